@@ -1,5 +1,25 @@
+import time
+
+from sqlalchemy import event
 from sqlalchemy.ext.asyncio import create_async_engine, async_sessionmaker, AsyncSession
 
+from other.request_context import CALL_KIND_DB, record_call
+
+
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    conn.info.setdefault("query_start_time", []).append(time.monotonic())
+
+
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    started = conn.info["query_start_time"].pop()
+    record_call(CALL_KIND_DB, statement.split(None, 1)[0], time.monotonic() - started)
+
+
+def install_call_tracing(engine) -> None:
+    """Записывает каждый SQL-запрос в трассу текущего HTTP-запроса."""
+    event.listen(engine.sync_engine, "before_cursor_execute", _before_cursor_execute)
+    event.listen(engine.sync_engine, "after_cursor_execute", _after_cursor_execute)
+
 
 def create_async_pool(db_dsn: str):
     """
@@ -140,6 +140,31 @@ class TransactionRepository:
         result = await self.session.execute(query.offset(offset).limit(limit))
         return result.all()
 
+    async def get_sequence_range(
+        self, source_account: str, first_sequence: int, count: int
+    ) -> List[Any]:
+        """Транзакции аккаунта с sequence из диапазона (пачки выплат)"""
+        query = (
+            select(
+                Transactions.hash.label("hash"),
+                Transactions.description.label("description"),
+                Transactions.add_dt.label("add_dt"),
+                Transactions.state.label("state"),
+                Transactions.stellar_sequence.label("stellar_sequence"),
+                func.count(Signatures.signature_xdr).label("signature_count"),
+            )
+            .outerjoin(Signatures, Transactions.hash == Signatures.transaction_hash)
+            .filter(
+                Transactions.source_account == source_account,
+                Transactions.stellar_sequence >= first_sequence,
+                Transactions.stellar_sequence < first_sequence + count,
+            )
+            .group_by(Transactions)
+            .order_by(Transactions.stellar_sequence, Transactions.add_dt)
+        )
+        result = await self.session.execute(query)
+        return result.all()
+
     async def get_signature_by_signer_public_key(
         self, public_key: str, tx_hash: str
     ) -> Optional[Signatures]:
@@ -1,92 +1,303 @@
+"""Асинхронный TTL/LRU кеш и декоратор async_cache_with_ttl.
+
+Кеш живет в одном event loop, поэтому чтение и запись - обычные операции
+со словарем без lock. Поверх этого:
+- single-flight: одновременные промахи по одному ключу ждут одну загрузку;
+- stale-while-revalidate: после ttl значение еще stale_ttl секунд отдается
+  сразу, а обновление идет в фоне;
+- negative caching: None кешируется на negative_ttl (0 - не кешируется);
+- jitter: ttl каждой записи случайно сдвигается на +-jitter, чтобы записи,
+  положенные одновременно, не истекали одновременно;
+- статистика попаданий/промахов/загрузок по каждому кешу (cache_stats());
+- shared=True: записи дублируются в общий для воркеров кеш
+  (other.shared_cache), промах в памяти сначала ищется там.
+"""
+
 import asyncio
-from functools import wraps
-from time import time
-from typing import Optional, Any, Tuple
+import random
 from collections import OrderedDict
+from collections.abc import Awaitable, Callable, Hashable
+from dataclasses import asdict, dataclass
+from functools import wraps
+from time import perf_counter, time
+from typing import Any
+
+from loguru import logger
+
+from other import shared_cache
+from other.request_context import create_detached_task
+
+_caches: dict[str, "AsyncTTLCache"] = {}
+# Общий для воркеров кеш, ставится при старте (start.py); None - только память
+_shared_backend = None
+
+
+def set_shared_backend(backend):
+    global _shared_backend
+    _shared_backend = backend
+
+
+def get_shared_backend():
+    return _shared_backend
+
+
+@dataclass
+class CacheStats:
+    hits: int = 0
+    negative_hits: int = 0
+    stale_hits: int = 0
+    misses: int = 0
+    loads: int = 0
+    load_errors: int = 0
+    load_time: float = 0.0  # суммарное время загрузок, секунд
+    shared_hits: int = 0  # промах в памяти, найдено в общем кеше
+
+
+def _retrieve_exception(future: asyncio.Future):
+    # Фоновое обновление (stale-while-revalidate) никто не ждет, ошибка уже
+    # учтена в load_errors - забираем ее, чтобы asyncio не ругался в лог
+    if not future.cancelled():
+        future.exception()
+
+
+@dataclass(slots=True)
+class _Entry:
+    value: Any
+    expires_at: float
+    stale_until: float
 
 
 class AsyncTTLCache:
-    def __init__(self, ttl_seconds: int, maxsize: int = 128):
+    def __init__(
+        self,
+        ttl_seconds: float,
+        maxsize: int = 128,
+        *,
+        stale_ttl: float = 0,
+        negative_ttl: float = 0,
+        jitter: float = 0.0,
+        name: str | None = None,
+        shared: bool = False,
+    ):
+        if shared and not name:
+            raise ValueError("shared cache needs a name")
         self.ttl_seconds = ttl_seconds
         self.maxsize = maxsize
-        self.cache: OrderedDict[str, Tuple[float, Any]] = OrderedDict()
-        self._lock = asyncio.Lock()
+        self.stale_ttl = stale_ttl
+        self.negative_ttl = negative_ttl
+        self.jitter = jitter
+        self.name = name
+        self.shared = shared
+        self.cache: OrderedDict[Hashable, _Entry] = OrderedDict()
+        self.stats = CacheStats()
+        self._loads: dict[Hashable, asyncio.Future] = {}
+        if name:
+            _caches[name] = self
 
-    async def get(self, key: str) -> Optional[Any]:
-        """Returns the value from the cache if it is valid (not expired), otherwise removes the key and returns None."""
-        async with self._lock:
-            if key in self.cache:
-                timestamp, value = self.cache[key]
-                if time() - timestamp < self.ttl_seconds:
-                    self.cache.move_to_end(key)
-                    return value
-                else:
-                    del self.cache[key]
+    def _ttl(self, ttl: float) -> float:
+        if self.jitter:
+            return ttl * random.uniform(1 - self.jitter, 1 + self.jitter)
+        return ttl
+
+    def _store(self, key: Hashable, entry: _Entry):
+        if key not in self.cache and len(self.cache) >= self.maxsize:
+            self.cache.popitem(last=False)  # удаляем самый старый элемент
+        self.cache[key] = entry
+        # Явно перемещаем в конец для обеспечения LRU-порядка
+        self.cache.move_to_end(key)
+
+    def _put(self, key: Hashable, value: Any, ttl: float) -> _Entry:
+        expires_at = time() + self._ttl(ttl)
+        entry = _Entry(value, expires_at, expires_at + self.stale_ttl)
+        self._store(key, entry)
+        return entry
+
+    @property
+    def _backend(self):
+        return _shared_backend if self.shared else None
+
+    async def _shared_get(self, key: Hashable) -> _Entry | None:
+        backend = self._backend
+        if backend is None:
+            return None
+        try:
+            row = await backend.get(self.name, _shared_key(key))
+            if row is None:
+                return None
+            text, expires_at, stale_until = row
+            entry = _Entry(shared_cache.loads(text), expires_at, stale_until)
+        except Exception as e:
+            logger.warning(f"shared cache {self.name}: read failed: {e}")
             return None
+        self.stats.shared_hits += 1
+        self._store(key, entry)
+        return entry
 
-    async def set(self, key: str, value: Any) -> None:
-        """Forcibly sets a key in the cache."""
-        async with self._lock:
-            if len(self.cache) >= self.maxsize and key not in self.cache:
-                self.cache.popitem(last=False)  # удаляем самый старый элемент
-            self.cache[key] = (time(), value)
-            # Явно перемещаем в конец для обеспечения LRU-порядка
+    async def _shared_set(self, key: Hashable, entry: _Entry):
+        backend = self._backend
+        if backend is None:
+            return
+        try:
+            text = shared_cache.dumps(entry.value)
+        except (TypeError, ValueError):
+            return  # не сериализуется - остается только в памяти воркера
+        try:
+            await backend.set(
+                self.name, _shared_key(key), text, entry.expires_at, entry.stale_until
+            )
+        except Exception as e:
+            logger.warning(f"shared cache {self.name}: write failed: {e}")
+
+    def get_nowait(self, key: Hashable) -> Any | None:
+        """Значение, если оно не истекло, иначе None"""
+        entry = self.cache.get(key)
+        if entry is None:
+            return None
+        now = time()
+        if now < entry.expires_at:
             self.cache.move_to_end(key)
+            return entry.value
+        if now >= entry.stale_until:
+            del self.cache[key]
+        return None
 
-    async def invalidate(self, key: str) -> bool:
+    async def get(self, key: Hashable) -> Any | None:
+        """Returns the value from the cache if it is valid (not expired), otherwise removes the key and returns None."""
+        value = self.get_nowait(key)
+        if value is None and self.shared:
+            entry = await self._shared_get(key)
+            if entry is not None and time() < entry.expires_at:
+                value = entry.value
+        return value
+
+    async def set(self, key: Hashable, value: Any, ttl: float | None = None) -> None:
+        """Forcibly sets a key in the cache."""
+        entry = self._put(key, value, self.ttl_seconds if ttl is None else ttl)
+        await self._shared_set(key, entry)
+
+    async def invalidate(self, key: Hashable) -> bool:
         """Forcibly removes a key from the cache. Returns True if the key was removed, False if the key was not present."""
-        async with self._lock:
-            if key in self.cache:
-                del self.cache[key]
-                return True
-            return False
+        if self._backend is not None:
+            try:
+                await self._backend.delete(self.name, _shared_key(key))
+            except Exception as e:
+                logger.warning(f"shared cache {self.name}: delete failed: {e}")
+        return self.cache.pop(key, None) is not None
 
+    def clear(self):
+        self.cache.clear()
 
-def async_cache_with_ttl(ttl_seconds: int, maxsize: int = 32):
-    cache = AsyncTTLCache(ttl_seconds, maxsize)
+    async def _load(self, key: Hashable, loader: Callable[[], Awaitable[Any]]):
+        started = perf_counter()
+        try:
+            value = await loader()
+        except Exception:
+            self.stats.load_errors += 1
+            raise
+        finally:
+            self._loads.pop(key, None)
+            self.stats.loads += 1
+            self.stats.load_time += perf_counter() - started
 
-    def decorator(func):
-        @wraps(func)
-        async def wrapper(*args, **kwargs):
-            key_parts = [repr(args)]
-            if kwargs:
-                key_parts.append(repr(tuple(sorted(kwargs.items()))))
-            cache_key = "".join(key_parts)
+        if value is not None:
+            await self._shared_set(key, self._put(key, value, self.ttl_seconds))
+        elif self.negative_ttl:
+            await self._shared_set(key, self._put(key, None, self.negative_ttl))
+        return value
 
-            cached_value = await cache.get(cache_key)
-            if cached_value is not None:
-                return cached_value
+    def _start_load(self, key: Hashable, loader) -> asyncio.Future:
+        future = self._loads.get(key)
+        if future is None:
+            # Загрузка общая для всех ждущих - не в трассе первого вызывающего
+            future = create_detached_task(self._load(key, loader))
+            self._loads[key] = future
+            future.add_done_callback(_retrieve_exception)
+        return future
 
-            result = await func(*args, **kwargs)
+    async def get_or_load(
+        self, key: Hashable, loader: Callable[[], Awaitable[Any]]
+    ) -> Any:
+        """Значение из кеша или результат loader() (один на все одновременные промахи)"""
+        entry = self.cache.get(key)
+        if self.shared and (entry is None or time() >= entry.expires_at):
+            # Другой воркер мог уже загрузить или обновить значение
+            entry = await self._shared_get(key) or entry
+        if entry is not None:
+            now = time()
+            if now < entry.expires_at:
+                self.cache.move_to_end(key)
+                if entry.value is None:
+                    self.stats.negative_hits += 1
+                else:
+                    self.stats.hits += 1
+                return entry.value
+            if now < entry.stale_until:
+                self.stats.stale_hits += 1
+                self._start_load(key, loader)
+                return entry.value
+            del self.cache[key]
 
-            await cache.set(cache_key, result)
+        self.stats.misses += 1
+        # shield: отмена одного вызывающего не отменяет загрузку для остальных
+        return await asyncio.shield(self._start_load(key, loader))
 
-            return result
 
-        return wrapper
+def _shared_key(key: Hashable) -> str:
+    return key if isinstance(key, str) else repr(key)
 
-    return decorator
+
+def _make_key(args: tuple, kwargs: dict) -> Hashable:
+    key = (args, tuple(sorted(kwargs.items()))) if kwargs else args
+    try:
+        hash(key)
+    except TypeError:
+        return repr(key)
+    return key
 
 
-# Примеры использования:
+def async_cache_with_ttl(
+    ttl_seconds: float,
+    maxsize: int = 32,
+    *,
+    stale_ttl: float = 0,
+    negative_ttl: float = 0,
+    jitter: float = 0.1,
+    key: Callable[..., Hashable] | None = None,
+    shared: bool = False,
+):
+    """Кеширует результат корутины по аргументам.
 
+    key - своя функция ключа от тех же аргументов (например, без self).
+    None кешируется только при negative_ttl > 0, исключения не кешируются.
+    shared - делить результат между воркерами (ключ должен иметь
+    стабильный repr, значение - сериализоваться в JSON).
+    """
 
-# С дефолтным maxsize=32
-@async_cache_with_ttl(ttl_seconds=3600)
-async def get_fund_signers_test():
-    print("real call")
-    return "data"
+    def decorator(func):
+        cache = AsyncTTLCache(
+            ttl_seconds,
+            maxsize,
+            stale_ttl=stale_ttl,
+            negative_ttl=negative_ttl,
+            jitter=jitter,
+            name=f"{func.__module__}.{func.__qualname__}",
+            shared=shared,
+        )
 
+        @wraps(func)
+        async def wrapper(*args, **kwargs):
+            cache_key = key(*args, **kwargs) if key else _make_key(args, kwargs)
+            return await cache.get_or_load(cache_key, lambda: func(*args, **kwargs))
 
-# Тестирование
-async def test():
-    result1 = await get_fund_signers_test()
-    print(result1)
+        wrapper.cache = cache
+        return wrapper
 
-    # Повторный вызов должен взять из кэша
-    result2 = await get_fund_signers_test()
-    print(result2)
+    return decorator
 
 
-if __name__ == "__main__":
-    asyncio.run(test())
+def cache_stats() -> dict[str, dict[str, Any]]:
+    """Статистика именованных кешей: {имя: {hits, misses, ..., size}}"""
+    return {
+        name: {**asdict(cache.stats), "size": len(cache.cache)}
+        for name, cache in _caches.items()
+    }
@@ -47,6 +47,44 @@ class Settings(BaseSettings):
     telegram_login_client_id: str = ""
     telegram_login_client_secret: SecretStr = SecretStr("")
     telegram_login_redirect_uri: str | None = None
+    # Максимум внешних вызовов (Horizon/Soroban/Grist) на один HTTP-запрос, сверх него вызов не уходит, 0 - без ограничения
+    outbound_call_budget: int = 60
+    # Порог SQL-запросов на один HTTP-запрос, превышение только логируется, 0 - без ограничения
+    db_call_budget: int = 200
+    # Снимок кеша Grist на диске (log/ - единственный писаемый volume в docker), "" - отключить
+    grist_cache_snapshot_path: str = os.path.join(start_path, "log", "grist_cache.json")
+    rely_job_workers: int = 4
+    rely_job_queue_size: int = 1000
+    # Write-behind буфер записи в Grist: пачка уходит раз в N мс или при M записях
+    grist_write_flush_ms: int = 500
+    grist_write_batch_size: int = 100
+    grist_write_spill_path: str = os.path.join(
+        start_path, "log", "grist_write_spill.jsonl"
+    )
+    # gzip/brotli для текстовых ответов начиная с этого размера (байт)
+    compress_min_size: int = 1024
+    # Дисковый кеш метаданных IPFS по CID и его предельный размер, "" - отключить
+    ipfs_cache_path: str = os.path.join(start_path, "log", "ipfs_cache")
+    ipfs_cache_max_mb: int = 50
+    # Локальная оценка path payment: как часто обновлять стаканы и пулы запрошенных активов, 0 - только Horizon
+    path_estimator_refresh_seconds: int = 60
+    # Пулы конечных точек: запрос идет в самую здоровую, медленное чтение
+    # дублируется на вторую через endpoint_hedge_ms
+    horizon_urls: list[str] = ["https://horizon.stellar.org"]
+    soroban_rpc_urls: list[str] = ["https://soroban-rpc.mainnet.stellar.gateway.fm"]
+    endpoint_hedge_ms: int = 800
+    # Фоновая проверка точек пула (если их больше одной), 0 - отключить
+    endpoint_probe_seconds: int = 30
+    # Общий для воркеров кеш (SQLite) Horizon/Grist-ответов, "" - только память воркера
+    shared_cache_path: str = os.path.join(start_path, "log", "shared_cache.sqlite3")
+    # Локальный симулятор upstream (python -m other.upstream_simulator) для
+    # нагрузочных прогонов: Horizon/Soroban/Grist/Telegram/IPFS идут в него, "" - выключен
+    upstream_simulator_url: str = ""
+    # Сторож event loop: задержка цикла дольше порога (мс) логируется со стеком
+    # блокирующего кода и маршрутом запроса, 0 - выключен
+    loop_watchdog_ms: int = 0
+    # Профили запросов ?__profile=1 (collapsed stacks для flamegraph)
+    profile_dir: str = os.path.join(start_path, "log", "profiles")
 
 
 config = Settings()
@@ -57,6 +95,19 @@ else:
     config.test_mode = True
 
 
+def simulator_url(path: str) -> str | None:
+    """Адрес ручки симулятора upstream или None, если симулятор не включен"""
+    if not config.upstream_simulator_url:
+        return None
+    return f"{config.upstream_simulator_url.rstrip('/')}{path}"
+
+
+if config.upstream_simulator_url:
+    config.horizon_urls = [simulator_url("/horizon")]
+    config.soroban_rpc_urls = [simulator_url("/soroban")]
+    config.telegram_api_url = simulator_url("/telegram")
+
+
 def update_test_user():
     if config.test_mode:
         data = {
@@ -0,0 +1,292 @@
+"""Пулы конечных точек Horizon и Soroban RPC с оценкой здоровья.
+
+Адреса берутся из конфига (horizon_urls, soroban_rpc_urls). Для каждой
+точки считается скользящая (EWMA) задержка и доля ошибок; после
+down_after ошибок подряд точка на down_seconds уходит в конец очереди.
+
+- pick() - адрес самой здоровой точки, для клиентов stellar_sdk;
+- request(call) - вызов call(base_url) на лучшей точке. Идемпотентное
+  чтение, не ответившее за hedge_delay, дублируется на вторую точку
+  (побеждает первый успешный ответ), при ошибке - переход к следующей.
+- start_probing() - фоновая проверка всех точек, чтобы оценка не
+  устаревала у точек, куда сейчас не идут запросы.
+"""
+
+import asyncio
+import time
+from collections.abc import Awaitable, Callable
+from dataclasses import dataclass
+from typing import Any
+
+from loguru import logger
+
+from other.config_reader import config
+from other.request_context import (
+    CALL_KIND_HORIZON,
+    CALL_KIND_SOROBAN,
+    CallBudgetExceeded,
+    check_budget,
+    register_host_kind,
+)
+from other.web_tools import WebResponse, http_session_manager
+
+# Задержка точки, которую еще не измеряли, секунд
+DEFAULT_LATENCY = 0.3
+# Во сколько раз доля ошибок 100% ухудшает оценку
+ERROR_PENALTY = 10.0
+# Прибавка к оценке выключенной точки: она выбирается только если других нет
+DOWN_PENALTY = 1e6
+
+
+@dataclass
+class Endpoint:
+    url: str
+    latency: float = 0.0  # EWMA, секунд; 0 - еще не измеряли
+    error_rate: float = 0.0  # EWMA доли ошибок
+    consecutive_errors: int = 0
+    down_until: float = 0.0
+    requests: int = 0
+    errors: int = 0
+
+    def score(self, now: float) -> float:
+        score = (self.latency or DEFAULT_LATENCY) * (
+            1 + ERROR_PENALTY * self.error_rate
+        )
+        if now < self.down_until:
+            score += DOWN_PENALTY
+        return score
+
+
+class EndpointPool:
+    def __init__(
+        self,
+        name: str,
+        urls: list[str],
+        kind: str,
+        *,
+        hedge_delay: float = 0.8,
+        alpha: float = 0.2,
+        down_after: int = 3,
+        down_seconds: float = 30.0,
+    ):
+        if not urls:
+            raise ValueError(f"endpoint pool {name} needs at least one url")
+        self.name = name
+        self.kind = kind
+        self.endpoints = [Endpoint(url.rstrip("/")) for url in urls]
+        self.hedge_delay = hedge_delay
+        self.alpha = alpha
+        self.down_after = down_after
+        self.down_seconds = down_seconds
+        self.hedges = 0
+        self._probe_task: asyncio.Task | None = None
+        for endpoint in self.endpoints:
+            register_host_kind(endpoint.url, kind)
+
+    def ranked(self) -> list[Endpoint]:
+        """Точки от лучшей к худшей; при равной оценке - в порядке конфига"""
+        now = time.monotonic()
+        return sorted(self.endpoints, key=lambda endpoint: endpoint.score(now))
+
+    def pick(self) -> str:
+        return self.ranked()[0].url
+
+    def _observe_latency(self, endpoint: Endpoint, elapsed: float):
+        if endpoint.latency:
+            endpoint.latency += self.alpha * (elapsed - endpoint.latency)
+        else:
+            endpoint.latency = elapsed
+
+    def record(self, endpoint: Endpoint, elapsed: float, ok: bool):
+        endpoint.requests += 1
+        self._observe_latency(endpoint, elapsed)
+        endpoint.error_rate += self.alpha * ((0.0 if ok else 1.0) - endpoint.error_rate)
+        if ok:
+            endpoint.consecutive_errors = 0
+            endpoint.down_until = 0.0
+            return
+        endpoint.errors += 1
+        endpoint.consecutive_errors += 1
+        if endpoint.consecutive_errors >= self.down_after:
+            endpoint.down_until = time.monotonic() + self.down_seconds
+
+    async def _attempt(
+        self,
+        endpoint: Endpoint,
+        call: Callable[[str], Awaitable[Any]],
+        ok: Callable[[Any], bool] | None,
+    ) -> tuple[Any, bool]:
+        started = time.monotonic()
+        try:
+            result = await call(endpoint.url)
+        except asyncio.CancelledError:
+            # Проиграли хедж: задержка точки не меньше прошедшего времени
+            self._observe_latency(endpoint, time.monotonic() - started)
+            raise
+        except CallBudgetExceeded:
+            raise  # вызов не уходил, точка ни при чем
+        except Exception:
+            self.record(endpoint, time.monotonic() - started, ok=False)
+            raise
+        good = ok(result) if ok else True
+        self.record(endpoint, time.monotonic() - started, ok=good)
+        return result, good
+
+    async def request(
+        self,
+        call: Callable[[str], Awaitable[Any]],
+        *,
+        idempotent: bool = True,
+        ok: Callable[[Any], bool] | None = None,
+    ) -> Any:
+        """call(base_url) на лучшей точке.
+
+        ok(result) - считать ли ответ успешным (например, status < 500).
+        Неидемпотентный вызов уходит ровно в одну точку. Идемпотентный
+        хеджируется на вторую точку через hedge_delay и при ошибке повторяется
+        на следующих; если успешных ответов нет, возвращается последний ответ
+        или пробрасывается последнее исключение.
+        """
+        check_budget(self.kind)
+        candidates = self.ranked()
+        if not idempotent or len(candidates) == 1:
+            result, _ = await self._attempt(candidates[0], call, ok)
+            return result
+
+        pending: dict[asyncio.Task, Endpoint] = {}
+        last_result: tuple[Any] | None = None
+        last_error: Exception | None = None
+        hedged = False
+
+        def launch():
+            endpoint = candidates.pop(0)
+            task = asyncio.create_task(self._attempt(endpoint, call, ok))
+            pending[task] = endpoint
+
+        launch()
+        try:
+            while pending:
+                can_hedge = not hedged and candidates and len(pending) == 1
+                done, _ = await asyncio.wait(
+                    pending,
+                    timeout=self.hedge_delay if can_hedge else None,
+                    return_when=asyncio.FIRST_COMPLETED,
+                )
+                if not done:
+                    hedged = True
+                    self.hedges += 1
+                    launch()
+                    continue
+                for task in done:
+                    del pending[task]
+                    try:
+                        result, good = task.result()
+                    except Exception as e:
+                        last_error = e
+                        continue
+                    if good:
+                        return result
+                    last_result = (result,)
+                if not pending and candidates:
+                    launch()  # переход к следующей точке
+        finally:
+            for task in pending:
+                task.cancel()
+            await asyncio.gather(*pending, return_exceptions=True)
+
+        if last_result is not None:
+            return last_result[0]
+        raise last_error
+
+    async def probe(self, check: Callable[[str], Awaitable[bool]]):
+        """Проверяет все точки параллельно и учитывает результат в оценке"""
+
+        async def probe_one(endpoint: Endpoint):
+            try:
+                await self._attempt(endpoint, check, ok=bool)
+            except Exception as e:
+                logger.debug(f"{self.name} probe {endpoint.url}: {e}")
+
+        await asyncio.gather(*(probe_one(endpoint) for endpoint in self.endpoints))
+
+    async def _probe_loop(self, check, interval: float):
+        while True:
+            await self.probe(check)
+            await asyncio.sleep(interval)
+
+    def start_probing(self, check: Callable[[str], Awaitable[bool]], interval: float):
+        if self._probe_task is None and len(self.endpoints) > 1:
+            self._probe_task = asyncio.create_task(self._probe_loop(check, interval))
+
+    async def stop_probing(self):
+        if self._probe_task is not None:
+            self._probe_task.cancel()
+            await asyncio.gather(self._probe_task, return_exceptions=True)
+            self._probe_task = None
+
+    def stats(self) -> list[dict[str, Any]]:
+        now = time.monotonic()
+        return [
+            {
+                "url": endpoint.url,
+                "latency_ms": round(endpoint.latency * 1000, 1),
+                "error_rate": round(endpoint.error_rate, 3),
+                "requests": endpoint.requests,
+                "errors": endpoint.errors,
+                "down": now < endpoint.down_until,
+            }
+            for endpoint in self.endpoints
+        ]
+
+
+def web_response_ok(response: WebResponse) -> bool:
+    """Ответ точки здоров: не 5xx, не таймаут и не rate limit"""
+    return response.status < 500 and response.status not in (408, 429)
+
+
+horizon_pool = EndpointPool(
+    "horizon",
+    config.horizon_urls,
+    CALL_KIND_HORIZON,
+    hedge_delay=config.endpoint_hedge_ms / 1000,
+)
+soroban_pool = EndpointPool(
+    "soroban",
+    config.soroban_rpc_urls,
+    CALL_KIND_SOROBAN,
+    hedge_delay=config.endpoint_hedge_ms / 1000,
+)
+
+
+async def horizon_request(
+    method: str, path: str, return_type: str | None = "json", **kwargs
+) -> WebResponse:
+    """Запрос к Horizon по пути (/accounts/G...) через пул точек"""
+
+    async def call(base_url: str) -> WebResponse:
+        return await http_session_manager.get_web_request(
+            method, f"{base_url}{path}", return_type=return_type, **kwargs
+        )
+
+    return await horizon_pool.request(
+        call, idempotent=method.upper() == "GET", ok=web_response_ok
+    )
+
+
+async def check_horizon(base_url: str) -> bool:
+    response = await http_session_manager.get_web_request(
+        "GET", f"{base_url}/", return_type="json", retries=0
+    )
+    return response.status == 200
+
+
+async def check_soroban(base_url: str) -> bool:
+    response = await http_session_manager.get_web_request(
+        "POST",
+        base_url,
+        json={"jsonrpc": "2.0", "id": 1, "method": "getHealth"},
+        return_type="json",
+    )
+    if response.status != 200 or not isinstance(response.data, dict):
+        return False
+    return response.data.get("result", {}).get("status") == "healthy"
@@ -1,7 +1,15 @@
+import asyncio
+import json
+import os
+import time
 from typing import Dict, List, Any, Optional
 from dataclasses import dataclass, field
 from loguru import logger
 
+from other.config_reader import config
+
+SNAPSHOT_VERSION = 1
+
 
 @dataclass
 class GristCacheManager:
@@ -11,6 +19,18 @@ class GristCacheManager:
     caches: Dict[str, List[Dict[str, Any]]] = field(default_factory=dict)
     index_caches: Dict[str, Dict[str, Dict[str, Any]]] = field(default_factory=dict)
 
+    # Файл снимка кеша на диске, None - снимки отключены
+    snapshot_path: Optional[str] = None
+    # Снимок моложе этого (его только что записал другой воркер) не
+    # перезапрашиваем из Grist при старте
+    snapshot_fresh_seconds: float = 60.0
+    _snapshot_lock: asyncio.Lock = field(default_factory=asyncio.Lock, repr=False)
+    _refresh_task: Optional[asyncio.Task] = field(default=None, repr=False)
+    _watch_task: Optional[asyncio.Task] = field(default=None, repr=False)
+    # mtime снимка, который мы сами записали или уже прочитали
+    _snapshot_mtime: Optional[float] = field(default=None, repr=False)
+    _snapshot_saved_at: float = field(default=0.0, repr=False)
+
     # Конфигурация таблиц для кеширования
     cached_tables = {
         "GRIST_access": {"indexed_by": "key"},  # проверки ключей доступа
@@ -23,27 +43,54 @@ class GristCacheManager:
         },  # пулы (фильтрация по need_dropdown)
     }
 
+    # Не пишутся в снимок: ключи доступа не храним на диске, и отозванный
+    # ключ не должен оживать после рестарта до фонового обновления
+    snapshot_excluded_tables = frozenset({"GRIST_access"})
+
     # Дополнительные индексы для таблиц
     additional_indexes = {
         "EURMTL_users": ["telegram_id"],  # дополнительный индекс для telegram_id
     }
 
     async def initialize_cache(self):
-        """Инициализация кеша при запуске приложения"""
-        logger.info("🔄 Начало инициализации кеша Grist...")
+        """Инициализация кеша при запуске приложения.
 
-        for table_name in self.cached_tables:
-            try:
-                await self.load_table_to_cache(table_name)
-                count = len(self.caches.get(table_name, []))
-                logger.info(
-                    f"✅ Таблица {table_name} загружена в кеш ({count} записей)"
+        Если есть снимок на диске - отдаем данные из него сразу,
+        а свежие данные из Grist подтягиваем в фоне. Таблицы не из снимка
+        (ключи доступа) загружаются до начала обслуживания.
+        """
+        if self.load_snapshot():
+            await asyncio.gather(
+                *(
+                    self._load_table_logged(table_name)
+                    for table_name in self.snapshot_excluded_tables
                 )
-            except Exception as e:
-                logger.error(f"❌ Ошибка загрузки таблицы {table_name}: {e}")
+            )
+            if time.time() - self._snapshot_saved_at < self.snapshot_fresh_seconds:
+                logger.info("Кеш Grist поднят из свежего снимка другого воркера")
+                return
+            logger.info("🔄 Кеш Grist поднят из снимка, обновление в фоне...")
+            self._refresh_task = asyncio.create_task(self.refresh_all_tables())
+            return
+
+        await self.refresh_all_tables()
 
+    async def refresh_all_tables(self):
+        """Параллельная загрузка всех таблиц из Grist"""
+        logger.info("🔄 Начало инициализации кеша Grist...")
+        await asyncio.gather(
+            *(self._load_table_logged(table_name) for table_name in self.cached_tables)
+        )
         logger.info("🎉 Кеш Grist успешно инициализирован")
 
+    async def _load_table_logged(self, table_name: str):
+        try:
+            await self.load_table_to_cache(table_name)
+            count = len(self.caches.get(table_name, []))
+            logger.info(f"✅ Таблица {table_name} загружена в кеш ({count} записей)")
+        except Exception as e:
+            logger.error(f"❌ Ошибка загрузки таблицы {table_name}: {e}")
+
     async def load_table_to_cache(self, table_name: str):
         """Загрузка конкретной таблицы в кеш"""
         from other.grist_tools import grist_manager, MTLGrist
@@ -74,6 +121,8 @@ class GristCacheManager:
                         if field in record and record[field] is not None
                     }
 
+            await self.save_snapshot()
+
     async def update_cache_by_webhook(self, table_name: str):
         """Обновление кеша по вебхуку - полная перезагрузка таблицы"""
         logger.info(f"🔄 Обновление кеша для таблицы {table_name}")
@@ -89,6 +138,125 @@ class GristCacheManager:
         except Exception as e:
             logger.error(f"❌ Ошибка обновления кеша таблицы {table_name}: {e}")
 
+    def _build_snapshot(self) -> Dict[str, Any]:
+        """Компактный снимок: записи таблиц + индексы как пары (ключ, позиция записи)"""
+        tables = {}
+        for table_name, records in self.caches.items():
+            if table_name in self.snapshot_excluded_tables:
+                continue
+            positions = {id(record): pos for pos, record in enumerate(records)}
+            index_keys = [table_name] + [
+                f"{table_name}_{extra_field}"
+                for extra_field in self.additional_indexes.get(table_name, [])
+            ]
+            indexes = {
+                index_key: [
+                    [key, positions[id(record)]]
+                    for key, record in self.index_caches[index_key].items()
+                ]
+                for index_key in index_keys
+                if index_key in self.index_caches
+            }
+            tables[table_name] = {"records": records, "indexes": indexes}
+        return {"version": SNAPSHOT_VERSION, "saved_at": time.time(), "tables": tables}
+
+    def _write_snapshot(self, payload: Dict[str, Any]) -> float:
+        os.makedirs(os.path.dirname(self.snapshot_path) or ".", exist_ok=True)
+        # Снимок пишут все воркеры, у каждого свой временный файл
+        tmp_path = f"{self.snapshot_path}.{os.getpid()}.tmp"
+        fd = os.open(tmp_path, os.O_WRONLY | os.O_CREAT | os.O_TRUNC, 0o600)
+        with open(fd, "w", encoding="utf-8") as f:
+            json.dump(payload, f, ensure_ascii=False, separators=(",", ":"))
+        os.replace(tmp_path, self.snapshot_path)
+        return os.stat(self.snapshot_path).st_mtime
+
+    async def save_snapshot(self):
+        """Сохранение снимка кеша на диск (атомарно, через временный файл)"""
+        if not self.snapshot_path:
+            return
+        async with self._snapshot_lock:
+            payload = self._build_snapshot()
+            try:
+                self._snapshot_mtime = await asyncio.to_thread(
+                    self._write_snapshot, payload
+                )
+            except OSError as e:
+                logger.warning(f"Не удалось сохранить снимок кеша Grist: {e}")
+
+    def _read_snapshot(self) -> Optional[tuple]:
+        """(caches, index_caches, saved_at, mtime) из файла снимка или None"""
+        if not self.snapshot_path or not os.path.exists(self.snapshot_path):
+            return None
+        try:
+            mtime = os.stat(self.snapshot_path).st_mtime
+            with open(self.snapshot_path, encoding="utf-8") as f:
+                payload = json.load(f)
+            if payload.get("version") != SNAPSHOT_VERSION:
+                logger.warning("Снимок кеша Grist устаревшего формата, пропускаем")
+                return None
+
+            caches = {}
+            index_caches = {}
+            for table_name, table in payload["tables"].items():
+                if (
+                    table_name not in self.cached_tables
+                    or table_name in self.snapshot_excluded_tables
+                ):
+                    continue
+                records = table["records"]
+                caches[table_name] = records
+                for index_key, pairs in table["indexes"].items():
+                    index_caches[index_key] = {key: records[pos] for key, pos in pairs}
+        except (OSError, ValueError, KeyError, IndexError, TypeError) as e:
+            logger.warning(f"Не удалось прочитать снимок кеша Grist: {e}")
+            return None
+        return caches, index_caches, payload.get("saved_at", 0), mtime
+
+    def _apply_snapshot(self, snapshot: tuple):
+        caches, index_caches, saved_at, mtime = snapshot
+        self.caches.update(caches)
+        self.index_caches.update(index_caches)
+        self._snapshot_saved_at = saved_at
+        self._snapshot_mtime = mtime
+        age = time.time() - saved_at
+        logger.info(
+            f"Кеш Grist загружен из снимка ({len(caches)} таблиц, возраст {age:.0f} с)"
+        )
+
+    def load_snapshot(self) -> bool:
+        """Загрузка кеша из снимка на диске. Возвращает True, если снимок применен"""
+        snapshot = self._read_snapshot()
+        if snapshot is None:
+            return False
+        self._apply_snapshot(snapshot)
+        return True
+
+    async def _watch_snapshot(self, interval: float):
+        while True:
+            await asyncio.sleep(interval)
+            try:
+                mtime = os.stat(self.snapshot_path).st_mtime
+            except OSError:
+                continue
+            if mtime == self._snapshot_mtime:
+                continue
+            # Снимок записал другой воркер (например, после вебхука Grist)
+            self._snapshot_mtime = mtime
+            snapshot = await asyncio.to_thread(self._read_snapshot)
+            if snapshot is not None:
+                self._apply_snapshot(snapshot)
+
+    def start_snapshot_watch(self, interval: float = 5.0):
+        """Подхватывать снимки, записанные другими воркерами хоста"""
+        if self.snapshot_path and self._watch_task is None:
+            self._watch_task = asyncio.create_task(self._watch_snapshot(interval))
+
+    async def stop_snapshot_watch(self):
+        if self._watch_task is not None:
+            self._watch_task.cancel()
+            await asyncio.gather(self._watch_task, return_exceptions=True)
+            self._watch_task = None
+
     def get_table_data(self, table_name: str) -> List[Dict[str, Any]]:
         """Получение всех данных таблицы из кеша"""
         return self.caches.get(table_name, [])
@@ -114,6 +282,41 @@ class GristCacheManager:
         table_data = self.caches.get(table_name, [])
         return [record for record in table_data if record.get(field) in values]
 
+    async def find_or_fetch(
+        self,
+        table_name: str,
+        filter_dict: Optional[Dict[str, List[Any]]] = None,
+        columns: Optional[List[str]] = None,
+    ) -> List[Dict[str, Any]]:
+        """Записи из кеша, а если таблица еще не загружена - узкий запрос в Grist.
+
+        columns - вернуть только эти колонки (плюс id), из кеша тоже.
+        """
+        if self.caches.get(table_name):
+            records = [
+                record
+                for record in self.caches[table_name]
+                if all(
+                    record.get(field) in values
+                    for field, values in (filter_dict or {}).items()
+                )
+            ]
+            if columns:
+                # Та же форма, что у ответа /sql: id и запрошенные колонки
+                keep = ["id", *(column for column in columns if column != "id")]
+                records = [
+                    {column: record[column] for column in keep if column in record}
+                    for record in records
+                ]
+            return records
+
+        from other.grist_tools import grist_manager, MTLGrist
+
+        records = await grist_manager.load_table_data(
+            getattr(MTLGrist, table_name), filter_dict=filter_dict, columns=columns
+        )
+        return records or []
+
     def find_one_by_filter(
         self, table_name: str, field: str, value: Any
     ) -> Optional[Dict[str, Any]]:
@@ -126,4 +329,4 @@ class GristCacheManager:
 
 
 # Глобальный экземпляр
-grist_cache = GristCacheManager()
+grist_cache = GristCacheManager(snapshot_path=config.grist_cache_snapshot_path or None)
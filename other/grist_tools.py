@@ -1,5 +1,7 @@
 import asyncio
 import json
+import os
+import re
 from datetime import datetime, timezone
 from dataclasses import dataclass
 from typing import List, Dict, Any, Optional
@@ -10,15 +12,20 @@ from stellar_sdk.client.aiohttp_client import AiohttpClient
 from other.cache_tools import AsyncTTLCache
 from other.telegram_tools import skynet_bot
 from db.sql_models import User
-from other.config_reader import config
+from other.config_reader import config, simulator_url
+from other.shared_cache import register_cache_type
+from other.request_context import create_detached_task
 from other.web_tools import HTTPSessionManager
+from other.endpoint_pool import horizon_pool
 
 
 @dataclass
 class GristTableConfig:
     access_id: str
     table_name: str
-    base_url: str = "https://montelibero.getgrist.com/api/docs"
+    base_url: str = (
+        simulator_url("/grist/api/docs") or "https://montelibero.getgrist.com/api/docs"
+    )
 
 
 # Enum для таблиц
@@ -56,18 +63,282 @@ class MTLGrist:
     MTL_admin_panel = GristTableConfig("cqmjqbs4e97hbKHyRADQ9N", "AdminPanel")
 
 
+def _sql_identifier(name: str) -> str:
+    if not re.fullmatch(r"[A-Za-z_][A-Za-z0-9_]*", name):
+        raise ValueError(f"Недопустимое имя колонки Grist: {name!r}")
+    return f'"{name}"'
+
+
+@dataclass
+class _PendingWrite:
+    record: Dict[str, Any]
+    future: Optional[asyncio.Future] = None
+
+
+class GristWriteBuffer:
+    """
+    Write-behind буфер для записи в Grist.
+
+    Записи копятся по ключу (метод, таблица, набор полей) и уходят одним запросом
+    {"records": [...]} раз в flush_interval секунд или сразу при накоплении max_batch
+    записей. PATCH одной и той же записи внутри пачки сливается в один.
+    Неудачная отправка повторяется с экспоненциальной задержкой, после исчерпания
+    попыток записи дописываются в spill-файл (jsonl) и отправляются при следующем старте.
+    """
+
+    def __init__(
+        self,
+        api: "GristAPI",
+        flush_interval: float = 0.5,
+        max_batch: int = 100,
+        max_retries: int = 4,
+        retry_delay: float = 1.0,
+        spill_path: Optional[str] = None,
+    ):
+        self.api = api
+        self.flush_interval = flush_interval
+        self.max_batch = max_batch
+        self.max_retries = max_retries
+        self.retry_delay = retry_delay
+        self.spill_path = spill_path
+        self._pending: Dict[tuple, List[_PendingWrite]] = {}
+        self._timers: Dict[tuple, asyncio.Task] = {}
+        self._inflight: set[asyncio.Task] = set()
+
+    async def add(
+        self,
+        method: str,
+        table: GristTableConfig,
+        record: Dict[str, Any],
+        wait: bool = False,
+    ) -> bool:
+        """
+        Ставит запись в очередь.
+
+        Args:
+            method: "POST" (добавление) или "PATCH" (обновление, в record нужен id)
+            table: Конфигурация таблицы Grist
+            record: Запись в формате {"fields": {...}} или {"id": 1, "fields": {...}}
+            wait: Дождаться отправки пачки и вернуть ее результат
+        """
+        future = self._enqueue(method, table, record, wait)
+        if future is None:
+            return True
+        return await future
+
+    def _enqueue(
+        self,
+        method: str,
+        table: GristTableConfig,
+        record: Dict[str, Any],
+        wait: bool,
+    ) -> Optional[asyncio.Future]:
+        key = (
+            method,
+            table.base_url,
+            table.access_id,
+            table.table_name,
+            tuple(sorted(record["fields"])),
+        )
+        future = asyncio.get_running_loop().create_future() if wait else None
+        batch = self._pending.setdefault(key, [])
+        batch.append(_PendingWrite(record, future))
+
+        if len(batch) >= self.max_batch:
+            self._start_flush(key)
+        elif key not in self._timers:
+            self._timers[key] = self._track(self._flush_later(key))
+        return future
+
+    async def _flush_later(self, key: tuple):
+        await asyncio.sleep(self.flush_interval)
+        self._timers.pop(key, None)
+        await self._flush_key(key)
+
+    def _start_flush(self, key: tuple):
+        timer = self._timers.pop(key, None)
+        if timer:
+            timer.cancel()
+        self._track(self._flush_key(key))
+
+    def _track(self, coro) -> asyncio.Task:
+        # В пачке записи разных запросов: отправка не должна тратить бюджет
+        # вызовов того запроса, который ее запустил
+        task = create_detached_task(coro)
+        self._inflight.add(task)
+        task.add_done_callback(self._inflight.discard)
+        return task
+
+    async def _flush_key(self, key: tuple):
+        items = self._pending.pop(key, [])
+        if not items:
+            return
+        method, base_url, access_id, table_name, _ = key
+        table = GristTableConfig(access_id, table_name, base_url)
+        records = [item.record for item in items]
+        if method == "PATCH":
+            records = self._coalesce_patches(records)
+
+        success = await self._send(method, table, records)
+        if not success:
+            await self._spill(method, table, records)
+        for item in items:
+            if item.future and not item.future.done():
+                item.future.set_result(success)
+
+    @staticmethod
+    def _coalesce_patches(records: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+        merged: Dict[Any, Dict[str, Any]] = {}
+        for record in records:
+            merged.setdefault(record["id"], {}).update(record["fields"])
+        return [
+            {"id": record_id, "fields": fields} for record_id, fields in merged.items()
+        ]
+
+    async def _send(
+        self, method: str, table: GristTableConfig, records: List[Dict[str, Any]]
+    ) -> bool:
+        send = self.api.post_data if method == "POST" else self.api.patch_data
+        for attempt in range(self.max_retries + 1):
+            try:
+                await send(table, {"records": records})
+                return True
+            except Exception as e:
+                if attempt == self.max_retries:
+                    logger.error(
+                        f"Grist {method} {table.table_name}: {len(records)} записей "
+                        f"не отправлены после {attempt + 1} попыток: {e}"
+                    )
+                    return False
+                delay = self.retry_delay * 2**attempt
+                logger.warning(
+                    f"Grist {method} {table.table_name}: ошибка отправки ({e}), "
+                    f"повтор через {delay:.1f} с"
+                )
+                await asyncio.sleep(delay)
+        return False
+
+    async def _spill(
+        self, method: str, table: GristTableConfig, records: List[Dict[str, Any]]
+    ):
+        if not self.spill_path:
+            return
+        line = json.dumps(
+            {
+                "method": method,
+                "table": {
+                    "access_id": table.access_id,
+                    "table_name": table.table_name,
+                    "base_url": table.base_url,
+                },
+                "records": records,
+            },
+            ensure_ascii=False,
+        )
+        try:
+            await asyncio.to_thread(self._append_spill, line)
+        except OSError as e:
+            logger.error(f"Не удалось сохранить записи Grist в {self.spill_path}: {e}")
+
+    def _append_spill(self, line: str):
+        os.makedirs(os.path.dirname(self.spill_path) or ".", exist_ok=True)
+        with open(self.spill_path, "a", encoding="utf-8") as f:
+            f.write(line + "\n")
+
+    def _take_spill(self) -> tuple[Optional[str], List[str]]:
+        """Переносит spill-файл в .replay и читает его.
+
+        .replay, оставшийся после сбоя во время прошлого повтора, не
+        перезаписывается: новый spill-файл дописывается к нему.
+        """
+        replay_path = f"{self.spill_path}.replay"
+        if os.path.exists(self.spill_path):
+            if os.path.exists(replay_path):
+                with (
+                    open(self.spill_path, encoding="utf-8") as src,
+                    open(replay_path, "a", encoding="utf-8") as dst,
+                ):
+                    # Последняя строка .replay могла остаться без перевода строки
+                    dst.write("\n" + src.read())
+                os.remove(self.spill_path)
+            else:
+                os.replace(self.spill_path, replay_path)
+        if not os.path.exists(replay_path):
+            return None, []
+        with open(replay_path, encoding="utf-8") as f:
+            return replay_path, f.readlines()
+
+    async def replay_spill(self) -> int:
+        """Ставит в очередь записи, сохраненные в spill-файл при прошлых сбоях.
+
+        Файл .replay удаляется только после отправки всех записей из него:
+        неотправленные к этому моменту уже снова лежат в spill-файле.
+        """
+        if not self.spill_path:
+            return 0
+        replay_path, lines = await asyncio.to_thread(self._take_spill)
+        if replay_path is None:
+            return 0
+
+        futures = []
+        for line in lines:
+            if not line.strip():
+                continue
+            try:
+                entry = json.loads(line)
+                table = GristTableConfig(**entry["table"])
+            except (ValueError, KeyError, TypeError) as e:
+                logger.error(f"Битая строка в spill-файле Grist: {e}")
+                continue
+            futures.extend(
+                self._enqueue(entry["method"], table, record, wait=True)
+                for record in entry["records"]
+            )
+        self._track(self._finish_replay(replay_path, futures))
+        logger.info(f"Из spill-файла Grist поставлено в очередь {len(futures)} записей")
+        return len(futures)
+
+    async def _finish_replay(self, replay_path: str, futures: List[asyncio.Future]):
+        await asyncio.gather(*futures)
+        try:
+            await asyncio.to_thread(os.remove, replay_path)
+        except OSError as e:
+            logger.error(f"Не удалось удалить {replay_path}: {e}")
+
+    async def flush_all(self):
+        """Отправляет все накопленные записи (используется при остановке)"""
+        for key in list(self._pending):
+            self._start_flush(key)
+        if self._inflight:
+            await asyncio.gather(*self._inflight, return_exceptions=True)
+
+
 class GristAPI:
-    def __init__(self, session_manager: HTTPSessionManager = None):
+    def __init__(
+        self,
+        session_manager: HTTPSessionManager = None,
+        write_spill_path: Optional[str] = None,
+    ):
         self.session_manager = session_manager
         self.token = config.grist_token
         if not self.session_manager:
             self.session_manager = HTTPSessionManager()
+        self.write_buffer = GristWriteBuffer(
+            self,
+            flush_interval=config.grist_write_flush_ms / 1000,
+            max_batch=config.grist_write_batch_size,
+            spill_path=write_spill_path,
+        )
 
     async def fetch_data(
         self,
         table: GristTableConfig,
         sort: Optional[str] = None,
         filter_dict: Optional[Dict[str, List[Any]]] = None,
+        ids: Optional[List[int]] = None,
+        columns: Optional[List[str]] = None,
+        limit: Optional[int] = None,
+        offset: Optional[int] = None,
     ) -> List[Dict[str, Any]]:
         """
         Загружает данные из указанной таблицы Grist.
@@ -77,11 +348,25 @@ class GristAPI:
             sort: Параметр сортировки
             filter_dict: Словарь фильтрации в формате {"column": [value1, value2]}
                         Пример: {"TGID": [123456789]}
+            ids: Загрузить только записи с этими id
+            columns: Вернуть только эти колонки (плюс id)
+            limit: Максимальное число записей
+            offset: Сколько записей пропустить
         """
         from urllib.parse import quote
 
+        if ids is not None:
+            filter_dict = {**(filter_dict or {}), "id": list(ids)}
+        # Endpoint /records не умеет выбирать колонки и пропускать записи,
+        # для этого идем через /sql
+        if columns or offset:
+            return await self._fetch_sql(
+                table, sort, filter_dict, columns, limit, offset
+            )
+
         headers = {
             "accept": "application/json",
+            "Accept-Encoding": "gzip",
             "Authorization": f"Bearer {self.token}",
         }
         url = f"{table.base_url}/{table.access_id}/tables/{table.table_name}/records"
@@ -94,6 +379,8 @@ class GristAPI:
             filter_json = json.dumps(filter_dict)
             encoded_filter = quote(filter_json)
             params.append(f"filter={encoded_filter}")
+        if limit:
+            params.append(f"limit={int(limit)}")
 
         if params:
             url = f"{url}?{'&'.join(params)}"
@@ -110,6 +397,65 @@ class GristAPI:
             case _:
                 raise Exception(f"Ошибка запроса: Статус {response.status}")
 
+    async def _fetch_sql(
+        self,
+        table: GristTableConfig,
+        sort: Optional[str],
+        filter_dict: Optional[Dict[str, List[Any]]],
+        columns: Optional[List[str]],
+        limit: Optional[int],
+        offset: Optional[int],
+    ) -> List[Dict[str, Any]]:
+        """Выборка через SQL endpoint Grist (projection, limit/offset).
+
+        Булевы колонки SQLite возвращает как 0/1.
+        """
+        select = "*"
+        if columns:
+            projected = [
+                _sql_identifier(column) for column in columns if column != "id"
+            ]
+            select = ", ".join(["id", *projected])
+        sql = f"SELECT {select} FROM {_sql_identifier(table.table_name)}"
+        args: List[Any] = []
+
+        conditions = []
+        for column, values in (filter_dict or {}).items():
+            placeholders = ", ".join("?" for _ in values)
+            conditions.append(f"{_sql_identifier(column)} IN ({placeholders})")
+            args.extend(values)
+        if conditions:
+            sql += " WHERE " + " AND ".join(conditions)
+
+        if sort:
+            order = []
+            for column in sort.split(","):
+                column = column.strip()
+                direction = "DESC" if column.startswith("-") else "ASC"
+                order.append(f"{_sql_identifier(column.lstrip('-'))} {direction}")
+            sql += " ORDER BY " + ", ".join(order)
+
+        if limit or offset:
+            # В SQLite OFFSET без LIMIT не работает, -1 - без ограничения
+            sql += " LIMIT ? OFFSET ?"
+            args.extend([int(limit) if limit else -1, int(offset or 0)])
+
+        headers = {
+            "accept": "application/json",
+            "Accept-Encoding": "gzip",
+            "Authorization": f"Bearer {self.token}",
+        }
+        url = f"{table.base_url}/{table.access_id}/sql"
+        response = await self.session_manager.get_web_request(
+            method="POST", url=url, headers=headers, json={"sql": sql, "args": args}
+        )
+
+        match response.status:
+            case 200 if response.data and "records" in response.data:
+                return [record["fields"] for record in response.data["records"]]
+            case _:
+                raise Exception(f"Ошибка запроса: Статус {response.status}")
+
     async def put_data(
         self, table: GristTableConfig, json_data: Dict[str, Any]
     ) -> bool:
@@ -181,11 +527,30 @@ class GristAPI:
             case _:
                 raise Exception(f"Ошибка запроса: Статус {response.status}")
 
+    async def queue_post_record(
+        self, table: GristTableConfig, fields: Dict[str, Any], wait: bool = False
+    ) -> bool:
+        """Добавление записи через write-behind буфер (см. GristWriteBuffer)"""
+        return await self.write_buffer.add("POST", table, {"fields": fields}, wait)
+
+    async def queue_patch_record(
+        self,
+        table: GristTableConfig,
+        record_id: int,
+        fields: Dict[str, Any],
+        wait: bool = False,
+    ) -> bool:
+        """Обновление записи через write-behind буфер (см. GristWriteBuffer)"""
+        return await self.write_buffer.add(
+            "PATCH", table, {"id": record_id, "fields": fields}, wait
+        )
+
     async def load_table_data(
         self,
         table: GristTableConfig,
         sort: Optional[str] = None,
         filter_dict: Optional[Dict[str, List[Any]]] = None,
+        **options: Any,
     ) -> Optional[List[Dict[str, Any]]]:
         """
         Загружает данные из таблицы с обработкой ошибок.
@@ -195,9 +560,10 @@ class GristAPI:
             sort: Параметр сортировки
             filter_dict: Словарь фильтрации в формате {"column": [value1, value2]}
                         Пример: {"TGID": [123456789]}
+            options: ids, columns, limit, offset - см. fetch_data
         """
         try:
-            records = await self.fetch_data(table, sort, filter_dict)
+            records = await self.fetch_data(table, sort, filter_dict, **options)
             logger.info(f"Данные из таблицы {table.table_name} успешно загружены")
             return records
         except Exception as e:
@@ -230,11 +596,12 @@ def extract_record_ids_from_grist_webhook(payload: Any) -> list[int]:
 
 
 async def load_notify_message_records_by_ids(record_ids: list[int]) -> list[dict]:
-    records = await grist_manager.load_table_data(MTLGrist.NOTIFY_MESSAGES)
-    if not records:
+    if not record_ids:
         return []
-    wanted_ids = set(record_ids)
-    return [record for record in records if int(record.get("id", 0)) in wanted_ids]
+    records = await grist_manager.load_table_data(
+        MTLGrist.NOTIFY_MESSAGES, ids=record_ids
+    )
+    return records or []
 
 
 def should_send_notify_message_record(record: dict) -> bool:
@@ -258,9 +625,9 @@ def _normalize_optional_int(value: Any) -> int | None:
 
 
 async def patch_notify_message_record(record_id: int, fields: dict[str, Any]) -> bool:
-    return await grist_manager.patch_data(
-        MTLGrist.NOTIFY_MESSAGES,
-        {"records": [{"id": record_id, "fields": fields}]},
+    # Ждем отправки: send_date защищает от повторной рассылки сообщения
+    return await grist_manager.queue_patch_record(
+        MTLGrist.NOTIFY_MESSAGES, record_id, fields, wait=True
     )
 
 
@@ -296,10 +663,11 @@ async def send_notify_message_record(record: dict) -> dict[str, Any]:
         await patch_notify_message_record(record_id, {"error_message": error_text})
         return {"status": "failed", "id": record_id, "error": error_text}
 
-    await patch_notify_message_record(
+    if not await patch_notify_message_record(
         record_id,
         {"send_date": int(datetime.now(timezone.utc).timestamp()), "error_message": ""},
-    )
+    ):
+        logger.error(f"Сообщение {record_id} отправлено, но send_date не сохранен")
     return {"status": "sent", "id": record_id}
 
 
@@ -315,9 +683,7 @@ async def update_mtl_shareholders_balance():
             return
 
         updates = []
-        async with ServerAsync(
-            "https://horizon.stellar.org", client=AiohttpClient()
-        ) as server:
+        async with ServerAsync(horizon_pool.pick(), client=AiohttpClient()) as server:
             for shareholder in shareholders:
                 stellar_address = shareholder.get("stellar")
                 current_balance = shareholder.get("MTL") or 0
@@ -368,17 +734,22 @@ async def update_mtl_shareholders_balance():
 
 
 # Конфигурация
+register_cache_type(User)  # пользователи из grist_cash делятся между воркерами
 grist_session_manager = HTTPSessionManager()
-grist_manager = GristAPI(grist_session_manager)
+grist_manager = GristAPI(
+    grist_session_manager, write_spill_path=config.grist_write_spill_path or None
+)
 grist_cash = AsyncTTLCache(
-    ttl_seconds=86400
+    ttl_seconds=86400, name="grist.users", shared=True
 )  # Кеш для найденных пользователей на 24 часа
 not_found_cache = AsyncTTLCache(
-    ttl_seconds=3600
+    ttl_seconds=3600, name="grist.users_not_found", shared=True
 )  # Кеш для ненайденных пользователей на 1 час
-assets_cache = AsyncTTLCache(ttl_seconds=86400)  # Кеш для найденных активов на 24 часа
+assets_cache = AsyncTTLCache(
+    ttl_seconds=86400, name="grist.assets", shared=True
+)  # Кеш для найденных активов на 24 часа
 assets_not_found_cache = AsyncTTLCache(
-    ttl_seconds=3600
+    ttl_seconds=3600, name="grist.assets_not_found", shared=True
 )  # Кеш для ненайденных активов на 1 час
 
 
@@ -0,0 +1,193 @@
+"""Загрузка JSON-метаданных из IPFS.
+
+Запрос уходит во все шлюзы сразу, побеждает первый валидный JSON,
+остальные запросы отменяются. Содержимое IPFS неизменно для CID, поэтому
+ответы складываются в дисковый кеш (по файлу на CID) с ограничением
+общего размера: при переполнении удаляются давно не читанные файлы.
+"""
+
+import asyncio
+import json
+import os
+import re
+from functools import partial
+
+from loguru import logger
+
+from other.config_reader import config, simulator_url
+from other.request_context import create_detached_task
+from other.web_tools import http_session_manager
+
+IPFS_GATEWAYS = (
+    (simulator_url("/ipfs/"),)
+    if config.upstream_simulator_url
+    else (
+        "https://gateway.pinata.cloud/ipfs/",
+        "https://cloudflare-ipfs.com/ipfs/",
+        "https://ipfs.io/ipfs/",
+    )
+)
+
+_CID_RE = re.compile(r"[A-Za-z0-9]+")
+
+
+def normalize_ipfs_cid(raw_value: str) -> str | None:
+    """CID из значения ManageData: убирает ipfs://, путь и кавычки"""
+    cid = raw_value.strip().strip("\"'").strip().removeprefix("ipfs://")
+    cid = cid.strip("/").split("/")[0]
+    if not _CID_RE.fullmatch(cid):
+        return None
+    return cid
+
+
+def ipfs_cid_from_manage_data(data_name: str, data_value: bytes | None) -> str | None:
+    if not data_name.startswith("ipfshash") or not data_value:
+        return None
+    return normalize_ipfs_cid(data_value.decode(errors="replace"))
+
+
+class IpfsCidCache:
+    """Дисковый кеш метаданных по CID с ограничением размера в байтах"""
+
+    def __init__(self, path: str | None, max_bytes: int):
+        self.path = path
+        self.max_bytes = max_bytes
+
+    def _file(self, cid: str) -> str:
+        return os.path.join(self.path, f"{cid}.json")
+
+    def _read(self, cid: str) -> dict | None:
+        file_path = self._file(cid)
+        try:
+            with open(file_path, encoding="utf-8") as f:
+                entry = json.load(f)
+            os.utime(file_path)  # для вытеснения давно не читанных
+            return entry
+        except FileNotFoundError:
+            return None
+        except (OSError, ValueError) as e:
+            logger.warning(f"IPFS cache: не прочитали {cid}: {e}")
+            return None
+
+    def _write(self, cid: str, entry: dict):
+        os.makedirs(self.path, exist_ok=True)
+        file_path = self._file(cid)
+        tmp_path = f"{file_path}.tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump(entry, f, ensure_ascii=False)
+        os.replace(tmp_path, file_path)
+        self._trim()
+
+    def _trim(self):
+        files = []
+        with os.scandir(self.path) as entries:
+            for entry in entries:
+                if entry.name.endswith(".json"):
+                    stat = entry.stat()
+                    files.append((stat.st_mtime, stat.st_size, entry.path))
+        total = sum(size for _, size, _ in files)
+        for _, size, file_path in sorted(files):
+            if total <= self.max_bytes:
+                break
+            try:
+                os.remove(file_path)
+                total -= size
+            except FileNotFoundError:
+                pass
+
+    async def get(self, cid: str) -> dict | None:
+        if not self.path:
+            return None
+        return await asyncio.to_thread(self._read, cid)
+
+    async def set(self, cid: str, entry: dict):
+        if not self.path:
+            return
+        try:
+            await asyncio.to_thread(self._write, cid, entry)
+        except OSError as e:
+            logger.warning(f"IPFS cache: не сохранили {cid}: {e}")
+
+
+class IpfsFetchError(Exception):
+    pass
+
+
+async def _fetch_from_gateway(url: str) -> dict:
+    response = await http_session_manager.get_web_request(
+        "GET", url=url, return_type="text"
+    )
+    if response.status != 200:
+        raise IpfsFetchError(f"HTTP {response.status} from {url}")
+
+    payload = response.data
+    metadata = payload if isinstance(payload, dict) else json.loads(payload)
+    if not isinstance(metadata, dict):
+        raise IpfsFetchError(f"Non-JSON object from {url}")
+    return metadata
+
+
+async def _race_gateways(cid: str) -> tuple[dict | None, str | None, str | None]:
+    tasks = {
+        asyncio.create_task(_fetch_from_gateway(f"{gateway}{cid}")): f"{gateway}{cid}"
+        for gateway in IPFS_GATEWAYS
+    }
+    last_error = None
+    try:
+        pending = set(tasks)
+        while pending:
+            done, pending = await asyncio.wait(
+                pending, return_when=asyncio.FIRST_COMPLETED
+            )
+            for task in done:
+                try:
+                    return task.result(), tasks[task], None
+                except Exception as exc:
+                    last_error = str(exc)
+        return None, None, last_error
+    finally:
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+
+
+ipfs_cache = IpfsCidCache(
+    config.ipfs_cache_path or None, config.ipfs_cache_max_mb * 1024 * 1024
+)
+_in_flight: dict[str, asyncio.Task] = {}
+
+
+async def _load_metadata(cid: str) -> tuple[dict | None, str | None, str | None]:
+    cached = await ipfs_cache.get(cid)
+    if cached is not None:
+        return cached["metadata"], cached["fetched_from"], None
+
+    metadata, fetched_from, error = await _race_gateways(cid)
+    if metadata is not None:
+        await ipfs_cache.set(cid, {"metadata": metadata, "fetched_from": fetched_from})
+    return metadata, fetched_from, error
+
+
+def _forget(cid: str, task: asyncio.Task):
+    if _in_flight.get(cid) is task:
+        del _in_flight[cid]
+
+
+def _start_fetch(cid: str) -> asyncio.Task:
+    task = _in_flight.get(cid)
+    if task is None or task.get_loop() is not asyncio.get_running_loop():
+        task = create_detached_task(_load_metadata(cid), name=f"ipfs-{cid}")
+        _in_flight[cid] = task
+        task.add_done_callback(partial(_forget, cid))
+    return task
+
+
+async def fetch_ipfs_metadata(cid: str) -> tuple[dict | None, str | None, str | None]:
+    """(metadata, url шлюза, ошибка) для CID; одновременные запросы CID объединяются"""
+    # shield: отмена одного запроса страницы не должна отменять общую загрузку
+    return await asyncio.shield(_start_fetch(cid))
+
+
+def prefetch_ipfs_metadata(cid: str):
+    """Начинает загрузку CID в фоне, чтобы страница /ipfs/<cid> открылась сразу"""
+    _start_fetch(cid)
@@ -0,0 +1,122 @@
+"""Ограниченный пул фоновых задач с очередью и дедупликацией по ключу.
+
+Вместо asyncio.create_task на каждое событие: задачи ставятся в очередь
+ограниченного размера и выполняются фиксированным числом воркеров.
+Воркеры и задачи выполняются вне контекста запроса, который их поставил.
+"""
+
+import asyncio
+from collections.abc import Awaitable, Callable, Hashable
+from dataclasses import dataclass
+from typing import Any
+
+from loguru import logger
+
+from other.request_context import create_detached_task
+
+Job = Callable[[], Awaitable[Any]]
+
+
+@dataclass
+class JobRunnerStats:
+    submitted: int = 0
+    deduplicated: int = 0
+    rejected: int = 0
+    completed: int = 0
+    failed: int = 0
+
+
+class JobRunner:
+    def __init__(self, name: str, workers: int = 4, max_queue: int = 1000):
+        self.name = name
+        self.workers = workers
+        self.max_queue = max_queue
+        self.stats = JobRunnerStats()
+        self._loop: asyncio.AbstractEventLoop | None = None
+        self._queue: asyncio.Queue[tuple[Hashable, Job]] | None = None
+        self._worker_tasks: list[asyncio.Task] = []
+        self._keys: set[Hashable] = set()  # в очереди или выполняются
+        self._running = 0
+        self._closed = False
+
+    def _ensure_started(self):
+        loop = asyncio.get_running_loop()
+        if self._loop is loop:
+            return
+        # Новый event loop (перезапуск приложения, тесты) - старые воркеры мертвы
+        self._loop = loop
+        self._queue = asyncio.Queue(maxsize=self.max_queue)
+        self._keys.clear()
+        self._running = 0
+        self._closed = False
+        # Воркеры живут дольше запроса, который их запустил, - без его трассы
+        self._worker_tasks = [
+            create_detached_task(self._worker(), name=f"{self.name}-worker-{idx}")
+            for idx in range(self.workers)
+        ]
+
+    def submit(self, key: Hashable, job: Job) -> bool:
+        """Ставит задачу в очередь.
+
+        Возвращает False, если очередь переполнена или пул остановлен.
+        Задача с ключом, который уже ждет или выполняется, пропускается (True).
+        """
+        self._ensure_started()
+        if self._closed:
+            self.stats.rejected += 1
+            return False
+        if key in self._keys:
+            self.stats.deduplicated += 1
+            return True
+        try:
+            self._queue.put_nowait((key, job))
+        except asyncio.QueueFull:
+            self.stats.rejected += 1
+            logger.warning(f"{self.name}: очередь заполнена, задача {key} отклонена")
+            return False
+        self._keys.add(key)
+        self.stats.submitted += 1
+        return True
+
+    async def _worker(self):
+        queue = self._queue
+        while True:
+            key, job = await queue.get()
+            self._running += 1
+            try:
+                await job()
+                self.stats.completed += 1
+            except Exception as e:
+                self.stats.failed += 1
+                logger.exception(f"{self.name}: задача {key} завершилась ошибкой: {e}")
+            finally:
+                self._running -= 1
+                self._keys.discard(key)
+                queue.task_done()
+
+    async def drain(self, timeout: float = 30.0):
+        """Перестает принимать задачи, дожидается очереди и останавливает воркеров"""
+        if self._queue is None:
+            return
+        self._closed = True
+        try:
+            await asyncio.wait_for(self._queue.join(), timeout)
+        except TimeoutError:
+            logger.warning(
+                f"{self.name}: не дождались {len(self._keys)} задач при остановке"
+            )
+        for task in self._worker_tasks:
+            task.cancel()
+        await asyncio.gather(*self._worker_tasks, return_exceptions=True)
+        self._worker_tasks = []
+        self._loop = None
+
+    def metrics(self) -> dict[str, Any]:
+        return {
+            "name": self.name,
+            "workers": self.workers,
+            "queue_size": self._queue.qsize() if self._queue else 0,
+            "queue_limit": self.max_queue,
+            "running": self._running,
+            **vars(self.stats),
+        }
@@ -0,0 +1,21 @@
+import importlib
+
+
+def lazy_callable(path: str):
+    """Обертка над функцией "package.module.func", модуль грузится при первом вызове.
+
+    Только для тяжелых опциональных зависимостей (gspread, PIL/qrcode), чтобы
+    они не грузились при старте приложения. Основные модули импортируются
+    напрямую. Обертка остается обычным атрибутом модуля, поэтому ее можно
+    подменять через patch в тестах.
+    """
+    module_name, attr_name = path.rsplit(".", 1)
+
+    def wrapper(*args, **kwargs):
+        target = getattr(importlib.import_module(module_name), attr_name)
+        return target(*args, **kwargs)
+
+    wrapper.__name__ = attr_name
+    wrapper.__qualname__ = attr_name
+    wrapper.__doc__ = f"Lazy proxy for {path}"
+    return wrapper
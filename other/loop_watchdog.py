@@ -0,0 +1,233 @@
+"""Сторож event loop: замер задержки цикла и поиск блокирующего кода.
+
+В цикле крутится тикер, который каждые interval секунд отмечает "пульс" и
+считает задержку (насколько позже положенного он проснулся). Отдельный поток
+следит за пульсом: если цикл не отвечает дольше threshold, поток снимает стек
+потока цикла (sys._current_frames) и маршрут запроса текущей задачи. Когда
+цикл оживает, тикер логирует остановку с длительностью и стеком и копит
+статистику по местам вызова (stats()), чтобы синхронный код вроде
+stellar_sdk.Server или PIL было видно в проде без профилировщика.
+"""
+
+import asyncio
+import contextlib
+import os
+import sys
+import threading
+import time
+import traceback
+from collections import deque
+from dataclasses import dataclass, field
+from typing import Any
+
+from loguru import logger
+
+from other.request_context import trace_for_task
+
+_PROJECT_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+# Границы гистограммы задержки цикла, мс
+LAG_BUCKETS_MS = (5, 10, 25, 50, 100, 250, 500, 1000, 5000)
+
+
+def _is_project_frame(filename: str) -> bool:
+    return filename.startswith(_PROJECT_ROOT) and "site-packages" not in filename
+
+
+def call_site(stack: traceback.StackSummary) -> str:
+    """Самый глубокий кадр кода проекта: из него и вызван блокирующий код"""
+    frames = [frame for frame in stack if _is_project_frame(frame.filename)]
+    frame = frames[-1] if frames else (stack[-1] if stack else None)
+    if frame is None:
+        return "unknown"
+    filename = os.path.relpath(frame.filename, _PROJECT_ROOT)
+    if filename.startswith(".."):
+        filename = frame.filename
+    return f"{filename}:{frame.lineno} {frame.name}"
+
+
+@dataclass
+class StallSample:
+    """Снимок из потока сторожа на момент остановки цикла"""
+
+    beat: float
+    route: str | None
+    task: str | None
+    stack: traceback.StackSummary
+    site: str
+
+
+@dataclass
+class SiteStats:
+    count: int = 0
+    total: float = 0.0
+    max: float = 0.0
+    routes: set[str] = field(default_factory=set)
+
+
+@dataclass
+class LagStats:
+    samples: int = 0
+    stalls: int = 0
+    total_lag: float = 0.0
+    max_lag: float = 0.0
+    buckets: list[int] = field(default_factory=lambda: [0] * (len(LAG_BUCKETS_MS) + 1))
+
+    def add(self, lag: float):
+        self.samples += 1
+        self.total_lag += lag
+        self.max_lag = max(self.max_lag, lag)
+        lag_ms = lag * 1000
+        idx = next(
+            (i for i, bound in enumerate(LAG_BUCKETS_MS) if lag_ms < bound),
+            len(LAG_BUCKETS_MS),
+        )
+        self.buckets[idx] += 1
+
+
+class LoopWatchdog:
+    def __init__(
+        self,
+        threshold: float = 0.1,
+        interval: float | None = None,
+        max_sites: int = 100,
+        recent: int = 20,
+    ):
+        self.threshold = threshold
+        self.interval = interval
+        self.max_sites = max_sites
+        self.lag = LagStats()
+        self.sites: dict[str, SiteStats] = {}
+        self.recent: deque[dict[str, Any]] = deque(maxlen=recent)
+        self._loop: asyncio.AbstractEventLoop | None = None
+        self._loop_thread_id: int | None = None
+        self._task: asyncio.Task | None = None
+        self._thread: threading.Thread | None = None
+        self._stop = threading.Event()
+        self._beat = 0.0
+        self._sample: StallSample | None = None
+
+    @property
+    def running(self) -> bool:
+        return self._task is not None and not self._task.done()
+
+    def _tick_interval(self) -> float:
+        return self.interval or max(self.threshold / 4, 0.005)
+
+    def start(self):
+        if self.running:
+            return
+        self._loop = asyncio.get_running_loop()
+        self._loop_thread_id = threading.get_ident()
+        self._beat = time.monotonic()
+        self._sample = None
+        self._stop.clear()
+        self._task = self._loop.create_task(self._ticker(), name="loop-watchdog")
+        self._thread = threading.Thread(
+            target=self._watch, name="loop-watchdog", daemon=True
+        )
+        self._thread.start()
+
+    async def stop(self):
+        self._stop.set()
+        if self._task is not None:
+            self._task.cancel()
+            with contextlib.suppress(asyncio.CancelledError):
+                await self._task
+            self._task = None
+        if self._thread is not None:
+            await asyncio.to_thread(self._thread.join, 1)
+            self._thread = None
+
+    async def _ticker(self):
+        interval = self._tick_interval()
+        while True:
+            expected = time.monotonic() + interval
+            await asyncio.sleep(interval)
+            now = time.monotonic()
+            lag = max(0.0, now - expected)
+            self._beat = now
+            self.lag.add(lag)
+            if lag >= self.threshold:
+                self._report(lag, self._sample)
+            self._sample = None
+
+    def _watch(self):
+        """Поток сторожа: снимает стек, пока цикл стоит"""
+        interval = self._tick_interval()
+        while not self._stop.wait(interval / 2):
+            beat = self._beat
+            stalled = time.monotonic() - beat - interval
+            if stalled < self.threshold or (
+                self._sample is not None and self._sample.beat == beat
+            ):
+                continue
+            frame = sys._current_frames().get(self._loop_thread_id)
+            if frame is None:
+                continue
+            stack = traceback.extract_stack(frame)
+            task = asyncio.current_task(self._loop)
+            trace = trace_for_task(task)
+            self._sample = StallSample(
+                beat=beat,
+                route=trace.route if trace else None,
+                task=task.get_name() if task else None,
+                stack=stack,
+                site=call_site(stack),
+            )
+
+    def _report(self, lag: float, sample: StallSample | None):
+        self.lag.stalls += 1
+        site = sample.site if sample else "unknown"
+        route = sample.route if sample and sample.route else "-"
+        if site in self.sites or len(self.sites) < self.max_sites:
+            stats = self.sites.setdefault(site, SiteStats())
+            stats.count += 1
+            stats.total += lag
+            stats.max = max(stats.max, lag)
+            stats.routes.add(route)
+        self.recent.append(
+            {
+                "lag_ms": round(lag * 1000, 1),
+                "route": route,
+                "task": sample.task if sample else None,
+                "site": site,
+                "at": time.time(),
+            }
+        )
+        stack = "".join(sample.stack.format()) if sample else ""
+        logger.warning(
+            f"Event loop blocked for {lag * 1000:.0f} ms, route {route}, at {site}\n"
+            f"{stack}"
+        )
+
+    def stats(self) -> dict[str, Any]:
+        lag = self.lag
+        bounds = [f"<{bound}ms" for bound in LAG_BUCKETS_MS] + [
+            f">={LAG_BUCKETS_MS[-1]}ms"
+        ]
+        sites = sorted(self.sites.items(), key=lambda item: -item[1].total)
+        return {
+            "running": self.running,
+            "threshold_ms": round(self.threshold * 1000),
+            "samples": lag.samples,
+            "stalls": lag.stalls,
+            "avg_lag_ms": round(lag.total_lag / lag.samples * 1000, 2)
+            if lag.samples
+            else 0.0,
+            "max_lag_ms": round(lag.max_lag * 1000, 1),
+            "lag_histogram": dict(zip(bounds, lag.buckets)),
+            "sites": [
+                {
+                    "site": site,
+                    "count": stats.count,
+                    "total_ms": round(stats.total * 1000, 1),
+                    "max_ms": round(stats.max * 1000, 1),
+                    "routes": sorted(stats.routes),
+                }
+                for site, stats in sites
+            ],
+            "recent": list(self.recent),
+        }
+
+
+loop_watchdog = LoopWatchdog()
@@ -1,4 +1,28 @@
-from quart import request
+import gzip
+import hashlib
+import zlib
+from collections.abc import AsyncIterable, AsyncIterator, Iterable
+from dataclasses import dataclass
+from functools import wraps
+
+from quart import (
+    Response,
+    current_app,
+    get_flashed_messages,
+    make_response,
+    request,
+    session,
+    stream_template,
+)
+from quart.wrappers.response import DataBody, IterableBody
+
+from other.cache_tools import AsyncTTLCache
+from other.request_context import budget_exceeded
+
+try:
+    import brotli
+except ImportError:  # brotli не обязателен, без него отдаем только gzip
+    brotli = None
 
 
 async def get_ip():
@@ -8,3 +32,269 @@ async def get_ip():
         return request.headers.get("X-Real-IP")
     else:
         return request.remote_addr
+
+
+NO_STORE_HEADERS = {"Cache-Control": "no-store"}
+_rendered_caches: list[AsyncTTLCache] = []
+
+
+@dataclass(frozen=True, slots=True)
+class CachedResponse:
+    body: bytes
+    content_type: str
+    etag: str
+
+
+def make_etag(body: bytes) -> str:
+    """Сильный ETag по хешу содержимого"""
+    return f'"{hashlib.sha256(body).hexdigest()[:32]}"'
+
+
+def clear_rendered_caches():
+    for rendered_cache in _rendered_caches:
+        rendered_cache.cache.clear()
+
+
+def _etag_matches(etag: str) -> bool:
+    header = request.headers.get("If-None-Match")
+    if not header:
+        return False
+    for candidate in header.split(","):
+        candidate = _strip_encoding_suffix(candidate.strip().removeprefix("W/"))
+        if candidate in ("*", etag):
+            return True
+    return False
+
+
+def _detach_session():
+    """Публичный ответ не должен ставить cookie, иначе его не закеширует CDN"""
+    session.permanent = False
+    session.modified = False
+    session.accessed = False
+
+
+def http_cache(
+    max_age: int,
+    public: bool = True,
+    immutable: bool = False,
+    maxsize: int = 64,
+):
+    """Кеширование GET-ответа: ETag/304, Cache-Control и in-process кеш отрендеренных ответов.
+
+    public=True - ответ не зависит от сессии, его можно отдавать из CDN.
+    public=False - страница персональная (шапка с пользователем), кешируется только
+    в браузере и в памяти отдельно для каждого пользователя.
+    Ответы со статусом != 200 или с Cache-Control: no-store не кешируются.
+    Ответ, собранный после исчерпания бюджета внешних вызовов, неполный:
+    он уходит с no-store и в память не кладется.
+    """
+    cache_control = f"{'public' if public else 'private'}, max-age={max_age}"
+    if immutable:
+        cache_control += ", immutable"
+    rendered_cache = AsyncTTLCache(ttl_seconds=max_age, maxsize=maxsize)
+    _rendered_caches.append(rendered_cache)
+
+    def decorator(func):
+        @wraps(func)
+        async def wrapper(*args, **kwargs):
+            if request.method != "GET":
+                return await func(*args, **kwargs)
+
+            if public:
+                _detach_session()
+                cache_key = request.full_path
+            else:
+                cache_key = f"{session.get('user_id')}:{request.full_path}"
+            # flash-сообщения одноразовые, такой ответ в память не кладем
+            use_memory = public or "_flashes" not in session
+
+            cached = await rendered_cache.get(cache_key) if use_memory else None
+            if cached is None:
+                response = await make_response(await func(*args, **kwargs))
+                if response.status_code != 200 or "no-store" in response.headers.get(
+                    "Cache-Control", ""
+                ):
+                    return response
+                if budget_exceeded():
+                    response.headers["Cache-Control"] = "no-store"
+                    return response
+                body = await response.get_data()
+                cached = CachedResponse(body, response.content_type, make_etag(body))
+                if use_memory:
+                    await rendered_cache.set(cache_key, cached)
+
+            if _etag_matches(cached.etag):
+                response = Response(b"", status=304)
+            else:
+                response = Response(cached.body, content_type=cached.content_type)
+            response.headers["ETag"] = cached.etag
+            response.headers["Cache-Control"] = cache_control
+            return response
+
+        wrapper.rendered_cache = rendered_cache
+        return wrapper
+
+    return decorator
+
+
+# --- Сжатие и потоковая отдача ---
+
+COMPRESSIBLE_MIMETYPES = (
+    "application/json",
+    "application/javascript",
+    "application/xml",
+    "image/svg+xml",
+)
+STREAM_CHUNK_SIZE = 8192
+GZIP_LEVEL = 6
+BROTLI_QUALITY = 5
+_ETAG_ENCODING_SUFFIXES = ("-gzip", "-br")
+
+
+def _strip_encoding_suffix(etag: str) -> str:
+    """ETag сжатого ответа ("abc-gzip") соответствует исходному ("abc")"""
+    for suffix in _ETAG_ENCODING_SUFFIXES:
+        if etag.endswith(f'{suffix}"'):
+            return f'{etag[: -len(suffix) - 1]}"'
+    return etag
+
+
+def _choose_encoding() -> str | None:
+    accept = request.accept_encodings
+    gzip_quality = accept.quality("gzip")
+    br_quality = accept.quality("br")
+    if brotli is not None and br_quality > 0 and br_quality >= gzip_quality:
+        return "br"
+    return "gzip" if gzip_quality > 0 else None
+
+
+def _is_compressible(response: Response) -> bool:
+    mimetype = response.mimetype or ""
+    return mimetype.startswith("text/") or mimetype in COMPRESSIBLE_MIMETYPES
+
+
+def _compress(body: bytes, encoding: str) -> bytes:
+    if encoding == "br":
+        return brotli.compress(body, quality=BROTLI_QUALITY)
+    return gzip.compress(body, compresslevel=GZIP_LEVEL)
+
+
+async def _compress_stream(body, encoding: str) -> AsyncIterator[bytes]:
+    """Сжимает поток по частям, сбрасывая сжатое каждые STREAM_CHUNK_SIZE байт"""
+    if encoding == "br":
+        compressor = brotli.Compressor(quality=BROTLI_QUALITY)
+        compress, flush = compressor.process, compressor.flush
+        finish = compressor.finish
+    else:
+        compressor = zlib.compressobj(GZIP_LEVEL, zlib.DEFLATED, 31)
+        compress = compressor.compress
+
+        def flush():
+            return compressor.flush(zlib.Z_SYNC_FLUSH)
+
+        finish = compressor.flush
+
+    pending = 0
+    async with body as chunks:
+        async for chunk in chunks:
+            if isinstance(chunk, str):
+                chunk = chunk.encode()
+            data = compress(chunk)
+            pending += len(chunk)
+            if pending >= STREAM_CHUNK_SIZE:
+                data += flush()
+                pending = 0
+            if data:
+                yield data
+    yield finish()
+
+
+def compress_response_hook(min_size: int = 1024):
+    """after_request: gzip/brotli по Accept-Encoding для текстовых ответов от min_size байт.
+
+    Потоковые ответы (IterableBody) сжимаются на лету, файлы (send_file) не трогаем.
+    """
+
+    async def compress_response(response: Response) -> Response:
+        if (
+            response.status_code < 200
+            or response.status_code in (204, 206, 304)
+            or "Content-Encoding" in response.headers
+            or not _is_compressible(response)
+        ):
+            return response
+        response.vary.add("Accept-Encoding")
+        encoding = _choose_encoding()
+        if encoding is None or request.method == "HEAD":
+            return response
+
+        if isinstance(response.response, IterableBody):
+            response.response = IterableBody(
+                _compress_stream(response.response, encoding)
+            )
+            response.headers.pop("Content-Length", None)
+        elif isinstance(response.response, DataBody):
+            body = await response.get_data()
+            if len(body) < min_size:
+                return response
+            response.set_data(_compress(body, encoding))
+        else:
+            return response
+
+        response.headers["Content-Encoding"] = encoding
+        etag = response.headers.get("ETag")
+        if etag and etag.endswith('"'):
+            response.headers["ETag"] = f'{etag[:-1]}-{encoding}"'
+        return response
+
+    return compress_response
+
+
+def install_compression(app, min_size: int = 1024):
+    app.after_request(compress_response_hook(min_size))
+
+
+async def _coalesce(chunks: AsyncIterable[str]) -> AsyncIterator[str]:
+    """Склеивает мелкие куски шаблона, чтобы не слать клиенту по паре байт"""
+    buffer: list[str] = []
+    size = 0
+    async for chunk in chunks:
+        buffer.append(chunk)
+        size += len(chunk)
+        if size >= STREAM_CHUNK_SIZE:
+            yield "".join(buffer)
+            buffer, size = [], 0
+    if buffer:
+        yield "".join(buffer)
+
+
+async def stream_page(template_name, **context) -> Response:
+    """Потоковый рендер HTML-страницы: первые байты уходят до конца рендера"""
+    # flash-сообщения забираем из сессии сейчас: сессия сохраняется до отправки
+    # тела, а шаблон рендерится уже во время отдачи в копии контекста запроса
+    messages = get_flashed_messages(with_categories=True)
+
+    def flashed_messages(with_categories=False, category_filter=()):
+        selected = [
+            item
+            for item in messages
+            if not category_filter or item[0] in category_filter
+        ]
+        return selected if with_categories else [item[1] for item in selected]
+
+    context.setdefault("get_flashed_messages", flashed_messages)
+    chunks = await stream_template(template_name, **context)
+    return Response(_coalesce(chunks), content_type="text/html; charset=utf-8")
+
+
+def stream_json_list(items: Iterable) -> Response:
+    """Потоковая отдача JSON-массива: по элементу, без одной большой строки"""
+    dumps = current_app.json.dumps
+
+    async def generate():
+        yield "["
+        for idx, item in enumerate(items):
+            yield ("," if idx else "") + dumps(item)
+        yield "]"
+
+    return Response(_coalesce(generate()), content_type="application/json")
@@ -0,0 +1,208 @@
+"""Per-request tracing of outbound calls (Horizon, Soroban, Grist, DB).
+
+Трасса хранится в contextvar, поэтому доступна во всех корутинах запроса,
+включая задачи из asyncio.gather, без явной передачи параметров.
+
+Бюджет внешних вызовов (Horizon, Soroban, Grist, HTTP) проверяется в
+track_call: когда он исчерпан, вызов не уходит, а поднимается
+CallBudgetExceeded. SQL-запросы считаются отдельно (db_budget) и только
+логируются: оборвать запрос к БД посреди транзакции нельзя.
+
+Общие и фоновые задачи (single-flight загрузки кеша, очереди, flush)
+запускаются через create_detached_task, без трассы запроса.
+"""
+
+import asyncio
+import time
+import weakref
+from contextlib import asynccontextmanager
+from contextvars import Context, ContextVar, Token
+from dataclasses import dataclass, field
+from urllib.parse import urlsplit
+
+from loguru import logger
+
+CALL_KIND_HORIZON = "horizon"
+CALL_KIND_SOROBAN = "soroban"
+CALL_KIND_GRIST = "grist"
+CALL_KIND_DB = "db"
+CALL_KIND_HTTP = "http"
+
+
+@dataclass(slots=True)
+class CallRecord:
+    kind: str
+    target: str
+    duration: float
+    ok: bool = True
+
+
+class CallBudgetExceeded(Exception):
+    """Внешний вызов не выполнен: у запроса закончился бюджет вызовов"""
+
+
+@dataclass
+class RequestTrace:
+    route: str
+    budget: int = 0  # внешние вызовы, 0 - без ограничения
+    db_budget: int = 0  # SQL-запросы, 0 - без ограничения
+    started_at: float = field(default_factory=time.monotonic)
+    calls: list[CallRecord] = field(default_factory=list)
+    outbound_count: int = 0
+    db_count: int = 0
+
+    def record(self, kind: str, target: str, duration: float, ok: bool = True):
+        self.calls.append(CallRecord(kind, target, duration, ok))
+        if kind == CALL_KIND_DB:
+            self.db_count += 1
+        else:
+            self.outbound_count += 1
+
+    @property
+    def call_count(self) -> int:
+        return len(self.calls)
+
+    @property
+    def budget_exceeded(self) -> bool:
+        return self.budget > 0 and self.outbound_count >= self.budget
+
+    @property
+    def db_budget_exceeded(self) -> bool:
+        return self.db_budget > 0 and self.db_count >= self.db_budget
+
+    def summary(self) -> dict:
+        by_kind: dict[str, dict] = {}
+        for call in self.calls:
+            item = by_kind.setdefault(call.kind, {"count": 0, "duration": 0.0})
+            item["count"] += 1
+            item["duration"] += call.duration
+        return {
+            "route": self.route,
+            "calls": len(self.calls),
+            "budget": self.budget,
+            "db_budget": self.db_budget,
+            "elapsed": time.monotonic() - self.started_at,
+            "by_kind": by_kind,
+        }
+
+
+_current_trace: ContextVar[RequestTrace | None] = ContextVar(
+    "request_trace", default=None
+)
+
+
+# До Python 3.12 у задачи нет get_context(), и сторож event loop
+# (other.loop_watchdog) находит трассу через этот реестр
+_task_traces: weakref.WeakKeyDictionary = weakref.WeakKeyDictionary()
+_TASK_HAS_CONTEXT = hasattr(asyncio.Task, "get_context")
+
+
+def start_trace(route: str, budget: int = 0, db_budget: int = 0) -> Token:
+    trace = RequestTrace(route=route, budget=budget, db_budget=db_budget)
+    if not _TASK_HAS_CONTEXT:
+        try:
+            _task_traces[asyncio.current_task()] = trace
+        except (RuntimeError, TypeError):  # вне event loop / без задачи
+            pass
+    return _current_trace.set(trace)
+
+
+def finish_trace(token: Token) -> RequestTrace | None:
+    trace = _current_trace.get()
+    _current_trace.reset(token)
+    return trace
+
+
+def get_current_trace() -> RequestTrace | None:
+    return _current_trace.get()
+
+
+def trace_for_task(task: asyncio.Task | None) -> RequestTrace | None:
+    """Трасса запроса, в котором выполняется задача; можно звать из другого потока"""
+    if task is None:
+        return None
+    if _TASK_HAS_CONTEXT:
+        return task.get_context().get(_current_trace)
+    return _task_traces.get(task)
+
+
+def create_detached_task(coro, *, name: str | None = None) -> asyncio.Task:
+    """create_task с пустым контекстом, без трассы текущего запроса.
+
+    Такая задача переживает запрос или обслуживает сразу несколько: с трассой
+    запроса она тратила бы его бюджет и делила бы его отказ с остальными.
+    """
+    return asyncio.create_task(coro, name=name, context=Context())
+
+
+def budget_exceeded() -> bool:
+    """True, если у текущего запроса закончился бюджет внешних вызовов."""
+    trace = _current_trace.get()
+    return trace is not None and trace.budget_exceeded
+
+
+def check_budget(kind: str):
+    """Поднимает CallBudgetExceeded, если внешний вызов kind уже не по бюджету"""
+    if kind == CALL_KIND_DB:
+        return
+    trace = _current_trace.get()
+    if trace is not None and trace.budget_exceeded:
+        raise CallBudgetExceeded(
+            f"Request {trace.route}: outbound call budget {trace.budget} exhausted"
+        )
+
+
+# Хосты из пулов конечных точек (other.endpoint_pool), имя которых не
+# говорит о типе сервиса
+_host_kinds: dict[str, str] = {}
+
+
+def register_host_kind(url: str, kind: str):
+    host = urlsplit(url).hostname
+    if host:
+        _host_kinds[host] = kind
+
+
+def classify_url(url: str) -> str:
+    host = urlsplit(url).hostname or ""
+    if host in _host_kinds:
+        return _host_kinds[host]
+    if "horizon" in host:
+        return CALL_KIND_HORIZON
+    if "soroban" in host:
+        return CALL_KIND_SOROBAN
+    if "getgrist" in host:
+        return CALL_KIND_GRIST
+    return CALL_KIND_HTTP
+
+
+def record_call(kind: str, target: str, duration: float, ok: bool = True):
+    trace = _current_trace.get()
+    if trace is None:
+        return
+    trace.record(kind, target, duration, ok)
+    if kind == CALL_KIND_DB:
+        if trace.db_budget and trace.db_count == trace.db_budget:
+            logger.warning(
+                f"Request {trace.route}: DB query budget {trace.db_budget} reached"
+            )
+    elif trace.budget and trace.outbound_count == trace.budget:
+        logger.warning(
+            f"Request {trace.route}: outbound call budget {trace.budget} reached"
+        )
+
+
+@asynccontextmanager
+async def track_call(kind: str, target: str):
+    """Замеряет и записывает внешний вызов в трассу текущего запроса.
+
+    Если бюджет запроса исчерпан, вызов не начинается: CallBudgetExceeded.
+    """
+    check_budget(kind)
+    start = time.monotonic()
+    ok = False
+    try:
+        yield
+        ok = True
+    finally:
+        record_call(kind, target, time.monotonic() - start, ok)
@@ -0,0 +1,187 @@
+"""Профиль одного запроса по ?__profile=1 (только для подписантов, см. start.py).
+
+Пока запрос выполняется, поток-семплер раз в interval снимает стек потока
+event loop, если в цикле сейчас работает задача этого запроса: это время CPU
+в обработчике, включая рендеринг шаблонов. Время ожидания внешних вызовов
+(Horizon, Soroban, Grist, БД, HTTP) берется из трассы запроса
+(other.request_context) и добавляется ветками "[await] <тип>;<цель>".
+Вызовы, запущенные через asyncio.gather, ждут параллельно, поэтому сумма
+веток ожидания может быть больше времени запроса.
+
+Результат - collapsed stacks ("кадр;кадр;кадр микросекунды"), его читают
+flamegraph.pl, speedscope и inferno. Ответ на запрос с __profile заменяется
+профилем, копия пишется в config.profile_dir. Без __profile ничего не
+запускается.
+"""
+
+import asyncio
+import os
+import re
+import sys
+import threading
+import time
+import traceback
+from collections import Counter
+from collections.abc import Awaitable, Callable
+from datetime import datetime
+
+from loguru import logger
+from quart import Response, request
+
+from other.request_context import RequestTrace, get_current_trace, trace_for_task
+
+_PROJECT_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+_UNSAFE_NAME_RE = re.compile(r"[^A-Za-z0-9_.-]+")
+
+
+def _frame_label(frame: traceback.FrameSummary) -> str:
+    filename = frame.filename
+    if filename.startswith(_PROJECT_ROOT):
+        filename = os.path.relpath(filename, _PROJECT_ROOT)
+    elif "site-packages" in filename:
+        filename = filename.split("site-packages", 1)[1].lstrip("/\\")
+    # ";" разделяет кадры в collapsed stacks
+    return f"{frame.name} ({filename}:{frame.lineno})".replace(";", ",")
+
+
+def _task_frames(stack: traceback.StackSummary) -> list[traceback.FrameSummary]:
+    """Отрезает кадры event loop (run_forever, _run_once, Handle._run)"""
+    for idx in range(len(stack) - 1, -1, -1):
+        frame = stack[idx]
+        if frame.name == "_run" and frame.filename.endswith(
+            os.path.join("asyncio", "events.py")
+        ):
+            return list(stack)[idx + 1 :]
+    return list(stack)
+
+
+class RequestProfiler:
+    def __init__(self, trace: RequestTrace, interval: float = 0.001):
+        self.trace = trace
+        self.interval = interval
+        self.samples: Counter[tuple[str, ...]] = Counter()
+        self.sample_count = 0
+        self.started_at = 0.0
+        self.wall_time = 0.0
+        self._loop: asyncio.AbstractEventLoop | None = None
+        self._loop_thread_id: int | None = None
+        self._thread: threading.Thread | None = None
+        self._stop = threading.Event()
+
+    def start(self):
+        self._loop = asyncio.get_running_loop()
+        self._loop_thread_id = threading.get_ident()
+        self.started_at = time.monotonic()
+        self._thread = threading.Thread(
+            target=self._sample, name="request-profiler", daemon=True
+        )
+        self._thread.start()
+
+    def stop(self):
+        if self._thread is None:
+            return
+        self._stop.set()
+        self._thread.join(1)
+        self._thread = None
+        self.wall_time = time.monotonic() - self.started_at
+
+    def _sample(self):
+        last = time.monotonic()
+        while not self._stop.wait(self.interval):
+            now = time.monotonic()
+            elapsed, last = now - last, now
+            task = asyncio.current_task(self._loop)
+            if task is None or trace_for_task(task) is not self.trace:
+                continue
+            frame = sys._current_frames().get(self._loop_thread_id)
+            if frame is None:
+                continue
+            stack = _task_frames(traceback.extract_stack(frame))
+            self.samples[tuple(_frame_label(item) for item in stack)] += int(
+                elapsed * 1_000_000
+            )
+            self.sample_count += 1
+
+    def collapsed(self) -> str:
+        """Collapsed stacks в микросекундах: CPU по семплам и ожидание вызовов"""
+        root = self.trace.route.replace(";", ",")
+        lines = [
+            ";".join((root, *stack)) + f" {weight}"
+            for stack, weight in self.samples.most_common()
+            if weight
+        ]
+        awaited: Counter[tuple[str, str]] = Counter()
+        for call in self.trace.calls:
+            target = call.target.replace(";", ",")
+            awaited[(call.kind, target)] += int(call.duration * 1_000_000)
+        lines.extend(
+            f"{root};[await] {kind};{target} {weight}"
+            for (kind, target), weight in awaited.most_common()
+            if weight
+        )
+        return "\n".join(lines) + "\n"
+
+    def summary(self) -> dict:
+        cpu = sum(self.samples.values()) / 1_000_000
+        return {
+            "route": self.trace.route,
+            "wall_ms": round(self.wall_time * 1000, 1),
+            "cpu_ms": round(cpu * 1000, 1),
+            "samples": self.sample_count,
+            "awaited": {
+                kind: round(item["duration"] * 1000, 1)
+                for kind, item in self.trace.summary()["by_kind"].items()
+            },
+        }
+
+    def save(self, directory: str) -> str:
+        """Пишет профиль в directory и возвращает имя файла"""
+        os.makedirs(directory, exist_ok=True)
+        slug = _UNSAFE_NAME_RE.sub("_", self.trace.route).strip("_")[:80] or "root"
+        name = f"{datetime.now().strftime('%Y%m%d-%H%M%S-%f')}-{slug}.folded"
+        with open(os.path.join(directory, name), "w", encoding="utf-8") as f:
+            f.write(self.collapsed())
+        return name
+
+
+def install_request_profiling(
+    app, is_allowed: Callable[[], Awaitable[bool]], directory: str
+):
+    """?__profile=1 - вместо ответа отдается профиль запроса (collapsed stacks).
+
+    is_allowed - проверка доступа (в start.py - подписант, как для /log).
+    Без параметра __profile обработчики только проверяют request.args.
+    """
+
+    @app.before_request
+    async def start_request_profile():
+        if "__profile" not in request.args or not await is_allowed():
+            return
+        trace = get_current_trace()
+        if trace is None:
+            return
+        request.profiler = RequestProfiler(trace)
+        request.profiler.start()
+
+    @app.after_request
+    async def return_request_profile(response):
+        profiler = getattr(request, "profiler", None)
+        if profiler is None:
+            return response
+        profiler.stop()
+        name = await asyncio.to_thread(profiler.save, directory)
+        logger.info(f"Request profile {name}: {profiler.summary()}")
+        return Response(
+            profiler.collapsed(),
+            mimetype="text/plain",
+            headers={
+                "Content-Disposition": f'attachment; filename="{name}"',
+                "X-Profile-Status": str(response.status_code),
+            },
+        )
+
+    @app.teardown_request
+    async def stop_request_profile(exc):
+        profiler = getattr(request, "profiler", None)
+        if profiler is not None:
+            profiler.stop()
@@ -0,0 +1,152 @@
+"""Общий для всех воркеров хоста кеш на SQLite.
+
+Каждый воркер uvicorn держит свой кеш в памяти, поэтому без общего слоя
+N воркеров делают N одинаковых запросов в Horizon/Grist. SqliteCacheBackend
+хранит записи AsyncTTLCache (cache_tools) в одном файле в режиме WAL:
+читатели не блокируют писателя, запись занимает доли миллисекунды.
+
+Значения сериализуются в JSON: словари/списки ответов Horizon как есть,
+dataclass - через register_cache_type (например User). Значения, которые
+в JSON не ложатся, в общий кеш не попадают и живут только в памяти воркера.
+"""
+
+import asyncio
+import json
+import os
+import sqlite3
+import threading
+import time
+from dataclasses import asdict, fields, is_dataclass
+from typing import Any
+
+_cache_types: dict[str, type] = {}
+
+_DATACLASS_TAG = "__dataclass__"
+
+
+def register_cache_type(cls: type) -> type:
+    """Разрешает хранить dataclass cls в общем кеше (можно как декоратор)"""
+    if not is_dataclass(cls):
+        raise TypeError(f"{cls.__name__} is not a dataclass")
+    _cache_types[cls.__name__] = cls
+    return cls
+
+
+def _encode(value: Any) -> dict:
+    cls = type(value)
+    if is_dataclass(value) and _cache_types.get(cls.__name__) is cls:
+        return {_DATACLASS_TAG: cls.__name__, **asdict(value)}
+    raise TypeError(f"{cls.__name__} is not registered for the shared cache")
+
+
+def _decode(data: dict) -> Any:
+    name = data.get(_DATACLASS_TAG)
+    if name is None:
+        return data
+    cls = _cache_types[name]
+    names = {item.name for item in fields(cls)}
+    return cls(**{key: value for key, value in data.items() if key in names})
+
+
+def dumps(value: Any) -> str:
+    """JSON для общего кеша; TypeError, если тип не сериализуется"""
+    return json.dumps(value, default=_encode, ensure_ascii=False, separators=(",", ":"))
+
+
+def loads(text: str) -> Any:
+    return json.loads(text, object_hook=_decode)
+
+
+class SqliteCacheBackend:
+    """Записи (namespace, key) -> (JSON, expires_at, stale_until) в SQLite.
+
+    Время - time.time(), оно общее для процессов. Запись не отдается после
+    stale_until; просроченные строки удаляются раз в purge_every записей.
+    Все обращения к файлу идут через asyncio.to_thread, у каждого потока
+    свое соединение.
+    """
+
+    def __init__(self, path: str, purge_every: int = 1000):
+        self.path = path
+        self.purge_every = purge_every
+        self._local = threading.local()
+        self._writes = 0
+
+    def _connection(self) -> sqlite3.Connection:
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+            conn = sqlite3.connect(self.path, timeout=5, isolation_level=None)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS cache ("
+                "namespace TEXT NOT NULL, key TEXT NOT NULL, value TEXT NOT NULL, "
+                "expires_at REAL NOT NULL, stale_until REAL NOT NULL, "
+                "PRIMARY KEY (namespace, key))"
+            )
+            self._local.conn = conn
+        return conn
+
+    def _get(self, namespace: str, key: str) -> tuple[str, float, float] | None:
+        row = (
+            self._connection()
+            .execute(
+                "SELECT value, expires_at, stale_until FROM cache "
+                "WHERE namespace = ? AND key = ? AND stale_until > ?",
+                (namespace, key, time.time()),
+            )
+            .fetchone()
+        )
+        return tuple(row) if row else None
+
+    def _set(
+        self,
+        namespace: str,
+        key: str,
+        value: str,
+        expires_at: float,
+        stale_until: float,
+    ):
+        conn = self._connection()
+        conn.execute(
+            "INSERT OR REPLACE INTO cache VALUES (?, ?, ?, ?, ?)",
+            (namespace, key, value, expires_at, stale_until),
+        )
+        self._writes += 1
+        if self._writes % self.purge_every == 0:
+            conn.execute("DELETE FROM cache WHERE stale_until <= ?", (time.time(),))
+
+    def _delete(self, namespace: str, key: str):
+        self._connection().execute(
+            "DELETE FROM cache WHERE namespace = ? AND key = ?", (namespace, key)
+        )
+
+    def _clear(self, namespace: str | None):
+        if namespace is None:
+            self._connection().execute("DELETE FROM cache")
+        else:
+            self._connection().execute(
+                "DELETE FROM cache WHERE namespace = ?", (namespace,)
+            )
+
+    async def get(self, namespace: str, key: str) -> tuple[str, float, float] | None:
+        return await asyncio.to_thread(self._get, namespace, key)
+
+    async def set(
+        self,
+        namespace: str,
+        key: str,
+        value: str,
+        expires_at: float,
+        stale_until: float,
+    ):
+        await asyncio.to_thread(
+            self._set, namespace, key, value, expires_at, stale_until
+        )
+
+    async def delete(self, namespace: str, key: str):
+        await asyncio.to_thread(self._delete, namespace, key)
+
+    async def clear(self, namespace: str | None = None):
+        await asyncio.to_thread(self._clear, namespace)
@@ -0,0 +1,117 @@
+"""Профилирование старта приложения.
+
+Показывает самые дорогие импорты (через `python -X importtime`) и время
+от запуска интерпретатора до ответа на первый запрос.
+
+Запуск: python -m other.startup_profile [--top 25] [--path /healthz]
+"""
+
+import argparse
+import json
+import subprocess
+import sys
+from dataclasses import dataclass
+
+from other.config_reader import start_path
+
+FIRST_REQUEST_SCRIPT = """
+import asyncio, json, time
+started = time.perf_counter()
+import start
+imported = time.perf_counter()
+
+async def main():
+    async with start.app.test_app() as test_app:
+        response = await test_app.test_client().get({path!r})
+        return response.status_code
+
+status = asyncio.run(main())
+finished = time.perf_counter()
+print(json.dumps({{
+    "import_seconds": imported - started,
+    "first_request_seconds": finished - started,
+    "status": status,
+}}))
+"""
+
+
+@dataclass(slots=True)
+class ImportTiming:
+    module: str
+    self_us: int
+    cumulative_us: int
+    depth: int
+
+
+def parse_importtime(output: str) -> list[ImportTiming]:
+    """Разбор вывода `-X importtime` (строки вида 'import time: self | cumulative | name')"""
+    timings = []
+    for line in output.splitlines():
+        if not line.startswith("import time:"):
+            continue
+        parts = line[len("import time:") :].split("|")
+        if len(parts) != 3 or not parts[0].strip().isdigit():
+            continue  # заголовок таблицы
+        name = parts[2].rstrip()
+        module = name.lstrip()
+        timings.append(
+            ImportTiming(
+                module=module,
+                self_us=int(parts[0]),
+                cumulative_us=int(parts[1]),
+                depth=(len(name) - len(module)) // 2,
+            )
+        )
+    return timings
+
+
+def top_imports(timings: list[ImportTiming], top: int = 25) -> list[ImportTiming]:
+    return sorted(timings, key=lambda item: item.cumulative_us, reverse=True)[:top]
+
+
+def profile_imports(target: str = "start") -> list[ImportTiming]:
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", f"import {target}"],
+        cwd=start_path,
+        capture_output=True,
+        text=True,
+        check=True,
+    )
+    return parse_importtime(result.stderr)
+
+
+def measure_first_request(path: str = "/healthz") -> dict:
+    result = subprocess.run(
+        [sys.executable, "-c", FIRST_REQUEST_SCRIPT.format(path=path)],
+        cwd=start_path,
+        capture_output=True,
+        text=True,
+        check=True,
+    )
+    return json.loads(result.stdout.strip().splitlines()[-1])
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Профиль старта приложения")
+    parser.add_argument("--top", type=int, default=25)
+    parser.add_argument("--path", default="/healthz")
+    args = parser.parse_args()
+
+    timings = profile_imports()
+    print(f"{'cumulative ms':>14} {'self ms':>9}  module")
+    for item in top_imports(timings, args.top):
+        print(
+            f"{item.cumulative_us / 1000:14.1f} {item.self_us / 1000:9.1f}  "
+            f"{'  ' * item.depth}{item.module}"
+        )
+
+    first_request = measure_first_request(args.path)
+    print(
+        f"\nimport start: {first_request['import_seconds']:.2f}s, "
+        f"first request {args.path} -> {first_request['status']} "
+        f"after {first_request['first_request_seconds']:.2f}s"
+    )
+
+
+if __name__ == "__main__":
+    main()
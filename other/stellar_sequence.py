@@ -0,0 +1,81 @@
+"""Кеш номеров последовательности (sequence) аккаунтов Stellar.
+
+Sequence аккаунта запрашивается в Horizon один раз, дальше для пачки
+транзакций номера выдаются локально. После ответа tx_bad_seq аккаунт
+нужно пересинхронизировать через resync().
+
+reserve() - только для пачек одного подписанта, которые отправляются
+подряд. Независимые транзакции (сделки rely, конструктор лаборатории)
+строятся от текущего sequence в сети: current(refresh=True).
+"""
+
+import asyncio
+import time
+from dataclasses import dataclass
+
+from stellar_sdk import AiohttpClient, ServerAsync
+
+from other.endpoint_pool import horizon_pool
+from other.request_context import CALL_KIND_HORIZON, track_call
+
+
+@dataclass(slots=True)
+class _AccountSequence:
+    onchain: int  # последний sequence аккаунта в сети
+    next: int  # следующий свободный номер для reserve()
+    loaded_at: float
+
+
+class SequenceAllocator:
+    def __init__(self, horizon_url: str | None = None, ttl: float = 30.0):
+        self.horizon_url = horizon_url
+        self.ttl = ttl
+        self._accounts: dict[str, _AccountSequence] = {}
+        self._locks: dict[str, asyncio.Lock] = {}
+
+    async def _load_sequence(self, account_id: str) -> int:
+        async def load(horizon_url: str) -> int:
+            async with (
+                track_call(CALL_KIND_HORIZON, f"{horizon_url}/accounts/{account_id}"),
+                ServerAsync(horizon_url=horizon_url, client=AiohttpClient()) as server,
+            ):
+                account = await server.load_account(account_id)
+            return account.sequence
+
+        if self.horizon_url:
+            return await load(self.horizon_url)
+        return await horizon_pool.request(load)
+
+    async def _state(self, account_id: str, refresh: bool = False) -> _AccountSequence:
+        lock = self._locks.setdefault(account_id, asyncio.Lock())
+        async with lock:
+            state = self._accounts.get(account_id)
+            if (
+                refresh
+                or state is None
+                or time.monotonic() - state.loaded_at > self.ttl
+            ):
+                onchain = await self._load_sequence(account_id)
+                # Выданные, но еще не отправленные номера не теряем
+                next_sequence = max(state.next if state else 0, onchain + 1)
+                state = _AccountSequence(onchain, next_sequence, time.monotonic())
+                self._accounts[account_id] = state
+            return state
+
+    async def current(self, account_id: str, refresh: bool = False) -> int:
+        """Текущий sequence аккаунта в сети (из кеша не старше ttl, refresh - из Horizon)"""
+        return (await self._state(account_id, refresh)).onchain
+
+    async def reserve(self, account_id: str, count: int = 1) -> list[int]:
+        """Выдает count подряд идущих номеров для новых транзакций аккаунта"""
+        state = await self._state(account_id)
+        sequences = list(range(state.next, state.next + count))
+        state.next += count
+        return sequences
+
+    def resync(self, account_id: str):
+        """Забыть выданные номера, следующий запрос снова сходит в Horizon"""
+        self._accounts.pop(account_id, None)
+
+
+sequence_allocator = SequenceAllocator()
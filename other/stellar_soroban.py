@@ -17,10 +17,16 @@ from stellar_sdk import (
 from stellar_sdk.sep import stellar_uri
 
 from other.cache_tools import async_cache_with_ttl
+from other.endpoint_pool import soroban_pool
+from other.request_context import CALL_KIND_SOROBAN, track_call
 
 PREPARED_TRANSACTION_TIMEOUT_SECONDS = 300
 SUBMIT_TRANSACTION_POLL_ATTEMPTS = 10
 SUBMIT_TRANSACTION_POLL_INTERVAL_SECONDS = 1
+# Методы JSON-RPC без побочных эффектов: их можно хеджировать и повторять
+SOROBAN_READ_METHODS = frozenset(
+    {"simulateTransaction", "getLatestLedger", "getLedgerEntries", "getHealth"}
+)
 
 
 def _normalize_status_name(status) -> str:
@@ -47,10 +53,20 @@ def _decode_send_transaction_error(send_response) -> str:
         return "Sending transaction failed"
 
 
-async def _post_json_rpc(url: str, payload: dict) -> dict:
+async def _post_json_rpc(url: str | None, payload: dict) -> dict:
+    """JSON-RPC запрос; url=None - через пул точек Soroban RPC"""
+    if url is None:
+        return await soroban_pool.request(
+            lambda rpc_url: _post_json_rpc(rpc_url, payload),
+            idempotent=payload.get("method") in SOROBAN_READ_METHODS,
+            ok=lambda response: response["status"] < 500,
+        )
     timeout = aiohttp.ClientTimeout(total=10)
     async with aiohttp.ClientSession(timeout=timeout) as session:
-        async with session.post(url, json=payload) as response:
+        async with (
+            track_call(CALL_KIND_SOROBAN, url),
+            session.post(url, json=payload) as response,
+        ):
             data = await response.json()
             return {"status": response.status, "data": data}
 
@@ -59,7 +75,7 @@ async def read_contract_value(
     contract_id: str,
     function_name: str,
     params: list | None = None,
-    rpc_url: str = "https://soroban-rpc.mainnet.stellar.gateway.fm",
+    rpc_url: str | None = None,
 ) -> dict:
     params = params or []
     transaction = (
@@ -122,7 +138,7 @@ def _normalize_contract_string(value: str) -> str:
 
 
 async def read_contract_string(
-    rpc_url: str, contract_id: str, function_name: str
+    contract_id: str, function_name: str, rpc_url: str | None = None
 ) -> str:
     try:
         return_value = await read_contract_value(
@@ -146,8 +162,10 @@ async def read_contract_string(
         raise ValueError(str(exc)) from exc
 
 
-@async_cache_with_ttl(ttl_seconds=30 * 24 * 60 * 60, maxsize=256)
-async def read_token_contract_display_name(rpc_url: str, contract_id: str) -> str:
+@async_cache_with_ttl(ttl_seconds=30 * 24 * 60 * 60, maxsize=256, shared=True)
+async def read_token_contract_display_name(
+    contract_id: str, rpc_url: str | None = None
+) -> str:
     contract_name = await read_contract_string(
         rpc_url=rpc_url,
         contract_id=contract_id,
@@ -159,7 +177,6 @@ async def read_token_contract_display_name(rpc_url: str, contract_id: str) -> st
 
 
 async def prepare_contract_transaction_uri(
-    rpc_url: str,
     contract_id: str,
     function_name: str,
     source_account_id: str,
@@ -170,7 +187,10 @@ async def prepare_contract_transaction_uri(
     signer_secret: str,
     token_contract_id: str | None = None,
     approve_expiration_ledger_offset: int = 1000,
+    rpc_url: str | None = None,
 ) -> dict:
+    # Одна точка на всю подготовку: simulate и prepare должны видеть один ledger
+    rpc_url = rpc_url or soroban_pool.pick()
     server = SorobanServer(rpc_url)
     source_account = server.load_account(source_account_id)
     builder = TransactionBuilder(
@@ -266,9 +286,11 @@ async def prepare_contract_transaction_uri(
     }
 
 
-async def submit_signed_transaction(rpc_url: str, signed_xdr: str) -> dict:
+async def submit_signed_transaction(
+    signed_xdr: str, rpc_url: str | None = None
+) -> dict:
     try:
-        server = SorobanServer(rpc_url)
+        server = SorobanServer(rpc_url or soroban_pool.pick())
         transaction = TransactionEnvelope.from_xdr(
             signed_xdr,
             Network.PUBLIC_NETWORK_PASSPHRASE,
@@ -0,0 +1,92 @@
+"""Локальный симулятор всех upstream приложения для нагрузочных прогонов.
+
+Запуск:
+    python -m other.upstream_simulator --port 8900 \
+        --fault horizon:latency_ms=80 --fault horizon:jitter_ms=40 \
+        --fault grist:error_rate=0.02 \
+        --app-url http://127.0.0.1:8000 --webhook-interval 30
+
+Приложение переключается на симулятор через UPSTREAM_SIMULATOR_URL
+(см. other/config_reader.py), нагрузку дает python -m other.upstream_simulator.loadgen.
+"""
+
+import argparse
+import asyncio
+import contextlib
+import os
+
+from aiohttp import web
+from loguru import logger
+
+from other.upstream_simulator.app import build_app, simulator_key
+from other.upstream_simulator.faults import FaultInjector, parse_fault_args
+from other.upstream_simulator.world import World
+
+
+async def _replay_webhooks(app: web.Application, table: str, interval: float):
+    """Периодический вебхук Grist, как при правках таблицы во время прогона"""
+    grist = app[simulator_key].grist
+    while True:
+        await asyncio.sleep(interval)
+        try:
+            await grist.send_webhook(table)
+        except Exception as e:
+            logger.warning(f"simulator: webhook {table} failed: {e}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Симулятор upstream для нагрузки")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8900)
+    parser.add_argument("--seed", type=int, default=1)
+    parser.add_argument("--users", type=int, default=200)
+    parser.add_argument("--funds", type=int, default=5)
+    parser.add_argument("--signers", type=int, default=20)
+    parser.add_argument(
+        "--fault",
+        action="append",
+        default=[],
+        help="upstream:field=value, например horizon:latency_ms=80",
+    )
+    parser.add_argument("--app-url", help="адрес приложения для вебхуков Grist")
+    parser.add_argument(
+        "--webhook-key",
+        default=os.getenv("GRIST_INCOME"),
+        help="ключ вебхука (grist_income приложения)",
+    )
+    parser.add_argument("--webhook-table", default="Users")
+    parser.add_argument(
+        "--webhook-interval", type=float, default=0, help="секунд, 0 - выключено"
+    )
+    args = parser.parse_args()
+
+    faults = FaultInjector(seed=args.seed)
+    for upstream, values in parse_fault_args(args.fault).items():
+        faults.update(upstream, **values)
+    world = World(
+        seed=args.seed,
+        user_count=args.users,
+        multisig_count=args.funds,
+        signers_per_multisig=args.signers,
+    )
+    app = build_app(world, faults, app_url=args.app_url, webhook_key=args.webhook_key)
+
+    if args.webhook_interval and args.app_url:
+
+        async def webhooks_ctx(app: web.Application):
+            task = asyncio.create_task(
+                _replay_webhooks(app, args.webhook_table, args.webhook_interval)
+            )
+            yield
+            task.cancel()
+            with contextlib.suppress(asyncio.CancelledError):
+                await task
+
+        app.cleanup_ctx.append(webhooks_ctx)
+
+    logger.info(f"simulator: http://{args.host}:{args.port} {faults.snapshot()}")
+    web.run_app(app, host=args.host, port=args.port, print=None)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,97 @@
+"""Сборка aiohttp-приложения симулятора и служебные /__sim/* ручки."""
+
+from dataclasses import dataclass
+
+from aiohttp import web
+
+from other.upstream_simulator.faults import FaultInjector
+from other.upstream_simulator.grist import GristSim
+from other.upstream_simulator.horizon import HorizonSim
+from other.upstream_simulator.soroban import SorobanSim
+from other.upstream_simulator.telegram import TelegramSim
+from other.upstream_simulator.world import World
+
+
+@dataclass
+class Simulator:
+    world: World
+    faults: FaultInjector
+    horizon: HorizonSim
+    soroban: SorobanSim
+    grist: GristSim
+    telegram: TelegramSim
+
+    def stats(self) -> dict:
+        return {
+            "upstreams": self.faults.snapshot(),
+            "horizon_submitted": len(self.horizon.submitted),
+            "soroban_sent": len(self.soroban.sent),
+            "telegram_sent": len(self.telegram.sent),
+            "grist_webhooks_sent": self.grist.webhooks_sent,
+        }
+
+
+simulator_key = web.AppKey("simulator", Simulator)
+
+
+async def ipfs_metadata(request: web.Request):
+    cid = request.match_info["cid"]
+    return web.json_response(
+        {
+            "name": f"Simulated {cid[:8]}",
+            "description": "Metadata served by the upstream simulator",
+            "image": f"ipfs://{cid}/image.png",
+        }
+    )
+
+
+async def sim_stats(request: web.Request):
+    return web.json_response(request.app[simulator_key].stats())
+
+
+async def sim_faults(request: web.Request):
+    """GET - текущие настройки; POST {"horizon": {"latency_ms": 200}} - изменить"""
+    faults = request.app[simulator_key].faults
+    if request.method == "POST":
+        changes = await request.json()
+        try:
+            for upstream, values in changes.items():
+                faults.update(upstream, **values)
+        except (KeyError, TypeError) as e:
+            return web.json_response({"error": f"bad fault: {e}"}, status=400)
+    return web.json_response(faults.snapshot())
+
+
+def build_app(
+    world: World | None = None,
+    faults: FaultInjector | None = None,
+    app_url: str | None = None,
+    webhook_key: str | None = None,
+) -> web.Application:
+    """Симулятор всех upstream на одном порту: /horizon, /soroban, /grist, /telegram, /ipfs"""
+    world = world or World()
+    faults = faults or FaultInjector()
+    simulator = Simulator(
+        world=world,
+        faults=faults,
+        horizon=HorizonSim(world),
+        soroban=SorobanSim(),
+        grist=GristSim(world, app_url=app_url, webhook_key=webhook_key),
+        telegram=TelegramSim(),
+    )
+
+    app = web.Application(middlewares=[faults.middleware])
+    app[simulator_key] = simulator
+    simulator.horizon.add_routes(app)
+    simulator.soroban.add_routes(app)
+    simulator.grist.add_routes(app)
+    simulator.telegram.add_routes(app)
+    app.add_routes(
+        [
+            web.get("/ipfs/{cid}", ipfs_metadata),
+            web.get("/__sim/stats", sim_stats),
+            web.get("/__sim/faults", sim_faults),
+            web.post("/__sim/faults", sim_faults),
+        ]
+    )
+    return app
@@ -0,0 +1,99 @@
+"""Задержки и ошибки симулятора по upstream (horizon, soroban, grist, ...).
+
+Upstream определяется по первому сегменту пути: /horizon/accounts/G... ->
+horizon. Настройки меняются на лету через POST /__sim/faults, чтобы во
+время прогона нагрузки включить деградацию одного upstream.
+"""
+
+import asyncio
+import random
+from dataclasses import asdict, dataclass, field, fields
+
+from aiohttp import web
+
+UPSTREAMS = ("horizon", "soroban", "grist", "telegram", "ipfs")
+
+
+@dataclass
+class Fault:
+    latency_ms: float = 0.0  # средняя задержка ответа
+    jitter_ms: float = 0.0  # разброс задержки, равномерно +-jitter
+    error_rate: float = 0.0  # доля ответов с error_status
+    error_status: int = 503
+    timeout_rate: float = 0.0  # доля запросов, которые "висят" hang_seconds
+    hang_seconds: float = 30.0
+
+    def delay(self, rnd: random.Random) -> float:
+        jitter = rnd.uniform(-self.jitter_ms, self.jitter_ms) if self.jitter_ms else 0
+        return max(0.0, self.latency_ms + jitter) / 1000
+
+
+@dataclass
+class UpstreamStats:
+    requests: int = 0
+    errors: int = 0
+    hangs: int = 0
+
+
+@dataclass
+class FaultInjector:
+    faults: dict[str, Fault] = field(default_factory=dict)
+    seed: int = 1
+    stats: dict[str, UpstreamStats] = field(default_factory=dict)
+
+    def __post_init__(self):
+        self._random = random.Random(self.seed)
+        for upstream in UPSTREAMS:
+            self.faults.setdefault(upstream, Fault())
+            self.stats.setdefault(upstream, UpstreamStats())
+
+    def update(self, upstream: str, **changes) -> Fault:
+        if upstream not in self.faults:
+            raise KeyError(upstream)
+        fault = Fault(**{**asdict(self.faults[upstream]), **changes})
+        self.faults[upstream] = fault
+        return fault
+
+    def snapshot(self) -> dict:
+        return {
+            upstream: {**asdict(self.faults[upstream]), **asdict(self.stats[upstream])}
+            for upstream in UPSTREAMS
+        }
+
+    @web.middleware
+    async def middleware(self, request: web.Request, handler):
+        upstream = request.path.strip("/").split("/", 1)[0]
+        fault = self.faults.get(upstream)
+        if fault is None:
+            return await handler(request)
+
+        stats = self.stats[upstream]
+        stats.requests += 1
+        delay = fault.delay(self._random)
+        if fault.timeout_rate and self._random.random() < fault.timeout_rate:
+            stats.hangs += 1
+            delay = fault.hang_seconds
+        if delay:
+            await asyncio.sleep(delay)
+        if fault.error_rate and self._random.random() < fault.error_rate:
+            stats.errors += 1
+            return web.json_response(
+                {"status": fault.error_status, "title": "Simulated failure"},
+                status=fault.error_status,
+            )
+        return await handler(request)
+
+
+def parse_fault_args(values: list[str]) -> dict[str, dict[str, float]]:
+    """["horizon:latency_ms=80", "grist:error_rate=0.05"] -> {upstream: {поле: значение}}"""
+    result: dict[str, dict[str, float]] = {}
+    types = {item.name: item.type for item in fields(Fault)}
+    for value in values:
+        upstream, _, assignment = value.partition(":")
+        name, _, number = assignment.partition("=")
+        if upstream not in UPSTREAMS or name not in types or not number:
+            raise ValueError(f"bad fault spec {value!r}, expected upstream:field=value")
+        result.setdefault(upstream, {})[name] = (
+            int(number) if types[name] in (int, "int") else float(number)
+        )
+    return result
@@ -0,0 +1,145 @@
+"""Grist: /records и /sql по таблицам мира, запись и повтор вебхуков.
+
+Документы не различаются: таблица ищется только по имени, поэтому один
+симулятор обслуживает и montelibero, и mtl-rely. Вебхук, как настоящий
+Grist, шлется в приложение на /grist/webhook/<таблица кеша>.
+"""
+
+import json
+import re
+from urllib.parse import unquote
+
+from aiohttp import ClientSession, ClientTimeout, web
+from loguru import logger
+
+from other.upstream_simulator.world import World
+
+# Таблица документа -> имя таблицы в кеше приложения (GristCacheManager)
+CACHE_TABLES = {
+    "Users": "EURMTL_users",
+    "Accounts": "EURMTL_accounts",
+    "Assets": "EURMTL_assets",
+    "Secretaries": "EURMTL_secretaries",
+    "Pools": "EURMTL_pools",
+    "Access": "GRIST_access",
+}
+
+_FROM_RE = re.compile(r'FROM\s+"(\w+)"', re.IGNORECASE)
+_SELECT_RE = re.compile(r"SELECT\s+(.+?)\s+FROM", re.IGNORECASE)
+_IN_RE = re.compile(r'"(\w+)"\s+IN\s+\(([?,\s]+)\)', re.IGNORECASE)
+
+
+def _matches(fields: dict, filters: dict) -> bool:
+    return all(fields.get(column) in values for column, values in filters.items())
+
+
+class GristSim:
+    def __init__(
+        self,
+        world: World,
+        app_url: str | None = None,
+        webhook_key: str | None = None,
+    ):
+        self.tables: dict[str, list[dict]] = {
+            name: [{"id": idx, "fields": fields} for idx, fields in enumerate(rows, 1)]
+            for name, rows in world.grist_tables().items()
+        }
+        self.app_url = app_url.rstrip("/") if app_url else None
+        self.webhook_key = webhook_key
+        self.webhooks_sent = 0
+
+    def _records(self, table: str) -> list[dict]:
+        return self.tables.setdefault(table, [])
+
+    async def get_records(self, request: web.Request):
+        records = self._records(request.match_info["table"])
+        if "filter" in request.query:
+            filters = json.loads(unquote(request.query["filter"]))
+            records = [
+                record
+                for record in records
+                if _matches({"id": record["id"], **record["fields"]}, filters)
+            ]
+        if "limit" in request.query:
+            records = records[: int(request.query["limit"])]
+        return web.json_response({"records": records})
+
+    async def write_records(self, request: web.Request):
+        table = request.match_info["table"]
+        payload = await request.json()
+        records = self._records(table)
+        by_id = {record["id"]: record for record in records}
+        created = []
+        for item in payload.get("records", []):
+            if "id" in item and item["id"] in by_id:
+                by_id[item["id"]]["fields"].update(item.get("fields", {}))
+                continue
+            record = {"id": len(records) + 1, "fields": dict(item.get("fields", {}))}
+            records.append(record)
+            created.append({"id": record["id"]})
+        if request.method == "POST":
+            return web.json_response({"records": created})
+        return web.json_response(None)
+
+    async def sql(self, request: web.Request):
+        """Подмножество SQL, которое строит GristAPI._fetch_sql"""
+        payload = await request.json()
+        query, args = payload.get("sql", ""), list(payload.get("args", []))
+        table_match = _FROM_RE.search(query)
+        if table_match is None:
+            return web.json_response({"error": "unsupported sql"}, status=400)
+
+        filters = {}
+        for column, placeholders in _IN_RE.findall(query):
+            count = placeholders.count("?")
+            filters[column], args = args[:count], args[count:]
+        rows = [
+            {"id": record["id"], **record["fields"]}
+            for record in self._records(table_match.group(1))
+        ]
+        rows = [row for row in rows if _matches(row, filters)]
+        if "LIMIT" in query.upper() and len(args) >= 2:
+            limit, offset = int(args[0]), int(args[1])
+            rows = rows[offset:] if limit < 0 else rows[offset : offset + limit]
+
+        select = _SELECT_RE.search(query).group(1).strip()
+        if select != "*":
+            columns = [column.strip().strip('"') for column in select.split(",")]
+            rows = [{column: row.get(column) for column in columns} for row in rows]
+        return web.json_response({"records": [{"fields": row} for row in rows]})
+
+    async def send_webhook(self, table: str) -> int:
+        """POST в /grist/webhook/<таблица кеша> приложения; статус ответа"""
+        if self.app_url is None:
+            raise RuntimeError("app_url is not configured")
+        cache_table = CACHE_TABLES.get(table, table)
+        headers = {"Authorization": f"Bearer {self.webhook_key or ''}"}
+        payload = [{"id": record["id"]} for record in self._records(table)[:10]]
+        async with (
+            ClientSession(timeout=ClientTimeout(total=30)) as session,
+            session.post(
+                f"{self.app_url}/grist/webhook/{cache_table}",
+                json=payload,
+                headers=headers,
+            ) as response,
+        ):
+            self.webhooks_sent += 1
+            logger.info(f"simulator: webhook {cache_table} -> {response.status}")
+            return response.status
+
+    async def replay(self, request: web.Request):
+        status = await self.send_webhook(request.match_info["table"])
+        return web.json_response({"status": status})
+
+    def add_routes(self, app: web.Application, prefix: str = "/grist"):
+        records = f"{prefix}/api/docs/{{doc}}/tables/{{table}}/records"
+        app.add_routes(
+            [
+                web.get(records, self.get_records),
+                web.post(records, self.write_records),
+                web.patch(records, self.write_records),
+                web.put(records, self.write_records),
+                web.post(f"{prefix}/api/docs/{{doc}}/sql", self.sql),
+                web.post("/__sim/grist/replay/{table}", self.replay),
+            ]
+        )
@@ -0,0 +1,237 @@
+"""Horizon: аккаунты, заявки, пути, стакан и отправка транзакций."""
+
+import random
+from datetime import UTC, datetime
+
+from aiohttp import web
+from stellar_sdk import Network, TransactionEnvelope
+
+from other.upstream_simulator.world import ASSET_CODES, EURMTL_ISSUER, World
+
+NETWORK_PASSPHRASE = Network.PUBLIC_NETWORK_PASSPHRASE
+
+
+def _page(records: list) -> dict:
+    return {"_links": {}, "_embedded": {"records": records}}
+
+
+def _asset_fields(prefix: str, code: str | None) -> dict:
+    if code is None:
+        return {f"{prefix}asset_type": "native"}
+    return {
+        f"{prefix}asset_type": "credit_alphanum12"
+        if len(code) > 4
+        else "credit_alphanum4",
+        f"{prefix}asset_code": code,
+        f"{prefix}asset_issuer": EURMTL_ISSUER,
+    }
+
+
+def _query_asset(request: web.Request, prefix: str) -> str | None:
+    """Код актива из selling_asset_code / selling=CODE:ISSUER; None - XLM"""
+    code = request.query.get(f"{prefix}_asset_code")
+    if code:
+        return code
+    value = request.query.get(prefix, "native")
+    return None if value == "native" else value.split(":", 1)[0]
+
+
+class HorizonSim:
+    def __init__(self, world: World, offers_per_pair: int = 60):
+        self.world = world
+        self.offers_per_pair = offers_per_pair
+        self.submitted: dict[str, dict] = {}
+        self.ledger = 50_000_000
+
+    def _price(self, selling: str | None, buying: str | None) -> float:
+        # XLM ~ 0.1 EURMTL, остальные активы ~ 1 EURMTL
+        value = {None: 0.1}
+        return value.get(selling, 1.0) / value.get(buying, 1.0)
+
+    def _offers(self, selling: str | None, buying: str | None) -> list[dict]:
+        rnd = random.Random(f"{selling}/{buying}")
+        price = self._price(selling, buying)
+        sellers = self.world.people
+        records = []
+        for idx in range(self.offers_per_pair):
+            offer_price = price * rnd.uniform(1.001, 1.2)
+            seller = sellers[idx % len(sellers)].account_id
+            records.append(
+                {
+                    "id": str(rnd.randint(10**8, 10**9)),
+                    "paging_token": str(idx),
+                    "seller": seller,
+                    "selling": _asset_fields("", selling),
+                    "buying": _asset_fields("", buying),
+                    "amount": f"{rnd.uniform(1, 5000):.7f}",
+                    "price": f"{offer_price:.7f}",
+                    "price_r": {"n": int(offer_price * 10**7), "d": 10**7},
+                    "last_modified_ledger": self.ledger,
+                }
+            )
+        return records
+
+    async def root(self, request: web.Request):
+        return web.json_response(
+            {
+                "horizon_version": "simulator",
+                "core_version": "simulator",
+                "history_latest_ledger": self.ledger,
+                "network_passphrase": NETWORK_PASSPHRASE,
+            }
+        )
+
+    async def account(self, request: web.Request):
+        return web.json_response(
+            self.world.horizon_account(request.match_info["account_id"])
+        )
+
+    async def account_offers(self, request: web.Request):
+        account_id = request.match_info["account_id"]
+        records = [
+            offer
+            for offer in self._offers("EURMTL", None)
+            if offer["seller"] == account_id
+        ]
+        return web.json_response(_page(records))
+
+    async def accounts(self, request: web.Request):
+        # /accounts?asset=CODE:ISSUER - держатели актива
+        records = [
+            self.world.horizon_account(account.account_id)
+            for account in self.world.people[: int(request.query.get("limit", 200))]
+        ]
+        return web.json_response(_page(records))
+
+    async def offers(self, request: web.Request):
+        selling = _query_asset(request, "selling")
+        buying = _query_asset(request, "buying")
+        records = self._offers(selling, buying)
+        return web.json_response(_page(records[: int(request.query.get("limit", 200))]))
+
+    async def order_book(self, request: web.Request):
+        selling = _query_asset(request, "selling")
+        buying = _query_asset(request, "buying")
+        asks = [
+            {"price": offer["price"], "amount": offer["amount"]}
+            for offer in sorted(
+                self._offers(selling, buying), key=lambda o: float(o["price"])
+            )
+        ]
+        bids = [
+            {"price": f"{1 / float(offer['price']):.7f}", "amount": offer["amount"]}
+            for offer in sorted(
+                self._offers(buying, selling), key=lambda o: float(o["price"])
+            )
+        ]
+        return web.json_response(
+            {
+                "bids": bids,
+                "asks": asks,
+                "base": _asset_fields("", selling),
+                "counter": _asset_fields("", buying),
+            }
+        )
+
+    async def assets(self, request: web.Request):
+        code = request.query.get("asset_code")
+        records = []
+        if code in ASSET_CODES:
+            records.append(
+                {
+                    **_asset_fields("", code),
+                    "num_accounts": len(self.world.people),
+                    "amount": "1000000.0000000",
+                }
+            )
+        return web.json_response(_page(records))
+
+    def _path_record(self, source: str | None, source_amount: float, dest: str | None):
+        destination_amount = source_amount / self._price(dest, source) * 0.995
+        return {
+            **_asset_fields("source_", source),
+            "source_amount": f"{source_amount:.7f}",
+            **_asset_fields("destination_", dest),
+            "destination_amount": f"{destination_amount:.7f}",
+            "path": [],
+        }
+
+    async def strict_send_paths(self, request: web.Request):
+        source = _query_asset(request, "source")
+        amount = float(request.query.get("source_amount", "1"))
+        destinations = request.query.get("destination_assets", "native").split(",")
+        records = [
+            self._path_record(
+                source, amount, None if dest == "native" else dest.split(":")[0]
+            )
+            for dest in destinations
+        ]
+        return web.json_response(_page(records))
+
+    async def strict_receive_paths(self, request: web.Request):
+        dest = _query_asset(request, "destination")
+        amount = float(request.query.get("destination_amount", "1"))
+        sources = request.query.get("source_assets", "native").split(",")
+        records = []
+        for source in sources:
+            source_code = None if source == "native" else source.split(":")[0]
+            source_amount = amount * self._price(dest, source_code) / 0.995
+            records.append(self._path_record(source_code, source_amount, dest))
+        return web.json_response(_page(records))
+
+    async def submit_transaction(self, request: web.Request):
+        form = await request.post()
+        try:
+            envelope = TransactionEnvelope.from_xdr(form["tx"], NETWORK_PASSPHRASE)
+        except Exception:
+            return web.json_response(
+                {"status": 400, "title": "Transaction Malformed"}, status=400
+            )
+        self.ledger += 1
+        tx_hash = envelope.hash_hex()
+        record = {
+            "id": tx_hash,
+            "hash": tx_hash,
+            "ledger": self.ledger,
+            "successful": True,
+            "created_at": datetime.now(UTC).strftime("%Y-%m-%dT%H:%M:%SZ"),
+            "envelope_xdr": form["tx"],
+        }
+        self.submitted[tx_hash] = record
+        return web.json_response(record)
+
+    async def transaction(self, request: web.Request):
+        record = self.submitted.get(request.match_info["tx_hash"])
+        if record is None:
+            return web.json_response(
+                {"status": 404, "title": "Resource Missing"}, status=404
+            )
+        return web.json_response(record)
+
+    async def empty_page(self, request: web.Request):
+        # trades, liquidity_pools, claimable_balances
+        return web.json_response(_page([]))
+
+    def add_routes(self, app: web.Application, prefix: str = "/horizon"):
+        app.add_routes(
+            [
+                web.get(f"{prefix}", self.root),
+                web.get(f"{prefix}/", self.root),
+                web.get(f"{prefix}/accounts", self.accounts),
+                web.get(f"{prefix}/accounts/{{account_id}}", self.account),
+                web.get(
+                    f"{prefix}/accounts/{{account_id}}/offers", self.account_offers
+                ),
+                web.get(f"{prefix}/offers", self.offers),
+                web.get(f"{prefix}/order_book", self.order_book),
+                web.get(f"{prefix}/assets", self.assets),
+                web.get(f"{prefix}/paths/strict-send", self.strict_send_paths),
+                web.get(f"{prefix}/paths/strict-receive", self.strict_receive_paths),
+                web.post(f"{prefix}/transactions", self.submit_transaction),
+                web.post(f"{prefix}/transactions/", self.submit_transaction),
+                web.get(f"{prefix}/transactions/{{tx_hash}}", self.transaction),
+                web.get(f"{prefix}/trades", self.empty_page),
+                web.get(f"{prefix}/liquidity_pools", self.empty_page),
+                web.get(f"{prefix}/claimable_balances", self.empty_page),
+            ]
+        )
@@ -0,0 +1,295 @@
+"""Генератор нагрузки "день подписания" для приложения на симуляторе upstream.
+
+Сначала через /remote/add_transaction создаются мультиподписные транзакции
+фондов из мира симулятора (тот же seed и размеры, что у симулятора), затем
+concurrency воркеров duration секунд выбирают сценарии по весам TRAFFIC_MIX:
+просмотр транзакции, подпись через SEP-7 колбек, списки на подпись и т.д.
+Итог - запросы, ошибки, RPS и p50/p95/p99 по каждому маршруту.
+
+Запуск:
+    python -m other.upstream_simulator.loadgen --app-url http://127.0.0.1:8000 \
+        --api-key "$EURMTL_KEY" --duration 60 --concurrency 32 --json log/load.json
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import random
+import time
+from collections.abc import Callable
+from dataclasses import dataclass, field
+
+from aiohttp import ClientSession, ClientTimeout
+from stellar_sdk import (
+    Account,
+    Asset,
+    Keypair,
+    Network,
+    TransactionBuilder,
+    TransactionEnvelope,
+)
+
+from other.upstream_simulator.world import EURMTL_ISSUER, World
+
+
+@dataclass
+class LoadTransaction:
+    tx_hash: str
+    body: str
+    signers: list[Keypair]
+
+
+@dataclass
+class LoadContext:
+    world: World
+    transactions: list[LoadTransaction]
+    rnd: random.Random
+
+    def transaction(self) -> LoadTransaction:
+        return self.rnd.choice(self.transactions)
+
+    def signer(self) -> Keypair:
+        return self.rnd.choice(self.transaction().signers)
+
+
+# Сценарий: (контекст) -> (метод, путь, параметры запроса aiohttp)
+Scenario = Callable[[LoadContext], tuple[str, str, dict]]
+
+
+def view_transaction(ctx: LoadContext):
+    return "GET", f"/sign_tools/{ctx.transaction().tx_hash}", {}
+
+
+def sign_transaction(ctx: LoadContext):
+    transaction = ctx.transaction()
+    envelope = TransactionEnvelope.from_xdr(
+        transaction.body, Network.PUBLIC_NETWORK_PASSPHRASE
+    )
+    envelope.sign(ctx.rnd.choice(transaction.signers))
+    return "POST", "/remote/sep07", {"data": {"xdr": envelope.to_xdr()}}
+
+
+def need_sign(ctx: LoadContext):
+    return "GET", f"/remote/need_sign/{ctx.signer().public_key}", {}
+
+
+def decode_transaction(ctx: LoadContext):
+    return "GET", f"/decode/{ctx.transaction().tx_hash}", {}
+
+
+def get_xdr(ctx: LoadContext):
+    return "GET", f"/remote/get_xdr/{ctx.transaction().tx_hash}", {}
+
+
+def sign_all(ctx: LoadContext):
+    return "GET", "/sign_all", {}
+
+
+def orderbook(ctx: LoadContext):
+    return "GET", f"/cup/orderbook/XLM/EURMTL-{EURMTL_ISSUER}", {}
+
+
+def healthz(ctx: LoadContext):
+    return "GET", "/healthz", {}
+
+
+# Маршрут -> (сценарий, вес); веса - доли трафика в день подписания
+TRAFFIC_MIX: dict[str, tuple[Scenario, int]] = {
+    "GET /sign_tools/<hash>": (view_transaction, 40),
+    "POST /remote/sep07": (sign_transaction, 15),
+    "GET /remote/need_sign/<key>": (need_sign, 15),
+    "GET /decode/<hash>": (decode_transaction, 10),
+    "GET /remote/get_xdr/<hash>": (get_xdr, 5),
+    "GET /sign_all": (sign_all, 5),
+    "GET /cup/orderbook": (orderbook, 5),
+    "GET /healthz": (healthz, 5),
+}
+
+
+@dataclass
+class RouteStats:
+    latencies: list[float] = field(default_factory=list)
+    errors: int = 0
+    statuses: dict[int, int] = field(default_factory=dict)
+
+
+def percentile(values: list[float], q: float) -> float:
+    """q-й перцентиль (0..100) с линейной интерполяцией"""
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    rank = (len(ordered) - 1) * q / 100
+    low = int(rank)
+    high = min(low + 1, len(ordered) - 1)
+    return ordered[low] + (ordered[high] - ordered[low]) * (rank - low)
+
+
+def summarize(stats: dict[str, RouteStats], duration: float) -> dict[str, dict]:
+    report = {}
+    for route, route_stats in sorted(stats.items()):
+        latencies = route_stats.latencies
+        report[route] = {
+            "requests": len(latencies),
+            "errors": route_stats.errors,
+            "rps": round(len(latencies) / duration, 2) if duration else 0.0,
+            "p50_ms": round(percentile(latencies, 50) * 1000, 1),
+            "p95_ms": round(percentile(latencies, 95) * 1000, 1),
+            "p99_ms": round(percentile(latencies, 99) * 1000, 1),
+            "max_ms": round(max(latencies, default=0) * 1000, 1),
+            "statuses": {
+                str(code): count for code, count in sorted(route_stats.statuses.items())
+            },
+        }
+    return report
+
+
+def build_transaction(world: World, fund_idx: int, number: int) -> tuple[str, list]:
+    """Платеж фонда fund_idx с number-м sequence; (XDR, ключи подписантов)"""
+    fund = world.funds[fund_idx % len(world.funds)]
+    builder = TransactionBuilder(
+        Account(fund.account_id, fund.sequence + number),
+        network_passphrase=Network.PUBLIC_NETWORK_PASSPHRASE,
+        base_fee=100,
+    ).add_time_bounds(0, 0)
+    for idx in range(3):
+        destination = world.people[(number * 3 + idx) % len(world.people)]
+        builder.append_payment_op(
+            destination.account_id, Asset("EURMTL", EURMTL_ISSUER), f"{number + 1}.5"
+        )
+    signers = [world.secret_for(key) for key, weight in fund.signers if weight > 0]
+    return builder.build().to_xdr(), [kp for kp in signers if kp is not None]
+
+
+async def create_transactions(
+    session: ClientSession, app_url: str, api_key: str, world: World, count: int
+) -> list[LoadTransaction]:
+    transactions = []
+    for number in range(count):
+        body, signers = build_transaction(world, number, number)
+        async with session.post(
+            f"{app_url}/remote/add_transaction",
+            json={"tx_body": body, "tx_description": f"Load test payment {number}"},
+            headers={"Authorization": f"Bearer {api_key}"},
+        ) as response:
+            data = await response.json()
+            if response.status != 201:
+                raise RuntimeError(f"add_transaction -> {response.status}: {data}")
+            transactions.append(LoadTransaction(data["hash"], body, signers))
+    return transactions
+
+
+async def _worker(
+    session: ClientSession,
+    app_url: str,
+    ctx: LoadContext,
+    stats: dict[str, RouteStats],
+    deadline: float,
+):
+    routes = list(TRAFFIC_MIX)
+    weights = [TRAFFIC_MIX[route][1] for route in routes]
+    while time.monotonic() < deadline:
+        route = ctx.rnd.choices(routes, weights)[0]
+        method, path, kwargs = TRAFFIC_MIX[route][0](ctx)
+        route_stats = stats.setdefault(route, RouteStats())
+        started = time.monotonic()
+        try:
+            async with session.request(
+                method, f"{app_url}{path}", **kwargs
+            ) as response:
+                await response.read()
+                status = response.status
+        except Exception:
+            status = 0
+        route_stats.latencies.append(time.monotonic() - started)
+        route_stats.statuses[status] = route_stats.statuses.get(status, 0) + 1
+        if status == 0 or status >= 500:
+            route_stats.errors += 1
+
+
+async def run_load(
+    app_url: str,
+    api_key: str,
+    world: World,
+    *,
+    transactions: int = 20,
+    duration: float = 60.0,
+    concurrency: int = 32,
+    seed: int = 1,
+) -> dict[str, dict]:
+    app_url = app_url.rstrip("/")
+    timeout = ClientTimeout(total=60)
+    async with ClientSession(timeout=timeout) as session:
+        created = await create_transactions(
+            session, app_url, api_key, world, transactions
+        )
+        stats: dict[str, RouteStats] = {}
+        deadline = time.monotonic() + duration
+        started = time.monotonic()
+        await asyncio.gather(
+            *(
+                _worker(
+                    session,
+                    app_url,
+                    LoadContext(world, created, random.Random(seed * 1000 + idx)),
+                    stats,
+                    deadline,
+                )
+                for idx in range(concurrency)
+            )
+        )
+        return summarize(stats, time.monotonic() - started)
+
+
+def print_report(report: dict[str, dict]):
+    print(
+        f"{'route':<30} {'req':>7} {'err':>5} {'rps':>8} "
+        f"{'p50 ms':>8} {'p95 ms':>8} {'p99 ms':>8} {'max ms':>8}"
+    )
+    for route, row in report.items():
+        print(
+            f"{route:<30} {row['requests']:>7} {row['errors']:>5} {row['rps']:>8} "
+            f"{row['p50_ms']:>8} {row['p95_ms']:>8} {row['p99_ms']:>8} {row['max_ms']:>8}"
+        )
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Нагрузка 'день подписания'")
+    parser.add_argument("--app-url", default="http://127.0.0.1:8000")
+    parser.add_argument("--api-key", default=os.getenv("EURMTL_KEY", ""))
+    parser.add_argument("--duration", type=float, default=60)
+    parser.add_argument("--concurrency", type=int, default=32)
+    parser.add_argument("--transactions", type=int, default=20)
+    # Должны совпадать с параметрами симулятора
+    parser.add_argument("--seed", type=int, default=1)
+    parser.add_argument("--users", type=int, default=200)
+    parser.add_argument("--funds", type=int, default=5)
+    parser.add_argument("--signers", type=int, default=20)
+    parser.add_argument("--json", help="записать отчет в файл")
+    args = parser.parse_args()
+
+    world = World(
+        seed=args.seed,
+        user_count=args.users,
+        multisig_count=args.funds,
+        signers_per_multisig=args.signers,
+    )
+    report = asyncio.run(
+        run_load(
+            args.app_url,
+            args.api_key,
+            world,
+            transactions=args.transactions,
+            duration=args.duration,
+            concurrency=args.concurrency,
+            seed=args.seed,
+        )
+    )
+    print_report(report)
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as f:
+            json.dump(report, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
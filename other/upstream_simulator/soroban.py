@@ -0,0 +1,85 @@
+"""Soroban RPC: JSON-RPC с simulateTransaction, getHealth и отправкой."""
+
+import hashlib
+
+from aiohttp import web
+from stellar_sdk import scval
+
+from other.upstream_simulator.horizon import NETWORK_PASSPHRASE
+
+# Минимальная плата ресурсов, которую отдает simulateTransaction
+MIN_RESOURCE_FEE = "100000"
+
+
+class SorobanSim:
+    def __init__(self, display_name: str = "EURMTL"):
+        self.display_name = display_name
+        self.ledger = 50_000_000
+        self.sent: dict[str, str] = {}
+
+    def _simulate(self, params: dict) -> dict:
+        return_value = scval.to_string(self.display_name)
+        result = {"auth": []}
+        if params.get("xdrFormat") == "json":
+            result["returnValueJson"] = {"string": self.display_name}
+        else:
+            result["xdr"] = return_value.to_xdr()
+        return {
+            "latestLedger": self.ledger,
+            "minResourceFee": MIN_RESOURCE_FEE,
+            "results": [result],
+            "cost": {"cpuInsns": "1000000", "memBytes": "100000"},
+        }
+
+    def _send(self, params: dict) -> dict:
+        tx_hash = hashlib.sha256(params.get("transaction", "").encode()).hexdigest()
+        self.sent[tx_hash] = params.get("transaction", "")
+        return {
+            "status": "PENDING",
+            "hash": tx_hash,
+            "latestLedger": self.ledger,
+            "latestLedgerCloseTime": "0",
+        }
+
+    def _get_transaction(self, params: dict) -> dict:
+        tx_hash = params.get("hash", "")
+        status = "SUCCESS" if tx_hash in self.sent else "NOT_FOUND"
+        return {"status": status, "latestLedger": self.ledger}
+
+    def call(self, method: str, params: dict) -> dict:
+        match method:
+            case "getHealth":
+                return {"status": "healthy", "latestLedger": self.ledger}
+            case "getLatestLedger":
+                return {"id": "0" * 64, "protocolVersion": 22, "sequence": self.ledger}
+            case "getNetwork":
+                return {"passphrase": NETWORK_PASSPHRASE, "protocolVersion": 22}
+            case "getLedgerEntries":
+                return {"entries": [], "latestLedger": self.ledger}
+            case "simulateTransaction":
+                return self._simulate(params)
+            case "sendTransaction":
+                return self._send(params)
+            case "getTransaction":
+                return self._get_transaction(params)
+        raise KeyError(method)
+
+    async def handle(self, request: web.Request):
+        payload = await request.json()
+        request_id = payload.get("id")
+        try:
+            result = self.call(payload.get("method", ""), payload.get("params") or {})
+        except KeyError:
+            return web.json_response(
+                {
+                    "jsonrpc": "2.0",
+                    "id": request_id,
+                    "error": {"code": -32601, "message": "method not found"},
+                }
+            )
+        return web.json_response({"jsonrpc": "2.0", "id": request_id, "result": result})
+
+    def add_routes(self, app: web.Application, prefix: str = "/soroban"):
+        app.add_routes(
+            [web.post(prefix, self.handle), web.post(f"{prefix}/", self.handle)]
+        )
@@ -0,0 +1,93 @@
+"""Telegram Bot API в формате локального telegram-bot-api."""
+
+import time
+
+from aiohttp import web
+
+BOT_ID = 7_000_000_001
+# Пользователь, который администратор в любом чате (is_user_admin)
+ADMIN_USER_ID = 84131737
+
+
+class TelegramSim:
+    def __init__(self):
+        self.sent: list[dict] = []
+        self._message_id = 0
+
+    def _message(self, params: dict) -> dict:
+        self._message_id += 1
+        chat_id = params.get("chat_id", 0)
+        try:
+            chat_id = int(chat_id)
+        except (TypeError, ValueError):
+            chat_id = 0
+        return {
+            "message_id": self._message_id,
+            "date": int(time.time()),
+            "chat": {"id": chat_id, "type": "supergroup", "title": "simulator"},
+            "from": {"id": BOT_ID, "is_bot": True, "first_name": "simulator"},
+            "text": params.get("text") or params.get("caption") or "",
+        }
+
+    def call(self, method: str, params: dict):
+        match method:
+            case "getMe":
+                return {
+                    "id": BOT_ID,
+                    "is_bot": True,
+                    "first_name": "simulator",
+                    "username": "simulator_bot",
+                }
+            case "getChatMember":
+                user_id = int(params.get("user_id", 0))
+                status = (
+                    "administrator" if user_id in (BOT_ID, ADMIN_USER_ID) else "member"
+                )
+                member = {
+                    "status": status,
+                    "user": {"id": user_id, "is_bot": False, "first_name": "user"},
+                }
+                if status == "administrator":
+                    member.update(
+                        {
+                            "can_be_edited": False,
+                            "is_anonymous": False,
+                            "can_manage_chat": True,
+                            "can_delete_messages": True,
+                            "can_manage_video_chats": True,
+                            "can_restrict_members": True,
+                            "can_promote_members": False,
+                            "can_change_info": True,
+                            "can_invite_users": True,
+                            "can_post_stories": False,
+                            "can_edit_stories": False,
+                            "can_delete_stories": False,
+                        }
+                    )
+                return member
+            case (
+                "sendMessage"
+                | "sendPhoto"
+                | "sendDocument"
+                | "editMessageText"
+                | "forwardMessage"
+                | "copyMessage"
+            ):
+                message = self._message(params)
+                self.sent.append({"method": method, **message})
+                return message
+        return True
+
+    async def handle(self, request: web.Request):
+        if request.method == "POST":
+            params = dict(await request.post())
+        else:
+            params = dict(request.query)
+        return web.json_response(
+            {"ok": True, "result": self.call(request.match_info["method"], params)}
+        )
+
+    def add_routes(self, app: web.Application, prefix: str = "/telegram"):
+        # aiogram: {base}/bot{token}/{method}
+        path = f"{prefix}/bot{{token}}/{{method}}"
+        app.add_routes([web.post(path, self.handle), web.get(path, self.handle)])
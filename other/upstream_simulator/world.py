@@ -0,0 +1,172 @@
+"""Детерминированный набор данных симулятора.
+
+Аккаунты, подписанты, активы и записи Grist выводятся из seed, поэтому
+симулятор и генератор нагрузки (loadgen) независимо получают один и тот же
+мир: генератор знает секреты подписантов и может подписывать транзакции,
+которые приложение проверит по ответам симулятора.
+"""
+
+import random
+from dataclasses import dataclass, field
+
+from stellar_sdk import Keypair
+
+EURMTL_ISSUER = "GACKTN5DAZGWXRWB2WLM6OPBDHAMT6SJNGLJZPQMEZBUR4JUGBX2UK7V"
+ASSET_CODES = ("EURMTL", "MTL", "SATSMTL", "USDM", "MTLRECT")
+
+
+def _keypair(seed: int, idx: int) -> Keypair:
+    return Keypair.from_raw_ed25519_seed((seed * 1_000_003 + idx).to_bytes(32, "big"))
+
+
+@dataclass
+class SimAccount:
+    keypair: Keypair
+    telegram_id: int
+    username: str
+    signers: list[tuple[str, int]] = field(default_factory=list)
+    thresholds: tuple[int, int, int] = (0, 0, 0)
+    sequence: int = 100_000_000
+
+    @property
+    def account_id(self) -> str:
+        return self.keypair.public_key
+
+
+@dataclass
+class World:
+    """Аккаунты: первые multisig_count - мультиподписные фонды, остальные - люди"""
+
+    seed: int = 1
+    user_count: int = 200
+    multisig_count: int = 5
+    signers_per_multisig: int = 20
+    accounts: list[SimAccount] = field(default_factory=list)
+    by_id: dict[str, SimAccount] = field(default_factory=dict)
+
+    def __post_init__(self):
+        rnd = random.Random(self.seed)
+        for idx in range(self.multisig_count + self.user_count):
+            account = SimAccount(
+                keypair=_keypair(self.seed, idx),
+                telegram_id=10_000_000 + idx,
+                username=f"user{idx}",
+                sequence=rnd.randint(10**8, 10**9) << 12,
+            )
+            self.accounts.append(account)
+            self.by_id[account.account_id] = account
+
+        people = self.people
+        for fund in self.funds:
+            members = rnd.sample(people, min(self.signers_per_multisig, len(people)))
+            fund.signers = [(member.account_id, 1) for member in members]
+            fund.signers.append((fund.account_id, 0))
+            half = len(members) // 2 + 1
+            fund.thresholds = (half, half, half)
+
+    @property
+    def funds(self) -> list[SimAccount]:
+        return self.accounts[: self.multisig_count]
+
+    @property
+    def people(self) -> list[SimAccount]:
+        return self.accounts[self.multisig_count :]
+
+    def secret_for(self, account_id: str) -> Keypair | None:
+        account = self.by_id.get(account_id)
+        return account.keypair if account else None
+
+    def horizon_account(self, account_id: str) -> dict:
+        """Ответ Horizon /accounts/{id}; неизвестный адрес - обычный аккаунт"""
+        account = self.by_id.get(account_id)
+        signers = account.signers if account and account.signers else [(account_id, 1)]
+        low, med, high = account.thresholds if account else (0, 0, 0)
+        sequence = account.sequence if account else 100_000_000
+        balances = [
+            {
+                "asset_type": "credit_alphanum12"
+                if len(code) > 4
+                else "credit_alphanum4",
+                "asset_code": code,
+                "asset_issuer": EURMTL_ISSUER,
+                "balance": "1000.0000000",
+                "limit": "922337203685.4775807",
+                "buying_liabilities": "0.0000000",
+                "selling_liabilities": "0.0000000",
+            }
+            for code in ASSET_CODES[:3]
+        ]
+        balances.append(
+            {
+                "asset_type": "native",
+                "balance": "250.0000000",
+                "buying_liabilities": "0.0000000",
+                "selling_liabilities": "0.0000000",
+            }
+        )
+        return {
+            "id": account_id,
+            "account_id": account_id,
+            "sequence": str(sequence),
+            "subentry_count": len(signers) + len(balances),
+            "num_sponsoring": 0,
+            "num_sponsored": 0,
+            "thresholds": {
+                "low_threshold": low,
+                "med_threshold": med,
+                "high_threshold": high,
+            },
+            "flags": {
+                "auth_required": False,
+                "auth_revocable": False,
+                "auth_immutable": False,
+                "auth_clawback_enabled": False,
+            },
+            "balances": balances,
+            "signers": [
+                {"key": key, "weight": weight, "type": "ed25519_public_key"}
+                for key, weight in signers
+            ],
+            "data": {},
+            "paging_token": account_id,
+        }
+
+    def grist_tables(self) -> dict[str, list[dict]]:
+        """Таблицы Grist по имени; id записи - ее номер с 1, как в Grist"""
+        users = [
+            {
+                "account_id": account.account_id,
+                "telegram_id": account.telegram_id,
+                "username": account.username,
+            }
+            for account in self.people
+        ]
+        accounts = [
+            {
+                "account_id": fund.account_id,
+                "description": f"Fund {idx}",
+                "need_dropdown": True,
+            }
+            for idx, fund in enumerate(self.funds)
+        ]
+        assets = [
+            {
+                "code": code,
+                "issuer": EURMTL_ISSUER,
+                "need_dropdown": True,
+                "need_QR": code == "EURMTL",
+            }
+            for code in ASSET_CODES
+        ]
+        # Ссылки в Grist - id записей: фонд idx+1, секретарь - первый человек
+        secretaries = [
+            {"account": idx + 1, "users": [1]} for idx in range(len(self.funds))
+        ]
+        return {
+            "Users": users,
+            "Accounts": accounts,
+            "Assets": assets,
+            "Secretaries": secretaries,
+            "Pools": [],
+            "Access": [],
+        }
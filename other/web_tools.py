@@ -1,13 +1,43 @@
-import aiohttp
+"""HTTP-клиент приложения поверх одной aiohttp-сессии на менеджер.
+
+- get_session без lock: проверка и замена сессии идут без await, поэтому
+  атомарны в event loop. Раз в max_session_duration сессия заменяется
+  новой, а старая закрывается через grace секунд, когда ее запросы
+  гарантированно закончились по таймауту.
+- TCPConnector с общим лимитом соединений, лимитом на хост и кешем DNS:
+  зависший хост не занимает весь пул.
+- Идемпотентные запросы (GET/HEAD/OPTIONS) повторяются при 429/502/503/504
+  и обрывах соединения с jittered backoff, Retry-After учитывается.
+  Таймаут не повторяется - вызывающий уже прождал весь бюджет.
+- Circuit breaker на хост: после failure_threshold подряд ошибок (5xx,
+  таймаут, обрыв) запросы к хосту reset_timeout секунд сразу получают 503,
+  затем один пробный запрос решает, закрыть ли breaker. Отмененная проба
+  (проигравший hedge-запрос) освобождает место для следующей.
+- Счетчики по хостам: stats().
+"""
+
 import asyncio
+import random
 import time
-from dataclasses import dataclass
-from typing import Optional, Dict, Any, Union, Tuple
+from dataclasses import asdict, dataclass
+from email.utils import parsedate_to_datetime
+from typing import Any, Dict, Optional, Tuple, Union
+from urllib.parse import urlsplit
 
+import aiohttp
 from loguru import logger
 from quart import jsonify as quart_jsonify
 
+from other.request_context import (
+    CallBudgetExceeded,
+    check_budget,
+    classify_url,
+    track_call,
+)
+
 DEFAULT_TIMEOUT = 10
+RETRY_METHODS = frozenset({"GET", "HEAD", "OPTIONS"})
+RETRY_STATUSES = frozenset({429, 502, 503, 504})
 
 
 # Датакласс для ответа
@@ -19,34 +49,208 @@ class WebResponse:
     elapsed_time: Optional[float] = None  # Время выполнения запроса (в секундах)
 
 
+@dataclass
+class HostStats:
+    requests: int = 0  # попытки, включая повторы
+    retries: int = 0
+    failures: int = 0  # 5xx, таймауты и обрывы
+    timeouts: int = 0
+    rejected: int = 0  # отбиты открытым circuit breaker
+
+
+class CircuitBreaker:
+    CLOSED = "closed"
+    OPEN = "open"
+    HALF_OPEN = "half_open"
+
+    def __init__(self, failure_threshold: int = 5, reset_timeout: float = 30.0):
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.state = self.CLOSED
+        self.failures = 0
+        self.opened_at = 0.0
+
+    def allow(self) -> bool:
+        if self.state == self.CLOSED:
+            return True
+        if self.state == self.OPEN:
+            if time.monotonic() - self.opened_at < self.reset_timeout:
+                return False
+            self.state = self.HALF_OPEN
+            return True  # пробный запрос
+        return False  # пробный запрос уже идет
+
+    def record_success(self):
+        self.state = self.CLOSED
+        self.failures = 0
+
+    def release_probe(self):
+        """Проба отменена без ответа: breaker снова открыт, следующий запрос - новая проба"""
+        if self.state == self.HALF_OPEN:
+            self.state = self.OPEN
+            self.opened_at = time.monotonic() - self.reset_timeout
+
+    def record_failure(self):
+        self.failures += 1
+        if self.state == self.HALF_OPEN or self.failures >= self.failure_threshold:
+            self.state = self.OPEN
+            self.opened_at = time.monotonic()
+
+
+def retry_after_seconds(value: Optional[str]) -> Optional[float]:
+    """Retry-After в секундах: число или HTTP-дата"""
+    if not value:
+        return None
+    try:
+        return max(0.0, float(value))
+    except ValueError:
+        pass
+    try:
+        return max(0.0, parsedate_to_datetime(value).timestamp() - time.time())
+    except (TypeError, ValueError):
+        return None
+
+
 class HTTPSessionManager:
-    def __init__(self):
+    def __init__(
+        self,
+        *,
+        limit: int = 100,
+        limit_per_host: int = 20,
+        dns_ttl: int = 300,
+        max_retries: int = 2,
+        backoff_base: float = 0.2,
+        backoff_max: float = 2.0,
+        max_retry_after: float = 5.0,
+        failure_threshold: int = 5,
+        reset_timeout: float = 30.0,
+    ):
         self.session: Optional[aiohttp.ClientSession] = None
         self.session_start_time: float = 0.0
         self.max_session_duration = 3600  # 1 час в секундах
-        self._lock = asyncio.Lock()  # Асинхронный lock для синхронизации
+        # Старую сессию закрываем, когда ее запросы точно закончились
+        self.session_close_grace = DEFAULT_TIMEOUT + 5
+        self.limit = limit
+        self.limit_per_host = limit_per_host
+        self.dns_ttl = dns_ttl
+        self.max_retries = max_retries
+        self.backoff_base = backoff_base
+        self.backoff_max = backoff_max
+        self.max_retry_after = max_retry_after
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self._session_loop: Optional[asyncio.AbstractEventLoop] = None
+        self._retired: set[aiohttp.ClientSession] = set()
+        self._breakers: dict[str, CircuitBreaker] = {}
+        self._stats: dict[str, HostStats] = {}
+
+    def _new_session(self, loop: asyncio.AbstractEventLoop) -> aiohttp.ClientSession:
+        connector = aiohttp.TCPConnector(
+            limit=self.limit,
+            limit_per_host=self.limit_per_host,
+            ttl_dns_cache=self.dns_ttl,
+        )
+        self.session = aiohttp.ClientSession(
+            connector=connector,
+            timeout=aiohttp.ClientTimeout(total=DEFAULT_TIMEOUT),
+        )
+        self.session_start_time = time.monotonic()
+        self._session_loop = loop
+        logger.info("Сессия создана или пересоздана.")
+        return self.session
+
+    async def _close_later(self, session: aiohttp.ClientSession):
+        try:
+            await asyncio.sleep(self.session_close_grace)
+        finally:
+            self._retired.discard(session)
+            await session.close()
 
     async def get_session(self) -> aiohttp.ClientSession:
-        async with self._lock:  # Блокируем доступ к сессии
-            current_time = time.monotonic()
-            if (
-                self.session is None
-                or self.session.closed
-                or current_time - self.session_start_time > self.max_session_duration
-            ):
-                if self.session and not self.session.closed:
-                    await self.session.close()
-                timeout = aiohttp.ClientTimeout(total=DEFAULT_TIMEOUT)
-                self.session = aiohttp.ClientSession(timeout=timeout)
-                self.session_start_time = current_time
-                logger.info("Сессия создана или пересоздана.")
-            return self.session
+        loop = asyncio.get_running_loop()
+        session = self.session
+        if session is None or session.closed or self._session_loop is not loop:
+            # Сессия другого (уже закрытого) loop непригодна, просто бросаем ее
+            return self._new_session(loop)
+        if time.monotonic() - self.session_start_time > self.max_session_duration:
+            self._retired.add(session)
+            asyncio.create_task(self._close_later(session))
+            return self._new_session(loop)
+        return session
 
     async def close(self):
-        async with self._lock:  # Блокируем доступ к сессии
-            if self.session and not self.session.closed:
-                await self.session.close()
-                logger.info("Сессия закрыта.")
+        sessions = [*self._retired, self.session]
+        self._retired.clear()
+        for session in sessions:
+            if session and not session.closed:
+                await session.close()
+        if self.session and self.session.closed:
+            logger.info("Сессия закрыта.")
+
+    def _host(self, url: str) -> str:
+        return urlsplit(url).netloc
+
+    def _breaker(self, host: str) -> CircuitBreaker:
+        breaker = self._breakers.get(host)
+        if breaker is None:
+            breaker = self._breakers[host] = CircuitBreaker(
+                self.failure_threshold, self.reset_timeout
+            )
+        return breaker
+
+    def _host_stats(self, host: str) -> HostStats:
+        stats = self._stats.get(host)
+        if stats is None:
+            stats = self._stats[host] = HostStats()
+        return stats
+
+    def stats(self) -> dict[str, dict[str, Any]]:
+        """Счетчики запросов и состояние circuit breaker по хостам"""
+        return {
+            host: {**asdict(stats), "circuit": self._breaker(host).state}
+            for host, stats in self._stats.items()
+        }
+
+    def _backoff(
+        self, attempt: int, retry_after: Optional[str] = None
+    ) -> Optional[float]:
+        """Пауза перед повтором или None, если сервер просит ждать слишком долго"""
+        delay = retry_after_seconds(retry_after)
+        if delay is not None:
+            return delay if delay <= self.max_retry_after else None
+        # full jitter: повторы разных запросов не приходят одной волной
+        return random.uniform(0, min(self.backoff_max, self.backoff_base * 2**attempt))
+
+    async def _send(
+        self,
+        session: aiohttp.ClientSession,
+        method: str,
+        url: str,
+        return_type: Optional[str],
+        start_time: float,
+        **kwargs,
+    ) -> WebResponse:
+        async with (
+            track_call(classify_url(url), url),
+            session.request(method, url, **kwargs) as response,
+        ):
+            content_type = response.headers.get("Content-Type", "")
+            elapsed_time = time.monotonic() - start_time
+
+            # Определяем, как обрабатывать ответ
+            if return_type == "bytes":
+                response_data = await response.read()
+            elif ("json" in content_type) or return_type == "json":
+                response_data = await response.json()
+            else:  # Default to text
+                response_data = await response.text()
+
+            return WebResponse(
+                status=response.status,
+                data=response_data,
+                headers=dict(response.headers),
+                elapsed_time=elapsed_time,
+            )
 
     async def get_web_request(
         self,
@@ -56,6 +260,7 @@ class HTTPSessionManager:
         headers: Optional[Dict[str, str]] = None,
         data: Optional[Union[Dict[str, Any], str]] = None,
         return_type: Optional[str] = None,  # 'json', 'text', or 'bytes'
+        retries: Optional[int] = None,
     ) -> WebResponse:
         """
         Выполняет HTTP-запрос с использованием текущей сессии.
@@ -66,46 +271,94 @@ class HTTPSessionManager:
         :param headers: Заголовки запроса.
         :param data: Данные для отправки (для GET/POST).
         :param return_type: Ожидаемый тип ответа ('json', 'text' или 'bytes').
-        :return: Экземпляр WebResponse.
+        :param retries: Число повторов вместо max_retries (только GET/HEAD/OPTIONS).
+        :return: Экземпляр WebResponse; 503 без запроса, если хост отключен breaker.
+        :raises CallBudgetExceeded: у HTTP-запроса приложения закончился бюджет вызовов.
         """
+        method = method.upper()
+        # До breaker: запрос сверх бюджета не должен занимать пробный слот
+        check_budget(classify_url(url))
+        host = self._host(url)
+        breaker = self._breaker(host)
+        stats = self._host_stats(host)
+        if not breaker.allow():
+            stats.rejected += 1
+            return WebResponse(
+                status=503, data=f"Circuit open for {host}", elapsed_time=0.0
+            )
+        probe = breaker.state == CircuitBreaker.HALF_OPEN
+
+        if method in RETRY_METHODS:
+            attempts = 1 + (self.max_retries if retries is None else retries)
+        else:
+            attempts = 1
         session = await self.get_session()
         start_time = time.monotonic()
 
         timeout = aiohttp.ClientTimeout(total=DEFAULT_TIMEOUT)
 
-        try:
-            async with session.request(
-                method.upper(),
-                url,
-                json=json,
-                headers=headers,
-                data=data,
-                timeout=timeout,
-            ) as response:
-                content_type = response.headers.get("Content-Type", "")
+        for attempt in range(attempts):
+            last_attempt = attempt == attempts - 1
+            stats.requests += 1
+            try:
+                response = await self._send(
+                    session,
+                    method,
+                    url,
+                    return_type,
+                    start_time,
+                    json=json,
+                    headers=headers,
+                    data=data,
+                    timeout=timeout,
+                )
+            except asyncio.TimeoutError:
+                stats.timeouts += 1
+                stats.failures += 1
+                breaker.record_failure()
                 elapsed_time = time.monotonic() - start_time
+                return WebResponse(
+                    status=408, data="Request timed out", elapsed_time=elapsed_time
+                )
+            except aiohttp.ClientError as e:
+                stats.failures += 1
+                breaker.record_failure()
+                if last_attempt or not isinstance(e, aiohttp.ClientConnectionError):
+                    raise Exception(f"Ошибка при выполнении запроса: {e}")
+                delay = self._backoff(attempt)
+            except (asyncio.CancelledError, CallBudgetExceeded):
+                # Иначе breaker навсегда остался бы в HALF_OPEN
+                if probe:
+                    breaker.release_probe()
+                raise
+            except Exception:
+                stats.failures += 1
+                breaker.record_failure()
+                raise
+            else:
+                if response.status >= 500:
+                    stats.failures += 1
+                    breaker.record_failure()
+                else:
+                    breaker.record_success()
+                if last_attempt or response.status not in RETRY_STATUSES:
+                    return response
+                delay = self._backoff(
+                    attempt, (response.headers or {}).get("Retry-After")
+                )
+                if delay is None:
+                    return response
 
-                # Определяем, как обрабатывать ответ
-                if return_type == "bytes":
-                    response_data = await response.read()
-                elif ("json" in content_type) or return_type == "json":
-                    response_data = await response.json()
-                else:  # Default to text
-                    response_data = await response.text()
-
+            if not breaker.allow():
+                # Breaker открылся на наших же ошибках - дальше не долбим хост
+                stats.rejected += 1
                 return WebResponse(
-                    status=response.status,
-                    data=response_data,
-                    headers=dict(response.headers),
-                    elapsed_time=elapsed_time,
+                    status=503,
+                    data=f"Circuit open for {host}",
+                    elapsed_time=time.monotonic() - start_time,
                 )
-        except asyncio.TimeoutError:
-            elapsed_time = time.monotonic() - start_time
-            return WebResponse(
-                status=408, data="Request timed out", elapsed_time=elapsed_time
-            )
-        except aiohttp.ClientError as e:
-            raise Exception(f"Ошибка при выполнении запроса: {e}")
+            stats.retries += 1
+            await asyncio.sleep(delay)
 
 
 http_session_manager = HTTPSessionManager()
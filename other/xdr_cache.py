@@ -0,0 +1,100 @@
+"""Общий кеш разобранных TransactionEnvelope по дайджесту XDR.
+
+Один и тот же XDR за запрос разбирается много раз: add_transaction,
+extract_sources, get_transaction_details, decode_xdr_to_text, подпись,
+SEP-7 URI. parse_envelope() разбирает строку один раз и дальше отдает тот
+же объект из ограниченного LRU.
+
+Объект из кеша общий для всех вызывающих, его нельзя менять. Кому нужно
+добавить/убрать подписи, берет copy_envelope(): новый конверт с копией
+списка подписей, но тем же Transaction (копирование при записи, без
+повторного разбора). Кто меняет саму транзакцию (memo), передает
+copy_transaction=True.
+"""
+
+import copy
+import hashlib
+import threading
+from collections import OrderedDict
+from dataclasses import asdict, dataclass
+
+from stellar_sdk import DecoratedSignature, Network, TransactionEnvelope
+
+
+@dataclass
+class XdrCacheStats:
+    hits: int = 0
+    misses: int = 0
+    evictions: int = 0
+
+
+class XdrEnvelopeCache:
+    def __init__(self, maxsize: int = 512):
+        self.maxsize = maxsize
+        self.stats = XdrCacheStats()
+        self._entries: OrderedDict[tuple[bytes, str], TransactionEnvelope] = (
+            OrderedDict()
+        )
+        # Разбор бывает и в asyncio.to_thread, OrderedDict не потокобезопасен
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def _key(xdr: str, network_passphrase: str) -> tuple[bytes, str]:
+        return hashlib.blake2b(xdr.encode(), digest_size=16).digest(), (
+            network_passphrase
+        )
+
+    def get(self, xdr: str, network_passphrase: str) -> TransactionEnvelope:
+        key = self._key(xdr, network_passphrase)
+        with self._lock:
+            envelope = self._entries.get(key)
+            if envelope is not None:
+                self._entries.move_to_end(key)
+                self.stats.hits += 1
+                return envelope
+
+        # Разбор вне lock; ошибки разбора не кешируются
+        envelope = TransactionEnvelope.from_xdr(xdr, network_passphrase)
+        with self._lock:
+            self.stats.misses += 1
+            self._entries[key] = envelope
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.maxsize:
+                self._entries.popitem(last=False)
+                self.stats.evictions += 1
+        return envelope
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def snapshot(self) -> dict:
+        return {**asdict(self.stats), "size": len(self._entries)}
+
+
+xdr_envelope_cache = XdrEnvelopeCache()
+
+
+def parse_envelope(
+    xdr: str, network_passphrase: str = Network.PUBLIC_NETWORK_PASSPHRASE
+) -> TransactionEnvelope:
+    """Разобранный конверт из кеша; только для чтения, менять через copy_envelope"""
+    return xdr_envelope_cache.get(xdr, network_passphrase)
+
+
+def copy_envelope(
+    envelope: TransactionEnvelope,
+    signatures: list[DecoratedSignature] | None = None,
+    copy_transaction: bool = False,
+) -> TransactionEnvelope:
+    """Изменяемая копия: свой список подписей (по умолчанию копия исходного),
+    Transaction общий, если не copy_transaction"""
+    transaction = envelope.transaction
+    if copy_transaction:
+        transaction = copy.copy(transaction)
+    # Конструктор сам копирует переданный список подписей
+    return TransactionEnvelope(
+        transaction,
+        envelope.network_passphrase,
+        envelope.signatures if signatures is None else signatures,
+    )
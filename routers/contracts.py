@@ -8,7 +8,7 @@ from quart import Blueprint, abort, jsonify, render_template, request, session
 
 from other.config_reader import config, start_path
 from other.grist_tools import load_user_from_grist
-from other.qr_tools import create_beautiful_code
+from other.lazy_import import lazy_callable
 from other.stellar_soroban import submit_signed_transaction
 from other.web_tools import http_session_manager
 from services.contracts.flow_service import ContractsFlowService
@@ -34,6 +34,7 @@ from services.contracts.registry import get_contract, list_public_contracts
 from services.xdr_parser import is_valid_base64
 
 blueprint = Blueprint("contracts", __name__)
+create_beautiful_code = lazy_callable("other.qr_tools.create_beautiful_code")
 MOUNTAIN_CONTRACT_ID = "CAFXUALXFPTBTLSRCDSMJXNPSN3AVL2ZPXJUDDHVTUTLRX5SCNP2SISM"
 
 
@@ -458,7 +459,6 @@ async def contracts_send_page():
                 len(form_xdr),
             )
             submit_result = await submit_signed_transaction(
-                rpc_url="https://soroban-rpc.mainnet.stellar.gateway.fm",
                 signed_xdr=form_xdr,
             )
             logger.info(
@@ -519,7 +519,6 @@ async def contracts_callback(request_id: str):
         return jsonify({"ok": False, "error": "Flow not found"}), 404
 
     submit_result = await submit_signed_transaction(
-        rpc_url="https://soroban-rpc.mainnet.stellar.gateway.fm",
         signed_xdr=signed_xdr,
     )
     if submit_result["ok"]:
@@ -4,6 +4,9 @@ from dateutil.parser import parse
 from quart import Blueprint, render_template
 from stellar_sdk import Server, Asset
 
+from other.endpoint_pool import horizon_pool
+from services.swap_ladder import get_swap_ladder
+
 blueprint = Blueprint("cup", __name__)
 
 
@@ -22,7 +25,7 @@ async def cmd_orderbook(asset1, asset2):
     orders = {"sellers": [], "buyers": []}
     need_round = 7
     try:
-        server = Server(horizon_url="https://horizon.stellar.org")
+        server = Server(horizon_url=horizon_pool.pick())
 
         sellers_offers = (
             server.offers().for_selling(asset1).for_buying(asset2).limit(200).call()
@@ -154,7 +157,7 @@ async def cmd_orderbook(asset1, asset2):
 async def cmd_trades(asset1, asset2):
     asset1, asset2 = decode_asset(asset1), decode_asset(asset2)
     try:
-        server = Server(horizon_url="https://horizon.stellar.org")
+        server = Server(horizon_url=horizon_pool.pick())
         trades_resp = (
             server.trades()
             .for_asset_pair(asset1, asset2)
@@ -212,7 +215,7 @@ async def cmd_chart(asset1, asset2):
     asset1, asset2 = decode_asset(asset1), decode_asset(asset2)
     orders = {"sellers": [], "buyers": []}
     try:
-        server = Server(horizon_url="https://horizon.stellar.org")
+        server = Server(horizon_url=horizon_pool.pick())
 
         sellers_offers = (
             server.offers().for_selling(asset1).for_buying(asset2).limit(200).call()
@@ -321,53 +324,24 @@ async def cmd_chart(asset1, asset2):
     return resp
 
 
-def get_send_swap_cost(asset1, asset2, amount):
-    server = Server(horizon_url="https://horizon.stellar.org")
-    swap_list = server.strict_send_paths(asset1, amount, [asset2]).limit(200).call()
-    if swap_list["_embedded"]["records"]:
-        return swap_list["_embedded"]["records"][0]["destination_amount"]
-    else:
-        return 0
-
-
-def get_receive_swap_cost(asset1, asset2, amount):
-    server = Server(horizon_url="https://horizon.stellar.org")
-    swap_list = server.strict_receive_paths([asset1], asset2, amount).limit(200).call()
-    if swap_list["_embedded"]["records"]:
-        return swap_list["_embedded"]["records"][-1]["source_amount"]
-    else:
-        return 0
-
-
 @blueprint.route("/cup/swap/<asset1>/<asset2>")
 async def cmd_swap_book(asset1, asset2):
     asset1, asset2 = decode_asset(asset1), decode_asset(asset2)
-    cost_list = ("10000", "1000", "100", "10", "1")
 
     orders = {"sellers": [], "buyers": []}
     need_round = 7
     try:
         # if float(sellers_offers['_embedded']['records'][-1]['price']) > 1:
         need_round = 3
-        for cost in cost_list:
-            swap_cost = get_send_swap_cost(asset1, asset2, cost)
-
-            order_info = {
-                "amount": round(float(cost), need_round),
-                "price": round(float(cost) / float(swap_cost), need_round),
-                "total": round(float(swap_cost), need_round),
-            }
-            orders["sellers"].append(order_info)
-
-        for cost in reversed(cost_list):
-            swap_cost = get_receive_swap_cost(asset2, asset1, cost)
-
-            order_info = {
-                "amount": round(float(cost), need_round),
-                "price": round(float(cost) / float(swap_cost), need_round),
-                "total": round(float(swap_cost), need_round),
-            }
-            orders["buyers"].append(order_info)
+        ladder = await get_swap_ladder(asset1, asset2)
+        for side in ("sellers", "buyers"):
+            for cost, swap_cost in ladder[side]:
+                order_info = {
+                    "amount": round(float(cost), need_round),
+                    "price": round(float(cost) / float(swap_cost), need_round),
+                    "total": round(float(swap_cost), need_round),
+                }
+                orders[side].append(order_info)
 
     except Exception as e:
         print(e)
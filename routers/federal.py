@@ -1,4 +1,4 @@
-from sqlalchemy import func, select
+from sqlalchemy import select
 from quart import (
     Blueprint,
     request,
@@ -17,7 +17,8 @@ from stellar_sdk.exceptions import BadRequestError
 from stellar_sdk.sep.stellar_web_authentication import build_challenge_transaction
 
 from other.config_reader import config
-from db.sql_models import Addresses, Signers
+from db.sql_models import Addresses
+from services.federation_index import federation_index
 from services.stellar_client import check_user_weight
 from quart_cors import cors
 
@@ -35,24 +36,6 @@ def _finalize_federation_response(resp):
     return resp
 
 
-def _normalize_signer_username(username: str) -> str:
-    return username.removeprefix("@").lower()
-
-
-def _has_federation_signer_username(signer: Signers) -> bool:
-    username = _normalize_signer_username(signer.username or "")
-    return bool(username and username != "faceless")
-
-
-def _signer_federation_result(signer: Signers, domain: str | None = None) -> dict:
-    federation_domain = (domain or config.domain).lower()
-    username = _normalize_signer_username(signer.username)
-    return {
-        "stellar_address": f"{username}*{federation_domain}",
-        "account_id": signer.public_key,
-    }
-
-
 def _clean_address_form_value(value: str | None) -> str:
     return (value or "").strip()
 
@@ -67,64 +50,14 @@ async def _require_federation_address_admin() -> None:
 async def federation():
     # https://eurmtl.me/federation/?q=english*eurmtl.me&type=name
     # https://eurmtl.me/federation/?q=GAPQ3YSV4IXUC2MWSVVUHGETWE6C2OYVFTHM3QFBC64MQWUUIM5PCLUB&type=id
-    if request.args.get("q") and request.args.get("type"):
-        if request.args.get("type") == "name":
-            async with current_app.db_pool() as db_session:
-                result = await db_session.execute(
-                    select(Addresses).filter(
-                        Addresses.stellar_address == request.args.get("q")
-                    )
-                )
-                address = result.scalars().first()
-                if address:
-                    result = {
-                        "stellar_address": address.stellar_address,
-                        "account_id": address.account_id,
-                    }
-                    if address.memo:
-                        result["memo_type"] = "text"
-                        result["memo"] = address.memo
-                    return _finalize_federation_response(jsonify(result))
-
-                username, separator, domain = request.args.get("q").partition("*")
-                if separator and domain.lower() == config.domain.lower():
-                    normalized_username = username.removeprefix("@").lower()
-                    result = await db_session.execute(
-                        select(Signers).filter(
-                            func.lower(Signers.username).in_(
-                                [normalized_username, f"@{normalized_username}"]
-                            )
-                        )
-                    )
-                    signer = result.scalars().first()
-                    if signer and _has_federation_signer_username(signer):
-                        return _finalize_federation_response(
-                            jsonify(_signer_federation_result(signer, domain))
-                        )
-
-        if request.args.get("type") == "id":
-            async with current_app.db_pool() as db_session:
-                result = await db_session.execute(
-                    select(Addresses).filter(
-                        Addresses.account_id == request.args.get("q")
-                    )
-                )
-                address = result.scalars().first()
-                if address:
-                    result = {
-                        "stellar_address": address.stellar_address,
-                        "account_id": address.account_id,
-                    }
-                    return _finalize_federation_response(jsonify(result))
-
-                result = await db_session.execute(
-                    select(Signers).filter(Signers.public_key == request.args.get("q"))
-                )
-                signer = result.scalars().first()
-                if signer and _has_federation_signer_username(signer):
-                    return _finalize_federation_response(
-                        jsonify(_signer_federation_result(signer))
-                    )
+    query, query_type = request.args.get("q"), request.args.get("type")
+    result = None
+    if query and query_type == "name":
+        result = await federation_index.lookup_name(current_app.db_pool, query)
+    elif query and query_type == "id":
+        result = await federation_index.lookup_id(current_app.db_pool, query)
+    if result:
+        return _finalize_federation_response(jsonify(result))
 
     resp = jsonify({"error": "Not found."})
     resp.status_code = 404
@@ -146,6 +79,7 @@ async def federation_addresses_admin():
                 if address:
                     await db_session.delete(address)
                     await db_session.commit()
+                    federation_index.invalidate()
                     await flash("Federation address deleted", "good")
                 return redirect(url_for("federal.federation_addresses_admin"))
 
@@ -168,6 +102,7 @@ async def federation_addresses_admin():
                     )
                 )
                 await db_session.commit()
+                federation_index.invalidate()
                 await flash("Federation address created", "good")
                 return redirect(url_for("federal.federation_addresses_admin"))
 
@@ -178,6 +113,7 @@ async def federation_addresses_admin():
                     address.account_id = account_id
                     address.memo = memo
                     await db_session.commit()
+                    federation_index.invalidate()
                     await flash("Federation address updated", "good")
                 return redirect(url_for("federal.federation_addresses_admin"))
 
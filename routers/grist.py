@@ -101,18 +101,14 @@ async def _process_grist_key(key: str, record: dict):
         from other.grist_tools import grist_manager, MTLGrist
         from datetime import datetime, timezone
 
-        update_data = {
-            "records": [
-                {
-                    "id": rec_id,
-                    "fields": {
-                        "DATE": datetime.now(timezone.utc).isoformat(),
-                        "UPDATE": False,
-                    },
-                }
-            ]
-        }
-        await grist_manager.patch_data(MTLGrist.MTL_admin_panel, update_data)
+        await grist_manager.queue_patch_record(
+            MTLGrist.MTL_admin_panel,
+            rec_id,
+            {
+                "DATE": datetime.now(timezone.utc).isoformat(),
+                "UPDATE": False,
+            },
+        )
         logger.info(
             f"Grist webhook: запись id={rec_id} для ключа '{key}' успешно обработана."
         )
@@ -139,18 +135,12 @@ async def check_grist_key(key: str, log_info: str = None) -> dict:
 
         # Логируем запрос если указана информация для логирования
         if log_info:
-            await grist_manager.post_data(
+            await grist_manager.queue_post_record(
                 MTLGrist.GRIST_use_log,
-                json_data={
-                    "records": [
-                        {
-                            "fields": {
-                                "user_id": record.get("user_id"),
-                                "dt_use": datetime.now().strftime("%Y-%m-%d %H:%M:%S"),
-                                "info": log_info,
-                            }
-                        }
-                    ]
+                {
+                    "user_id": record.get("user_id"),
+                    "dt_use": datetime.now().strftime("%Y-%m-%d %H:%M:%S"),
+                    "info": log_info,
                 },
             )
 
@@ -7,13 +7,16 @@ import sentry_sdk
 from loguru import logger
 from quart import Blueprint, request, render_template, flash
 
-from other.qr_tools import create_beautiful_code
+from other.lazy_import import lazy_callable
 from other.config_reader import start_path
+from other.quart_tools import http_cache
 from other.grist_tools import get_grist_asset_by_code
 from services.stellar_client import add_trust_line_uri, xdr_to_uri
 from services.stellar_client import float2str
 
 blueprint = Blueprint("sellers", __name__)
+
+create_beautiful_code = lazy_callable("other.qr_tools.create_beautiful_code")
 last_update_time = datetime.now() - timedelta(minutes=20)
 
 
@@ -121,6 +124,7 @@ async def cmd_asset(asset_code):
 
 
 @blueprint.route("/uri", methods=("GET", "POST"))
+@http_cache(max_age=5 * 60, public=False)
 async def cmd_uri():
     # if exist GET data xdr
     xdr = request.args.get("xdr")
@@ -37,6 +37,7 @@ from services.telegram_oidc import (
 from other.telegram_tools import check_response
 from other.quart_tools import get_ip
 from other.tailscale import get_latest_version_package
+from other.loop_watchdog import loop_watchdog
 from loguru import logger
 
 blueprint = Blueprint("index", __name__)
@@ -323,6 +324,14 @@ async def cmd_send_err():
         return "need authority"
 
 
+@blueprint.route("/loop_stats")
+async def cmd_loop_stats():
+    """Задержки event loop и места блокирующих вызовов (other.loop_watchdog)"""
+    if (await check_user_weight()) > 0:
+        return jsonify(loop_watchdog.stats())
+    return "need authority", 403
+
+
 @blueprint.route("/restart", methods=("GET", "POST"))
 async def restart():
     if request.method == "POST":
@@ -3,20 +3,30 @@ import json
 from datetime import datetime, timedelta, timezone
 from loguru import logger
 
-from quart import Blueprint, request, render_template, jsonify, session, current_app
+from quart import (
+    Blueprint,
+    request,
+    render_template,
+    jsonify,
+    session,
+    current_app,
+    url_for,
+)
 from stellar_sdk import Server
 from stellar_sdk.utils import is_valid_hash
 
 from infrastructure.repositories.transaction_repository import TransactionRepository
-from other.grist_tools import MTLGrist, grist_manager
+from other.grist_cache import grist_cache
 from services.xdr_parser import (
     decode_xdr_to_base64,
     is_valid_base64,
     update_memo_in_xdr,
     decode_data_value,
 )
+from services.payout_batch import create_payout_batch
+from services.swap_ladder import get_send_paths
 from services.stellar_client import stellar_build_xdr, decode_asset, float2str
-from other.web_tools import http_session_manager
+from other.endpoint_pool import horizon_pool, horizon_request
 
 blueprint = Blueprint("lab", __name__)
 
@@ -47,8 +57,10 @@ async def cmd_laboratory():
 async def cmd_mtl_accounts():
     if request.method == "GET":
         result = {}
-        accounts = await grist_manager.load_table_data(
-            MTLGrist.EURMTL_accounts, filter_dict={"need_dropdown": [True]}
+        accounts = await grist_cache.find_or_fetch(
+            "EURMTL_accounts",
+            filter_dict={"need_dropdown": [True]},
+            columns=["account_id", "description"],
         )
         for account in accounts:
             account_id = account["account_id"]  ###
@@ -63,8 +75,8 @@ async def cmd_mtl_accounts():
 @blueprint.route("/lab/sequence/<account_id>")
 async def cmd_sequence(account_id):
     try:
-        response = await http_session_manager.get_web_request(
-            "GET", f"https://horizon.stellar.org/accounts/{account_id}"
+        response = await horizon_request(
+            "GET", f"/accounts/{account_id}", return_type=None
         )
         if response.status == 200:
             sequence = int(response.data["sequence"]) + 1
@@ -79,8 +91,10 @@ async def cmd_sequence(account_id):
 async def cmd_mtl_assets():
     if request.method == "GET":
         result = {}
-        assets = await grist_manager.load_table_data(
-            MTLGrist.EURMTL_assets, filter_dict={"need_dropdown": [True]}
+        assets = await grist_cache.find_or_fetch(
+            "EURMTL_assets",
+            filter_dict={"need_dropdown": [True]},
+            columns=["code", "issuer"],
         )
 
         for asset in assets:
@@ -104,8 +118,6 @@ async def cmd_mtl_pools():
     if request.method == "GET":
         result = {}
         # Используем кеш вместо прямого запроса к Grist
-        from other.grist_cache import grist_cache
-
         all_pools = grist_cache.get_table_data("EURMTL_pools")
 
         # Фильтруем в памяти
@@ -137,6 +149,43 @@ async def cmd_build_xdr():
     return jsonify({"xdr": xdr})
 
 
+@blueprint.route("/lab/pay_divs_batch", methods=["POST"])
+async def cmd_pay_divs_batch():
+    data = await request.json
+    description = (data.get("description") or "").strip()
+    if len(description) < 5:
+        return jsonify({"error": "Description too short"}), 400
+
+    try:
+        result = await create_payout_batch(
+            public_key=data["publicKey"],
+            holders_asset=data["holders"],
+            payment_asset=data["asset"],
+            amount=float(data["amount"]),
+            description=description,
+            memo=data.get("memo", ""),
+            require_trustline=bool(int(data.get("requireTrustline", 1))),
+        )
+    except (KeyError, TypeError, ValueError) as e:
+        return jsonify({"error": f"Bad request: {e}"}), 400
+
+    if not result["SUCCESS"]:
+        return jsonify({"error": result["message"]}), 400
+
+    count = len(result["hashes"])
+    return jsonify(
+        {
+            "hashes": result["hashes"],
+            "url": url_for(
+                "sign_tools.show_batch_transactions",
+                source_account=data["publicKey"],
+                first_sequence=result["first_sequence"],
+                count=count,
+            ),
+        }
+    )
+
+
 @blueprint.route("/lab/xdr_to_json", methods=["POST"])
 async def cmd_xdr_to_json():
     data = await request.json
@@ -153,7 +202,7 @@ async def cmd_assets(account_id):
     result = {"XLM": "XLM"}
     try:
         account = (
-            Server(horizon_url="https://horizon.stellar.org")
+            Server(horizon_url=horizon_pool.pick())
             .accounts()
             .account_id(account_id)
             .call()
@@ -165,7 +214,7 @@ async def cmd_assets(account_id):
                 f"{asset_code}-{asset_issuer}"
             )
         assets = (
-            Server(horizon_url="https://horizon.stellar.org")
+            Server(horizon_url=horizon_pool.pick())
             .assets()
             .for_issuer(account_id)
             .call()
@@ -229,10 +278,8 @@ async def cmd_claimable_balances(account_id):
         return False
 
     try:
-        response = await http_session_manager.get_web_request(
-            "GET",
-            f"https://horizon.stellar.org/claimable_balances?claimant={account_id}&limit=200",
-            return_type="json",
+        response = await horizon_request(
+            "GET", f"/claimable_balances?claimant={account_id}&limit=200"
         )
 
         if response.status == 200:
@@ -286,7 +333,7 @@ async def cmd_data(account_id):
     result = {}
     try:
         account = (
-            Server(horizon_url="https://horizon.stellar.org")
+            Server(horizon_url=horizon_pool.pick())
             .accounts()
             .account_id(account_id)
             .call()
@@ -307,7 +354,7 @@ async def cmd_offers(account_id):
     result = {}
     try:
         account = (
-            Server(horizon_url="https://horizon.stellar.org")
+            Server(horizon_url=horizon_pool.pick())
             .offers()
             .for_account(account_id)
             .call()
@@ -330,16 +377,10 @@ async def cmd_offers(account_id):
 async def cmd_path(asset_from, asset_for, asset_sum):
     result = {}
     try:
-        account = (
-            Server(horizon_url="https://horizon.stellar.org")
-            .strict_send_paths(
-                source_asset=decode_asset(asset_from),
-                source_amount=float2str(asset_sum),
-                destination=[decode_asset(asset_for)],
-            )
-            .call()
+        records = await get_send_paths(
+            decode_asset(asset_from), float2str(asset_sum), decode_asset(asset_for)
         )
-        for record in account["_embedded"]["records"]:
+        for record in records:
             destination_asset_code = (
                 record["destination_asset_code"]
                 if record.get("destination_asset_code")
@@ -375,7 +416,7 @@ async def cmd_check_balance():
 
     try:
         account = (
-            Server(horizon_url="https://horizon.stellar.org")
+            Server(horizon_url=horizon_pool.pick())
             .accounts()
             .account_id(account_id)
             .call()
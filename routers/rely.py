@@ -4,6 +4,7 @@ import asyncio
 import hmac
 import re
 import traceback
+from contextlib import asynccontextmanager
 from dataclasses import dataclass
 from functools import wraps
 from typing import (
@@ -18,12 +19,12 @@ from decimal import Decimal
 from aiogram.exceptions import TelegramBadRequest
 from loguru import logger
 from quart import Blueprint, request, jsonify, abort, Response
-from stellar_sdk.server_async import ServerAsync
-from stellar_sdk.client.aiohttp_client import AiohttpClient
 from stellar_sdk.exceptions import SdkError
 
-from other.config_reader import config
+from other.cache_tools import AsyncTTLCache
+from other.config_reader import config, simulator_url
 from other.grist_tools import grist_manager, GristTableConfig, GristAPI
+from other.job_runner import JobRunner
 from services.stellar_client import stellar_build_xdr, add_transaction
 from other.telegram_tools import skynet_bot
 
@@ -32,7 +33,9 @@ RELY_DEAL_CHAT_ID = -1003363491610  # rely
 # RELY_DEAL_CHAT_ID = -1001767165598 #test group
 
 GRIST_ACCESS_ID = "kceNjvoEEihSsc8dQ5vZVB"
-GRIST_BASE_URL = "https://mtl-rely.getgrist.com/api/docs"
+GRIST_BASE_URL = (
+    simulator_url("/grist/api/docs") or "https://mtl-rely.getgrist.com/api/docs"
+)
 
 DEAL_ACCOUNT = "GCWCVYBHVDBZP7U4DDJBPEMWKYMUQDR6PKWS6EHYM2OB4YSZGBU3DEAL"
 DEAL_ASSET = "RELY-GC5WBT3D5GPZ3FU7MTUMVWTLAS3IUU7EPCTFJSLHI5RYMPTLEIX2RELY"
@@ -40,6 +43,14 @@ RELY_ACCOUNT = "GC5WBT3D5GPZ3FU7MTUMVWTLAS3IUU7EPCTFJSLHI5RYMPTLEIX2RELY"
 
 # --- Concurrency Lock ---
 deal_locks: dict[int, asyncio.Lock] = {}
+deal_lock_users: dict[int, int] = {}
+
+# --- Background Jobs ---
+deal_jobs = JobRunner(
+    "rely-deals",
+    workers=config.rely_job_workers,
+    max_queue=config.rely_job_queue_size,
+)
 
 # --- Typing for Decorator ---
 F = TypeVar("F", bound=Callable[..., Awaitable[tuple[Response, int]]])
@@ -113,22 +124,35 @@ class HolderNotFoundException(Exception):
     pass
 
 
-def _get_deal_lock(deal_id: int) -> asyncio.Lock:
+class DealDataLoadException(Exception):
+    """Raised when deal participants or holders cannot be fetched from Grist."""
+
+    pass
+
+
+@asynccontextmanager
+async def _deal_lock(deal_id: int):
     """
-    Retrieves or creates a lock for a given deal ID.
+    Holds the lock for a given deal ID.
 
-    This mechanism prevents race conditions when multiple webhooks for the
-    same deal are received concurrently.
+    This mechanism prevents race conditions when the initial and the result
+    transaction of the same deal are processed concurrently. The lock is
+    dropped once nobody holds or waits for it, so the registry does not grow
+    with every deal ever seen.
 
     Args:
         deal_id: The unique identifier for the deal.
-
-    Returns:
-        An asyncio.Lock instance specific to the deal ID.
     """
-    if deal_id not in deal_locks:
-        deal_locks[deal_id] = asyncio.Lock()
-    return deal_locks[deal_id]
+    lock = deal_locks.setdefault(deal_id, asyncio.Lock())
+    deal_lock_users[deal_id] = deal_lock_users.get(deal_id, 0) + 1
+    try:
+        async with lock:
+            yield
+    finally:
+        deal_lock_users[deal_id] -= 1
+        if not deal_lock_users[deal_id]:
+            del deal_lock_users[deal_id]
+            deal_locks.pop(deal_id, None)
 
 
 def require_grist_auth(f: F) -> F:
@@ -265,32 +289,52 @@ class GristDealParticipantRepository:
         Returns:
             A list of DealParticipantEntry objects.
         """
+        participants = await self.get_participants_by_deal_ids([deal_id])
+        return participants.get(deal_id, [])
+
+    async def get_participants_by_deal_ids(
+        self, deal_ids: list[int]
+    ) -> dict[int, list[DealParticipantEntry]]:
+        """
+        Retrieve participants of several deals with a single Grist query.
+
+        Args:
+            deal_ids: The IDs of the deals.
+
+        Returns:
+            A dictionary mapping deal IDs to their DealParticipantEntry lists.
+        """
+        if not deal_ids:
+            return {}
+
         try:
             records = await self._grist_api.fetch_data(
-                table=self._table_config, filter_dict={"Deal": [deal_id]}
+                table=self._table_config, filter_dict={"Deal": deal_ids}
             )
         except Exception as e:
             logger.error(
-                f"Failed to fetch participants for deal {deal_id} from Grist: {e}\n{traceback.format_exc()}"
+                f"Failed to fetch participants for deals {deal_ids} from Grist: {e}\n{traceback.format_exc()}"
             )
-            return []
+            raise DealDataLoadException(
+                f"Failed to fetch participants for deals {deal_ids}: {e}"
+            ) from e
 
-        participants = []
+        participants: dict[int, list[DealParticipantEntry]] = {}
         for record in records:
             try:
-                participants.append(
-                    DealParticipantEntry(
-                        id=record["id"],
-                        deal_id=record["Deal"],
-                        holder_id=record["Participant"],
-                        amount=Decimal(str(record["Amount"])),
-                        is_done=record["Done"],
-                    )
+                entry = DealParticipantEntry(
+                    id=record["id"],
+                    deal_id=record["Deal"],
+                    holder_id=record["Participant"],
+                    amount=Decimal(str(record["Amount"])),
+                    is_done=record["Done"],
                 )
             except (KeyError, TypeError, ValueError) as e:
                 logger.warning(
-                    f"Skipping malformed participant record for deal {deal_id}: {record}. Error: {e}"
+                    f"Skipping malformed participant record for deals {deal_ids}: {record}. Error: {e}"
                 )
+                continue
+            participants.setdefault(entry.deal_id, []).append(entry)
 
         return participants
 
@@ -298,14 +342,18 @@ class GristDealParticipantRepository:
 class GristHolderRepository:
     """
     Repository for managing holder entries in Grist.
+
+    Holder rows (Stellar address, Telegram username) rarely change, so they are
+    kept in a short-lived cache shared across webhooks.
     """
 
-    def __init__(self, grist_api: GristAPI):
+    def __init__(self, grist_api: GristAPI, cache_ttl: int = 60):
         """
         Initialize the repository with Grist configuration for the Holders table.
 
         Args:
             grist_api: An instance of the GristAPI client.
+            cache_ttl: Lifetime of cached holder rows in seconds.
         """
         self._grist_api = grist_api
         self._table_config = GristTableConfig(
@@ -313,11 +361,14 @@ class GristHolderRepository:
             table_name="Holders",
             base_url=GRIST_BASE_URL,
         )
+        self._cache = AsyncTTLCache(ttl_seconds=cache_ttl, maxsize=1024)
 
     async def get_holders_by_ids(self, holder_ids: list[int]) -> dict[int, HolderEntry]:
         """
         Retrieve holders by their IDs.
 
+        Cached holders are returned as is; the rest are fetched with one query.
+
         Args:
             holder_ids: A list of holder IDs.
 
@@ -327,20 +378,32 @@ class GristHolderRepository:
         if not holder_ids:
             return {}
 
+        holders: dict[int, HolderEntry] = {}
+        missing_ids = []
+        for holder_id in dict.fromkeys(holder_ids):
+            holder = await self._cache.get(str(holder_id))
+            if holder is None:
+                missing_ids.append(holder_id)
+            else:
+                holders[holder_id] = holder
+        if not missing_ids:
+            return holders
+
         try:
             records = await self._grist_api.fetch_data(
-                table=self._table_config, filter_dict={"id": holder_ids}
+                table=self._table_config, filter_dict={"id": missing_ids}
             )
         except Exception as e:
             logger.error(
-                f"Failed to fetch holders by IDs {holder_ids} from Grist: {e}\n{traceback.format_exc()}"
+                f"Failed to fetch holders by IDs {missing_ids} from Grist: {e}\n{traceback.format_exc()}"
             )
-            return {}
+            raise DealDataLoadException(
+                f"Failed to fetch holders {missing_ids}: {e}"
+            ) from e
 
-        holders = {}
         for record in records:
             try:
-                holders[record["id"]] = HolderEntry(
+                holder = HolderEntry(
                     id=record["id"],
                     stellar=record.get("Stellar"),
                     telegram=record.get("Telegram"),
@@ -349,6 +412,9 @@ class GristHolderRepository:
                 logger.warning(
                     f"Skipping malformed holder record: {record}. Error: {e}"
                 )
+                continue
+            holders[holder.id] = holder
+            await self._cache.set(str(holder.id), holder)
         return holders
 
 
@@ -383,10 +449,13 @@ class GristDealRepository:
             True if update was successful, False otherwise.
         """
         try:
-            await self._grist_api.patch_data(
-                self._table_config,
-                {"records": [{"id": deal_id, "fields": fields}]},
+            # Batched with other writes to the Deals table; wait for the outcome here
+            success = await self._grist_api.queue_patch_record(
+                self._table_config, deal_id, fields, wait=True
             )
+            if not success:
+                logger.error(f"Failed to update fields for deal {deal_id}: {fields}")
+                return False
             logger.info(f"Successfully updated fields for deal {deal_id}: {fields}")
             return True
         except Exception as e:
@@ -402,19 +471,74 @@ holder_repo = GristHolderRepository(grist_manager)
 deal_repo = GristDealRepository(grist_manager)
 
 
+class DealResolutionContext:
+    """
+    Participants and holders of all deals from one webhook payload.
+
+    The first deal that needs its participants loads them for the whole batch:
+    one Conditions query and one Holders query, shared by the other deals.
+    A failed load is not remembered; the next deal of the batch retries it.
+    """
+
+    def __init__(self, deal_ids: list[int]):
+        """
+        Args:
+            deal_ids: IDs of all deals queued from the payload.
+        """
+        self.deal_ids = list(dict.fromkeys(deal_ids))
+        self._lock = asyncio.Lock()
+        self._loaded = False
+        self.participants: dict[int, list[DealParticipantEntry]] = {}
+        self.holders: dict[int, HolderEntry] = {}
+
+    async def _load(self) -> None:
+        async with self._lock:
+            if self._loaded:
+                return
+            participants = await participant_repo.get_participants_by_deal_ids(
+                self.deal_ids
+            )
+            holder_ids = [
+                entry.holder_id
+                for entries in participants.values()
+                for entry in entries
+            ]
+            self.holders = await holder_repo.get_holders_by_ids(holder_ids)
+            self.participants = participants
+            self._loaded = True
+
+    async def get_participants(
+        self, deal_id: int
+    ) -> tuple[list[DealParticipantEntry], dict[int, HolderEntry]]:
+        """
+        Returns participant entries of a deal and the holders they reference.
+
+        Args:
+            deal_id: The ID of the deal; must be one of the context deals.
+        """
+        await self._load()
+        return self.participants.get(deal_id, []), self.holders
+
+
 class Deal:
     """
     Represents a Deal aggregate root, encapsulating the business logic for processing a deal.
     """
 
-    def __init__(self, deal_record: DealRecord):
+    def __init__(
+        self,
+        deal_record: DealRecord,
+        context: DealResolutionContext | None = None,
+    ):
         """
         Initializes the Deal aggregate.
 
         Args:
             deal_record: The raw deal record from Grist.
+            context: Shared participant/holder data of the webhook batch.
         """
         self.deal_record = deal_record
+        self.context = context or DealResolutionContext([deal_record.id])
         self.participants: list[DealParticipant] = []
 
     @property
@@ -427,16 +551,13 @@ class Deal:
         Loads and assembles participant objects for the deal from the repositories.
         """
         logger.info(f"Loading participants for deal {self.deal_record.id}.")
-        participant_entries = await participant_repo.get_participants_by_deal_id(
+        participant_entries, holders = await self.context.get_participants(
             self.deal_record.id
         )
         if not participant_entries:
             logger.info(f"No participants found for deal {self.deal_record.id}.")
             return
 
-        holder_ids = [p.holder_id for p in participant_entries]
-        holders = await holder_repo.get_holders_by_ids(holder_ids)
-
         assembled_participants = []
         for p_entry in participant_entries:
             holder = holders.get(p_entry.holder_id)
@@ -494,14 +615,10 @@ class Deal:
         Returns:
             A base64-encoded XDR string.
         """
-        async with ServerAsync(
-            horizon_url="https://horizon.stellar.org", client=AiohttpClient()
-        ) as server:
-            source_account = await server.load_account(DEAL_ACCOUNT)
-
+        # Deals are signed and submitted independently, so each one is built
+        # from the current on-chain sequence rather than a reserved chain.
         tx_data = {
             "publicKey": DEAL_ACCOUNT,
-            "sequence": str(source_account.sequence + 1),
             "memo": memo,
             "memo_type": "memo_text",
             "operations": operations,
@@ -587,6 +704,13 @@ class Deal:
             await self._load_participants()
         except HolderNotFoundException as e:
             return TransactionProcessResult(success=False, errors=[str(e)])
+        except DealDataLoadException as e:
+            return TransactionProcessResult(
+                success=False,
+                errors=[
+                    f"❌ Не удалось загрузить участников сделки из Grist. Пожалуйста, попробуйте позже. ({e})"
+                ],
+            )
 
         validation_errors = self._validate_preconditions()
         if validation_errors:
@@ -622,7 +746,9 @@ class Deal:
 
 
 async def _process_deal_transaction(
-    deal_record: DealRecord, is_result: bool = False
+    deal_record: DealRecord,
+    is_result: bool = False,
+    context: DealResolutionContext | None = None,
 ) -> None:
     """
     Unified handler for processing deal transactions (both initial and result).
@@ -630,15 +756,14 @@ async def _process_deal_transaction(
     Args:
         deal_record: The deal record to process.
         is_result: If True, processes a result transaction; otherwise, an initial transaction.
+        context: Shared participant/holder data of the webhook batch.
     """
     deal_id = deal_record.id
     try:
-        lock = _get_deal_lock(deal_id)
-
-        async with lock:
+        async with _deal_lock(deal_id):
             action_type = "result " if is_result else ""
             logger.info(f"Processing {action_type}deal {deal_id}: {deal_record}")
-            deal_aggregate = Deal(deal_record)
+            deal_aggregate = Deal(deal_record, context)
 
             proc_result = await deal_aggregate.process_any_transaction(
                 is_result=is_result
@@ -745,23 +870,38 @@ async def _process_deal_transaction(
         )
 
 
-async def _process_grist_payload(payload: list[dict]) -> None:
+def _submit_deal_job(
+    record: DealRecord, is_result: bool, context: DealResolutionContext
+) -> bool:
+    """Queues deal processing; repeated webhooks for a pending deal are merged."""
+    return deal_jobs.submit(
+        (record.id, is_result),
+        lambda: _process_deal_transaction(record, is_result=is_result, context=context),
+    )
+
+
+async def _process_grist_payload(payload: list[dict]) -> bool:
     """
-    Processes the Grist webhook payload, creating tasks to handle valid deals.
+    Processes the Grist webhook payload, queueing jobs for valid deals.
 
     It iterates through records, identifies deals that need processing,
-    and creates background tasks for them.
+    and submits them to the bounded deal job runner.
 
     Args:
         payload: The JSON payload (list of records) from the Grist webhook.
+
+    Returns:
+        False if some deals were rejected because the job queue is full.
     """
+    accepted = True
     try:
         if not isinstance(payload, list):
             msg = f"⚠️ Получен некорректный вебхук от Grist (ожидался список): {str(payload)[:200]}"
             logger.warning(msg)
             await TelegramMessenger.send_message(text=msg)
-            return
+            return True
 
+        jobs: list[tuple[DealRecord, bool]] = []
         for item in payload:
             try:
                 record = DealRecord(
@@ -773,13 +913,9 @@ async def _process_grist_payload(payload: list[dict]) -> None:
                     result_transaction=item.get("Result_Transaction"),
                 )
                 if record.checked and not record.transaction:
-                    asyncio.create_task(
-                        _process_deal_transaction(record, is_result=False)
-                    )
+                    jobs.append((record, False))
                 elif record.result_checked and not record.result_transaction:
-                    asyncio.create_task(
-                        _process_deal_transaction(record, is_result=True)
-                    )
+                    jobs.append((record, True))
             except (KeyError, TypeError) as e:
                 logger.warning(
                     f"Could not process record, skipping: {item}. Error: {e}"
@@ -788,14 +924,21 @@ async def _process_grist_payload(payload: list[dict]) -> None:
                 # but might be too noisy. Logging is usually enough for data format issues
                 # unless it blocks the whole pipeline.
 
+        # Deals of one payload resolve participants and holders together
+        context = DealResolutionContext([record.id for record, _ in jobs])
+        for record, is_result in jobs:
+            accepted &= _submit_deal_job(record, is_result, context)
+
         logger.info(
-            f"Grist webhook payload processing initiated for {len(payload)} records."
+            f"Grist webhook payload queued for {len(payload)} records: "
+            f"{deal_jobs.metrics()}"
         )
     except Exception as e:
         logger.error(f"Error processing Grist payload: {e}\n{traceback.format_exc()}")
         await TelegramMessenger.send_message(
             text=f"‼️ Ошибка при обработке вебхука Grist: {e}"
         )
+    return accepted
 
 
 blueprint = Blueprint("rely", __name__)
@@ -807,13 +950,22 @@ async def grist_webhook() -> tuple[Response, int]:
     """
     Endpoint to receive a webhook from Grist.
 
-    Authenticates the request, then processes the payload in the background.
+    Authenticates the request and queues the deals for background processing.
+    Answers 503 when the job queue is full, so Grist delivers the webhook again.
     """
     try:
         payload = await request.get_json()
     except Exception:
         abort(400, "Invalid JSON payload")
 
-    asyncio.create_task(_process_grist_payload(payload))
+    if not await _process_grist_payload(payload):
+        return jsonify({"status": "busy"}), 503
 
     return jsonify({"status": "ok"}), 200
+
+
+@blueprint.route("/rely/jobs", methods=["GET"])
+@require_grist_auth
+async def deal_jobs_metrics() -> tuple[Response, int]:
+    """Queue depth and counters of the deal job runner."""
+    return jsonify(deal_jobs.metrics()), 200
@@ -10,7 +10,8 @@ from db.sql_models import (
     WebEditorMessages,
     MMWBTransactions,
 )
-from other.grist_tools import grist_manager, MTLGrist
+from other.grist_cache import grist_cache
+from other.quart_tools import NO_STORE_HEADERS, http_cache, stream_json_list
 
 # from routers.sign_tools import parse_xdr_for_signatures # Removed, logic in service
 from services.xdr_parser import decode_xdr_to_text, is_valid_base64
@@ -36,7 +37,8 @@ async def remote_need_sign(public_key):
         # Получаем транзакции, требующие подписи этого подписанта
         transactions = await service.get_pending_transactions_for_signer(public_key)
 
-        return jsonify(transactions)
+    # Список бывает на сотни КБ, отдаем потоком по транзакции
+    return stream_json_list(transactions)
 
 
 @blueprint.route("/remote/update_signature", methods=("POST",))
@@ -78,6 +80,7 @@ async def remote_decode_xdr():
 
 
 @blueprint.route("/remote/get_xdr/<tr_hash>")
+@http_cache(max_age=24 * 60 * 60, immutable=True)
 async def remote_get_xdr(tr_hash):
     if len(tr_hash) != 64 and len(tr_hash) != 32:
         abort(404)
@@ -87,7 +90,7 @@ async def remote_get_xdr(tr_hash):
         transaction = await service.get_transaction_by_hash(tr_hash)
 
     if transaction is None:
-        return "Transaction not exist =("
+        return "Transaction not exist =(", 200, NO_STORE_HEADERS
 
     return jsonify({"xdr": transaction.body}), 200
 
@@ -111,9 +114,10 @@ async def remote_get_new_pin_id():
 @blueprint.route("/remote/good_assets", methods=["GET"])
 async def remote_good_assets():
     # Получаем активы, xz
-    assets = await grist_manager.load_table_data(
-        MTLGrist.EURMTL_assets,
+    assets = await grist_cache.find_or_fetch(
+        "EURMTL_assets",
         # filter_dict={"need_dropdown": [True]}
+        columns=["issuer", "name"],
     )
 
     # Переструктурируем данные, группируя активы по issuer (это аналогично account)
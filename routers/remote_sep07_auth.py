@@ -5,7 +5,7 @@ from loguru import logger
 from quart import Blueprint, jsonify, request, render_template
 
 from other.config_reader import config
-from other.qr_tools import create_beautiful_code
+from other.lazy_import import lazy_callable
 from services.stellar_client import (
     create_sep7_auth_transaction,
     process_xdr_transaction,
@@ -15,6 +15,8 @@ from other.web_tools import cors_jsonify
 
 blueprint = Blueprint("sep07_auth", __name__, url_prefix="/remote/sep07/auth")
 
+create_beautiful_code = lazy_callable("other.qr_tools.create_beautiful_code")
+
 # Хранилище nonce
 nonce_store = {}
 MAX_NONCE_STORE_SIZE = 1000
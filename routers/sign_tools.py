@@ -1,6 +1,5 @@
 import base64
 import html
-import json
 import os
 import re
 from random import shuffle
@@ -25,14 +24,12 @@ from services.transaction_service import TransactionService
 from services.xdr_parser import decode_xdr_to_text
 from services.stellar_client import add_transaction
 from other.config_reader import start_path
-from other.web_tools import http_session_manager
+from other.ipfs_tools import fetch_ipfs_metadata, normalize_ipfs_cid
+from other.endpoint_pool import horizon_request
+from other.stellar_sequence import sequence_allocator
+from other.quart_tools import NO_STORE_HEADERS, http_cache, stream_page
 
 MAX_SEP07_URI_LENGTH = 1800
-IPFS_GATEWAYS = (
-    "https://gateway.pinata.cloud/ipfs/",
-    "https://cloudflare-ipfs.com/ipfs/",
-    "https://ipfs.io/ipfs/",
-)
 
 _IPFS_MANAGE_DATA_RE = re.compile(
     r"ManageData\s+(ipfshash(?:-[A-Za-z0-9_.-]+)?)\s*=\s*(.+)$"
@@ -55,21 +52,11 @@ def _extract_ipfs_cid_from_manage_data_line(line: str) -> str | None:
 
     raw_value = match.group(2).strip()
     if raw_value.startswith("b'") and raw_value.endswith("'"):
-        cid = raw_value[2:-1]
+        raw_value = raw_value[2:-1]
     elif raw_value.startswith('b"') and raw_value.endswith('"'):
-        cid = raw_value[2:-1]
-    else:
-        cid = raw_value.strip("\"'")
+        raw_value = raw_value[2:-1]
 
-    cid = cid.strip()
-    if cid.startswith("ipfs://"):
-        cid = cid[len("ipfs://") :]
-    cid = cid.strip("/").split("/")[0]
-
-    if not re.fullmatch(r"[A-Za-z0-9]+", cid):
-        return None
-
-    return cid
+    return normalize_ipfs_cid(raw_value)
 
 
 def _append_ipfs_preview_link(line: str) -> str:
@@ -198,31 +185,6 @@ def _build_metadata_preview(metadata: dict | None) -> dict | None:
     return preview
 
 
-async def _fetch_ipfs_metadata(cid: str) -> tuple[dict | None, str | None, str | None]:
-    last_error = None
-
-    for gateway in IPFS_GATEWAYS:
-        url = f"{gateway}{cid}"
-        try:
-            response = await http_session_manager.get_web_request(
-                "GET", url=url, return_type="text"
-            )
-            if response.status != 200:
-                last_error = f"HTTP {response.status} from {url}"
-                continue
-
-            payload = response.data
-            metadata = payload if isinstance(payload, dict) else json.loads(payload)
-            if isinstance(metadata, dict):
-                return metadata, url, None
-
-            last_error = f"Non-JSON object from {url}"
-        except Exception as exc:
-            last_error = str(exc)
-
-    return None, None, last_error
-
-
 @blueprint.route("/sign_tools", methods=("GET", "POST"))
 @blueprint.route("/sign_tools/", methods=("GET", "POST"))
 async def start_add_transaction():
@@ -339,9 +301,10 @@ async def show_transaction(tr_hash):
                 shuffle(transaction_env.signatures)
                 await flash("Signatures shuffled", "good")
 
-            transaction_resp = await http_session_manager.get_web_request(
+            transaction_resp = await horizon_request(
                 "POST",
-                "https://horizon.stellar.org/transactions/",
+                "/transactions/",
+                return_type=None,
                 data={"tx": transaction_env.to_xdr()},
             )
             if transaction_resp.status == 200:
@@ -360,6 +323,11 @@ async def show_transaction(tr_hash):
                     result_codes = transaction_resp.data.get("extras", {}).get(
                         "result_codes", {}
                     )
+                    if result_codes.get("transaction") == "tx_bad_seq":
+                        # Выданные аккаунту номера sequence больше не актуальны
+                        sequence_allocator.resync(
+                            transaction_env.transaction.source.account_id
+                        )
                     operation_results = result_codes.get("operations", [])
 
                     for i, result in enumerate(operation_results):
@@ -439,7 +407,8 @@ async def start_show_all_transactions():
     if "owner_id" in filters:
         del filters["owner_id"]
 
-    return await render_template(
+    # До 100 строк с полными описаниями - отдаем по мере рендера
+    return await stream_page(
         "tabler_sign_all.html",
         transactions=transactions,
         next_page=next_page,
@@ -447,7 +416,27 @@ async def start_show_all_transactions():
     )
 
 
+@blueprint.route("/sign_batch/<source_account>/<int:first_sequence>/<int:count>")
+async def show_batch_transactions(source_account, first_sequence, count):
+    # Пачка транзакций одного аккаунта с последовательными sequence (выплаты)
+    count = min(count, 1000)
+    async with current_app.db_pool() as db_session:
+        service = TransactionService(db_session)
+        transactions = await service.get_batch_transactions(
+            source_account, first_sequence, count
+        )
+
+    return await render_template(
+        "tabler_sign_batch.html",
+        transactions=transactions,
+        source_account=source_account,
+        first_sequence=first_sequence,
+        count=count,
+    )
+
+
 @blueprint.route("/decode/<tr_hash>", methods=("GET", "POST"))
+@http_cache(max_age=60)
 async def decode_xdr(tr_hash):
     if len(tr_hash) != 64 and len(tr_hash) != 32:
         abort(404)
@@ -458,9 +447,9 @@ async def decode_xdr(tr_hash):
         transaction = await service.get_transaction_by_hash(tr_hash)
 
     if transaction is None:
-        return "Transaction not exist =("
+        return "Transaction not exist =(", 200, NO_STORE_HEADERS
 
-    encoded_xdr = await decode_xdr_to_text(transaction.body)
+    encoded_xdr = await decode_xdr_to_text(transaction.body, prefetch_ipfs=True)
     encoded_xdr = [_append_ipfs_preview_link(line) for line in encoded_xdr]
     return (
         ("<br>".join(encoded_xdr) + "<br><br><br>")
@@ -470,18 +459,19 @@ async def decode_xdr(tr_hash):
 
 
 @blueprint.route("/ipfs/<cid>", methods=("GET",))
+@http_cache(max_age=60 * 60, public=False)
 async def ipfs_preview(cid):
     if not re.fullmatch(r"[A-Za-z0-9]+", cid):
         abort(404)
 
-    metadata, fetched_from, error_message = await _fetch_ipfs_metadata(cid)
+    metadata, fetched_from, error_message = await fetch_ipfs_metadata(cid)
     decoded_fulldescription = (
         _decode_fulldescription(metadata or {}) if metadata else None
     )
     pretty_fulldescription = _render_fulldescription_pretty(decoded_fulldescription)
     metadata_preview = _build_metadata_preview(metadata)
 
-    return await render_template(
+    page = await render_template(
         "ipfs_view.html",
         cid=cid,
         metadata=metadata,
@@ -491,12 +481,20 @@ async def ipfs_preview(cid):
         decoded_fulldescription=decoded_fulldescription,
         pretty_fulldescription=pretty_fulldescription,
     )
+    # Ошибку шлюза не кешируем - следующий запрос может оказаться удачным
+    return page, 200, NO_STORE_HEADERS if error_message else {}
+
+
+def _qr_response(payload: dict):
+    headers = {} if payload["success"] else NO_STORE_HEADERS
+    return jsonify(payload), 200, headers
 
 
 @blueprint.route("/uri_qr/<tr_hash>", methods=("GET", "POST"))
+@http_cache(max_age=60 * 60)
 async def generate_transaction_qr(tr_hash):
     if len(tr_hash) != 64 and len(tr_hash) != 32:
-        return jsonify(
+        return _qr_response(
             {
                 "success": False,
                 "message": "Invalid transaction hash",
@@ -516,7 +514,7 @@ async def generate_transaction_qr(tr_hash):
         transaction = await service.get_transaction_by_hash(tr_hash)
 
     if uri is None or transaction is None:
-        return jsonify(
+        return _qr_response(
             {
                 "success": False,
                 "message": "Transaction not found",
@@ -542,7 +540,7 @@ async def generate_transaction_qr(tr_hash):
     # Actually, let's keep it safe. If I change it, I might break "always regenerate" behavior if that was intended (by disabling the check with '88').
     # But I'll assume I should use standard logic. If file exists, return it.
     if os.path.exists(full_path):
-        return jsonify(
+        return _qr_response(
             {
                 "success": True,
                 "message": "QR code already exists",
@@ -564,7 +562,7 @@ async def generate_transaction_qr(tr_hash):
             text_for_qr = text if text else words[0][:10]
 
         if uri and len(uri) > MAX_SEP07_URI_LENGTH:
-            return jsonify(
+            return _qr_response(
                 {
                     "success": False,
                     "message": "URI слишком длинный для генерации QR-кода",
@@ -579,7 +577,7 @@ async def generate_transaction_qr(tr_hash):
             create_beautiful_code(qr_file_path, text_for_qr, uri)
         except ValueError as e:
             logger.warning(f"QR generation rejected for {tr_hash}: {str(e)}")
-            return jsonify(
+            return _qr_response(
                 {
                     "success": False,
                     "message": "URI слишком длинный для генерации QR-кода",
@@ -589,7 +587,7 @@ async def generate_transaction_qr(tr_hash):
             )
         except Exception as e:
             logger.error(f"Error creating beautiful QR code: {str(e)}")
-            return jsonify(
+            return _qr_response(
                 {
                     "success": False,
                     "message": f"Error: {str(e)}",
@@ -598,7 +596,7 @@ async def generate_transaction_qr(tr_hash):
                 }
             )
 
-        return jsonify(
+        return _qr_response(
             {
                 "success": True,
                 "message": "QR code created",
@@ -608,7 +606,7 @@ async def generate_transaction_qr(tr_hash):
         )
     except Exception as e:
         logger.error(f"Error generating QR code for transaction {tr_hash}: {str(e)}")
-        return jsonify(
+        return _qr_response(
             {"success": False, "message": f"Error: {str(e)}", "file": "", "uri": ""}
         )
 
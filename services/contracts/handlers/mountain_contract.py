@@ -206,7 +206,6 @@ async def prepare_capture_flow(
         scval.to_string(msg),
     ]
     return await prepare_contract_transaction_uri(
-        rpc_url="https://soroban-rpc.mainnet.stellar.gateway.fm",
         contract_id=contract_id,
         function_name="capture",
         source_account_id=user,
@@ -223,7 +222,6 @@ async def prepare_capture_flow(
 async def load_message(contract_id: str) -> dict:
     try:
         message = await read_contract_string(
-            rpc_url="https://soroban-rpc.mainnet.stellar.gateway.fm",
             contract_id=contract_id,
             function_name="message",
         )
@@ -237,7 +235,6 @@ async def load_range(contract_id: str) -> dict:
         range_value = await read_contract_value(
             contract_id=contract_id,
             function_name="get_range",
-            rpc_url="https://soroban-rpc.mainnet.stellar.gateway.fm",
         )
         min_amount_raw, max_amount_raw = _extract_range_pair(range_value)
         return {
@@ -160,7 +160,6 @@ async def prepare_swap_exact_in_flow(
         apply_exact_in_slippage(quote["estimated_out"], slippage_percent)
     )
     return await prepare_contract_transaction_uri(
-        rpc_url="https://soroban-rpc.mainnet.stellar.gateway.fm",
         contract_id=SWAP_POOL_CONTRACT_ID,
         function_name="swap",
         source_account_id=user,
@@ -193,7 +192,6 @@ async def prepare_swap_exact_out_flow(
         apply_exact_out_slippage(quote["estimated_in"], slippage_percent)
     )
     return await prepare_contract_transaction_uri(
-        rpc_url="https://soroban-rpc.mainnet.stellar.gateway.fm",
         contract_id=SWAP_POOL_CONTRACT_ID,
         function_name="swap_strict_receive",
         source_account_id=user,
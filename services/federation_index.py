@@ -0,0 +1,164 @@
+"""Индекс federation-адресов в памяти для публичного /federation.
+
+Таблицы t_addresses и t_signers целиком читаются в словари (имя и
+account_id в нижнем регистре), запросы кошельков обслуживаются без
+обращения к БД. Индекс перечитывается после правок адресов и подписантов
+(invalidate), раз в refresh_seconds и при промахе, но не чаще раза в
+miss_rebuild_seconds - изменения из других воркеров тоже подхватываются.
+Промахи запоминаются на negative_ttl секунд.
+"""
+
+import asyncio
+import time
+
+from cachetools import TTLCache
+from loguru import logger
+from sqlalchemy import select
+
+from db.sql_models import Addresses, Signers
+from other.config_reader import config
+
+
+def normalize_signer_username(username: str) -> str:
+    return username.removeprefix("@").lower()
+
+
+def has_federation_signer_username(signer: Signers) -> bool:
+    username = normalize_signer_username(signer.username or "")
+    return bool(username and username != "faceless")
+
+
+def signer_federation_result(signer: Signers, domain: str | None = None) -> dict:
+    federation_domain = (domain or config.domain).lower()
+    username = normalize_signer_username(signer.username)
+    return {
+        "stellar_address": f"{username}*{federation_domain}",
+        "account_id": signer.public_key,
+    }
+
+
+class FederationIndex:
+    def __init__(
+        self,
+        refresh_seconds: float = 300.0,
+        miss_rebuild_seconds: float = 10.0,
+        negative_ttl: float = 60.0,
+        negative_maxsize: int = 10000,
+    ):
+        self.refresh_seconds = refresh_seconds
+        self.miss_rebuild_seconds = miss_rebuild_seconds
+        self._by_name: dict[str, dict] = {}
+        self._by_id: dict[str, dict] = {}
+        self._loaded_at: float | None = None
+        self._lock = asyncio.Lock()
+        self._missing = TTLCache(maxsize=negative_maxsize, ttl=negative_ttl)
+
+    async def _load(self, db_pool) -> tuple[dict[str, dict], dict[str, dict]]:
+        async with db_pool() as db_session:
+            addresses = (
+                (await db_session.execute(select(Addresses).order_by(Addresses.id)))
+                .scalars()
+                .all()
+            )
+            signers = (
+                (await db_session.execute(select(Signers).order_by(Signers.id)))
+                .scalars()
+                .all()
+            )
+
+        by_name: dict[str, dict] = {}
+        by_id: dict[str, dict] = {}
+        # Записи t_addresses важнее подписантов, при дублях побеждает первая
+        for address in addresses:
+            result = {
+                "stellar_address": address.stellar_address,
+                "account_id": address.account_id,
+            }
+            if address.memo:
+                by_name.setdefault(
+                    address.stellar_address.lower(),
+                    {**result, "memo_type": "text", "memo": address.memo},
+                )
+            else:
+                by_name.setdefault(address.stellar_address.lower(), result)
+            by_id.setdefault(address.account_id, result)
+
+        for signer in signers:
+            if not has_federation_signer_username(signer):
+                continue
+            result = signer_federation_result(signer)
+            by_name.setdefault(result["stellar_address"], result)
+            by_id.setdefault(signer.public_key, result)
+        return by_name, by_id
+
+    async def rebuild(self, db_pool, max_age: float | None = None):
+        """Перечитывает адреса и подписантов из БД.
+
+        С max_age индекс не перечитывается, если он моложе max_age секунд
+        (его уже обновил параллельный запрос, пока мы ждали lock).
+        """
+        async with self._lock:
+            if max_age is not None and self._age() <= max_age:
+                return
+            self._by_name, self._by_id = await self._load(db_pool)
+            self._loaded_at = time.monotonic()
+            self._missing.clear()
+        logger.info(
+            f"federation index: {len(self._by_name)} names, {len(self._by_id)} accounts"
+        )
+
+    def invalidate(self):
+        """Индекс перечитается при следующем запросе"""
+        self._loaded_at = None
+        self._missing.clear()
+
+    def _age(self) -> float:
+        if self._loaded_at is None:
+            return float("inf")
+        return time.monotonic() - self._loaded_at
+
+    async def _lookup(self, db_pool, index_name: str, key: str) -> dict | None:
+        if self._age() > self.refresh_seconds:
+            await self.rebuild(db_pool, max_age=self.refresh_seconds)
+
+        found = getattr(self, index_name).get(key)
+        if found is not None:
+            return found
+
+        missing_key = (index_name, key)
+        if missing_key in self._missing:
+            return None
+        if self._age() > self.miss_rebuild_seconds:
+            # Запись могли добавить в другом воркере
+            await self.rebuild(db_pool, max_age=self.miss_rebuild_seconds)
+            found = getattr(self, index_name).get(key)
+            if found is not None:
+                return found
+        self._missing[missing_key] = True
+        return None
+
+    async def lookup_name(self, db_pool, stellar_address: str) -> dict | None:
+        """Ответ federation для type=name: адрес вида name*domain"""
+        username, separator, domain = stellar_address.partition("*")
+        if not separator or not username:
+            return None
+        key = f"{username.removeprefix('@')}*{domain}".lower()
+        found = await self._lookup(db_pool, "_by_name", key)
+        if found is None and key != stellar_address.lower():
+            # В t_addresses имя может начинаться с @
+            found = await self._lookup(db_pool, "_by_name", stellar_address.lower())
+        return found
+
+    async def lookup_id(self, db_pool, account_id: str) -> dict | None:
+        """Ответ federation для type=id"""
+        found = await self._lookup(db_pool, "_by_id", account_id)
+        if found is None:
+            return None
+        # memo отдаем только в ответе на type=name
+        return {
+            "stellar_address": found["stellar_address"],
+            "account_id": found["account_id"],
+        }
+
+
+federation_index = FederationIndex()
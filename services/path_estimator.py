@@ -0,0 +1,465 @@
+"""Локальная оценка path payment по кешированным стаканам и пулам.
+
+Стаканы и резервы пулов ликвидности грузятся только для активов, которые
+недавно запрашивали (demand_ttl), и только из списка Grist (EURMTL_assets).
+Без запросов estimator в Horizon не ходит. Свежесть считается по каждой
+единице загрузки и по каждому стакану и пулу: устаревшие данные в оценку не
+попадают. Лучший путь strict send / strict receive ищется перебором графа
+обменов (до MAX_PATH_HOPS шагов). Если данных нет или они устарели, оценка
+возвращает None и вызывающий код идет в Horizon.
+
+Оценка не делит объем между стаканом и пулом одной пары и не учитывает,
+что два шага пути могут есть одну и ту же ликвидность, поэтому это
+именно оценка, а не точный ответ Horizon.
+"""
+
+import asyncio
+import math
+import time
+from collections.abc import Iterable
+
+from loguru import logger
+from stellar_sdk import AiohttpClient, Asset, ServerAsync
+
+from other.endpoint_pool import horizon_pool
+from other.grist_cache import grist_cache
+from other.request_context import CALL_KIND_HORIZON, track_call
+
+EURMTL_KEY = "EURMTL:GACKTN5DAZGWXRWB2WLM6OPBDHAMT6SJNGLJZPQMEZBUR4JUGBX2UK7V"
+# Стаканы грузим только между активом и "хабами", через них идет почти весь объем
+HUB_ASSETS = ("native", EURMTL_KEY)
+MAX_PATH_HOPS = 3
+POOL_FEE = 0.003
+STELLAR_PRECISION = 10**7
+
+
+def asset_key(asset: Asset) -> str:
+    """Ключ актива в формате резервов пулов Horizon: native или CODE:ISSUER"""
+    if asset.is_native():
+        return "native"
+    return f"{asset.code}:{asset.issuer}"
+
+
+def _asset_from_key(key: str) -> Asset:
+    if key == "native":
+        return Asset.native()
+    code, issuer = key.split(":")
+    return Asset(code, issuer)
+
+
+def _asset_fields(key: str, prefix: str = "") -> dict[str, str]:
+    """Поля актива как в ответах Horizon /paths"""
+    if key == "native":
+        return {f"{prefix}asset_type": "native"}
+    code, issuer = key.split(":")
+    return {
+        f"{prefix}asset_type": "credit_alphanum4"
+        if len(code) <= 4
+        else "credit_alphanum12",
+        f"{prefix}asset_code": code,
+        f"{prefix}asset_issuer": issuer,
+    }
+
+
+def _floor_amount(amount: float) -> str:
+    return f"{math.floor(amount * STELLAR_PRECISION) / STELLAR_PRECISION:.7f}"
+
+
+def _ceil_amount(amount: float) -> str:
+    return f"{math.ceil(amount * STELLAR_PRECISION) / STELLAR_PRECISION:.7f}"
+
+
+class MarketEdge:
+    """Обмен source -> destination: уровни стакана и пулы ликвидности"""
+
+    __slots__ = ("levels", "levels_at", "pools", "pools_at")
+
+    def __init__(self):
+        # (сколько destination за 1 source, сколько destination доступно), лучшие первыми
+        self.levels: list[tuple[float, float]] = []
+        self.levels_at = -math.inf  # time.monotonic() загрузки стакана
+        # pool_id -> (резерв source, резерв destination)
+        self.pools: dict[str, tuple[float, float]] = {}
+        self.pools_at: dict[str, float] = {}
+
+    def _fresh_pools(self, since: float):
+        for pool_id, reserves in self.pools.items():
+            if self.pools_at.get(pool_id, -math.inf) >= since:
+                yield reserves
+
+    def _book_sell(self, amount: float) -> float | None:
+        received = 0.0
+        for rate, capacity in self.levels:
+            can_take = capacity / rate
+            if amount <= can_take:
+                return received + amount * rate
+            received += capacity
+            amount -= can_take
+        return None
+
+    def _book_buy(self, amount: float) -> float | None:
+        spent = 0.0
+        for rate, capacity in self.levels:
+            if amount <= capacity:
+                return spent + amount / rate
+            spent += capacity / rate
+            amount -= capacity
+        return None
+
+    def sell(self, amount: float, since: float = -math.inf) -> float | None:
+        """Сколько destination получим за amount source (None - не хватает ликвидности).
+
+        Стакан и пулы, загруженные раньше since, не учитываются.
+        """
+        use_book = self.levels and self.levels_at >= since
+        best = self._book_sell(amount) if use_book else None
+        for reserve_in, reserve_out in self._fresh_pools(since):
+            if reserve_in <= 0 or reserve_out <= 0:
+                continue
+            amount_in = amount * (1 - POOL_FEE)
+            received = reserve_out * amount_in / (reserve_in + amount_in)
+            if best is None or received > best:
+                best = received
+        return best
+
+    def buy(self, amount: float, since: float = -math.inf) -> float | None:
+        """Сколько source нужно отдать за amount destination (None - не хватает ликвидности)"""
+        use_book = self.levels and self.levels_at >= since
+        best = self._book_buy(amount) if use_book else None
+        for reserve_in, reserve_out in self._fresh_pools(since):
+            if reserve_in <= 0 or amount >= reserve_out:
+                continue
+            spent = reserve_in * amount / ((reserve_out - amount) * (1 - POOL_FEE))
+            if best is None or spent < best:
+                best = spent
+        return best
+
+
+class PathEstimator:
+    def __init__(
+        self,
+        horizon_url: str | None = None,
+        refresh_interval: float = 60.0,
+        max_age: float = 300.0,
+        hub_assets: Iterable[str] = HUB_ASSETS,
+        concurrency: int = 4,
+        demand_ttl: float = 600.0,
+    ):
+        self.horizon_url = horizon_url
+        self.refresh_interval = refresh_interval
+        self.max_age = max_age
+        self.hub_assets = tuple(hub_assets)
+        self.concurrency = concurrency
+        self.demand_ttl = demand_ttl
+        self._edges: dict[str, dict[str, MarketEdge]] = {}
+        self._incoming: dict[str, dict[str, MarketEdge]] = {}
+        # Единица обновления -> время загрузки: ("book", base, counter) или ("pools", asset)
+        self._loaded: dict[tuple[str, ...], float] = {}
+        # None - любые активы, иначе только эти (и хабы)
+        self._assets: set[str] | None = None
+        # Актив -> время последнего запроса оценки
+        self._demand: dict[str, float] = {}
+        self._wakeup: asyncio.Event | None = None
+        self._task: asyncio.Task | None = None
+
+    # --- граф ---
+
+    def _edge(self, source: str, destination: str) -> MarketEdge:
+        edge = self._edges.setdefault(source, {}).get(destination)
+        if edge is None:
+            edge = MarketEdge()
+            self._edges[source][destination] = edge
+            self._incoming.setdefault(destination, {})[source] = edge
+        return edge
+
+    def apply_order_book(
+        self, base: str, counter: str, book: dict, loaded_at: float | None = None
+    ):
+        """Стакан Horizon /order_book?selling=base&buying=counter.
+
+        asks продают base за counter (amount в base, price - counter за 1 base),
+        bids продают counter за base (amount в counter, price - counter за 1 base).
+        """
+        loaded_at = time.monotonic() if loaded_at is None else loaded_at
+        asks = self._edge(counter, base)
+        asks.levels = [
+            (1 / float(ask["price"]), float(ask["amount"]))
+            for ask in book.get("asks", [])
+            if float(ask["price"]) > 0
+        ]
+        bids = self._edge(base, counter)
+        bids.levels = [
+            (float(bid["price"]), float(bid["amount"]))
+            for bid in book.get("bids", [])
+            if float(bid["price"]) > 0
+        ]
+        asks.levels_at = bids.levels_at = loaded_at
+
+    def apply_pool(self, pool: dict, loaded_at: float | None = None):
+        """Пул Horizon /liquidity_pools (reserves - список или reserves_dict)"""
+        reserves = pool.get("reserves_dict") or {
+            reserve["asset"]: reserve["amount"] for reserve in pool["reserves"]
+        }
+        if len(reserves) != 2:
+            return
+        loaded_at = time.monotonic() if loaded_at is None else loaded_at
+        (asset_a, amount_a), (asset_b, amount_b) = (
+            (asset, float(amount)) for asset, amount in reserves.items()
+        )
+        for source, destination, reserve_in, reserve_out in (
+            (asset_a, asset_b, amount_a, amount_b),
+            (asset_b, asset_a, amount_b, amount_a),
+        ):
+            edge = self._edge(source, destination)
+            edge.pools[pool["id"]] = (reserve_in, reserve_out)
+            edge.pools_at[pool["id"]] = loaded_at
+
+    # --- загрузка ---
+
+    def set_assets(self, assets: Iterable[str]):
+        """Активы, которые можно оценивать локально (хабы добавляются всегда)"""
+        self._assets = set(assets) | set(self.hub_assets)
+
+    def request(self, *assets: str):
+        """Отмечает спрос на оценку; будит обновление, если данных для них нет"""
+        now = time.monotonic()
+        for asset in assets:
+            if self._assets is None or asset in self._assets:
+                self._demand[asset] = now
+        if self._wakeup is not None and self.stale_units(now):
+            self._wakeup.set()
+
+    def _demanded(self, now: float) -> list[str]:
+        for asset, requested_at in list(self._demand.items()):
+            if now - requested_at > self.demand_ttl:
+                del self._demand[asset]
+        return list(self._demand)
+
+    def _units_for(self, assets: Iterable[str]) -> list[tuple[str, ...]]:
+        keys = sorted(set(assets) | set(self.hub_assets))
+        units = [("pools", asset) for asset in keys]
+        for asset in keys:
+            for hub in self.hub_assets:
+                if asset != hub and (asset < hub or asset not in self.hub_assets):
+                    units.append(("book", asset, hub))
+        return units
+
+    def stale_units(self, now: float | None = None) -> list[tuple[str, ...]]:
+        """Единицы запрошенных активов, не загруженные или старше refresh_interval.
+
+        Старые первыми; без спроса - пустой список.
+        """
+        now = time.monotonic() if now is None else now
+        demanded = self._demanded(now)
+        if not demanded:
+            return []
+        stale = [
+            unit
+            for unit in self._units_for(demanded)
+            if now - self._loaded.get(unit, -math.inf) >= self.refresh_interval
+        ]
+        return sorted(stale, key=lambda unit: self._loaded.get(unit, -math.inf))
+
+    async def _load_unit(self, server: ServerAsync, unit: tuple[str, ...]):
+        if unit[0] == "pools":
+            asset = unit[1]
+            async with track_call(CALL_KIND_HORIZON, "liquidity_pools"):
+                response = await (
+                    server.liquidity_pools()
+                    .for_reserves([_asset_from_key(asset)])
+                    .limit(200)
+                    .call()
+                )
+            loaded_at = time.monotonic()
+            for pool in response["_embedded"]["records"]:
+                self.apply_pool(pool, loaded_at)
+        else:
+            _, base, counter = unit
+            async with track_call(CALL_KIND_HORIZON, "order_book"):
+                book = await (
+                    server.orderbook(_asset_from_key(base), _asset_from_key(counter))
+                    .limit(200)
+                    .call()
+                )
+            loaded_at = time.monotonic()
+            self.apply_order_book(base, counter, book, loaded_at)
+        self._loaded[unit] = loaded_at
+
+    async def refresh(self, max_units: int | None = None) -> int:
+        """Обновляет устаревшие стаканы и пулы, возвращает число обновленных"""
+        units = self.stale_units()
+        if max_units is not None:
+            units = units[:max_units]
+        if not units:
+            return 0
+
+        semaphore = asyncio.Semaphore(self.concurrency)
+        async with ServerAsync(
+            horizon_url=self.horizon_url or horizon_pool.pick(), client=AiohttpClient()
+        ) as server:
+
+            async def load(unit):
+                async with semaphore:
+                    try:
+                        await self._load_unit(server, unit)
+                        return True
+                    except Exception as e:
+                        logger.warning(f"path estimator: не загрузили {unit}: {e}")
+                        return False
+
+            results = await asyncio.gather(*(load(unit) for unit in units))
+        return sum(results)
+
+    def _fresh(self, unit: tuple[str, ...], now: float) -> bool:
+        return now - self._loaded.get(unit, -math.inf) <= self.max_age
+
+    def is_ready(self) -> bool:
+        """Все единицы запрошенных сейчас активов загружены не раньше max_age"""
+        now = time.monotonic()
+        demanded = self._demanded(now)
+        return bool(demanded) and all(
+            self._fresh(unit, now) for unit in self._units_for(demanded)
+        )
+
+    def covers(self, *assets: str) -> bool:
+        """Стаканы и пулы этих активов и хабов загружены не раньше max_age"""
+        now = time.monotonic()
+        return all(self._fresh(unit, now) for unit in self._units_for(assets))
+
+    async def _refresh_loop(self, assets_source, step: float, units_per_step: int):
+        while True:
+            try:
+                self.set_assets(assets_source())
+                await self.refresh(max_units=units_per_step)
+            except Exception as e:
+                logger.warning(f"path estimator: ошибка обновления: {e}")
+            if self.stale_units():
+                # Порция не все успела - следующая через step
+                await asyncio.sleep(step)
+                continue
+            # Все свежее или спроса нет: ждем запроса или срока обновления
+            self._wakeup.clear()
+            try:
+                await asyncio.wait_for(self._wakeup.wait(), self.refresh_interval)
+            except TimeoutError:
+                pass
+
+    def start(self, assets_source, step: float = 5.0, units_per_step: int = 20):
+        """Запускает обновление по спросу; assets_source() возвращает допустимые активы"""
+        if self._task is None or self._task.done():
+            self._wakeup = asyncio.Event()
+            self._task = asyncio.create_task(
+                self._refresh_loop(assets_source, step, units_per_step),
+                name="path-estimator-refresh",
+            )
+
+    async def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            await asyncio.gather(self._task, return_exceptions=True)
+            self._task = None
+
+    # --- поиск путей ---
+
+    def strict_send(
+        self, source: str, amount: float, destination: str
+    ) -> tuple[float, tuple[str, ...]] | None:
+        """Лучший (destination_amount, промежуточные активы) за amount source"""
+        if source == destination or not self.covers(source, destination):
+            return None
+        since = time.monotonic() - self.max_age
+        best: dict[str, tuple[float, tuple[str, ...]]] = {source: (amount, ())}
+        frontier = {source}
+        for _ in range(MAX_PATH_HOPS):
+            improved = set()
+            for asset in frontier:
+                have, path = best[asset]
+                next_path = path + (asset,) if asset != source else path
+                for target, edge in self._edges.get(asset, {}).items():
+                    if target == source or target in next_path:
+                        continue
+                    received = edge.sell(have, since)
+                    if received and received > best.get(target, (0.0,))[0]:
+                        best[target] = (received, next_path)
+                        if target != destination:
+                            improved.add(target)
+            frontier = improved
+        return best.get(destination)
+
+    def strict_receive(
+        self, source: str, destination: str, amount: float
+    ) -> tuple[float, tuple[str, ...]] | None:
+        """Лучший (source_amount, промежуточные активы) за amount destination"""
+        if source == destination or not self.covers(source, destination):
+            return None
+        since = time.monotonic() - self.max_age
+        need: dict[str, tuple[float, tuple[str, ...]]] = {destination: (amount, ())}
+        frontier = {destination}
+        for _ in range(MAX_PATH_HOPS):
+            improved = set()
+            for asset in frontier:
+                required, path = need[asset]
+                prev_path = (asset,) + path if asset != destination else path
+                for origin, edge in self._incoming.get(asset, {}).items():
+                    if origin == destination or origin in prev_path:
+                        continue
+                    spent = edge.buy(required, since)
+                    if spent is not None and spent < need.get(origin, (math.inf,))[0]:
+                        need[origin] = (spent, prev_path)
+                        if origin != source:
+                            improved.add(origin)
+            frontier = improved
+        return need.get(source)
+
+    def send_records(
+        self, source: Asset, amount: str, destination: Asset
+    ) -> list[dict] | None:
+        """strict send в формате записей Horizon /paths/strict-send, None - промах"""
+        source_key, destination_key = asset_key(source), asset_key(destination)
+        self.request(source_key, destination_key)
+        found = self.strict_send(source_key, float(amount), destination_key)
+        if found is None:
+            return None
+        received, path = found
+        return [
+            {
+                **_asset_fields(source_key, "source_"),
+                "source_amount": amount,
+                **_asset_fields(destination_key, "destination_"),
+                "destination_amount": _floor_amount(received),
+                "path": [_asset_fields(key) for key in path],
+            }
+        ]
+
+    def receive_records(
+        self, source: Asset, destination: Asset, amount: str
+    ) -> list[dict] | None:
+        """strict receive в формате записей Horizon /paths/strict-receive, None - промах"""
+        source_key, destination_key = asset_key(source), asset_key(destination)
+        self.request(source_key, destination_key)
+        found = self.strict_receive(source_key, destination_key, float(amount))
+        if found is None:
+            return None
+        spent, path = found
+        return [
+            {
+                **_asset_fields(source_key, "source_"),
+                "source_amount": _ceil_amount(spent),
+                **_asset_fields(destination_key, "destination_"),
+                "destination_amount": amount,
+                "path": [_asset_fields(key) for key in path],
+            }
+        ]
+
+
+def grist_asset_keys() -> list[str]:
+    """Ключи активов из EURMTL_assets (кеш Grist)"""
+    keys = []
+    for record in grist_cache.get_table_data("EURMTL_assets"):
+        code, issuer = record.get("code"), record.get("issuer")
+        if code and issuer:
+            keys.append(f"{code}:{issuer}")
+    return keys
+
+
+path_estimator = PathEstimator()
@@ -0,0 +1,106 @@
+"""Выплата дивидендов пачкой транзакций.
+
+pay_divs может вернуть сколько угодно платежей, а в транзакцию Stellar
+помещается не больше 100 операций. Платежи режутся на транзакции
+с последовательными sequence и сохраняются одним commit.
+"""
+
+from other.stellar_sequence import sequence_allocator
+from services.stellar_client import (
+    add_transactions,
+    decode_asset,
+    float2str,
+    pay_divs,
+    stellar_build_xdr,
+)
+
+MAX_OPERATIONS_PER_TRANSACTION = 100
+
+
+def chunk_payments(payments: list[dict], size: int = MAX_OPERATIONS_PER_TRANSACTION):
+    """Платежи больше 0 (с точностью Stellar), разбитые по size штук"""
+    payments = [record for record in payments if round(record["payment"], 7) > 0]
+    return [payments[idx : idx + size] for idx in range(0, len(payments), size)]
+
+
+async def build_payout_transactions(
+    public_key: str,
+    holders_asset: str,
+    payment_asset: str,
+    amount: float,
+    memo: str = "",
+    require_trustline: bool = True,
+) -> list[tuple[int, str]]:
+    """Строит транзакции выплаты держателям holders_asset: [(sequence, xdr), ...]"""
+    payments = await pay_divs(
+        decode_asset(holders_asset),
+        float(amount),
+        decode_asset(payment_asset),
+        require_trustline=require_trustline,
+    )
+    chunks = chunk_payments(payments)
+    if not chunks:
+        return []
+
+    sequences = await sequence_allocator.reserve(public_key, len(chunks))
+    transactions = []
+    for sequence, chunk in zip(sequences, chunks):
+        xdr = await stellar_build_xdr(
+            {
+                "publicKey": public_key,
+                "sequence": str(sequence),
+                "memo_type": "memo_text" if memo else "",
+                "memo": memo,
+                "operations": [
+                    {
+                        "type": "payment",
+                        "destination": record["account"],
+                        "asset": payment_asset,
+                        "amount": float2str(record["payment"]),
+                    }
+                    for record in chunk
+                ],
+            }
+        )
+        transactions.append((sequence, xdr))
+    return transactions
+
+
+async def create_payout_batch(
+    public_key: str,
+    holders_asset: str,
+    payment_asset: str,
+    amount: float,
+    description: str,
+    memo: str = "",
+    require_trustline: bool = True,
+) -> dict:
+    """Строит и сохраняет пачку транзакций выплаты.
+
+    Возвращает {"SUCCESS": bool, "hashes": [...], "first_sequence": int}
+    или {"SUCCESS": False, "message": ...}.
+    """
+    transactions = await build_payout_transactions(
+        public_key,
+        holders_asset,
+        payment_asset,
+        amount,
+        memo=memo,
+        require_trustline=require_trustline,
+    )
+    if not transactions:
+        return {"SUCCESS": False, "message": "No payments to send"}
+
+    count = len(transactions)
+    success, result = await add_transactions(
+        [
+            (xdr, f"{description} ({index}/{count})")
+            for index, (_, xdr) in enumerate(transactions, start=1)
+        ]
+    )
+    if not success:
+        # Номера sequence не использованы, выдадим их заново
+        sequence_allocator.resync(public_key)
+        return {"SUCCESS": False, "message": result}
+
+    return {"SUCCESS": True, "hashes": result, "first_sequence": transactions[0][0]}
@@ -1,3 +1,4 @@
+import asyncio
 import json
 from datetime import datetime
 from loguru import logger
@@ -24,12 +25,22 @@ from other.grist_tools import (
     load_users_from_grist,
     load_user_from_grist,
 )
-from other.web_tools import http_session_manager
+from other.endpoint_pool import horizon_pool, horizon_request
+from other.stellar_sequence import sequence_allocator
+from other.request_context import (
+    CALL_KIND_HORIZON,
+    CallBudgetExceeded,
+    budget_exceeded,
+    track_call,
+)
 from other.config_reader import config
+from other.xdr_cache import copy_envelope, parse_envelope
 from db.sql_models import Signers, Transactions, Signatures
 from infrastructure.repositories.transaction_repository import TransactionRepository
+from services.federation_index import federation_index
 
 main_fund_address = "GACKTN5DAZGWXRWB2WLM6OPBDHAMT6SJNGLJZPQMEZBUR4JUGBX2UK7V"
+BALANCE_NOT_SHOWN_TEXT = "(баланс не показан)"
 tools_cash = {}
 
 
@@ -51,11 +62,7 @@ async def check_publish_state(tx_hash: str) -> tuple[int, str]:
     Checks the status of a transaction on the Horizon network.
     """
     try:
-        response = await http_session_manager.get_web_request(
-            "GET",
-            f"https://horizon.stellar.org/transactions/{tx_hash}",
-            return_type="json",
-        )
+        response = await horizon_request("GET", f"/transactions/{tx_hash}")
         if response.status == 200:
             data = response.data
             date = data["created_at"].replace("T", " ").replace("Z", "")
@@ -80,9 +87,10 @@ async def get_pool_data(pool_id: str) -> dict:
     """Get current pool data from Horizon including price and reserves"""
     try:
         async with ServerAsync(
-            horizon_url="https://horizon.stellar.org", client=AiohttpClient()
+            horizon_url=horizon_pool.pick(), client=AiohttpClient()
         ) as server:
-            pool = await server.liquidity_pools().liquidity_pool(pool_id).call()
+            async with track_call(CALL_KIND_HORIZON, f"liquidity_pools/{pool_id}"):
+                pool = await server.liquidity_pools().liquidity_pool(pool_id).call()
             reserves = pool["reserves"]
             if len(reserves) == 2:
                 a_amount = float(reserves[0]["amount"])
@@ -120,16 +128,16 @@ async def get_pool_data(pool_id: str) -> dict:
     }
 
 
-@async_cache_with_ttl(ttl_seconds=900)
+@async_cache_with_ttl(ttl_seconds=900, shared=True)
 async def check_asset(asset):
     try:
-        response = await http_session_manager.get_web_request(
-            "GET",
-            f"https://horizon.stellar.org/assets?asset_code={asset.code}&asset_issuer={asset.issuer}",
-            return_type="json",
+        response = await horizon_request(
+            "GET", f"/assets?asset_code={asset.code}&asset_issuer={asset.issuer}"
         )
         if response.status == 200 and response.data["_embedded"]["records"]:
             return ""
+    except CallBudgetExceeded:
+        raise  # не ответ Horizon: заглушка не должна попасть в общий кеш
     except Exception as e:
         logger.warning(f"Error checking asset: {e}")
     return f'<div style="color: red;">Asset {asset.code} not exist ! </div>'
@@ -137,19 +145,17 @@ async def check_asset(asset):
 
 async def _fetch_account(account_id):
     try:
-        response = await http_session_manager.get_web_request(
-            "GET",
-            "https://horizon.stellar.org/accounts/" + account_id,
-            return_type="json",
-        )
+        response = await horizon_request("GET", f"/accounts/{account_id}")
         if response.status == 200:
             return response.data
+    except CallBudgetExceeded:
+        raise
     except Exception as e:
         logger.warning(f"Error getting account {account_id}: {e}")
     return {"balances": []}
 
 
-@async_cache_with_ttl(ttl_seconds=900)
+@async_cache_with_ttl(ttl_seconds=900, shared=True)
 async def get_account(account_id):
     return await _fetch_account(account_id)
 
@@ -163,7 +169,10 @@ async def get_available_balance_str(account_id: str) -> str:
     Loads account data, calculates the available XLM balance using the full reserve formula,
     and returns it as a formatted string.
     Returns an empty string if the account is not found or an error occurs.
+    When the request has used up its outbound call budget, the balance is skipped.
     """
+    if budget_exceeded():
+        return BALANCE_NOT_SHOWN_TEXT
     account_info = await get_account(account_id)
     if not account_info or "balances" not in account_info:
         return ""
@@ -197,28 +206,22 @@ async def get_available_balance_str(account_id: str) -> str:
         return ""
 
 
-@async_cache_with_ttl(ttl_seconds=900)
+@async_cache_with_ttl(ttl_seconds=900, shared=True)
 async def get_offers(account_id):
     try:
-        response = await http_session_manager.get_web_request(
-            "GET",
-            f"https://horizon.stellar.org/accounts/{account_id}/offers",
-            return_type="json",
-        )
+        response = await horizon_request("GET", f"/accounts/{account_id}/offers")
         if response.status == 200:
             return response.data
+    except CallBudgetExceeded:
+        raise
     except Exception as e:
         logger.warning(f"Error getting offers for {account_id}: {e}")
     return {"_embedded": {"records": []}}
 
 
-@async_cache_with_ttl(3600)
+@async_cache_with_ttl(3600, negative_ttl=60, shared=True)
 async def get_fund_signers():
-    response = await http_session_manager.get_web_request(
-        "GET",
-        "https://horizon.stellar.org/accounts/" + main_fund_address,
-        return_type="json",
-    )
+    response = await horizon_request("GET", f"/accounts/{main_fund_address}")
     if response.status == 200:
         data = response.data
         signers = data.get("signers", [])
@@ -299,25 +302,30 @@ async def check_user_in_sign(tr_hash):
     return False
 
 
-async def stellar_copy_multi_sign(public_key_from, public_key_for):
-    async with ServerAsync(
-        horizon_url="https://horizon.stellar.org", client=AiohttpClient()
-    ) as server:
-        updated_signers = []
-        call = await server.accounts().account_id(public_key_from).call()
-        public_key_from_signers = call["signers"]
-        updated_signers.append(
-            {
-                "key": "threshold",
-                "high_threshold": call["thresholds"]["high_threshold"],
-                "low_threshold": call["thresholds"]["low_threshold"],
-                "med_threshold": call["thresholds"]["med_threshold"],
-            }
-        )
+async def stellar_copy_multi_sign(public_key_from, public_key_for, server=None):
+    if server is None:
+        async with ServerAsync(
+            horizon_url=horizon_pool.pick(), client=AiohttpClient()
+        ) as own_server:
+            return await stellar_copy_multi_sign(
+                public_key_from, public_key_for, server=own_server
+            )
 
-        public_key_for_signers = (
-            await server.accounts().account_id(public_key_for).call()
-        )["signers"]
+    call, public_key_for_call = await asyncio.gather(
+        server.accounts().account_id(public_key_from).call(),
+        server.accounts().account_id(public_key_for).call(),
+    )
+    updated_signers = []
+    public_key_from_signers = call["signers"]
+    updated_signers.append(
+        {
+            "key": "threshold",
+            "high_threshold": call["thresholds"]["high_threshold"],
+            "low_threshold": call["thresholds"]["low_threshold"],
+            "med_threshold": call["thresholds"]["med_threshold"],
+        }
+    )
+    public_key_for_signers = public_key_for_call["signers"]
 
     current_signers = {
         signer["key"]: signer["weight"] for signer in public_key_for_signers
@@ -350,9 +358,7 @@ async def stellar_copy_multi_sign(public_key_from, public_key_for):
 async def get_liquidity_pools_for_asset(asset):
     client = AiohttpClient(request_timeout=3 * 60)
 
-    async with ServerAsync(
-        horizon_url="https://horizon.stellar.org", client=client
-    ) as server:
+    async with ServerAsync(horizon_url=horizon_pool.pick(), client=client) as server:
         pools = []
         pools_call_builder = server.liquidity_pools().for_reserves([asset]).limit(200)
 
@@ -384,7 +390,7 @@ async def pay_divs(
     require_trustline: bool = True,
 ):
     async with ServerAsync(
-        horizon_url="https://horizon.stellar.org", client=AiohttpClient()
+        horizon_url=horizon_pool.pick(), client=AiohttpClient()
     ) as server:
         accounts = await server.accounts().for_asset(asset_hold).limit(200).call()
         holders = accounts["_embedded"]["records"]
@@ -455,7 +461,7 @@ async def pay_divs(
 
 async def stellar_manage_data(account_id, data_name, data_value):
     async with ServerAsync(
-        horizon_url="https://horizon.stellar.org", client=AiohttpClient()
+        horizon_url=horizon_pool.pick(), client=AiohttpClient()
     ) as server:
         source_account = await server.load_account(account_id=account_id)
         if data_value == "":
@@ -502,11 +508,13 @@ async def add_signer(signer_key):
                 )
             )
             await db_session.commit()
+            federation_index.invalidate()
         else:
             if user_id != db_signer.tg_id or username != db_signer.username:
                 db_signer.tg_id = user_id
                 db_signer.username = username
                 await db_session.commit()
+                federation_index.invalidate()
 
 
 def get_operation_threshold_level(operation) -> str:
@@ -572,9 +580,7 @@ def get_operation_threshold_level(operation) -> str:
 
 
 async def extract_sources(xdr):
-    tr = TransactionEnvelope.from_xdr(
-        xdr, network_passphrase=Network.PUBLIC_NETWORK_PASSPHRASE
-    )
+    tr = parse_envelope(xdr)
 
     # 1. Собираем все уникальные source accounts
     unique_sources = {tr.transaction.source.account_id}
@@ -601,11 +607,7 @@ async def extract_sources(xdr):
     sources_data = {}
     for source_id, max_level in source_max_levels.items():
         try:
-            response = await http_session_manager.get_web_request(
-                "GET",
-                f"https://horizon.stellar.org/accounts/{source_id}",
-                return_type="json",
-            )
+            response = await horizon_request("GET", f"/accounts/{source_id}")
             data = response.data
             account_thresholds = data["thresholds"]
             required_threshold_value = account_thresholds[f"{max_level}_threshold"]
@@ -663,67 +665,98 @@ async def update_transaction_sources(transaction: "Transactions") -> bool:
         return False
 
 
-async def add_transaction(tx_body, tx_description):
+async def _register_transaction(repo, tx_body, tx_description, owner_id):
+    """Добавляет транзакцию и ее подписи в сессию, без commit"""
     try:
-        tr = TransactionEnvelope.from_xdr(
-            tx_body, network_passphrase=Network.PUBLIC_NETWORK_PASSPHRASE
-        )
-        tr_full = TransactionEnvelope.from_xdr(
-            tx_body, network_passphrase=Network.PUBLIC_NETWORK_PASSPHRASE
-        )
+        tr_full = parse_envelope(tx_body)
+        tr = copy_envelope(tr_full, signatures=[])
         sources = await extract_sources(tx_body)
     except Exception as ex:
         logger.info(ex)
         return False, "BAD xdr. Can`t load"
 
     tx_hash = tr.hash_hex()
-    tr.signatures.clear()
 
+    existing_transaction = await repo.get_by_hash(tx_hash)
+    if existing_transaction:
+        return True, tx_hash
+
+    new_transaction = Transactions(
+        hash=tx_hash,
+        body=tr.to_xdr(),
+        description=tx_description,
+        json=json.dumps(sources),
+        stellar_sequence=tr.transaction.sequence,
+        source_account=tr.transaction.source.account_id,
+        owner_id=owner_id,
+    )
+    await repo.add(new_transaction)
+
+    if len(tr_full.signatures) > 0:
+        for signature in tr_full.signatures:
+            signer = await repo.get_signer_by_signature_hint(
+                signature.signature_hint.hex()
+            )
+            await repo.add_signature(
+                Signatures(
+                    signature_xdr=signature.to_xdr_object().to_xdr(),
+                    signer_id=signer.id if signer else None,
+                    transaction_hash=tx_hash,
+                )
+            )
+    return True, tx_hash
+
+
+def _session_owner_id():
+    return (
+        int(session["userdata"]["id"])
+        if "userdata" in session and "id" in session["userdata"]
+        else None
+    )
+
+
+async def add_transaction(tx_body, tx_description):
     async with current_app.db_pool() as db_session:
         repo = TransactionRepository(db_session)
-        existing_transaction = await repo.get_by_hash(tx_hash)
-        if existing_transaction:
-            return True, tx_hash
-
-        owner_id = (
-            int(session["userdata"]["id"])
-            if "userdata" in session and "id" in session["userdata"]
-            else None
-        )
-        new_transaction = Transactions(
-            hash=tx_hash,
-            body=tr.to_xdr(),
-            description=tx_description,
-            json=json.dumps(sources),
-            stellar_sequence=tr.transaction.sequence,
-            source_account=tr.transaction.source.account_id,
-            owner_id=owner_id,
+        success, result = await _register_transaction(
+            repo, tx_body, tx_description, _session_owner_id()
         )
-        await repo.add(new_transaction)
-
-        if len(tr_full.signatures) > 0:
-            for signature in tr_full.signatures:
-                signer = await repo.get_signer_by_signature_hint(
-                    signature.signature_hint.hex()
-                )
-                await repo.add_signature(
-                    Signatures(
-                        signature_xdr=signature.to_xdr_object().to_xdr(),
-                        signer_id=signer.id if signer else None,
-                        transaction_hash=tx_hash,
-                    )
-                )
+        if not success:
+            return False, result
         await repo.commit()
         await db_session.commit()
 
-    return True, tx_hash
+    return True, result
+
+
+async def add_transactions(items):
+    """Добавляет несколько транзакций [(tx_body, tx_description), ...] одним commit.
+
+    Если хоть одна транзакция не разобралась - не сохраняется ни одна.
+    Возвращает (True, [hash, ...]) или (False, текст ошибки).
+    """
+    owner_id = _session_owner_id()
+    tx_hashes = []
+    async with current_app.db_pool() as db_session:
+        repo = TransactionRepository(db_session)
+        for index, (tx_body, tx_description) in enumerate(items, start=1):
+            success, result = await _register_transaction(
+                repo, tx_body, tx_description, owner_id
+            )
+            if not success:
+                await db_session.rollback()
+                return False, f"Transaction {index}: {result}"
+            tx_hashes.append(result)
+        await db_session.commit()
+
+    return True, tx_hashes
 
 
 async def create_sep7_auth_transaction(domain: str, nonce: str, callback: str) -> str:
     """Создает SEP-7 транзакцию для аутентификации с подменой адреса."""
     from stellar_sdk import Server
 
-    server = Server("https://horizon.stellar.org")
+    server = Server(horizon_pool.pick())
     source_account = server.load_account(account_id=main_fund_address)
 
     transaction = (
@@ -828,7 +861,7 @@ def add_trust_line_uri(public_key, asset_code, asset_issuer) -> str:
 
 
 def xdr_to_uri(xdr):
-    transaction = TransactionEnvelope.from_xdr(xdr, Network.PUBLIC_NETWORK_PASSPHRASE)
+    transaction = parse_envelope(xdr)
     return stellar_uri.TransactionStellarUri(transaction_envelope=transaction).to_uri()
 
 
@@ -851,14 +884,45 @@ def decode_flags(flag_value):
     return flags
 
 
-async def stellar_build_xdr(data):
-    from stellar_sdk import Server
+async def _load_copy_multi_sign_signers(data) -> list:
+    """Подписанты для всех операций copy_multi_sign, запросы идут параллельно"""
+    operations = [op for op in data["operations"] if op["type"] == "copy_multi_sign"]
+    if not operations:
+        return []
 
-    root_account = Server(horizon_url="https://horizon.stellar.org").load_account(
-        data["publicKey"]
-    )
+    async with ServerAsync(
+        horizon_url=horizon_pool.pick(), client=AiohttpClient()
+    ) as server:
+        return list(
+            await asyncio.gather(
+                *(
+                    stellar_copy_multi_sign(
+                        public_key_from=operation["from"],
+                        public_key_for=_operation_source(operation)
+                        or data["publicKey"],
+                        server=server,
+                    )
+                    for operation in operations
+                )
+            )
+        )
+
+
+def _operation_source(operation) -> str | None:
+    source_account_raw = operation.get("sourceAccount") or ""
+    if isinstance(source_account_raw, str) and len(source_account_raw) == 56:
+        return source_account_raw
+    return None
+
+
+async def stellar_build_xdr(data):
     if "sequence" in data and int(data["sequence"]) > 0:
-        root_account.sequence = int(data["sequence"]) - 1
+        sequence = int(data["sequence"]) - 1
+    else:
+        # Кеш может отставать на ttl, конструктор берет свежий sequence
+        sequence = await sequence_allocator.current(data["publicKey"], refresh=True)
+    root_account = Account(data["publicKey"], sequence)
+    copy_multi_sign_signers = iter(await _load_copy_multi_sign_signers(data))
 
     transaction = TransactionBuilder(
         source_account=root_account,
@@ -903,12 +967,7 @@ async def stellar_build_xdr(data):
     if memo_type == "memo_hash":
         transaction.add_hash_memo(data["memo"])
     for operation in data["operations"]:
-        source_account_raw = operation.get("sourceAccount") or ""
-        source_account = (
-            source_account_raw
-            if isinstance(source_account_raw, str) and len(source_account_raw) == 56
-            else None
-        )
+        source_account = _operation_source(operation)
         if operation["type"] == "payment":
             transaction.append_payment_op(
                 destination=operation["destination"],
@@ -932,9 +991,7 @@ async def stellar_build_xdr(data):
             )
         if operation["type"] == "copy_multi_sign":
             public_key = source_account if source_account else data["publicKey"]
-            updated_signers = await stellar_copy_multi_sign(
-                public_key_from=operation["from"], public_key_for=public_key
-            )
+            updated_signers = next(copy_multi_sign_signers)
             for signer in updated_signers:
                 if signer["key"] == public_key:
                     transaction.append_set_options_op(
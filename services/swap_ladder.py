@@ -0,0 +1,125 @@
+"""Стоимость обмена через path payment (strict send / strict receive).
+
+Для лестницы цен путь сначала считается локально (services.path_estimator),
+в Horizon идем только если локальной оценки нет. /lab/path строит по путям
+реальную транзакцию, поэтому всегда берет список путей из Horizon. Запросы
+лестницы цен идут параллельно, ответы Horizon кешируются на несколько секунд
+по (направление, пара, сумма). Используется страницей /cup/swap и /lab/path.
+"""
+
+import asyncio
+
+from stellar_sdk import AiohttpClient, Asset, ServerAsync
+
+from other.cache_tools import AsyncTTLCache
+from other.endpoint_pool import horizon_pool
+from other.request_context import CALL_KIND_HORIZON, track_call
+from services.path_estimator import path_estimator
+
+SWAP_LADDER_AMOUNTS = ("10000", "1000", "100", "10", "1")
+PATHS_CACHE_TTL = 5
+
+paths_cache = AsyncTTLCache(
+    ttl_seconds=PATHS_CACHE_TTL, maxsize=512, name="swap_ladder.paths"
+)
+
+
+def _asset_key(asset: Asset) -> str:
+    return f"{asset.code}:{asset.issuer or 'native'}"
+
+
+async def _cached_paths(cache_key: str, load) -> list[dict]:
+    async def load_records() -> list[dict]:
+        async with track_call(CALL_KIND_HORIZON, "paths"):
+            response = await load()
+        return response["_embedded"]["records"]
+
+    # Одинаковые запросы лестницы с разных страниц ждут один ответ Horizon
+    return await paths_cache.get_or_load(cache_key, load_records)
+
+
+async def find_send_paths(
+    server: ServerAsync,
+    source_asset: Asset,
+    source_amount: str,
+    destination: Asset,
+    estimate: bool = True,
+) -> list[dict]:
+    """Пути strict send: сколько destination получим за source_amount.
+
+    estimate=False - только пути Horizon, без приблизительной локальной оценки.
+    """
+    if estimate:
+        local = path_estimator.send_records(source_asset, source_amount, destination)
+        if local is not None:
+            return local
+    return await _cached_paths(
+        f"send:{_asset_key(source_asset)}:{_asset_key(destination)}:{source_amount}",
+        lambda: (
+            server.strict_send_paths(source_asset, source_amount, [destination])
+            .limit(200)
+            .call()
+        ),
+    )
+
+
+async def find_receive_paths(
+    server: ServerAsync, source: Asset, destination_asset: Asset, amount: str
+) -> list[dict]:
+    """Пути strict receive: сколько source нужно отдать за amount destination"""
+    local = path_estimator.receive_records(source, destination_asset, amount)
+    if local is not None:
+        return local
+    return await _cached_paths(
+        f"receive:{_asset_key(source)}:{_asset_key(destination_asset)}:{amount}",
+        lambda: (
+            server.strict_receive_paths([source], destination_asset, amount)
+            .limit(200)
+            .call()
+        ),
+    )
+
+
+async def get_send_swap_cost(server: ServerAsync, asset1, asset2, amount):
+    records = await find_send_paths(server, asset1, amount, asset2)
+    return records[0]["destination_amount"] if records else 0
+
+
+async def get_receive_swap_cost(server: ServerAsync, asset1, asset2, amount):
+    records = await find_receive_paths(server, asset1, asset2, amount)
+    return records[-1]["source_amount"] if records else 0
+
+
+async def get_swap_ladder(
+    asset1: Asset, asset2: Asset, amounts=SWAP_LADDER_AMOUNTS
+) -> dict[str, list[tuple[str, object]]]:
+    """Лестница цен для amounts в обе стороны: {"sellers": [(amount, cost)], "buyers": [...]}
+
+    sellers - продаем amount asset1 за asset2, buyers - покупаем amount asset1 за asset2.
+    """
+    async with ServerAsync(
+        horizon_url=horizon_pool.pick(), client=AiohttpClient()
+    ) as server:
+        costs = await asyncio.gather(
+            *(get_send_swap_cost(server, asset1, asset2, amount) for amount in amounts),
+            *(
+                get_receive_swap_cost(server, asset2, asset1, amount)
+                for amount in reversed(amounts)
+            ),
+        )
+    send_costs, receive_costs = costs[: len(amounts)], costs[len(amounts) :]
+    return {
+        "sellers": list(zip(amounts, send_costs)),
+        "buyers": list(zip(reversed(amounts), receive_costs)),
+    }
+
+
+async def get_send_paths(
+    source_asset: Asset, source_amount: str, destination: Asset
+) -> list[dict]:
+    async with ServerAsync(
+        horizon_url=horizon_pool.pick(), client=AiohttpClient()
+    ) as server:
+        return await find_send_paths(
+            server, source_asset, source_amount, destination, estimate=False
+        )
@@ -6,7 +6,7 @@ from typing import Optional, List, Dict, Any, Tuple
 from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy import select
 
-from stellar_sdk import DecoratedSignature, Keypair, Network, TransactionEnvelope
+from stellar_sdk import DecoratedSignature, Keypair
 from stellar_sdk.exceptions import BadSignatureError
 from stellar_sdk.xdr import DecoratedSignature as DecoratedSignatureXdr
 from stellar_sdk.sep import stellar_uri
@@ -17,6 +17,7 @@ from other.grist_tools import load_users_from_grist
 from other.config_reader import config
 from other.telegram_tools import skynet_bot
 from other.cache_tools import async_cache_with_ttl
+from other.xdr_cache import copy_envelope, parse_envelope
 from services.stellar_client import (
     check_user_in_sign,
     update_transaction_sources,
@@ -68,9 +69,8 @@ class TransactionService:
             # Handle bad JSON
             return {"error": "BAD xdr. Can`t load", "transaction": transaction}
 
-        transaction_env = TransactionEnvelope.from_xdr(
-            transaction.body, network_passphrase=Network.PUBLIC_NETWORK_PASSPHRASE
-        )
+        # Своя копия подписей: ниже в нее добавляются подписи из БД
+        transaction_env = copy_envelope(parse_envelope(transaction.body))
 
         # Preload users
         all_public_keys = [
@@ -246,9 +246,7 @@ class TransactionService:
         result = {"SUCCESS": False, "MESSAGES": []}
 
         try:
-            tr_full = TransactionEnvelope.from_xdr(
-                tx_body_xdr, network_passphrase=Network.PUBLIC_NETWORK_PASSPHRASE
-            )
+            tr_full = parse_envelope(tx_body_xdr)
             result["hash"] = tr_full.hash_hex()
         except Exception:
             result["MESSAGES"].append("BAD xdr. Can`t load")
@@ -379,17 +377,22 @@ class TransactionService:
             limit=limit,
         )
 
+    async def get_batch_transactions(
+        self, source_account: str, first_sequence: int, count: int
+    ) -> List[Any]:
+        return await self.repo.get_sequence_range(source_account, first_sequence, count)
+
+    # Кеш на неделю с лимитом 30 транзакций; ключ - только хеш, сервис
+    # создается на каждый запрос
     @async_cache_with_ttl(
-        ttl_seconds=7 * 24 * 60 * 60, maxsize=30
-    )  # Кеш на неделю с лимитом 30 транзакций
+        ttl_seconds=7 * 24 * 60 * 60, maxsize=30, key=lambda self, tr_hash: tr_hash
+    )
     async def create_transaction_uri(self, tr_hash: str) -> Optional[str]:
         transaction = await self.get_transaction_by_hash(tr_hash)
         if not transaction:
             return None
 
-        transaction_envelope = TransactionEnvelope.from_xdr(
-            transaction.body, Network.PUBLIC_NETWORK_PASSPHRASE
-        )
+        transaction_envelope = parse_envelope(transaction.body)
         msg = transaction.description[:300] if transaction.description else None
 
         transaction_uri = stellar_uri.TransactionStellarUri(
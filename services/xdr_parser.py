@@ -1,8 +1,8 @@
 import asyncio
 import base64
 import json
-import copy
 from datetime import datetime, timezone
+from decimal import ROUND_DOWN, Decimal
 from loguru import logger
 from quart import current_app
 from stellar_sdk import (
@@ -11,7 +11,6 @@ from stellar_sdk import (
     Network,
     NoneMemo,
     TextMemo,
-    TransactionEnvelope,
     PathPaymentStrictSend,
     ManageSellOffer,
     Transaction,
@@ -31,7 +30,10 @@ from stellar_sdk.operation.create_claimable_balance import ClaimPredicateType
 
 from infrastructure.repositories.transaction_repository import TransactionRepository
 from other.grist_cache import grist_cache
+from other.ipfs_tools import ipfs_cid_from_manage_data, prefetch_ipfs_metadata
+from other.request_context import CallBudgetExceeded
 from other.stellar_soroban import read_token_contract_display_name
+from other.xdr_cache import copy_envelope, parse_envelope
 from services.stellar_client import (
     get_available_balance_str,
     check_asset,
@@ -42,6 +44,10 @@ from services.stellar_client import (
 )
 
 tools_cash = {}
+BUDGET_EXCEEDED_TEXT = (
+    '<div style="color: orange;">Разбор остановлен: превышен лимит внешних '
+    "запросов, проверки ниже не выполнены</div>"
+)
 
 
 def get_key_sort(key, idx=1):
@@ -59,9 +65,7 @@ def _parse_transaction_envelope(xdr: str):
             )
             return fee_transaction.transaction.inner_transaction_envelope
 
-        return TransactionEnvelope.from_xdr(
-            xdr, network_passphrase=Network.PUBLIC_NETWORK_PASSPHRASE
-        )
+        return parse_envelope(xdr)
     except (EOFError, TypeError, ValueError) as exc:
         raise ValueError("Invalid Stellar XDR") from exc
 
@@ -396,13 +400,87 @@ async def asset_to_link(operation_asset) -> str:
         return f'<a href="{start_url}{operation_asset.code}-{operation_asset.issuer}" target="_blank">{operation_asset.code}{star}</a>'
 
 
+STROOPS_PER_UNIT = 10_000_000
+
+
+def to_stroops(amount) -> int:
+    """Сумма Stellar ("12.5", Decimal, int) в целых строупах без float"""
+    return int((Decimal(str(amount)) * STROOPS_PER_UNIT).to_integral_value(ROUND_DOWN))
+
+
+def stroops_to_str(stroops: int) -> str:
+    """Строупы в сумму без лишних нулей: 905000000 -> 90.5"""
+    sign = "-" if stroops < 0 else ""
+    units, rest = divmod(abs(stroops), STROOPS_PER_UNIT)
+    if not rest:
+        return f"{sign}{units}"
+    return f"{sign}{units}.{rest:07d}".rstrip("0")
+
+
+def _asset_key(asset) -> str:
+    if isinstance(asset, LiquidityPoolAsset):
+        return f"pool:{asset.liquidity_pool_id}"
+    if asset.is_native():
+        return "XLM"
+    return f"{asset.code}:{asset.issuer}"
+
+
+def _horizon_balance_key(balance: dict) -> str:
+    asset_type = balance.get("asset_type")
+    if asset_type == "native":
+        return "XLM"
+    if asset_type == "liquidity_pool_shares":
+        return f"pool:{balance.get('liquidity_pool_id')}"
+    return f"{balance.get('asset_code')}:{balance.get('asset_issuer')}"
+
+
+class LedgerBalance:
+    __slots__ = ("stroops",)
+
+    def __init__(self, stroops: int = 0):
+        self.stroops = stroops
+
+
+class LedgerAccount:
+    """Состояние аккаунта в симуляции: балансы по ключу актива, суммы в строупах"""
+
+    __slots__ = ("account_id", "auth_required", "balances", "exists")
+
+    def __init__(
+        self, account_id: str, auth_required: bool = False, exists: bool = True
+    ):
+        self.account_id = account_id
+        self.balances: dict[str, LedgerBalance] = {}
+        self.auth_required = auth_required
+        self.exists = exists
+
+    @classmethod
+    def from_horizon(cls, data: dict) -> "LedgerAccount":
+        account = cls(
+            data["id"], auth_required=bool(data.get("flags", {}).get("auth_required"))
+        )
+        for balance in data.get("balances", ()):
+            account.balances[_horizon_balance_key(balance)] = LedgerBalance(
+                to_stroops(balance.get("balance", 0))
+            )
+        return account
+
+    def balance(self, asset) -> int:
+        """Баланс актива в строупах, 0 если линии доверия нет"""
+        entry = self.balances.get(_asset_key(asset))
+        return entry.stroops if entry else 0
+
+    def has_trustline(self, asset) -> bool:
+        return _asset_key(asset) in self.balances
+
+
 class SimulatedLedger:
     """
     Simulates the state of the ledger for a single transaction analysis.
     """
 
     def __init__(self):
-        self.accounts = {}  # account_id -> account_data from Horizon
+        self.accounts: dict[str, LedgerAccount] = {}
         self.new_assets = set()  # set of "asset_code:asset_issuer"
 
     async def prefetch_accounts(self, account_ids: set):
@@ -411,155 +489,56 @@ class SimulatedLedger:
         results = await asyncio.gather(*tasks)
         for acc_id, acc_data in zip(account_ids, results):
             if acc_data and "id" in acc_data:
-                self.accounts[acc_id] = copy.deepcopy(acc_data)
+                self.accounts[acc_id] = LedgerAccount.from_horizon(acc_data)
             else:
-                # Initialize with a default structure if account not found
-                self.accounts[acc_id] = {
-                    "id": acc_id,
-                    "balances": [],
-                    "subentry_count": 0,
-                    "num_sponsoring": 0,
-                    "num_sponsored": 0,
-                }
+                # Аккаунта нет в сети
+                self.accounts[acc_id] = LedgerAccount(acc_id, exists=False)
 
-    def get_account(self, account_id: str):
+    def get_account(self, account_id: str) -> LedgerAccount:
         """Gets account data from the simulation."""
-        return self.accounts.get(
-            account_id,
-            {
-                "id": account_id,
-                "balances": [],
-                "subentry_count": 0,
-                "num_sponsoring": 0,
-                "num_sponsored": 0,
-            },
-        )
-
-    def _get_asset_key(self, asset: Asset) -> str:
-        """Generates a unique key for an asset."""
-        if asset.is_native():
-            return "XLM"
-        return f"{asset.code}:{asset.issuer}"
+        account = self.accounts.get(account_id)
+        if account is None:
+            account = self.accounts[account_id] = LedgerAccount(
+                account_id, exists=False
+            )
+        return account
 
-    def update_balance(self, account_id: str, asset: Asset, amount_delta: float):
+    def update_balance(self, account_id: str, asset: Asset, delta_stroops: int):
         """Updates the balance of an asset for a given account."""
-        account = self.get_account(account_id)
-        if "balances" not in account:
-            account["balances"] = []
-
-        balance_updated = False
-        for balance in account["balances"]:
-            if asset.is_native() and balance.get("asset_type") == "native":
-                current_balance = float(balance["balance"])
-                balance["balance"] = str(current_balance + amount_delta)
-                balance_updated = True
-                break
-            elif (
-                not asset.is_native()
-                and balance.get("asset_code") == asset.code
-                and balance.get("asset_issuer") == asset.issuer
-            ):
-                current_balance = float(balance["balance"])
-                balance["balance"] = str(current_balance + amount_delta)
-                balance_updated = True
-                break
-
-        if not balance_updated and amount_delta > 0:
-            if asset.is_native():
-                account["balances"].append(
-                    {"asset_type": "native", "balance": str(amount_delta)}
-                )
-            else:
-                account["balances"].append(
-                    {
-                        "asset_type": asset.type,
-                        "asset_code": asset.code,
-                        "asset_issuer": asset.issuer,
-                        "balance": str(amount_delta),
-                    }
-                )
+        balances = self.get_account(account_id).balances
+        entry = balances.get(_asset_key(asset))
+        if entry is not None:
+            entry.stroops += delta_stroops
+        elif delta_stroops > 0:
+            balances[_asset_key(asset)] = LedgerBalance(delta_stroops)
 
     def add_trustline(self, account_id: str, asset: Asset):
         """Adds a trustline to an account."""
-        account = self.get_account(account_id)
-        if "balances" not in account:
-            account["balances"] = []
-
-        if isinstance(asset, LiquidityPoolAsset):
-            for balance in account["balances"]:
-                if balance.get("liquidity_pool_id") == asset.liquidity_pool_id:
-                    return
-            account["balances"].append(
-                {
-                    "balance": "0.0000000",
-                    "limit": "922337203685.4775807",
-                    "asset_type": "liquidity_pool_shares",
-                    "liquidity_pool_id": asset.liquidity_pool_id,
-                }
-            )
-        else:
-            for balance in account["balances"]:
-                if (
-                    not asset.is_native()
-                    and balance.get("asset_code") == asset.code
-                    and balance.get("asset_issuer") == asset.issuer
-                ):
-                    return
-            account["balances"].append(
-                {
-                    "balance": "0.0000000",
-                    "limit": "922337203685.4775807",
-                    "asset_type": asset.type,
-                    "asset_code": asset.code,
-                    "asset_issuer": asset.issuer,
-                }
-            )
+        balances = self.get_account(account_id).balances
+        key = _asset_key(asset)
+        if key not in balances:
+            balances[key] = LedgerBalance(0)
 
     def remove_trustline(self, account_id: str, asset: Asset):
         """Removes a trustline from an account."""
-        account = self.get_account(account_id)
-        if "balances" not in account:
-            return
-
-        if isinstance(asset, LiquidityPoolAsset):
-            account["balances"] = [
-                b
-                for b in account["balances"]
-                if not (
-                    b.get("asset_type") == "liquidity_pool_shares"
-                    and b.get("liquidity_pool_id") == asset.liquidity_pool_id
-                )
-            ]
-        else:
-            account["balances"] = [
-                b
-                for b in account["balances"]
-                if not (
-                    b.get("asset_code") == asset.code
-                    and b.get("asset_issuer") == asset.issuer
-                )
-            ]
+        self.get_account(account_id).balances.pop(_asset_key(asset), None)
 
     def create_account(self, account_id: str, starting_balance: str):
         """Creates a new account in the simulation."""
-        self.accounts[account_id] = {
-            "id": account_id,
-            "balances": [{"asset_type": "native", "balance": starting_balance}],
-            "subentry_count": 0,
-            "num_sponsoring": 0,
-            "num_sponsored": 0,
-        }
+        account = LedgerAccount(account_id)
+        account.balances["XLM"] = LedgerBalance(to_stroops(starting_balance))
+        self.accounts[account_id] = account
 
     def mark_asset_as_new(self, asset: Asset):
         """Marks an asset as being created within this transaction."""
         if not asset.is_native():
-            self.new_assets.add(self._get_asset_key(asset))
+            self.new_assets.add(_asset_key(asset))
 
     def is_asset_new(self, asset: Asset) -> bool:
         """Checks if an asset was marked as new."""
         if asset.is_native():
             return False
-        return self._get_asset_key(asset) in self.new_assets
+        return _asset_key(asset) in self.new_assets
 
 
 async def decode_invoke_host_function(operation):
@@ -712,7 +691,6 @@ async def _render_sub_invocation_summary(invocation) -> str:
 async def _resolve_sub_invocation_token_name(token_contract_id: str) -> str:
     try:
         token_name = await read_token_contract_display_name(
-            rpc_url="https://soroban-rpc.mainnet.stellar.gateway.fm",
             contract_id=token_contract_id,
         )
     except Exception:
@@ -789,8 +767,17 @@ def decode_scval(val):
         return f"<error decoding SCVal: {str(e)}>"
 
 
-async def decode_xdr_to_text(xdr, only_op_number=None):
+async def decode_xdr_to_text(xdr, only_op_number=None, prefetch_ipfs=False):
     result = []
+    try:
+        return await _decode_xdr_lines(result, xdr, only_op_number, prefetch_ipfs)
+    except CallBudgetExceeded:
+        # Лимит внешних вызовов исчерпан: отдаем то, что успели разобрать
+        result.append(BUDGET_EXCEEDED_TEXT)
+        return [item for item in result if item != ""]
+
+
+async def _decode_xdr_lines(result, xdr, only_op_number, prefetch_ipfs):
     data_exist = False
 
     def humanize_relative_seconds(total_seconds: int) -> str:
@@ -1028,6 +1015,12 @@ async def decode_xdr_to_text(xdr, only_op_number=None):
             )
 
             # --- Validation ---
+            dest_account_sim = simulated_ledger.get_account(dest_id)
+            if not dest_account_sim.exists:
+                result.append(
+                    '<div style="color: red;">Error: Destination account does not exist, use CreateAccount.</div>'
+                )
+
             if not operation.asset.is_native():
                 # Check asset existence
                 if not simulated_ledger.is_asset_new(operation.asset):
@@ -1036,45 +1029,29 @@ async def decode_xdr_to_text(xdr, only_op_number=None):
                         result.append(check_res)
 
                 # Check trustline
-                if dest_id != operation.asset.issuer:
-                    dest_account_sim = simulated_ledger.get_account(dest_id)
-                    asset_found = any(
-                        b.get("asset_code") == operation.asset.code
-                        and b.get("asset_issuer") == operation.asset.issuer
-                        for b in dest_account_sim.get("balances", [])
+                if (
+                    dest_account_sim.exists
+                    and dest_id != operation.asset.issuer
+                    and not dest_account_sim.has_trustline(operation.asset)
+                ):
+                    result.append(
+                        f'<div style="color: red;">Error: Trustline for {operation.asset.code} not found on destination account.</div>'
                     )
-                    if not asset_found:
-                        result.append(
-                            f'<div style="color: red;">Error: Trustline for {operation.asset.code} not found on destination account.</div>'
-                        )
 
             # Check balance
+            amount = to_stroops(operation.amount)
             if op_source_id != operation.asset.issuer:
-                source_account_sim = simulated_ledger.get_account(op_source_id)
-                source_sum = 0
-                for b in source_account_sim.get("balances", []):
-                    if operation.asset.is_native() and b.get("asset_type") == "native":
-                        source_sum = float(b.get("balance", 0))
-                        break
-                    elif (
-                        not operation.asset.is_native()
-                        and b.get("asset_code") == operation.asset.code
-                        and b.get("asset_issuer") == operation.asset.issuer
-                    ):
-                        source_sum = float(b.get("balance", 0))
-                        break
-                if source_sum < float(operation.amount):
+                source_sum = simulated_ledger.get_account(op_source_id).balance(
+                    operation.asset
+                )
+                if source_sum < amount:
                     result.append(
-                        f'<div style="color: red;">Error: Not enough balance ({source_sum}) to send {operation.amount}.</div>'
+                        f'<div style="color: red;">Error: Not enough balance ({stroops_to_str(source_sum)}) to send {operation.amount}.</div>'
                     )
 
             # --- State Update ---
-            simulated_ledger.update_balance(
-                op_source_id, operation.asset, -float(operation.amount)
-            )
-            simulated_ledger.update_balance(
-                dest_id, operation.asset, float(operation.amount)
-            )
+            simulated_ledger.update_balance(op_source_id, operation.asset, -amount)
+            simulated_ledger.update_balance(dest_id, operation.asset, amount)
             continue
 
         if type(operation).__name__ == "ChangeTrust":
@@ -1135,7 +1112,7 @@ async def decode_xdr_to_text(xdr, only_op_number=None):
             # --- State Update ---
             simulated_ledger.create_account(dest_id, start_balance)
             simulated_ledger.update_balance(
-                op_source_id, Asset.native(), -float(start_balance)
+                op_source_id, Asset.native(), -to_stroops(start_balance)
             )
             continue
 
@@ -1206,20 +1183,11 @@ async def decode_xdr_to_text(xdr, only_op_number=None):
             selling_asset_code = (
                 operation.selling.code if hasattr(operation.selling, "code") else "XLM"
             )
-            selling_sum = sum(
-                float(balance.get("balance"))
-                for balance in source_account["balances"]
-                if balance.get("asset_code") == selling_asset_code
-                or (
-                    selling_asset_code == "XLM"
-                    and "asset_type" in balance
-                    and balance["asset_type"] == "native"
-                )
-            )
+            selling_sum = source_account.balance(operation.selling)
 
             selling_asset_issuer = getattr(operation.selling, "issuer", None)
             if (
-                selling_sum < float(operation.amount)
+                selling_sum < to_stroops(operation.amount)
                 and selling_asset_issuer != op_source_id
             ):
                 result.append(
@@ -1236,20 +1204,11 @@ async def decode_xdr_to_text(xdr, only_op_number=None):
             selling_asset_code = (
                 operation.selling.code if hasattr(operation.selling, "code") else "XLM"
             )
-            selling_sum = sum(
-                float(balance.get("balance"))
-                for balance in source_account["balances"]
-                if balance.get("asset_code") == selling_asset_code
-                or (
-                    selling_asset_code == "XLM"
-                    and "asset_type" in balance
-                    and balance["asset_type"] == "native"
-                )
-            )
+            selling_sum = source_account.balance(operation.selling)
 
             selling_asset_issuer = getattr(operation.selling, "issuer", None)
             if (
-                selling_sum < float(operation.amount)
+                selling_sum < to_stroops(operation.amount)
                 and selling_asset_issuer != op_source_id
             ):
                 result.append(
@@ -1276,20 +1235,11 @@ async def decode_xdr_to_text(xdr, only_op_number=None):
             selling_asset_code = (
                 operation.selling.code if hasattr(operation.selling, "code") else "XLM"
             )
-            required_amount_to_spend = float(operation.amount) * (
-                operation.price.n / operation.price.d
-            )
-
-            selling_sum = sum(
-                float(balance.get("balance"))
-                for balance in source_account["balances"]
-                if balance.get("asset_code") == selling_asset_code
-                or (
-                    selling_asset_code == "XLM"
-                    and "asset_type" in balance
-                    and balance["asset_type"] == "native"
-                )
+            # Цена - сколько selling за единицу buying, округляем вверх
+            required_amount_to_spend = -(
+                -to_stroops(operation.amount) * operation.price.n // operation.price.d
             )
+            selling_sum = source_account.balance(operation.selling)
 
             selling_asset_issuer = getattr(operation.selling, "issuer", None)
             if (
@@ -1297,7 +1247,7 @@ async def decode_xdr_to_text(xdr, only_op_number=None):
                 and selling_asset_issuer != op_source_id
             ):
                 result.append(
-                    f'<div style="color: red;">Error: Not enough {selling_asset_code} to buy! Required: {required_amount_to_spend}, Available: {selling_sum}</div>'
+                    f'<div style="color: red;">Error: Not enough {selling_asset_code} to buy! Required: {stroops_to_str(required_amount_to_spend)}, Available: {stroops_to_str(selling_sum)}</div>'
                 )
 
             continue
@@ -1326,6 +1276,12 @@ async def decode_xdr_to_text(xdr, only_op_number=None):
             continue
         if type(operation).__name__ == "ManageData":
             data_exist = True
+            if prefetch_ipfs:
+                cid = ipfs_cid_from_manage_data(
+                    operation.data_name, operation.data_value
+                )
+                if cid:
+                    prefetch_ipfs_metadata(cid)
             result.append(
                 f"    ManageData {operation.data_name} = {operation.data_value} "
             )
@@ -1341,9 +1297,7 @@ async def decode_xdr_to_text(xdr, only_op_number=None):
                 result.append(f"    Set flags: {operation.set_flags}")
 
             issuer_account = simulated_ledger.get_account(operation.asset.issuer)
-            if issuer_account.get("flags", {}).get("auth_required"):
-                pass
-            else:
+            if not issuer_account.auth_required:
                 result.append(
                     f'    <div style="color: orange;">Warning: issuer {address_id_to_link(operation.asset.issuer)} '
                     f"not need auth </div>"
@@ -1395,38 +1349,23 @@ async def decode_xdr_to_text(xdr, only_op_number=None):
             if isinstance(lp_asset, LiquidityPoolAsset):
                 source_account_sim = simulated_ledger.get_account(op_source_id)
                 assets_to_check = [
-                    (lp_asset.asset_a, float(operation.max_amount_a)),
-                    (lp_asset.asset_b, float(operation.max_amount_b)),
+                    (lp_asset.asset_a, to_stroops(operation.max_amount_a)),
+                    (lp_asset.asset_b, to_stroops(operation.max_amount_b)),
                 ]
                 for asset, required_amount in assets_to_check:
                     if op_source_id == asset.issuer:
                         continue
-                    if not asset.is_native():
-                        has_trustline = any(
-                            b.get("asset_code") == asset.code
-                            and b.get("asset_issuer") == asset.issuer
-                            for b in source_account_sim.get("balances", [])
+                    if not asset.is_native() and not source_account_sim.has_trustline(
+                        asset
+                    ):
+                        result.append(
+                            f'<div style="color: red;">Error: Trustline for {asset.code} not found on source account.</div>'
                         )
-                        if not has_trustline:
-                            result.append(
-                                f'<div style="color: red;">Error: Trustline for {asset.code} not found on source account.</div>'
-                            )
-                    source_sum = 0.0
-                    for b in source_account_sim.get("balances", []):
-                        if asset.is_native() and b.get("asset_type") == "native":
-                            source_sum = float(b.get("balance", 0))
-                            break
-                        if (
-                            not asset.is_native()
-                            and b.get("asset_code") == asset.code
-                            and b.get("asset_issuer") == asset.issuer
-                        ):
-                            source_sum = float(b.get("balance", 0))
-                            break
+                    source_sum = source_account_sim.balance(asset)
                     if source_sum < required_amount:
                         result.append(
-                            f'<div style="color: red;">Error: Not enough balance ({source_sum}) to deposit '
-                            f"{required_amount} {await asset_to_link(asset)}.</div>"
+                            f'<div style="color: red;">Error: Not enough balance ({stroops_to_str(source_sum)}) to deposit '
+                            f"{stroops_to_str(required_amount)} {await asset_to_link(asset)}.</div>"
                         )
                 for asset, required_amount in assets_to_check:
                     if op_source_id == asset.issuer:
@@ -1444,10 +1383,10 @@ async def decode_xdr_to_text(xdr, only_op_number=None):
             lp_asset = pool_data.get("LiquidityPoolAsset")
             if isinstance(lp_asset, LiquidityPoolAsset):
                 simulated_ledger.update_balance(
-                    op_source_id, lp_asset.asset_a, float(operation.min_amount_a)
+                    op_source_id, lp_asset.asset_a, to_stroops(operation.min_amount_a)
                 )
                 simulated_ledger.update_balance(
-                    op_source_id, lp_asset.asset_b, float(operation.min_amount_b)
+                    op_source_id, lp_asset.asset_b, to_stroops(operation.min_amount_b)
                 )
             continue
         if type(operation).__name__ == "InvokeHostFunction":
@@ -1535,9 +1474,7 @@ def uri_sign(data, stellar_private_key):
 
 def update_memo_in_xdr(xdr: str, new_memo: str) -> str:
     try:
-        transaction = TransactionEnvelope.from_xdr(
-            xdr, Network.PUBLIC_NETWORK_PASSPHRASE
-        )
+        transaction = copy_envelope(parse_envelope(xdr), copy_transaction=True)
         transaction.transaction.memo = TextMemo(new_memo)
         return transaction.to_xdr()
     except Exception as e:
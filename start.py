@@ -4,7 +4,7 @@ from datetime import timedelta
 import sentry_sdk
 from cachetools import TTLCache
 from loguru import logger
-from quart import Quart, session
+from quart import Quart, request, session
 
 import routers.contracts
 import routers.cup
@@ -21,12 +21,22 @@ import routers.grist
 import routers.rely
 from other.config_reader import config, update_test_user
 from db.sql_models import Base
-from db.sql_pool import create_async_pool
+from db.sql_pool import create_async_pool, install_call_tracing
+from other.quart_tools import install_compression
+from other.request_profiler import install_request_profiling
+from other.request_context import (
+    CallBudgetExceeded,
+    finish_trace,
+    get_current_trace,
+    start_trace,
+)
 
 app = Quart(__name__)
 
 # Initialize DB pool
 app.db_pool, app.db_engine = create_async_pool(config.db_dsn)
+install_call_tracing(app.db_engine)
+install_compression(app, min_size=config.compress_min_size)
 
 logger.add("log/app.log", level=logging.INFO)
 
@@ -106,11 +116,90 @@ async def update_db():
 
 @app.before_request
 async def before_request():
+    request.trace_token = start_trace(
+        request.path, config.outbound_call_budget, config.db_call_budget
+    )
     session.permanent = True
     if "userdata" not in session:  # Чтобы избежать перезаписи сессии на каждом запросе
         update_test_user()
 
 
+@app.after_request
+async def add_server_timing(response):
+    trace = get_current_trace()
+    if trace is not None and trace.calls:
+        metrics = [
+            f'{kind};dur={item["duration"] * 1000:.1f};desc="{item["count"]} calls"'
+            for kind, item in trace.summary()["by_kind"].items()
+        ]
+        response.headers["Server-Timing"] = ", ".join(metrics)
+    return response
+
+
+@app.teardown_request
+async def teardown_request(exc):
+    token = getattr(request, "trace_token", None)
+    if token is None:
+        return
+    trace = finish_trace(token)
+    if trace and (trace.budget_exceeded or trace.db_budget_exceeded):
+        logger.warning(f"Request call budget exceeded: {trace.summary()}")
+
+
+@app.errorhandler(CallBudgetExceeded)
+async def call_budget_exceeded(exc):
+    # Сюда доходят только запросы, которым без внешних данных нечего отдать
+    # (отправка, API). Страницы разбора XDR ловят исключение сами и
+    # показывают то, что успели собрать.
+    logger.warning(str(exc))
+    return "Слишком много внешних запросов, попробуйте позже", 503
+
+
+async def _profile_allowed() -> bool:
+    from services.stellar_client import check_user_weight
+
+    return await check_user_weight(False) > 0
+
+
+# После before_request: профилю нужна уже начатая трасса запроса
+install_request_profiling(app, _profile_allowed, config.profile_dir)
+
+
+@app.before_serving
+async def install_shared_cache():
+    """Кеши Horizon/Grist общие для всех воркеров хоста"""
+    from other.cache_tools import set_shared_backend
+    from other.shared_cache import SqliteCacheBackend
+
+    if not config.test_mode and config.shared_cache_path:
+        set_shared_backend(SqliteCacheBackend(config.shared_cache_path))
+
+
+@app.before_serving
+async def start_endpoint_probes():
+    """Фоновая оценка здоровья точек Horizon / Soroban RPC"""
+    from other.endpoint_pool import (
+        check_horizon,
+        check_soroban,
+        horizon_pool,
+        soroban_pool,
+    )
+
+    if not config.test_mode and config.endpoint_probe_seconds > 0:
+        horizon_pool.start_probing(check_horizon, config.endpoint_probe_seconds)
+        soroban_pool.start_probing(check_soroban, config.endpoint_probe_seconds)
+
+
+@app.before_serving
+async def start_loop_watchdog():
+    """Поиск кода, блокирующего event loop (loop_watchdog_ms > 0)"""
+    from other.loop_watchdog import loop_watchdog
+
+    if config.loop_watchdog_ms > 0:
+        loop_watchdog.threshold = config.loop_watchdog_ms / 1000
+        loop_watchdog.start()
+
+
 @app.before_serving
 async def initialize_grist_cache():
     """Инициализация кеша Grist при запуске приложения"""
@@ -118,6 +207,103 @@ async def initialize_grist_cache():
 
     if not config.test_mode:
         await grist_cache.initialize_cache()
+        grist_cache.start_snapshot_watch()
+
+
+@app.before_serving
+async def build_federation_index():
+    """Индекс /federation в памяти, дальше он перечитывается сам"""
+    from services.federation_index import federation_index
+
+    try:
+        await federation_index.rebuild(app.db_pool)
+    except Exception as e:
+        logger.warning(f"Federation index is not built at startup: {e}")
+
+
+@app.before_serving
+async def replay_grist_writes():
+    """Повторная отправка записей Grist, не ушедших до прошлой остановки"""
+    from other.grist_tools import grist_manager
+
+    if not config.test_mode:
+        await grist_manager.write_buffer.replay_spill()
+
+
+@app.before_serving
+async def start_path_estimator():
+    """Загрузка стаканов и пулов по спросу для локальной оценки путей обмена"""
+    from services.path_estimator import grist_asset_keys, path_estimator
+
+    if not config.test_mode and config.path_estimator_refresh_seconds > 0:
+        path_estimator.refresh_interval = config.path_estimator_refresh_seconds
+        path_estimator.start(grist_asset_keys)
+
+
+@app.after_serving
+async def stop_path_estimator():
+    from services.path_estimator import path_estimator
+
+    await path_estimator.stop()
+
+
+@app.after_serving
+async def drain_rely_jobs():
+    """Дожидаемся обработки сделок rely до остановки (они пишут в Grist)"""
+    await routers.rely.deal_jobs.drain()
+
+
+@app.after_serving
+async def stop_grist_snapshot_watch():
+    from other.grist_cache import grist_cache
+
+    await grist_cache.stop_snapshot_watch()
+
+
+@app.after_serving
+async def flush_grist_writes():
+    from other.grist_tools import grist_manager
+
+    await grist_manager.write_buffer.flush_all()
+
+
+@app.after_serving
+async def stop_endpoint_probes():
+    from other.endpoint_pool import horizon_pool, soroban_pool
+
+    for pool in (horizon_pool, soroban_pool):
+        await pool.stop_probing()
+        logger.info(f"endpoints {pool.name}: {pool.stats()}")
+
+
+@app.after_serving
+async def close_http_sessions():
+    from other.grist_tools import grist_session_manager
+    from other.web_tools import http_session_manager
+
+    for manager in (http_session_manager, grist_session_manager):
+        for host, stats in manager.stats().items():
+            logger.info(f"http {host}: {stats}")
+        await manager.close()
+
+
+@app.after_serving
+async def stop_loop_watchdog():
+    from other.loop_watchdog import loop_watchdog
+
+    if loop_watchdog.running:
+        await loop_watchdog.stop()
+        logger.info(f"loop watchdog: {loop_watchdog.stats()}")
+
+
+@app.after_serving
+async def log_cache_stats():
+    from other.cache_tools import cache_stats
+    from other.xdr_cache import xdr_envelope_cache
+
+    for name, stats in cache_stats().items():
+        logger.info(f"cache {name}: {stats}")
+    logger.info(f"cache xdr_envelopes: {xdr_envelope_cache.snapshot()}")
 
 
 if __name__ == "__main__":
@@ -1064,6 +1064,8 @@ function generatePayDivs() {
         ${generateInput("amount", "Amount", "float", "", "Total sum to distribute proportionally among holders")}
         ${generateInput("requireTrustline", "Require Trustline (1/0)", "int", "1",
             "1 to skip recipients without a trustline to payout asset, 0 to include all")}
+        ${generateInput("description", "Batch Description", "text_null", "",
+            "Needed for Payout Batch: payouts over 100 payments are split into several transactions")}
 
         ${generateAccountSelector("sourceAccount", "Source Account", "", "Optional per-op source; defaults to top-level public key")}
     </div>
@@ -1464,6 +1466,46 @@ function handleXDR() {
     });
 }
 
+function handlePayDivsBatch() {
+    var data = gatherData();
+    if (!data) {
+        return;
+    }
+
+    var operation = data.operations[0];
+    if (data.operations.length !== 1 || operation.type !== 'pay_divs') {
+        showToast('Payout Batch needs exactly one PayDivs operation', 'warning');
+        return;
+    }
+    if (operation.sourceAccount && operation.sourceAccount !== data.publicKey) {
+        showToast('Payout Batch pays from the top-level public key, clear Source Account', 'warning');
+        return;
+    }
+
+    $.ajax({
+        url: "/lab/pay_divs_batch",
+        type: "POST",
+        contentType: "application/json",
+        data: JSON.stringify({
+            publicKey: data.publicKey,
+            holders: operation.holders,
+            asset: operation.asset,
+            amount: operation.amount,
+            requireTrustline: operation.requireTrustline,
+            memo: data.memo_type === 'memo_text' ? data.memo : '',
+            description: operation.description
+        }),
+        success: function(response) {
+            showToast(`Created ${response.hashes.length} transaction(s)`, 'success');
+            window.location.href = response.url;
+        },
+        error: function(xhr, status, error) {
+            var message = xhr.responseJSON && xhr.responseJSON.error;
+            showToast(message || ("An error occurred: " + error), 'warning');
+        }
+    });
+}
+
 function isIsoUtc(value) {
     return /^\d{4}-\d{2}-\d{2}T\d{2}:\d{2}:\d{2}Z$/.test(value);
 }
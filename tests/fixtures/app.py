@@ -63,6 +63,16 @@ async def app(db_pool):
     # Use REAL db_pool (SQLite in-memory) instead of mock
     app.db_pool = db_pool
 
+    # Rendered-response caches are module level, reset them between tests
+    from other.quart_tools import clear_rendered_caches
+
+    clear_rendered_caches()
+
+    # Индекс federation тоже общий на модуль, а БД у каждого теста своя
+    from services.federation_index import federation_index
+
+    federation_index.invalidate()
+
     return app
 
 
@@ -5,6 +5,7 @@ Fixtures for Stellar Horizon mock server.
 import socket
 import random
 import pytest
+import pytest_asyncio
 from aiohttp import web
 from .constants import (
     HORIZON_PORT_START,
@@ -46,6 +47,10 @@ class HorizonMockState:
         self.requests = []
         self.accounts = {}
         self.not_found_accounts = set()
+        # Заявки для /offers и /accounts/{id}/offers
+        self.offers = []
+        # Известные активы для /assets, (code, issuer)
+        self.assets = set()
 
     def set_account(self, account_id: str, balances=None, sequence="123456789"):
         """Configure mock account data."""
@@ -66,8 +71,46 @@ class HorizonMockState:
             "paging_token": account_id,
         }
 
+    def set_account_signers(self, account_id: str, signers, thresholds=None):
+        """Configure signers (list of (public_key, weight)) and thresholds."""
+        if account_id not in self.accounts:
+            self.set_account(account_id)
+        self.accounts[account_id]["signers"] = [
+            {"key": key, "weight": weight, "type": "ed25519_public_key"}
+            for key, weight in signers
+        ]
+        if thresholds is not None:
+            self.accounts[account_id]["thresholds"] = thresholds
+
+
+def make_offer_records(
+    count: int,
+    selling: str = "native",
+    buying: str = "EURMTL",
+    base_price: float = 0.25,
+    seed: int = 0,
+):
+    """Generate deterministic Horizon offer records for orderbook tests."""
+    rnd = random.Random(seed)
+    return [
+        {
+            "id": str(seed * 100000 + idx),
+            "paging_token": str(seed * 100000 + idx),
+            "seller": TEST_FUNDED_ACCOUNT,
+            "selling": selling,
+            "buying": buying,
+            "amount": f"{rnd.uniform(0.5, 5000):.7f}",
+            "price": f"{base_price * rnd.uniform(0.8, 1.2):.7f}",
+        }
+        for idx in range(count)
+    ]
+
 
-@pytest.fixture
+def _page(records):
+    return {"_embedded": {"records": records}}
+
+
+@pytest_asyncio.fixture
 async def mock_horizon(horizon_server_config):
     """
     Starts a local mock Stellar Horizon server.
@@ -123,6 +166,48 @@ async def mock_horizon(horizon_server_config):
             }
         )
 
+    @routes.get("/accounts/{account_id}/offers")
+    async def get_account_offers(request):
+        account_id = request.match_info["account_id"]
+        state.requests.append(
+            {"endpoint": "account_offers", "method": "GET", "account_id": account_id}
+        )
+        return web.json_response(
+            _page([o for o in state.offers if o["seller"] == account_id])
+        )
+
+    @routes.get("/offers")
+    async def get_offers(request):
+        state.requests.append({"endpoint": "offers", "method": "GET"})
+        return web.json_response(_page(state.offers))
+
+    @routes.get("/assets")
+    async def get_assets(request):
+        code = request.query.get("asset_code")
+        issuer = request.query.get("asset_issuer")
+        state.requests.append(
+            {"endpoint": "assets", "method": "GET", "asset_code": code}
+        )
+        records = []
+        if (code, issuer) in state.assets:
+            records.append(
+                {"asset_code": code, "asset_issuer": issuer, "asset_type": "credit"}
+            )
+        return web.json_response(_page(records))
+
+    @routes.get("/transactions/{tx_hash}")
+    async def get_transaction(request):
+        state.requests.append(
+            {
+                "endpoint": "transactions",
+                "method": "GET",
+                "tx_hash": request.match_info["tx_hash"],
+            }
+        )
+        return web.json_response(
+            {"status": 404, "title": "Resource Missing"}, status=404
+        )
+
     @routes.get("/")
     async def root(request):
         return web.json_response(
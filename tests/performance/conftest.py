@@ -0,0 +1,153 @@
+"""
+Benchmark harness for the performance suite.
+
+Benchmarks are marked with ``@pytest.mark.performance`` and are skipped
+unless selected explicitly:
+
+    pytest -m performance --no-cov tests/performance
+
+Each benchmark runs the measured coroutine ``rounds`` times and compares the
+median against ``baseline.json``. Environment variables:
+
+- PERF_MAX_REGRESSION: allowed slowdown vs baseline, fraction (default 0.5);
+  a baseline entry may override it with its own ``max_regression``;
+- PERF_MIN_DELTA_MS: slowdowns smaller than this are noise (default 1.0);
+- PERF_UPDATE_BASELINE=1: write measured medians to baseline.json instead
+  of comparing;
+- PERF_RESULTS_PATH: where to write results of the run
+  (default log/perf_results.json).
+"""
+
+import json
+import os
+import pathlib
+import statistics
+from time import perf_counter
+
+import pytest
+from _pytest.mark.expression import Expression
+
+from other.endpoint_pool import Endpoint, horizon_pool
+
+BASELINE_PATH = pathlib.Path(__file__).with_name("baseline.json")
+
+_results: dict[str, dict] = {}
+
+
+def _env_float(name: str, default: float) -> float:
+    return float(os.getenv(name) or default)
+
+
+def _update_baseline() -> bool:
+    return os.getenv("PERF_UPDATE_BASELINE") == "1"
+
+
+def _load_baseline() -> dict[str, dict]:
+    if not BASELINE_PATH.exists():
+        return {}
+    return json.loads(BASELINE_PATH.read_text())
+
+
+def _performance_selected(markexpr: str) -> bool:
+    """True if the -m expression selects tests marked ``performance``."""
+    if not markexpr:
+        return False
+    return Expression.compile(markexpr).evaluate(
+        lambda name, **kwargs: name == "performance"
+    )
+
+
+def pytest_collection_modifyitems(config, items):
+    if _performance_selected(config.getoption("markexpr") or ""):
+        return
+    skip = pytest.mark.skip(reason="benchmark: run with -m performance")
+    for item in items:
+        if "performance" in item.keywords:
+            item.add_marker(skip)
+
+
+def pytest_sessionfinish(session):
+    if not _results:
+        return
+    results_path = pathlib.Path(
+        os.getenv("PERF_RESULTS_PATH") or "log/perf_results.json"
+    )
+    results_path.parent.mkdir(parents=True, exist_ok=True)
+    results_path.write_text(json.dumps(_results, indent=2, sort_keys=True) + "\n")
+
+    if _update_baseline():
+        baseline = _load_baseline()
+        for name, result in _results.items():
+            entry = baseline.setdefault(name, {})
+            entry["median_ms"] = result["median_ms"]
+            entry["rounds"] = result["rounds"]
+        BASELINE_PATH.write_text(json.dumps(baseline, indent=2, sort_keys=True) + "\n")
+
+
+class Benchmark:
+    """Times an async callable and checks the median against the baseline."""
+
+    def __init__(self, name: str):
+        self.name = name
+
+    async def __call__(self, func, *, rounds: int = 20, warmup: int = 2, setup=None):
+        """
+        Run ``await func()`` warmup + rounds times, return the last result.
+
+        ``setup`` (optional coroutine function) runs before every call and
+        is not timed, e.g. to reset DB rows the measured call changes.
+        """
+        result = None
+        timings = []
+        for idx in range(warmup + rounds):
+            if setup is not None:
+                await setup()
+            started = perf_counter()
+            result = await func()
+            if idx >= warmup:
+                timings.append(perf_counter() - started)
+
+        median_ms = statistics.median(timings) * 1000
+        _results[self.name] = {
+            "median_ms": round(median_ms, 3),
+            "min_ms": round(min(timings) * 1000, 3),
+            "max_ms": round(max(timings) * 1000, 3),
+            "rounds": rounds,
+        }
+        self._check(median_ms)
+        return result
+
+    def _check(self, median_ms: float):
+        if _update_baseline():
+            return
+        baseline = _load_baseline().get(self.name)
+        if baseline is None:
+            return
+        max_regression = baseline.get(
+            "max_regression", _env_float("PERF_MAX_REGRESSION", 0.5)
+        )
+        limit_ms = max(
+            baseline["median_ms"] * (1 + max_regression),
+            baseline["median_ms"] + _env_float("PERF_MIN_DELTA_MS", 1.0),
+        )
+        if median_ms > limit_ms:
+            pytest.fail(
+                f"{self.name}: median {median_ms:.3f} ms > {limit_ms:.3f} ms "
+                f"(baseline {baseline['median_ms']:.3f} ms, "
+                f"+{max_regression:.0%} allowed)"
+            )
+
+
+@pytest.fixture
+def benchmark(request):
+    """Benchmark named after the test (parametrize id included)."""
+    return Benchmark(request.node.name)
+
+
+@pytest.fixture
+def horizon_stub(mock_horizon, horizon_server_config, monkeypatch):
+    """mock_horizon as the only Horizon endpoint of horizon_pool."""
+    monkeypatch.setattr(
+        horizon_pool, "endpoints", [Endpoint(horizon_server_config["url"])]
+    )
+    return mock_horizon
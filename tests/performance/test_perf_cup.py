@@ -0,0 +1,37 @@
+"""
+Benchmark for the /cup orderbook aggregation.
+
+routers/cup uses the synchronous stellar_sdk.Server, which would block the
+loop the mock Horizon server runs on, so offers come from the same
+make_offer_records stub through a fake Server.
+"""
+
+from unittest.mock import MagicMock, patch
+
+import pytest
+
+from tests.fixtures.horizon import make_offer_records
+
+EURMTL = "EURMTL-GACKTN5DAZGWXRWB2WLM6OPBDHAMT6SJNGLJZPQMEZBUR4JUGBX2UK7V"
+
+
+@pytest.mark.performance
+@pytest.mark.asyncio
+async def test_cup_orderbook_aggregation(client, benchmark):
+    sellers = {"_embedded": {"records": make_offer_records(200, seed=1)}}
+    buyers = {"_embedded": {"records": make_offer_records(200, base_price=4.0, seed=2)}}
+
+    with patch("routers.cup.Server") as MockServer:
+        offers = MockServer.return_value.offers.return_value
+        offers.for_selling.return_value.for_buying.return_value.limit.return_value.call = MagicMock(
+            return_value=sellers
+        )
+        offers.for_buying.return_value.for_selling.return_value.limit.return_value.call = MagicMock(
+            return_value=buyers
+        )
+
+        response = await benchmark(lambda: client.get(f"/cup/XLM/{EURMTL}"))
+
+    assert response.status_code == 200
+    body = await response.get_data(as_text=True)
+    assert body.count("<tr") > 100
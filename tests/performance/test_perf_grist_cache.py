@@ -0,0 +1,88 @@
+"""
+Benchmarks for GristCacheManager lookups and load_users_from_grist.
+"""
+
+from types import SimpleNamespace
+from unittest.mock import AsyncMock, patch
+
+import pytest
+import pytest_asyncio
+
+from other.grist_cache import GristCacheManager
+from other.grist_tools import grist_cash, load_users_from_grist
+
+USER_COUNT = 5000
+
+
+def _account_id(idx: int) -> str:
+    return f"G{idx:055d}"
+
+
+@pytest_asyncio.fixture
+async def users_cache():
+    cache = GristCacheManager()
+    records = [
+        {
+            "account_id": _account_id(idx),
+            "telegram_id": 1000 + idx,
+            "username": f"@user{idx}",
+        }
+        for idx in range(USER_COUNT)
+    ]
+    with (
+        patch("other.grist_tools.MTLGrist", new=SimpleNamespace(EURMTL_users="users")),
+        patch(
+            "other.grist_tools.grist_manager.load_table_data",
+            new=AsyncMock(return_value=records),
+        ),
+    ):
+        await cache.load_table_to_cache("EURMTL_users")
+    return cache
+
+
+@pytest.mark.performance
+@pytest.mark.asyncio
+async def test_grist_cache_index_lookups(users_cache, benchmark):
+    keys = [_account_id(idx) for idx in range(0, USER_COUNT, 5)]
+
+    async def lookups():
+        found = [users_cache.find_by_index("EURMTL_users", key) for key in keys]
+        found += [
+            users_cache.find_by_index("EURMTL_users", 1000 + idx, field="telegram_id")
+            for idx in range(0, USER_COUNT, 5)
+        ]
+        return found
+
+    found = await benchmark(lookups)
+
+    assert all(found)
+
+
+@pytest.mark.performance
+@pytest.mark.asyncio
+async def test_grist_cache_filter_scan(users_cache, benchmark):
+    values = [_account_id(idx) for idx in range(0, USER_COUNT, 50)]
+
+    async def scan():
+        return users_cache.find_by_filter("EURMTL_users", "account_id", values)
+
+    found = await benchmark(scan)
+
+    assert len(found) == len(values)
+
+
+@pytest.mark.performance
+@pytest.mark.asyncio
+async def test_load_users_from_grist(users_cache, benchmark):
+    account_ids = [_account_id(idx) for idx in range(0, USER_COUNT, 50)]
+
+    async def reset_users_cache():
+        grist_cash.clear()
+
+    with patch("other.grist_cache.grist_cache", users_cache):
+        users = await benchmark(
+            lambda: load_users_from_grist(account_ids), setup=reset_users_cache
+        )
+
+    assert len(users) == len(account_ids)
+    grist_cash.clear()
@@ -0,0 +1,145 @@
+"""
+Benchmarks for transaction signing paths on the SQLite fixture DB:
+TransactionService.get_transaction_details, sign_transaction_from_xdr and
+services/stellar_client.extract_sources.
+"""
+
+import json
+import pathlib
+
+import pytest
+from sqlalchemy import delete
+from stellar_sdk import Account, Asset, Keypair, Network, TransactionBuilder
+
+from db.sql_models import Signatures, Signers, Transactions
+from services.stellar_client import extract_sources
+from services.transaction_service import TransactionService
+
+
+def _keypair(idx: int) -> Keypair:
+    return Keypair.from_raw_ed25519_seed(idx.to_bytes(32, "big"))
+
+
+def _build_envelope(source: Keypair, ops: int = 3):
+    builder = TransactionBuilder(
+        Account(source.public_key, 1000),
+        network_passphrase=Network.PUBLIC_NETWORK_PASSPHRASE,
+        base_fee=100,
+    ).add_time_bounds(0, 1893456000)
+    for idx in range(ops):
+        builder.append_payment_op(_keypair(9000 + idx).public_key, Asset.native(), "1")
+    return builder.build()
+
+
+async def _seed_multisig(db_session, signer_count: int, signed_count: int):
+    """Transaction of one source with signer_count signers, signed_count signed."""
+    source = _keypair(1)
+    signers = [_keypair(100 + idx) for idx in range(signer_count)]
+    envelope = _build_envelope(source)
+    tx_hash = envelope.hash_hex()
+
+    sources = {
+        source.public_key: {
+            "threshold": signer_count // 2 + 1,
+            "signers": [
+                [kp.public_key, 1, kp.signature_hint().hex()] for kp in signers
+            ],
+        }
+    }
+    db_session.add(
+        Transactions(
+            hash=tx_hash,
+            description="benchmark multisig",
+            body=envelope.to_xdr(),
+            json=json.dumps(sources),
+            source_account=source.public_key,
+        )
+    )
+    for idx, kp in enumerate(signers, start=1):
+        db_session.add(
+            Signers(
+                id=idx,
+                username=f"@signer{idx}",
+                public_key=kp.public_key,
+                signature_hint=kp.signature_hint().hex(),
+            )
+        )
+    for idx, kp in enumerate(signers[:signed_count], start=1):
+        db_session.add(
+            Signatures(
+                signature_xdr=kp.sign_decorated(envelope.hash())
+                .to_xdr_object()
+                .to_xdr(),
+                transaction_hash=tx_hash,
+                signer_id=idx,
+            )
+        )
+    await db_session.commit()
+    return envelope, signers
+
+
+@pytest.mark.performance
+@pytest.mark.asyncio
+@pytest.mark.parametrize("signer_count", [5, 20, 50])
+async def test_get_transaction_details(
+    signer_count, app, db_session, horizon_stub, benchmark
+):
+    # Конверт держит не больше 20 подписей
+    signed_count = min(signer_count // 2, 20)
+    envelope, _ = await _seed_multisig(db_session, signer_count, signed_count)
+    service = TransactionService(db_session)
+
+    async with app.test_request_context("/"):
+        details = await benchmark(
+            lambda: service.get_transaction_details(envelope.hash_hex(), 0)
+        )
+
+    assert len(details["signers_table"][0]["signers"]) == signer_count
+    assert len(details["signatures"]) == signed_count
+
+
+@pytest.mark.performance
+@pytest.mark.asyncio
+async def test_sign_transaction_from_xdr_many_signatures(
+    app, db_session, horizon_stub, benchmark
+):
+    signer_count = 20
+    envelope, signers = await _seed_multisig(db_session, signer_count, 0)
+    tx_hash = envelope.hash_hex()
+    for kp in signers:
+        envelope.sign(kp)
+    signed_xdr = envelope.to_xdr()
+    service = TransactionService(db_session)
+
+    async def reset_signatures():
+        await db_session.execute(
+            delete(Signatures).where(Signatures.transaction_hash == tx_hash)
+        )
+        await db_session.commit()
+
+    async with app.app_context():
+        result = await benchmark(
+            lambda: service.sign_transaction_from_xdr(signed_xdr),
+            rounds=10,
+            setup=reset_signatures,
+        )
+
+    assert result["SUCCESS"]
+    assert len(result["MESSAGES"]) == signer_count
+
+
+@pytest.mark.performance
+@pytest.mark.asyncio
+async def test_extract_sources(app, horizon_stub, benchmark):
+    xdr = pathlib.Path("tests/fixtures/xdr/classic_ops_100.xdr").read_text().strip()
+    signers = [(_keypair(200 + idx).public_key, 1) for idx in range(10)]
+    thresholds = {"low_threshold": 1, "med_threshold": 3, "high_threshold": 5}
+    for idx in [1, 30, 31, 32, 33, 34]:
+        account_id = Keypair.from_raw_ed25519_seed(bytes([idx]) * 32).public_key
+        horizon_stub.set_account_signers(account_id, signers, thresholds)
+
+    async with app.app_context():
+        sources = await benchmark(lambda: extract_sources(xdr))
+
+    assert len(sources) == 6
+    assert all(len(data["signers"]) == 10 for data in sources.values())
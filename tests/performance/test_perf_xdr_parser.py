@@ -0,0 +1,43 @@
+"""
+Benchmarks for services/xdr_parser.decode_xdr_to_text.
+"""
+
+import pathlib
+from unittest.mock import AsyncMock, patch
+
+import pytest
+
+from services.xdr_parser import decode_xdr_to_text
+
+XDR_FIXTURES = pathlib.Path("tests/fixtures/xdr")
+
+
+def _read_xdr(name: str) -> str:
+    return (XDR_FIXTURES / f"{name}.xdr").read_text().strip()
+
+
+@pytest.mark.performance
+@pytest.mark.asyncio
+@pytest.mark.parametrize("ops", [1, 10, 100])
+async def test_decode_classic_ops(ops, app, horizon_stub, benchmark):
+    xdr = _read_xdr(f"classic_ops_{ops}")
+
+    async with app.app_context():
+        result = await benchmark(lambda: decode_xdr_to_text(xdr), rounds=10)
+
+    assert len(result) > ops
+
+
+@pytest.mark.performance
+@pytest.mark.asyncio
+async def test_decode_soroban_swap(app, horizon_stub, benchmark):
+    xdr = _read_xdr("swap_chained_with_xlm_transfer")
+
+    with patch(
+        "services.xdr_parser.read_token_contract_display_name",
+        new=AsyncMock(return_value="EURMTL"),
+    ):
+        async with app.app_context():
+            result = await benchmark(lambda: decode_xdr_to_text(xdr), rounds=10)
+
+    assert result
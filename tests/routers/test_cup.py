@@ -1,5 +1,5 @@
 import pytest
-from unittest.mock import patch, MagicMock
+from unittest.mock import AsyncMock, patch, MagicMock
 
 
 @pytest.mark.asyncio
@@ -44,20 +44,15 @@ async def test_cup_trades(client):
 @pytest.mark.asyncio
 async def test_cup_swap(client):
     """Test /cup/swap/<asset1>/<asset2>"""
-    mock_paths_resp = {"_embedded": {"records": []}}
-
-    with patch("routers.cup.Server") as MockServer:
-        mock_server = MockServer.return_value
-        # strict_send_paths
-        mock_server.strict_send_paths.return_value.limit.return_value.call = MagicMock(
-            return_value=mock_paths_resp
-        )
-        # strict_receive_paths
-        mock_server.strict_receive_paths.return_value.limit.return_value.call = (
-            MagicMock(return_value=mock_paths_resp)
-        )
+    ladder = {
+        "sellers": [("10", "20"), ("1", "2")],
+        "buyers": [("1", "0.5"), ("10", "5")],
+    }
 
+    with patch("routers.cup.get_swap_ladder", AsyncMock(return_value=ladder)):
         response = await client.get(
             "/cup/swap/XLM/EURMTL-GACKTN5DAZGWXRWB2WLM6OPBDHAMT6SJNGLJZPQMEZBUR4JUGBX2UK7V"
         )
         assert response.status_code == 200
+        body = await response.get_data(as_text=True)
+        assert "0.5" in body
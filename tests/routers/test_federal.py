@@ -159,6 +159,61 @@ async def test_federal_federation_not_found_uses_sep2_status_and_cors(client, ap
     assert await response.get_json() == {"error": "Not found."}
 
 
+@pytest.mark.asyncio
+async def test_federal_federation_serves_lookups_from_memory(client, app, db_session):
+    db_session.add(
+        Addresses(stellar_address="bob*eurmtl.me", account_id="GBOB", memo="42")
+    )
+    await db_session.commit()
+
+    assert (
+        await client.get("/federation?q=bob*eurmtl.me&type=name")
+    ).status_code == 200
+
+    def broken_pool():
+        raise AssertionError("federation lookup must not touch the database")
+
+    app.db_pool = broken_pool
+    response = await client.get("/federation?q=BOB*eurmtl.me&type=name")
+    assert await response.get_json() == {
+        "stellar_address": "bob*eurmtl.me",
+        "account_id": "GBOB",
+        "memo_type": "text",
+        "memo": "42",
+    }
+    response = await client.get("/federation?q=GBOB&type=id")
+    assert await response.get_json() == {
+        "stellar_address": "bob*eurmtl.me",
+        "account_id": "GBOB",
+    }
+    # Промах сразу после загрузки индекса тоже отвечается из памяти
+    response = await client.get("/federation?q=nobody*eurmtl.me&type=name")
+    assert response.status_code == 404
+
+
+@pytest.mark.asyncio
+async def test_federal_federation_index_refreshes_after_admin_create(
+    client, db_session
+):
+    response = await client.get("/federation?q=carol*eurmtl.me&type=name")
+    assert response.status_code == 404
+
+    with patch("routers.federal.check_user_weight", new=AsyncMock(return_value=1)):
+        await client.post(
+            "/federation/addresses",
+            form={
+                "action": "create",
+                "stellar_address": "carol*eurmtl.me",
+                "account_id": "GCAROL",
+                "memo": "",
+            },
+        )
+
+    response = await client.get("/federation?q=carol*eurmtl.me&type=name")
+    assert response.status_code == 200
+    assert (await response.get_json())["account_id"] == "GCAROL"
+
+
 @pytest.mark.asyncio
 async def test_federal_stellar_toml(client):
     """Test /.well-known/stellar.toml"""
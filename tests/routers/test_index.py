@@ -50,6 +50,19 @@ async def test_index_err_with_auth_no_file(client):
             assert (await response.get_data(as_text=True)) == "No error"
 
 
+@pytest.mark.asyncio
+async def test_loop_stats_requires_signer(client):
+    with patch("routers.index.check_user_weight", new=AsyncMock(return_value=0)):
+        response = await client.get("/loop_stats")
+    assert response.status_code == 403
+
+    with patch("routers.index.check_user_weight", new=AsyncMock(return_value=1)):
+        response = await client.get("/loop_stats")
+    data = await response.get_json()
+    assert data["running"] is False
+    assert data["stalls"] == 0
+
+
 @pytest.mark.asyncio
 async def test_index_myip(client):
     """Test /myip route"""
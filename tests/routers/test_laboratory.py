@@ -29,10 +29,11 @@ async def test_lab_mtl_accounts(client):
         {"description": "Test", "account_id": "GABCDEFGHIJKLMNOPQRSTUVWXYZ123456"}
     ]
     with patch(
-        "routers.laboratory.grist_manager.load_table_data",
+        "routers.laboratory.grist_cache.find_or_fetch",
         new=AsyncMock(return_value=mock_accounts),
-    ):
+    ) as find_or_fetch:
         response = await client.get("/lab/mtl_accounts")
+        assert find_or_fetch.await_args.args == ("EURMTL_accounts",)
         assert response.status_code == 200
         data = await response.get_json()
         assert any("Test" in k for k in data.keys())
@@ -46,7 +47,7 @@ async def test_lab_sequence(client):
     mock_response.data = {"sequence": "100"}
 
     with patch(
-        "routers.laboratory.http_session_manager.get_web_request",
+        "other.endpoint_pool.http_session_manager.get_web_request",
         new=AsyncMock(return_value=mock_response),
     ):
         response = await client.get("/lab/sequence/GABC")
@@ -60,7 +61,7 @@ async def test_lab_mtl_assets(client):
     """Test /lab/mtl_assets"""
     mock_assets = [{"code": "EURMTL", "issuer": "GABC"}]
     with patch(
-        "routers.laboratory.grist_manager.load_table_data",
+        "routers.laboratory.grist_cache.find_or_fetch",
         new=AsyncMock(return_value=mock_assets),
     ):
         response = await client.get("/lab/mtl_assets")
@@ -1,5 +1,9 @@
+import asyncio
+
 import pytest
-from unittest.mock import patch
+from unittest.mock import AsyncMock, patch
+
+from routers import rely
 
 
 @pytest.mark.asyncio
@@ -34,3 +38,144 @@ async def test_rely_webhook_success(client):
             assert response.status_code == 200
             # process task is created in background, tricky to assert it ran without ensuring loop execution
             # but we assert response is 200
+
+
+@pytest.mark.asyncio
+async def test_rely_payload_queues_each_deal_once():
+    processed = []
+    release = asyncio.Event()
+
+    async def fake_process(record, is_result=False, context=None):
+        await release.wait()
+        processed.append((record.id, is_result))
+
+    payload = [
+        {"id": 1, "Checked": True},
+        {"id": 1, "Checked": True},
+        {"id": 2, "Result_Checked": True},
+        {"id": 3, "Checked": True, "Transaction": "done"},
+    ]
+    with patch("routers.rely._process_deal_transaction", new=fake_process):
+        assert await rely._process_grist_payload(payload) is True
+        release.set()
+        await rely.deal_jobs.drain(timeout=1)
+
+    assert sorted(processed) == [(1, False), (2, True)]
+
+
+@pytest.mark.asyncio
+async def test_rely_webhook_returns_busy_when_queue_is_full(client):
+    with (
+        patch("routers.rely.config") as mock_config,
+        patch("routers.rely._process_grist_payload", new=AsyncMock(return_value=False)),
+    ):
+        mock_config.grist_income = "secret"
+        response = await client.post(
+            "/rely/grist-webhook",
+            headers={"Authorization": "Bearer secret"},
+            json=[{"id": 1, "Checked": True}],
+        )
+
+    assert response.status_code == 503
+
+
+@pytest.mark.asyncio
+async def test_rely_deal_lock_serializes_and_is_dropped_after_use():
+    order = []
+
+    async def use_lock(name):
+        async with rely._deal_lock(10):
+            order.append(f"{name}-in")
+            await asyncio.sleep(0)
+            order.append(f"{name}-out")
+
+    await asyncio.gather(use_lock("a"), use_lock("b"))
+
+    assert order == ["a-in", "a-out", "b-in", "b-out"]
+    assert 10 not in rely.deal_locks
+    assert 10 not in rely.deal_lock_users
+
+
+@pytest.mark.asyncio
+async def test_rely_context_resolves_batch_with_one_query_per_table():
+    grist_api = AsyncMock()
+    grist_api.fetch_data.side_effect = [
+        [
+            {"id": 1, "Deal": 10, "Participant": 5, "Amount": 1, "Done": False},
+            {"id": 2, "Deal": 11, "Participant": 5, "Amount": 2, "Done": True},
+            {"id": 3, "Deal": 11, "Participant": 6, "Amount": 3, "Done": True},
+        ],
+        [
+            {"id": 5, "Stellar": "GA", "Telegram": "alice"},
+            {"id": 6, "Stellar": "GB", "Telegram": "bob"},
+        ],
+    ]
+    with (
+        patch.object(rely.participant_repo, "_grist_api", grist_api),
+        patch.object(
+            rely, "holder_repo", rely.GristHolderRepository(grist_api, cache_ttl=60)
+        ),
+    ):
+        context = rely.DealResolutionContext([10, 11])
+        first = rely.Deal(
+            rely.DealRecord(id=10, checked=True, result_checked=False), context
+        )
+        second = rely.Deal(
+            rely.DealRecord(id=11, checked=True, result_checked=False), context
+        )
+        await asyncio.gather(first._load_participants(), second._load_participants())
+
+    assert [p.stellar for p in first.participants] == ["GA"]
+    assert [p.stellar for p in second.participants] == ["GA", "GB"]
+    assert grist_api.fetch_data.await_count == 2
+    assert grist_api.fetch_data.await_args_list[0].kwargs["filter_dict"] == {
+        "Deal": [10, 11]
+    }
+    assert grist_api.fetch_data.await_args_list[1].kwargs["filter_dict"] == {
+        "id": [5, 6]
+    }
+
+
+@pytest.mark.asyncio
+async def test_rely_context_retries_after_failed_participants_query():
+    grist_api = AsyncMock()
+    grist_api.fetch_data.side_effect = [
+        Exception("grist is down"),
+        [{"id": 1, "Deal": 11, "Participant": 5, "Amount": 1, "Done": False}],
+        [{"id": 5, "Stellar": "GA", "Telegram": "alice"}],
+    ]
+    with (
+        patch.object(rely.participant_repo, "_grist_api", grist_api),
+        patch.object(
+            rely, "holder_repo", rely.GristHolderRepository(grist_api, cache_ttl=60)
+        ),
+    ):
+        context = rely.DealResolutionContext([10, 11])
+        failed = await rely.Deal(
+            rely.DealRecord(id=10, checked=True, result_checked=False), context
+        ).process_any_transaction()
+        second = rely.Deal(
+            rely.DealRecord(id=11, checked=True, result_checked=False), context
+        )
+        await second._load_participants()
+
+    assert failed.success is False
+    assert "Grist" in failed.errors[0]
+    assert [p.stellar for p in second.participants] == ["GA"]
+    assert grist_api.fetch_data.await_count == 3
+
+
+@pytest.mark.asyncio
+async def test_rely_holder_repository_fetches_only_uncached_holders():
+    grist_api = AsyncMock()
+    grist_api.fetch_data.side_effect = [
+        [{"id": 5, "Stellar": "GA", "Telegram": "alice"}],
+        [{"id": 6, "Stellar": "GB", "Telegram": "bob"}],
+    ]
+    repo = rely.GristHolderRepository(grist_api, cache_ttl=60)
+
+    await repo.get_holders_by_ids([5])
+    holders = await repo.get_holders_by_ids([5, 6])
+
+    assert sorted(holders) == [5, 6]
+    assert grist_api.fetch_data.await_args.kwargs["filter_dict"] == {"id": [6]}
@@ -76,6 +76,28 @@ async def test_remote_get_xdr(client):
         assert data["xdr"] == "AAAA..."
 
 
+@pytest.mark.asyncio
+async def test_remote_get_xdr_is_cacheable_and_revalidates(client):
+    """/remote/get_xdr/<hash> is immutable: ETag + 304 without a second DB read."""
+    mock_tx = AsyncMock()
+    mock_tx.body = "AAAA..."
+    url = "/remote/get_xdr/" + "1" * 64
+
+    with patch("routers.remote.TransactionService") as MockService:
+        mock_instance = MockService.return_value
+        mock_instance.get_transaction_by_hash = AsyncMock(return_value=mock_tx)
+
+        response = await client.get(url)
+        assert "immutable" in response.headers["Cache-Control"]
+
+        revalidated = await client.get(
+            url, headers={"If-None-Match": response.headers["ETag"]}
+        )
+
+    assert revalidated.status_code == 304
+    mock_instance.get_transaction_by_hash.assert_awaited_once()
+
+
 @pytest.mark.asyncio
 async def test_remote_add_transaction_save_error_returns_generic_503(client):
     """POST /remote/add_transaction should hide internal save errors."""
@@ -97,3 +119,23 @@ async def test_remote_add_transaction_save_error_returns_generic_503(client):
     assert await response.get_json() == {
         "message": "Transaction could not be saved. Please try again later."
     }
+
+
+@pytest.mark.asyncio
+async def test_remote_good_assets_groups_cached_assets_by_issuer(client):
+    assets = [
+        {"issuer": "GA", "name": "EURMTL"},
+        {"issuer": "GA", "name": "MTL"},
+        {"issuer": "GB", "name": "SATSMTL"},
+    ]
+    with patch(
+        "routers.remote.grist_cache.find_or_fetch", new=AsyncMock(return_value=assets)
+    ):
+        response = await client.get("/remote/good_assets")
+
+    assert await response.get_json() == {
+        "accounts": [
+            {"account": "GA", "assets": [{"asset": "EURMTL"}, {"asset": "MTL"}]},
+            {"account": "GB", "assets": [{"asset": "SATSMTL"}]},
+        ]
+    }
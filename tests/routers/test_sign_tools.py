@@ -124,6 +124,47 @@ async def test_sign_tools_decode(client):
             assert "Line 1" in data
 
 
+@pytest.mark.asyncio
+async def test_sign_tools_decode_degrades_when_call_budget_is_spent(app, client):
+    """Test GET /decode/<hash> renders what it has once the call budget is spent."""
+    from stellar_sdk import Account, Asset, Keypair, Network, TransactionBuilder
+
+    from other.request_context import record_call, start_trace
+
+    source = Keypair.random().public_key
+    mock_tx = MagicMock()
+    mock_tx.body = (
+        TransactionBuilder(
+            Account(source, 10), Network.PUBLIC_NETWORK_PASSPHRASE, base_fee=10000
+        )
+        .append_payment_op(Keypair.random().public_key, Asset.native(), "1")
+        .set_timeout(300)
+        .build()
+        .to_xdr()
+    )
+
+    @app.before_request
+    async def spend_budget():
+        start_trace("/decode", budget=1)
+        record_call("horizon", "accounts", 0.01)
+
+    with (
+        patch("routers.sign_tools.TransactionService") as MockService,
+        patch("other.endpoint_pool.http_session_manager.get_web_request") as web,
+    ):
+        mock_instance = MockService.return_value
+        mock_instance.get_transaction_by_hash = AsyncMock(return_value=mock_tx)
+        response = await client.get("/decode/" + "0" * 64)
+
+    assert response.status_code == 200
+    assert response.headers["Cache-Control"] == "no-store"
+    data = await response.get_data(as_text=True)
+    assert "Sequence Number 11" in data
+    assert "(баланс не показан)" in data
+    assert "превышен лимит внешних запросов" in data
+    web.assert_not_called()
+
+
 @pytest.mark.asyncio
 async def test_sign_tools_decode_adds_ipfs_link(client):
     """Test GET /decode/<hash> adds local IPFS preview link for ipfshash ManageData."""
@@ -149,13 +190,16 @@ async def test_sign_tools_decode_adds_ipfs_link(client):
 
 
 @pytest.mark.asyncio
-async def test_ipfs_view_decodes_fulldescription(client):
+async def test_ipfs_view_decodes_fulldescription(client, tmp_path):
     """Test GET /ipfs/<cid> fetches JSON metadata and decodes fulldescription."""
     metadata = '{"name":"MVP","fulldescription":"SGVsbG8="}'
 
-    with patch(
-        "routers.sign_tools.http_session_manager.get_web_request",
-        new=AsyncMock(return_value=MagicMock(status=200, data=metadata)),
+    with (
+        patch("other.ipfs_tools.ipfs_cache.path", str(tmp_path)),
+        patch(
+            "other.ipfs_tools.http_session_manager.get_web_request",
+            new=AsyncMock(return_value=MagicMock(status=200, data=metadata)),
+        ),
     ):
         response = await client.get("/ipfs/bafytestcid123")
         assert response.status_code == 200
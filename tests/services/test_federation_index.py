@@ -0,0 +1,40 @@
+import pytest
+
+from services.federation_index import FederationIndex
+
+
+class CountingIndex(FederationIndex):
+    def __init__(self, by_name, **kwargs):
+        super().__init__(**kwargs)
+        self.rows = by_name
+        self.loads = 0
+
+    async def _load(self, db_pool):
+        self.loads += 1
+        return dict(self.rows), {}
+
+
+@pytest.mark.asyncio
+async def test_misses_are_cached_and_rebuilds_are_rate_limited():
+    index = CountingIndex({}, miss_rebuild_seconds=0)
+
+    assert await index.lookup_name(None, "ghost*eurmtl.me") is None
+    assert index.loads == 2  # первая загрузка и перепроверка на промахе
+
+    index.rows = {"ghost*eurmtl.me": {"account_id": "GGHOST"}}
+    # Промах закеширован, БД не читаем
+    assert await index.lookup_name(None, "ghost*eurmtl.me") is None
+    assert index.loads == 2
+
+    index.invalidate()
+    assert await index.lookup_name(None, "Ghost*EURMTL.me") == {"account_id": "GGHOST"}
+    assert index.loads == 3
+
+
+@pytest.mark.asyncio
+async def test_miss_does_not_reload_fresh_index():
+    index = CountingIndex({}, miss_rebuild_seconds=60)
+
+    assert await index.lookup_name(None, "a*eurmtl.me") is None
+    assert await index.lookup_name(None, "b*eurmtl.me") is None
+    assert index.loads == 1
@@ -91,7 +91,6 @@ async def test_load_message_uses_soroban_reader_with_contract_and_message_functi
 
     assert result == {"ok": True, "message": "Long live the king", "error": ""}
     read_mock.assert_awaited_once_with(
-        rpc_url="https://soroban-rpc.mainnet.stellar.gateway.fm",
         contract_id=MOUNTAIN_CONTRACT_ID,
         function_name="message",
     )
@@ -167,7 +166,6 @@ async def test_load_range_returns_normalized_raw_and_eurmtl_values():
     read_mock.assert_awaited_once_with(
         contract_id=MOUNTAIN_CONTRACT_ID,
         function_name="get_range",
-        rpc_url="https://soroban-rpc.mainnet.stellar.gateway.fm",
     )
 
 
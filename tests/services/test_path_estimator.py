@@ -0,0 +1,284 @@
+import asyncio
+import time
+from contextlib import asynccontextmanager
+from types import SimpleNamespace
+from unittest.mock import patch
+
+import pytest
+from stellar_sdk import Asset
+
+from services import swap_ladder
+from services.path_estimator import (
+    EURMTL_KEY,
+    POOL_FEE,
+    MarketEdge,
+    PathEstimator,
+)
+
+ISSUER = "GACKTN5DAZGWXRWB2WLM6OPBDHAMT6SJNGLJZPQMEZBUR4JUGBX2UK7V"
+EURMTL = Asset("EURMTL", ISSUER)
+MTL_KEY = f"MTL:{ISSUER}"
+
+
+def _ready(estimator: PathEstimator, *assets: str) -> PathEstimator:
+    """Единицы этих активов и хабов только что загружены"""
+    now = time.monotonic()
+    for unit in estimator._units_for(assets):
+        estimator._loaded[unit] = now
+    return estimator
+
+
+def _levels(estimator, source, destination, levels, loaded_at=None):
+    edge = estimator._edge(source, destination)
+    edge.levels = levels
+    edge.levels_at = time.monotonic() if loaded_at is None else loaded_at
+
+
+def test_order_book_edge_walks_levels():
+    edge = MarketEdge()
+    edge.levels = [(2.0, 10.0), (1.0, 100.0)]
+
+    assert edge.sell(5) == pytest.approx(10)  # первый уровень целиком
+    assert edge.sell(10) == pytest.approx(10 + 5)
+    assert edge.buy(15) == pytest.approx(5 + 5)
+    assert edge.sell(1000) is None
+    assert edge.buy(1000) is None
+
+
+def test_pool_edge_uses_constant_product_with_fee():
+    edge = MarketEdge()
+    edge.pools["pool"] = (1000.0, 2000.0)
+
+    received = edge.sell(10)
+    amount_in = 10 * (1 - POOL_FEE)
+    assert received == pytest.approx(2000 * amount_in / (1000 + amount_in))
+    assert edge.buy(received) == pytest.approx(10)
+    assert edge.buy(2000) is None
+
+
+def test_apply_order_book_maps_asks_and_bids():
+    estimator = PathEstimator()
+    estimator.apply_order_book(
+        "native",
+        EURMTL_KEY,
+        {
+            "asks": [{"price": "0.5", "amount": "100"}],
+            "bids": [{"price": "0.4", "amount": "40"}],
+        },
+    )
+
+    # 1 XLM продаем по bid: 0.4 EURMTL
+    assert estimator._edges["native"][EURMTL_KEY].sell(1) == pytest.approx(0.4)
+    # ask продает XLM по 0.5 EURMTL, за 1 EURMTL получаем 2 XLM
+    assert estimator._edges[EURMTL_KEY]["native"].sell(1) == pytest.approx(2)
+
+
+def test_strict_send_prefers_better_multi_hop_route():
+    estimator = _ready(PathEstimator(), MTL_KEY)
+    _levels(estimator, "native", MTL_KEY, [(1.0, 1000.0)])
+    _levels(estimator, "native", EURMTL_KEY, [(2.0, 1000.0)])
+    _levels(estimator, EURMTL_KEY, MTL_KEY, [(1.0, 1000.0)])
+
+    received, path = estimator.strict_send("native", 10, MTL_KEY)
+
+    assert received == pytest.approx(20)
+    assert path == (EURMTL_KEY,)
+
+
+def test_strict_receive_finds_cheapest_source_amount():
+    estimator = _ready(PathEstimator(), MTL_KEY)
+    _levels(estimator, "native", MTL_KEY, [(1.0, 1000.0)])
+    _levels(estimator, "native", EURMTL_KEY, [(2.0, 1000.0)])
+    _levels(estimator, EURMTL_KEY, MTL_KEY, [(1.0, 1000.0)])
+
+    spent, path = estimator.strict_receive("native", MTL_KEY, 20)
+
+    assert spent == pytest.approx(10)
+    assert path == (EURMTL_KEY,)
+
+
+def test_estimate_misses_when_not_loaded_or_asset_unknown():
+    estimator = PathEstimator()
+    _levels(estimator, "native", EURMTL_KEY, [(1.0, 1000.0)])
+
+    assert estimator.strict_send("native", 1, EURMTL_KEY) is None  # не обновлялся
+
+    _ready(estimator)
+    assert estimator.strict_send("native", 1, MTL_KEY) is None
+    assert estimator.strict_send("native", 1, EURMTL_KEY) is not None
+
+
+def test_one_stale_unit_is_not_reported_as_fresh():
+    estimator = _ready(PathEstimator(), MTL_KEY)
+    _levels(estimator, "native", MTL_KEY, [(1.0, 1000.0)])
+    estimator.request(MTL_KEY)
+    assert estimator.is_ready()
+    assert estimator.covers("native", MTL_KEY)
+
+    estimator._loaded[("pools", MTL_KEY)] = time.monotonic() - estimator.max_age - 1
+
+    assert not estimator.is_ready()
+    assert not estimator.covers("native", MTL_KEY)
+    assert estimator.covers("native", EURMTL_KEY)
+    assert estimator.strict_send("native", 1, MTL_KEY) is None
+
+
+def test_stale_book_is_skipped_by_path_search():
+    estimator = _ready(PathEstimator(), MTL_KEY)
+    old = time.monotonic() - estimator.max_age - 1
+    _levels(estimator, "native", MTL_KEY, [(5.0, 1000.0)], loaded_at=old)
+    _levels(estimator, "native", EURMTL_KEY, [(1.0, 1000.0)])
+    _levels(estimator, EURMTL_KEY, MTL_KEY, [(1.0, 1000.0)])
+
+    received, path = estimator.strict_send("native", 10, MTL_KEY)
+
+    assert received == pytest.approx(10)
+    assert path == (EURMTL_KEY,)
+
+
+def test_send_records_look_like_horizon_paths():
+    estimator = _ready(PathEstimator())
+    _levels(estimator, "native", EURMTL_KEY, [(0.123456789, 1000.0)])
+
+    records = estimator.send_records(Asset.native(), "1", EURMTL)
+
+    assert records == [
+        {
+            "source_asset_type": "native",
+            "source_amount": "1",
+            "destination_asset_type": "credit_alphanum12",
+            "destination_asset_code": "EURMTL",
+            "destination_asset_issuer": ISSUER,
+            "destination_amount": "0.1234567",
+            "path": [],
+        }
+    ]
+
+
+def test_nothing_is_loaded_without_demand():
+    estimator = PathEstimator()
+    estimator.set_assets([MTL_KEY])
+
+    assert estimator.stale_units() == []
+
+    estimator.request("native", f"USD:{ISSUER}")  # USD нет в списке Grist
+    assert ("pools", f"USD:{ISSUER}") not in estimator.stale_units()
+    assert ("pools", MTL_KEY) not in estimator.stale_units()
+
+
+def test_demand_expires_after_ttl():
+    estimator = PathEstimator(demand_ttl=60)
+    estimator.request(MTL_KEY)
+    assert estimator.stale_units()
+
+    estimator._demand[MTL_KEY] -= 61
+
+    assert estimator.stale_units() == []
+
+
+def test_stale_units_cover_pools_and_hub_books():
+    estimator = PathEstimator()
+    estimator.set_assets([MTL_KEY])
+    estimator.request(MTL_KEY)
+
+    units = estimator.stale_units()
+
+    assert ("pools", MTL_KEY) in units
+    assert ("book", MTL_KEY, "native") in units
+    assert ("book", MTL_KEY, EURMTL_KEY) in units
+    assert ("book", EURMTL_KEY, "native") in units
+    assert ("book", "native", EURMTL_KEY) not in units
+
+
+class FakeMarketServer:
+    def __init__(self):
+        self.calls = []
+
+    def _call(self, name, response):
+        async def call():
+            self.calls.append(name)
+            return response
+
+        return SimpleNamespace(limit=lambda _: SimpleNamespace(call=call))
+
+    def orderbook(self, selling, buying):
+        return self._call(
+            "order_book",
+            {"asks": [], "bids": [{"price": "0.5", "amount": "1000"}]},
+        )
+
+    def liquidity_pools(self):
+        pool = {
+            "id": "pool",
+            "reserves": [
+                {"asset": "native", "amount": "1000"},
+                {"asset": EURMTL_KEY, "amount": "500"},
+            ],
+        }
+        return SimpleNamespace(
+            for_reserves=lambda assets: self._call(
+                "liquidity_pools", {"_embedded": {"records": [pool]}}
+            )
+        )
+
+
+@pytest.mark.asyncio
+async def test_refresh_loads_only_stale_units():
+    server = FakeMarketServer()
+
+    @asynccontextmanager
+    async def server_async(*args, **kwargs):
+        yield server
+
+    estimator = PathEstimator()
+    estimator.set_assets([])
+    with patch("services.path_estimator.ServerAsync", server_async):
+        assert await estimator.refresh() == 0  # спроса нет - в Horizon не ходим
+        estimator.request(EURMTL_KEY, "native")
+        assert await estimator.refresh() == 3
+        assert await estimator.refresh() == 0
+
+    assert sorted(server.calls) == ["liquidity_pools", "liquidity_pools", "order_book"]
+    assert estimator.is_ready()
+    assert estimator.strict_send(EURMTL_KEY, 1, "native") is not None
+
+
+@pytest.mark.asyncio
+async def test_refresh_loop_is_idle_without_demand_and_wakes_on_request():
+    server = FakeMarketServer()
+
+    @asynccontextmanager
+    async def server_async(*args, **kwargs):
+        yield server
+
+    estimator = PathEstimator(refresh_interval=3600)
+    with patch("services.path_estimator.ServerAsync", server_async):
+        estimator.start(list, step=0)
+        try:
+            for _ in range(5):
+                await asyncio.sleep(0)
+            assert server.calls == []
+
+            estimator.request(EURMTL_KEY, "native")
+            for _ in range(20):
+                await asyncio.sleep(0)
+        finally:
+            await estimator.stop()
+
+    assert len(server.calls) == 3
+    assert estimator.covers(EURMTL_KEY, "native")
+
+
+@pytest.mark.asyncio
+async def test_swap_ladder_uses_local_estimate_before_horizon():
+    estimator = _ready(PathEstimator())
+    _levels(estimator, "native", EURMTL_KEY, [(0.5, 100000.0)])
+
+    swap_ladder.paths_cache.cache.clear()
+    with patch("services.swap_ladder.path_estimator", estimator):
+        # любой запрос в Horizon упадет с AttributeError
+        records = await swap_ladder.find_send_paths(
+            SimpleNamespace(), Asset.native(), "10", EURMTL
+        )
+
+    assert records[0]["destination_amount"] == "5.0000000"
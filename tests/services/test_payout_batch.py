@@ -0,0 +1,83 @@
+from unittest.mock import AsyncMock, patch
+
+import pytest
+from stellar_sdk import Keypair, Network, TransactionEnvelope
+
+from services.payout_batch import build_payout_transactions, chunk_payments
+
+SOURCE = Keypair.random().public_key
+ISSUER = Keypair.random().public_key
+
+
+def _payments(count):
+    return [
+        {"account": Keypair.random().public_key, "payment": 1.5} for _ in range(count)
+    ]
+
+
+def test_chunk_payments_drops_zero_amounts_and_splits_by_100():
+    payments = _payments(205) + [{"account": SOURCE, "payment": 0.00000001}]
+
+    chunks = chunk_payments(payments)
+
+    assert [len(chunk) for chunk in chunks] == [100, 100, 5]
+
+
+@pytest.mark.asyncio
+async def test_build_payout_transactions_uses_consecutive_sequences():
+    with (
+        patch("services.payout_batch.pay_divs", AsyncMock(return_value=_payments(250))),
+        patch(
+            "services.payout_batch.sequence_allocator.reserve",
+            AsyncMock(return_value=[11, 12, 13]),
+        ) as reserve,
+    ):
+        transactions = await build_payout_transactions(
+            SOURCE, f"MTL-{ISSUER}", "XLM", 375, memo="divs"
+        )
+
+    reserve.assert_awaited_once_with(SOURCE, 3)
+    envelopes = [
+        TransactionEnvelope.from_xdr(xdr, Network.PUBLIC_NETWORK_PASSPHRASE)
+        for _, xdr in transactions
+    ]
+    assert [envelope.transaction.sequence for envelope in envelopes] == [11, 12, 13]
+    assert [len(envelope.transaction.operations) for envelope in envelopes] == [
+        100,
+        100,
+        50,
+    ]
+
+
+@pytest.mark.asyncio
+async def test_pay_divs_batch_registers_all_transactions_and_shows_overview(client):
+    with (
+        patch("services.payout_batch.pay_divs", AsyncMock(return_value=_payments(150))),
+        patch(
+            "services.payout_batch.sequence_allocator.reserve",
+            AsyncMock(return_value=[21, 22]),
+        ),
+        patch("services.stellar_client.extract_sources", AsyncMock(return_value={})),
+    ):
+        response = await client.post(
+            "/lab/pay_divs_batch",
+            json={
+                "publicKey": SOURCE,
+                "holders": f"MTL-{ISSUER}",
+                "asset": "XLM",
+                "amount": "300",
+                "description": "Dividends MTL",
+            },
+        )
+
+    assert response.status_code == 200
+    data = await response.get_json()
+    assert len(data["hashes"]) == 2
+    assert data["url"] == f"/sign_batch/{SOURCE}/21/2"
+
+    overview = await client.get(data["url"])
+    body = await overview.get_data(as_text=True)
+    assert overview.status_code == 200
+    assert "Dividends MTL (1/2)" in body
+    assert "Dividends MTL (2/2)" in body
+    assert all(tx_hash in body for tx_hash in data["hashes"])
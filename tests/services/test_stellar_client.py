@@ -334,7 +334,8 @@ class TestBuildXdr:
         }
 
         with patch(
-            "stellar_sdk.Server.load_account", return_value=Account(root_key, 1)
+            "services.stellar_client.sequence_allocator.current",
+            AsyncMock(side_effect=AssertionError("sequence is given")),
         ):
             xdr = await stellar_build_xdr(data)
 
@@ -376,7 +377,8 @@ class TestBuildXdr:
         }
 
         with patch(
-            "stellar_sdk.Server.load_account", return_value=Account(root_key, 1)
+            "services.stellar_client.sequence_allocator.current",
+            AsyncMock(side_effect=AssertionError("sequence is given")),
         ):
             xdr = await stellar_build_xdr(data)
 
@@ -456,8 +458,12 @@ class TestBuildXdr:
             ],
         }
 
+        current_sequence = AsyncMock(return_value=1)
         with (
-            patch("stellar_sdk.Server.load_account", return_value=Account(root_key, 1)),
+            patch(
+                "services.stellar_client.sequence_allocator.current",
+                current_sequence,
+            ),
             patch(
                 "services.stellar_client.get_pool_data",
                 AsyncMock(return_value=pool_data),
@@ -465,6 +471,8 @@ class TestBuildXdr:
         ):
             xdr = await stellar_build_xdr(data)
 
+        current_sequence.assert_awaited_once_with(data["publicKey"], refresh=True)
+
         transaction = TransactionEnvelope.from_xdr(
             xdr, Network.PUBLIC_NETWORK_PASSPHRASE
         ).transaction
@@ -513,7 +521,10 @@ class TestBuildXdr:
         }
 
         with (
-            patch("stellar_sdk.Server.load_account", return_value=Account(root_key, 1)),
+            patch(
+                "services.stellar_client.sequence_allocator.current",
+                AsyncMock(return_value=1),
+            ),
             patch(
                 "services.stellar_client.stellar_copy_multi_sign",
                 AsyncMock(
@@ -551,3 +562,4 @@ class TestBuildXdr:
         assert isinstance(transaction.operations[4], ClaimClaimableBalance)
         assert transaction.operations[0].med_threshold == 2
         assert transaction.operations[3].amount == "12.5"
+        assert transaction.sequence == 2
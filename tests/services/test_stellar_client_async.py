@@ -24,6 +24,12 @@ from services.stellar_client import (
 )
 from db.sql_models import Signers, Transactions
 from other.grist_tools import User
+from other.request_context import (
+    CallBudgetExceeded,
+    finish_trace,
+    record_call,
+    start_trace,
+)
 
 
 # === TestCheckPublishState ===
@@ -49,7 +55,7 @@ class TestCheckPublishState:
         with (
             patch("services.stellar_client.current_app", mock_app),
             patch(
-                "services.stellar_client.http_session_manager.get_web_request"
+                "other.endpoint_pool.http_session_manager.get_web_request"
             ) as mock_get,
         ):
             # Mock Horizon API response for successful transaction
@@ -91,7 +97,7 @@ class TestCheckPublishState:
         with (
             patch("services.stellar_client.current_app", mock_app),
             patch(
-                "services.stellar_client.http_session_manager.get_web_request"
+                "other.endpoint_pool.http_session_manager.get_web_request"
             ) as mock_get,
         ):
             # Mock Horizon API response for failed transaction
@@ -125,7 +131,7 @@ class TestCheckPublishState:
         with (
             patch("services.stellar_client.current_app", mock_app),
             patch(
-                "services.stellar_client.http_session_manager.get_web_request"
+                "other.endpoint_pool.http_session_manager.get_web_request"
             ) as mock_get,
         ):
             # Mock Horizon API 404 response
@@ -155,7 +161,7 @@ class TestCheckPublishState:
         with (
             patch("services.stellar_client.current_app", mock_app),
             patch(
-                "services.stellar_client.http_session_manager.get_web_request"
+                "other.endpoint_pool.http_session_manager.get_web_request"
             ) as mock_get,
         ):
             # Mock network error
@@ -186,7 +192,7 @@ class TestCheckPublishState:
         with (
             patch("services.stellar_client.current_app", mock_app),
             patch(
-                "services.stellar_client.http_session_manager.get_web_request"
+                "other.endpoint_pool.http_session_manager.get_web_request"
             ) as mock_get,
         ):
             # Mock successful Horizon response
@@ -532,6 +538,44 @@ class TestAccountHelpers:
         }
         assert await get_available_balance_str("G" + "C" * 55) == ""
 
+    @pytest.mark.asyncio
+    @patch("services.stellar_client.get_account", new_callable=AsyncMock)
+    async def test_get_available_balance_str_skips_when_budget_exceeded(
+        self, mock_get_account
+    ):
+        token = start_trace("/decode/test", budget=1)
+        try:
+            record_call("horizon", "accounts", 0.01)
+            result = await get_available_balance_str("G" + "D" * 55)
+        finally:
+            finish_trace(token)
+
+        assert result == "(баланс не показан)"
+        mock_get_account.assert_not_called()
+
+    @pytest.mark.asyncio
+    async def test_budget_exhaustion_is_not_cached_as_missing_asset(self):
+        asset_obj = MagicMock(code="EURMTL", issuer=Keypair.random().public_key)
+        response = MagicMock(status=200, data={"_embedded": {"records": [{"id": 1}]}})
+
+        token = start_trace("/decode/test", budget=1)
+        try:
+            record_call("horizon", "accounts", 0.01)
+            with patch(
+                "other.endpoint_pool.http_session_manager.get_web_request",
+                AsyncMock(return_value=response),
+            ) as web_request:
+                with pytest.raises(CallBudgetExceeded):
+                    await check_asset.__wrapped__(asset_obj)
+                with pytest.raises(CallBudgetExceeded):
+                    await _fetch_account("acc")
+                # Общая загрузка кеша идет без трассы исчерпавшего бюджет запроса
+                assert await check_asset(asset_obj) == ""
+        finally:
+            finish_trace(token)
+
+        web_request.assert_awaited_once()
+
     @pytest.mark.asyncio
     async def test_fetch_account_and_offers_fallbacks(self):
         response = MagicMock(status=200, data={"balances": [{"asset_type": "native"}]})
@@ -540,7 +584,7 @@ class TestAccountHelpers:
         )
 
         with patch(
-            "services.stellar_client.http_session_manager.get_web_request",
+            "other.endpoint_pool.http_session_manager.get_web_request",
             side_effect=[
                 response,
                 offers_response,
@@ -574,7 +618,7 @@ class TestAccountHelpers:
 
         with (
             patch(
-                "services.stellar_client.http_session_manager.get_web_request",
+                "other.endpoint_pool.http_session_manager.get_web_request",
                 side_effect=[
                     success_response,
                     MagicMock(status=404, data={}),
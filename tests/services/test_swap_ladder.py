@@ -0,0 +1,83 @@
+import asyncio
+from contextlib import asynccontextmanager
+from types import SimpleNamespace
+from unittest.mock import patch
+
+import pytest
+from stellar_sdk import Asset
+
+from services import swap_ladder
+
+EURMTL = Asset("EURMTL", "GACKTN5DAZGWXRWB2WLM6OPBDHAMT6SJNGLJZPQMEZBUR4JUGBX2UK7V")
+
+
+class FakePathsServer:
+    def __init__(self):
+        self.calls = 0
+        self.in_flight = 0
+        self.peak = 0
+
+    def _call(self, record):
+        async def call():
+            self.calls += 1
+            self.in_flight += 1
+            self.peak = max(self.peak, self.in_flight)
+            await asyncio.sleep(0.01)
+            self.in_flight -= 1
+            return {"_embedded": {"records": [record]}}
+
+        return SimpleNamespace(limit=lambda _: SimpleNamespace(call=call))
+
+    def strict_send_paths(self, source_asset, source_amount, destination):
+        return self._call({"destination_amount": str(float(source_amount) * 2)})
+
+    def strict_receive_paths(self, source, destination_asset, amount):
+        return self._call({"source_amount": str(float(amount) / 2)})
+
+
+@pytest.fixture
+def fake_server():
+    server = FakePathsServer()
+
+    @asynccontextmanager
+    async def server_async(*args, **kwargs):
+        yield server
+
+    swap_ladder.paths_cache.cache.clear()
+    with patch("services.swap_ladder.ServerAsync", server_async):
+        yield server
+    swap_ladder.paths_cache.cache.clear()
+
+
+@pytest.mark.asyncio
+async def test_swap_ladder_queries_all_amounts_concurrently(fake_server):
+    ladder = await swap_ladder.get_swap_ladder(Asset.native(), EURMTL)
+
+    assert ladder["sellers"][0] == ("10000", "20000.0")
+    assert ladder["buyers"][0] == ("1", "0.5")
+    assert fake_server.calls == 10
+    assert fake_server.peak == 10
+
+
+@pytest.mark.asyncio
+async def test_swap_ladder_and_lab_paths_share_cache(fake_server):
+    await swap_ladder.get_swap_ladder(Asset.native(), EURMTL)
+    records = await swap_ladder.get_send_paths(Asset.native(), "100", EURMTL)
+    await swap_ladder.get_swap_ladder(Asset.native(), EURMTL)
+
+    assert records == [{"destination_amount": "200.0"}]
+    assert fake_server.calls == 10
+
+
+@pytest.mark.asyncio
+async def test_lab_paths_come_from_horizon_even_with_local_estimate(fake_server):
+    with patch.object(
+        swap_ladder.path_estimator,
+        "send_records",
+        return_value=[{"destination_amount": "1.0"}],
+    ):
+        ladder = await swap_ladder.get_swap_ladder(Asset.native(), EURMTL)
+        records = await swap_ladder.get_send_paths(Asset.native(), "100", EURMTL)
+
+    assert ladder["sellers"][0] == ("10000", "1.0")
+    assert records == [{"destination_amount": "200.0"}]
@@ -102,10 +102,10 @@ async def test_sign_transaction_from_xdr_rejects_bad_xdr(transaction_service):
 async def test_sign_transaction_from_xdr_returns_not_found_for_unknown_transaction(
     transaction_service,
 ):
-    with patch("services.transaction_service.TransactionEnvelope") as envelope_cls:
+    with patch("services.transaction_service.parse_envelope") as parse_envelope:
         envelope = MagicMock()
         envelope.hash_hex.return_value = "a" * 64
-        envelope_cls.from_xdr.return_value = envelope
+        parse_envelope.return_value = envelope
         transaction_service.repo.get_by_hash = AsyncMock(return_value=None)
 
         result = await transaction_service.sign_transaction_from_xdr("AAAA")
@@ -119,11 +119,11 @@ async def test_sign_transaction_from_xdr_returns_not_found_for_unknown_transacti
 async def test_sign_transaction_from_xdr_returns_error_for_bad_transaction_json(
     transaction_service,
 ):
-    with patch("services.transaction_service.TransactionEnvelope") as envelope_cls:
+    with patch("services.transaction_service.parse_envelope") as parse_envelope:
         envelope = MagicMock()
         envelope.hash_hex.return_value = "a" * 64
         envelope.signatures = []
-        envelope_cls.from_xdr.return_value = envelope
+        parse_envelope.return_value = envelope
 
         transaction = Transactions(hash="a" * 64, body="AAAA", json="{bad-json")
         transaction_service.repo.get_by_hash = AsyncMock(return_value=transaction)
@@ -229,12 +229,16 @@ async def test_get_transaction_details_happy_path(transaction_service, mock_sess
                 ]
             ),
         ),
-        patch("services.transaction_service.TransactionEnvelope.from_xdr") as from_xdr,
+        patch("services.transaction_service.parse_envelope") as parse_envelope,
+        patch(
+            "services.transaction_service.copy_envelope",
+            side_effect=lambda envelope: envelope,
+        ),
     ):
         envelope = MagicMock()
         envelope.signatures = []
         envelope.to_xdr.return_value = "full-xdr"
-        from_xdr.return_value = envelope
+        parse_envelope.return_value = envelope
 
         result = await transaction_service.get_transaction_details(
             transaction.hash, 100
@@ -291,7 +295,7 @@ async def test_sign_transaction_from_xdr_handles_existing_signature(
 
     with (
         patch(
-            "services.transaction_service.TransactionEnvelope.from_xdr",
+            "services.transaction_service.parse_envelope",
             return_value=envelope,
         ),
         patch(
@@ -329,7 +333,7 @@ async def test_sign_transaction_from_xdr_rejects_unknown_signature_hint(
 
     with (
         patch(
-            "services.transaction_service.TransactionEnvelope.from_xdr",
+            "services.transaction_service.parse_envelope",
             return_value=envelope,
         ),
         patch(
@@ -367,7 +371,7 @@ async def test_sign_transaction_from_xdr_rejects_unverifiable_signature(
 
     with (
         patch(
-            "services.transaction_service.TransactionEnvelope.from_xdr",
+            "services.transaction_service.parse_envelope",
             return_value=envelope,
         ),
         patch(
@@ -410,7 +414,7 @@ async def test_sign_transaction_from_xdr_adds_valid_signature_and_notifies(
 
     with (
         patch(
-            "services.transaction_service.TransactionEnvelope.from_xdr",
+            "services.transaction_service.parse_envelope",
             return_value=envelope,
         ),
         patch(
@@ -38,6 +38,9 @@ from services.xdr_parser import (
     decode_invoke_host_function,
     decode_xdr_to_text,
     SimulatedLedger,
+    LedgerAccount,
+    stroops_to_str,
+    to_stroops,
     _render_sub_invocation_summary,
     update_memo_in_xdr,
 )
@@ -91,13 +94,13 @@ async def _decode_fixture_xdr(
 
     if isinstance(token_display_name, dict):
 
-        async def _resolve_token_name(*, rpc_url: str, contract_id: str) -> str:
+        async def _resolve_token_name(*, contract_id: str) -> str:
             return token_display_name.get(
                 contract_id, contract_id[:4] + ".." + contract_id[-4:]
             )
     else:
 
-        async def _resolve_token_name(*, rpc_url: str, contract_id: str) -> str:
+        async def _resolve_token_name(*, contract_id: str) -> str:
             return token_display_name
 
     with (
@@ -695,8 +698,8 @@ async def test_asset_to_link_and_simulated_ledger_helpers_cover_cache_and_balanc
     ):
         await ledger.prefetch_accounts({issuer, destination})
 
-    ledger.update_balance(issuer, Asset.native(), -10)
-    ledger.update_balance(destination, asset, 5)
+    ledger.update_balance(issuer, Asset.native(), -to_stroops(10))
+    ledger.update_balance(destination, asset, to_stroops(5))
     ledger.add_trustline(destination, asset)
     ledger.add_trustline(destination, pool_asset)
     ledger.mark_asset_as_new(asset)
@@ -704,12 +707,57 @@ async def test_asset_to_link_and_simulated_ledger_helpers_cover_cache_and_balanc
     ledger.remove_trustline(destination, pool_asset)
     ledger.create_account(destination, "20")
 
-    assert ledger.get_account(issuer)["balances"][0]["balance"] == "90.0"
-    assert ledger.get_account(destination)["balances"][0]["balance"] == "20"
+    assert ledger.get_account(issuer).balance(Asset.native()) == to_stroops(90)
+    assert ledger.get_account(destination).balance(Asset.native()) == to_stroops(20)
+    assert not ledger.get_account(destination).has_trustline(asset)
     assert ledger.is_asset_new(asset) is True
     assert ledger.is_asset_new(Asset.native()) is False
 
 
+def test_simulated_ledger_uses_exact_stroop_arithmetic():
+    assert to_stroops("0.1") + to_stroops("0.2") == to_stroops("0.3")
+    assert to_stroops("922337203685.4775807") == 2**63 - 1
+    assert stroops_to_str(to_stroops("90.5000000")) == "90.5"
+    assert stroops_to_str(to_stroops("100")) == "100"
+    assert stroops_to_str(-1) == "-0.0000001"
+
+
+def test_ledger_account_from_horizon_indexes_balances_by_asset():
+    issuer = Keypair.random().public_key
+    other_issuer = Keypair.random().public_key
+    usd = Asset("USD", issuer)
+    pool_asset = LiquidityPoolAsset(Asset.native(), usd)
+    account = LedgerAccount.from_horizon(
+        {
+            "id": issuer,
+            "flags": {"auth_required": True},
+            "balances": [
+                {"asset_type": "native", "balance": "12.3456789"},
+                {
+                    "asset_type": "credit_alphanum4",
+                    "asset_code": "USD",
+                    "asset_issuer": issuer,
+                    "balance": "5.0000000",
+                    "limit": "922337203685.4775807",
+                },
+                {
+                    "asset_type": "liquidity_pool_shares",
+                    "liquidity_pool_id": pool_asset.liquidity_pool_id,
+                    "balance": "1.0000000",
+                },
+            ],
+        }
+    )
+
+    assert account.auth_required is True
+    assert account.balance(Asset.native()) == 123456789
+    assert account.balance(usd) == to_stroops(5)
+    assert account.has_trustline(pool_asset)
+    # Тот же код у другого эмитента - другой актив
+    assert not account.has_trustline(Asset("USD", other_issuer))
+    assert account.balance(Asset("USD", other_issuer)) == 0
+
+
 @pytest.mark.asyncio
 async def test_decode_invoke_host_function_supports_multiple_host_function_shapes():
     contract_bytes = bytes.fromhex("ab" * 32)
@@ -888,6 +936,86 @@ async def test_decode_xdr_to_text_describes_core_operations():
     assert "BumpSequence to 999" in text
 
 
+@pytest.mark.asyncio
+async def test_decode_xdr_to_text_flags_payment_to_missing_account():
+    source_kp = Keypair.random()
+    missing_id = Keypair.random().public_key
+    created_id = Keypair.random().public_key
+    transaction = (
+        TransactionBuilder(
+            source_account=Account(source_kp.public_key, 10),
+            network_passphrase=Network.PUBLIC_NETWORK_PASSPHRASE,
+            base_fee=100,
+        )
+        .append_payment_op(destination=missing_id, asset=Asset.native(), amount="1")
+        .append_create_account_op(destination=created_id, starting_balance="2")
+        .append_payment_op(destination=created_id, asset=Asset.native(), amount="1")
+        .set_timeout(300)
+        .build()
+    )
+    repo = SimpleNamespace(get_by_sequence=AsyncMock(return_value=[]))
+    account = {
+        "id": source_kp.public_key,
+        "sequence": "9",
+        "balances": [{"asset_type": "native", "balance": "100"}],
+    }
+
+    with (
+        patch("services.xdr_parser.current_app", _mock_current_app()),
+        patch("services.xdr_parser.TransactionRepository", return_value=repo),
+        patch(
+            "services.xdr_parser.get_available_balance_str",
+            AsyncMock(return_value="(bal)"),
+        ),
+        patch("services.xdr_parser.get_account_fresh", AsyncMock(return_value=account)),
+        patch(
+            "services.xdr_parser.get_account",
+            AsyncMock(
+                side_effect=lambda account_id: (
+                    account if account_id == source_kp.public_key else {}
+                )
+            ),
+        ),
+    ):
+        result = await decode_xdr_to_text(transaction.to_xdr())
+
+    text = "\n".join(result)
+    # Второй перевод идет на аккаунт, созданный выше в той же транзакции
+    assert text.count("Destination account does not exist") == 1
+
+
+@pytest.mark.asyncio
+async def test_decode_xdr_to_text_prefetches_ipfs_metadata_for_manage_data():
+    source_kp = Keypair.random()
+    transaction = (
+        TransactionBuilder(
+            source_account=Account(source_kp.public_key, 10),
+            network_passphrase=Network.PUBLIC_NETWORK_PASSPHRASE,
+            base_fee=100,
+        )
+        .append_manage_data_op(data_name="ipfshash-MTL", data_value=b"ipfs://bafycid1")
+        .append_manage_data_op(data_name="hello", data_value=b"world")
+        .set_timeout(300)
+        .build()
+    )
+    repo = SimpleNamespace(get_by_sequence=AsyncMock(return_value=[]))
+    account = {"id": source_kp.public_key, "sequence": "9", "balances": []}
+
+    with (
+        patch("services.xdr_parser.current_app", _mock_current_app()),
+        patch("services.xdr_parser.TransactionRepository", return_value=repo),
+        patch("services.xdr_parser.get_account_fresh", AsyncMock(return_value=account)),
+        patch("services.xdr_parser.get_account", AsyncMock(return_value=account)),
+        patch("services.xdr_parser.prefetch_ipfs_metadata") as prefetch,
+    ):
+        await decode_xdr_to_text(transaction.to_xdr())
+        prefetch.assert_not_called()
+
+        await decode_xdr_to_text(transaction.to_xdr(), prefetch_ipfs=True)
+
+    prefetch.assert_called_once_with("bafycid1")
+
+
 @pytest.mark.asyncio
 async def test_decode_xdr_to_text_describes_pool_and_special_operations():
     source_kp = Keypair.random()
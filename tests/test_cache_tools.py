@@ -1,8 +1,10 @@
+import asyncio
 from unittest.mock import patch
 
 import pytest
 
-from other.cache_tools import AsyncTTLCache, async_cache_with_ttl
+from other.cache_tools import AsyncTTLCache, async_cache_with_ttl, cache_stats
+from other.request_context import finish_trace, get_current_trace, start_trace
 
 
 @pytest.mark.asyncio
@@ -42,3 +44,115 @@ async def test_async_cache_with_ttl_caches_result():
     assert await sample(3) == 6
     assert await sample(3) == 6
     assert state["calls"] == 1
+
+
+@pytest.mark.asyncio
+async def test_concurrent_misses_share_one_load():
+    state = {"calls": 0}
+    release = asyncio.Event()
+
+    @async_cache_with_ttl(ttl_seconds=60)
+    async def slow(value):
+        state["calls"] += 1
+        await release.wait()
+        return value
+
+    waiters = [asyncio.create_task(slow(1)) for _ in range(5)]
+    await asyncio.sleep(0)
+    release.set()
+
+    assert await asyncio.gather(*waiters) == [1] * 5
+    assert state["calls"] == 1
+    assert slow.cache.stats.misses == 5
+    assert slow.cache.stats.loads == 1
+
+
+@pytest.mark.asyncio
+async def test_shared_load_runs_outside_caller_trace():
+    @async_cache_with_ttl(ttl_seconds=60)
+    async def load(value):
+        return get_current_trace()
+
+    token = start_trace("/decode/x", budget=1)
+    try:
+        assert await load(1) is None
+    finally:
+        finish_trace(token)
+
+
+@pytest.mark.asyncio
+async def test_none_is_cached_only_with_negative_ttl():
+    state = {"calls": 0}
+
+    async def load():
+        state["calls"] += 1
+
+    plain = AsyncTTLCache(ttl_seconds=60)
+    await plain.get_or_load("k", load)
+    await plain.get_or_load("k", load)
+    assert state["calls"] == 2
+
+    negative = AsyncTTLCache(ttl_seconds=60, negative_ttl=10)
+    await negative.get_or_load("k", load)
+    await negative.get_or_load("k", load)
+    assert state["calls"] == 3
+    assert negative.stats.negative_hits == 1
+
+
+@pytest.mark.asyncio
+async def test_errors_are_not_cached():
+    cache = AsyncTTLCache(ttl_seconds=60)
+
+    async def fail():
+        raise RuntimeError("boom")
+
+    with pytest.raises(RuntimeError):
+        await cache.get_or_load("k", fail)
+
+    async def ok():
+        return "value"
+
+    assert await cache.get_or_load("k", ok) == "value"
+    assert cache.stats.load_errors == 1
+
+
+@pytest.mark.asyncio
+async def test_stale_value_is_served_while_refreshing():
+    cache = AsyncTTLCache(ttl_seconds=10, stale_ttl=100)
+    values = iter(["old", "new"])
+
+    async def load():
+        return next(values)
+
+    with patch("other.cache_tools.time", return_value=0):
+        assert await cache.get_or_load("k", load) == "old"
+
+    with patch("other.cache_tools.time", return_value=50):
+        assert await cache.get_or_load("k", load) == "old"
+        await asyncio.sleep(0)
+        assert await cache.get_or_load("k", load) == "new"
+
+    assert cache.stats.stale_hits == 1
+
+
+def test_jitter_spreads_ttl():
+    cache = AsyncTTLCache(ttl_seconds=100, jitter=0.1)
+
+    ttls = {cache._ttl(100) for _ in range(20)}
+    assert len(ttls) > 1
+    assert all(90 <= ttl <= 110 for ttl in ttls)
+
+
+@pytest.mark.asyncio
+async def test_cache_key_function_and_stats():
+    @async_cache_with_ttl(ttl_seconds=60, key=lambda service, value: value)
+    async def method(service, value):
+        return value
+
+    assert await method(object(), "a") == "a"
+    assert await method(object(), "a") == "a"
+
+    stats = cache_stats()[f"{__name__}.{method.__qualname__}"]
+    assert stats["hits"] == 1
+    assert stats["misses"] == 1
+    assert stats["size"] == 1
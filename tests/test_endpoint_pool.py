@@ -0,0 +1,152 @@
+import asyncio
+
+import pytest
+import pytest_asyncio
+from aiohttp import web
+
+from other.endpoint_pool import EndpointPool, web_response_ok
+from other.request_context import (
+    CALL_KIND_HORIZON,
+    CallBudgetExceeded,
+    classify_url,
+    finish_trace,
+    start_trace,
+)
+from other.web_tools import HTTPSessionManager
+
+
+async def _start_server(behaviour: dict):
+    """Локальная замена Horizon: задержка и статус берутся из behaviour"""
+
+    async def handler(request):
+        behaviour["hits"] += 1
+        await asyncio.sleep(behaviour.get("delay", 0))
+        status = behaviour.get("status", 200)
+        return web.json_response({"served_by": behaviour["name"]}, status=status)
+
+    app = web.Application()
+    app.router.add_route("*", "/{tail:.*}", handler)
+    runner = web.AppRunner(app)
+    await runner.setup()
+    site = web.TCPSite(runner, "127.0.0.1", 0)
+    await site.start()
+    port = site._server.sockets[0].getsockname()[1]
+    return runner, f"http://127.0.0.1:{port}"
+
+
+@pytest_asyncio.fixture
+async def upstreams():
+    first = {"name": "first", "hits": 0}
+    second = {"name": "second", "hits": 0}
+    runners = []
+    for behaviour in (first, second):
+        runner, behaviour["url"] = await _start_server(behaviour)
+        runners.append(runner)
+    manager = HTTPSessionManager(max_retries=0)
+    yield first, second, manager
+    await manager.close()
+    for runner in runners:
+        await runner.cleanup()
+
+
+def _pool(first, second, **kwargs):
+    return EndpointPool(
+        "test", [first["url"], second["url"]], CALL_KIND_HORIZON, **kwargs
+    )
+
+
+def _get(manager, method="GET"):
+    async def call(base_url):
+        return await manager.get_web_request(method, f"{base_url}/accounts/G1")
+
+    return call
+
+
+@pytest.mark.asyncio
+async def test_slow_read_is_hedged_to_second_endpoint(upstreams):
+    first, second, manager = upstreams
+    first["delay"] = 0.5
+    pool = _pool(first, second, hedge_delay=0.05)
+
+    response = await pool.request(_get(manager), ok=web_response_ok)
+
+    assert response.data == {"served_by": "second"}
+    assert pool.hedges == 1
+    # Проигравшая точка получила оценку задержки и теперь идет второй
+    assert pool.pick() == second["url"]
+
+
+@pytest.mark.asyncio
+async def test_failed_read_fails_over_and_demotes_endpoint(upstreams):
+    first, second, manager = upstreams
+    first["status"] = 503
+    pool = _pool(first, second, hedge_delay=5)
+
+    response = await pool.request(_get(manager), ok=web_response_ok)
+
+    assert response.data == {"served_by": "second"}
+    assert pool.hedges == 0
+    assert pool.pick() == second["url"]
+    assert pool.stats()[0]["errors"] == 1
+
+
+@pytest.mark.asyncio
+async def test_write_goes_to_exactly_one_endpoint(upstreams):
+    first, second, manager = upstreams
+    first["status"] = 503
+    pool = _pool(first, second, hedge_delay=0.01)
+
+    response = await pool.request(
+        _get(manager, "POST"), idempotent=False, ok=web_response_ok
+    )
+
+    assert response.status == 503
+    assert (first["hits"], second["hits"]) == (1, 0)
+
+
+@pytest.mark.asyncio
+async def test_last_error_is_raised_when_every_endpoint_fails():
+    pool = EndpointPool("test", ["http://a", "http://b"], CALL_KIND_HORIZON)
+    calls = []
+
+    async def call(base_url):
+        calls.append(base_url)
+        raise ConnectionError(base_url)
+
+    with pytest.raises(ConnectionError):
+        await pool.request(call)
+    assert calls == ["http://a", "http://b"]
+
+
+def test_endpoint_goes_down_after_consecutive_errors():
+    pool = EndpointPool(
+        "test", ["http://a", "http://b"], CALL_KIND_HORIZON, down_after=2
+    )
+    endpoint = pool.endpoints[0]
+    pool.record(endpoint, 0.01, ok=False)
+    pool.record(endpoint, 0.01, ok=False)
+
+    assert pool.stats()[0]["down"] is True
+    assert pool.pick() == "http://b"
+
+
+def test_pool_hosts_are_classified_as_their_service():
+    EndpointPool("test", ["https://rpc.example.org"], CALL_KIND_HORIZON)
+
+    assert classify_url("https://rpc.example.org/accounts/G1") == CALL_KIND_HORIZON
+
+
+@pytest.mark.asyncio
+async def test_request_over_call_budget_does_not_demote_endpoints(upstreams):
+    first, second, manager = upstreams
+    pool = _pool(first, second)
+    token = start_trace("/decode/x", budget=1)
+    try:
+        await pool.request(_get(manager), ok=web_response_ok)
+        with pytest.raises(CallBudgetExceeded):
+            await pool.request(_get(manager), ok=web_response_ok)
+    finally:
+        finish_trace(token)
+
+    assert first["hits"] + second["hits"] == 1
+    assert all(endpoint.errors == 0 for endpoint in pool.endpoints)
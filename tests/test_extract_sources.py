@@ -74,7 +74,7 @@ def create_test_transaction_builder(source_kp, operations):
 
 
 @pytest.mark.asyncio
-@patch("services.stellar_client.http_session_manager.get_web_request")
+@patch("other.endpoint_pool.http_session_manager.get_web_request")
 async def test_extract_sources_for_medium_threshold(mock_get, app):
     """Тест 1: Транзакция со средним порогом."""
     async with app.app_context():
@@ -99,7 +99,7 @@ async def test_extract_sources_for_medium_threshold(mock_get, app):
 
 
 @pytest.mark.asyncio
-@patch("services.stellar_client.http_session_manager.get_web_request")
+@patch("other.endpoint_pool.http_session_manager.get_web_request")
 async def test_extract_sources_for_high_threshold(mock_get, app):
     """Тест 2: Транзакция с высоким порогом."""
     async with app.app_context():
@@ -123,7 +123,7 @@ async def test_extract_sources_for_high_threshold(mock_get, app):
 
 
 @pytest.mark.asyncio
-@patch("services.stellar_client.http_session_manager.get_web_request")
+@patch("other.endpoint_pool.http_session_manager.get_web_request")
 async def test_extract_sources_with_multiple_sources(mock_get, app):
     """Тест 3: Транзакция с несколькими источниками."""
     async with app.app_context():
@@ -162,7 +162,7 @@ async def test_extract_sources_with_multiple_sources(mock_get, app):
 
 
 @pytest.mark.asyncio
-@patch("services.stellar_client.http_session_manager.get_web_request")
+@patch("other.endpoint_pool.http_session_manager.get_web_request")
 async def test_extract_sources_handles_network_error(mock_get, app):
     """Тест 4: Обработка ошибки сети."""
     async with app.app_context():
@@ -1,3 +1,5 @@
+import asyncio
+import json
 from types import SimpleNamespace
 from unittest.mock import AsyncMock, patch
 
@@ -98,3 +100,217 @@ def test_filter_helpers_return_expected_records():
         "enabled": False,
     }
     assert cache.find_one_by_filter("EURMTL_assets", "issuer", "missing") is None
+
+
+@pytest.mark.asyncio
+async def test_initialize_cache_loads_tables_concurrently():
+    cache = GristCacheManager()
+    in_flight = 0
+    max_in_flight = 0
+
+    async def fake_load(table_name):
+        nonlocal in_flight, max_in_flight
+        in_flight += 1
+        max_in_flight = max(max_in_flight, in_flight)
+        await asyncio.sleep(0)
+        in_flight -= 1
+
+    with patch.object(
+        cache, "load_table_to_cache", new=AsyncMock(side_effect=fake_load)
+    ):
+        await cache.initialize_cache()
+
+    assert max_in_flight == len(cache.cached_tables)
+
+
+@pytest.mark.asyncio
+async def test_snapshot_roundtrip_restores_records_and_indexes(tmp_path):
+    snapshot_path = str(tmp_path / "grist_cache.json")
+    cache = GristCacheManager(snapshot_path=snapshot_path)
+    records = [
+        {"account_id": "G1", "telegram_id": 100, "name": "Alice"},
+        {"account_id": "G2", "telegram_id": 200, "name": "Bob"},
+    ]
+
+    with patch("other.grist_tools.MTLGrist", new=SimpleNamespace(EURMTL_users="users")):
+        with patch(
+            "other.grist_tools.grist_manager.load_table_data",
+            new=AsyncMock(return_value=records),
+        ):
+            await cache.load_table_to_cache("EURMTL_users")
+
+    restored = GristCacheManager(snapshot_path=snapshot_path)
+    assert restored.load_snapshot() is True
+    assert restored.get_table_data("EURMTL_users") == records
+    assert restored.find_by_index("EURMTL_users", "G2")["name"] == "Bob"
+    user = restored.find_by_index("EURMTL_users", 100, field="telegram_id")
+    assert user is restored.find_by_index("EURMTL_users", "G1")
+
+
+@pytest.mark.asyncio
+async def test_initialize_cache_serves_snapshot_and_refreshes_in_background(
+    tmp_path,
+):
+    snapshot_path = tmp_path / "grist_cache.json"
+    snapshot_path.write_text(
+        json.dumps(
+            {
+                "version": 1,
+                "saved_at": 0,
+                "tables": {
+                    "EURMTL_assets": {
+                        "records": [{"code": "EURMTL"}],
+                        "indexes": {"EURMTL_assets": [["EURMTL", 0]]},
+                    }
+                },
+            }
+        )
+    )
+    cache = GristCacheManager(snapshot_path=str(snapshot_path))
+    refresh_started = asyncio.Event()
+    release_refresh = asyncio.Event()
+
+    async def slow_refresh():
+        refresh_started.set()
+        await release_refresh.wait()
+
+    with (
+        patch.object(cache, "refresh_all_tables", new=slow_refresh),
+        patch.object(cache, "load_table_to_cache", new=AsyncMock()),
+    ):
+        await cache.initialize_cache()
+        assert cache.find_by_index("EURMTL_assets", "EURMTL") == {"code": "EURMTL"}
+        await refresh_started.wait()
+        release_refresh.set()
+        await cache._refresh_task
+
+
+@pytest.mark.asyncio
+async def test_snapshot_excludes_access_keys_and_loads_them_before_serving(
+    tmp_path,
+):
+    snapshot_path = tmp_path / "grist_cache.json"
+    writer = GristCacheManager(snapshot_path=str(snapshot_path))
+    writer.caches["GRIST_access"] = [{"key": "secret"}]
+    writer.index_caches["GRIST_access"] = {"secret": writer.caches["GRIST_access"][0]}
+    writer.caches["EURMTL_assets"] = [{"code": "EURMTL"}]
+    writer.index_caches["EURMTL_assets"] = {"EURMTL": writer.caches["EURMTL_assets"][0]}
+    await writer.save_snapshot()
+
+    assert "secret" not in snapshot_path.read_text()
+    assert snapshot_path.stat().st_mode & 0o777 == 0o600
+
+    cache = GristCacheManager(snapshot_path=str(snapshot_path))
+
+    async def load_access(table_name):
+        cache.caches[table_name] = [{"key": "current"}]
+
+    load_table = AsyncMock(side_effect=load_access)
+    with (
+        patch.object(cache, "refresh_all_tables", new=AsyncMock()),
+        patch.object(cache, "load_table_to_cache", new=load_table),
+    ):
+        await cache.initialize_cache()
+
+    load_table.assert_awaited_once_with("GRIST_access")
+    assert cache.get_table_data("GRIST_access") == [{"key": "current"}]
+    assert cache.find_by_index("GRIST_access", "secret") is None
+
+
+def test_load_snapshot_ignores_broken_file(tmp_path):
+    snapshot_path = tmp_path / "grist_cache.json"
+    snapshot_path.write_text("{not json")
+    cache = GristCacheManager(snapshot_path=str(snapshot_path))
+
+    assert cache.load_snapshot() is False
+    assert cache.get_table_data("EURMTL_assets") == []
+
+
+@pytest.mark.asyncio
+async def test_find_or_fetch_filters_cache_and_falls_back_to_narrow_query():
+    cache = GristCacheManager()
+    cache.caches["EURMTL_assets"] = [
+        {"code": "EURMTL", "need_dropdown": True},
+        {"code": "HIDDEN", "need_dropdown": False},
+    ]
+    load_table_data = AsyncMock(return_value=[{"id": 1, "account_id": "GA"}])
+
+    with patch("other.grist_tools.grist_manager.load_table_data", new=load_table_data):
+        assets = await cache.find_or_fetch(
+            "EURMTL_assets", filter_dict={"need_dropdown": [True]}
+        )
+        accounts = await cache.find_or_fetch(
+            "EURMTL_accounts",
+            filter_dict={"need_dropdown": [True]},
+            columns=["account_id"],
+        )
+
+    assert assets == [{"code": "EURMTL", "need_dropdown": True}]
+    assert accounts == [{"id": 1, "account_id": "GA"}]
+    load_table_data.assert_awaited_once()
+    assert load_table_data.await_args.kwargs == {
+        "filter_dict": {"need_dropdown": [True]},
+        "columns": ["account_id"],
+    }
+
+
+@pytest.mark.asyncio
+async def test_find_or_fetch_projects_columns_from_cache():
+    cache = GristCacheManager()
+    cache.caches["EURMTL_accounts"] = [
+        {"id": 1, "account_id": "GA", "descr": "x", "need_dropdown": True},
+        {"id": 2, "account_id": "GB", "descr": "y", "need_dropdown": False},
+    ]
+
+    accounts = await cache.find_or_fetch(
+        "EURMTL_accounts",
+        filter_dict={"need_dropdown": [True]},
+        columns=["account_id"],
+    )
+
+    assert accounts == [{"id": 1, "account_id": "GA"}]
+    assert cache.caches["EURMTL_accounts"][0]["descr"] == "x"
+
+
+@pytest.mark.asyncio
+async def test_initialize_cache_skips_refresh_for_fresh_snapshot(tmp_path):
+    snapshot_path = str(tmp_path / "grist_cache.json")
+    writer = GristCacheManager(snapshot_path=snapshot_path)
+    writer.caches["EURMTL_assets"] = [{"code": "EURMTL"}]
+    writer.index_caches["EURMTL_assets"] = {"EURMTL": writer.caches["EURMTL_assets"][0]}
+    await writer.save_snapshot()
+
+    cache = GristCacheManager(snapshot_path=snapshot_path)
+    refresh = AsyncMock()
+    with (
+        patch.object(cache, "refresh_all_tables", new=refresh),
+        patch.object(cache, "load_table_to_cache", new=AsyncMock()),
+    ):
+        await cache.initialize_cache()
+
+    refresh.assert_not_awaited()
+    assert cache._refresh_task is None
+    assert cache.find_by_index("EURMTL_assets", "EURMTL") == {"code": "EURMTL"}
+
+
+@pytest.mark.asyncio
+async def test_snapshot_watch_picks_up_other_worker_snapshot(tmp_path):
+    snapshot_path = str(tmp_path / "grist_cache.json")
+    reader = GristCacheManager(snapshot_path=snapshot_path)
+    reader.start_snapshot_watch(interval=0.01)
+
+    writer = GristCacheManager(snapshot_path=snapshot_path)
+    writer.caches["EURMTL_users"] = [{"account_id": "G1", "telegram_id": 1}]
+    writer.index_caches["EURMTL_users"] = {"G1": writer.caches["EURMTL_users"][0]}
+    await writer.save_snapshot()
+
+    for _ in range(100):
+        if reader.find_by_index("EURMTL_users", "G1"):
+            break
+        await asyncio.sleep(0.01)
+    await reader.stop_snapshot_watch()
+
+    assert reader.find_by_index("EURMTL_users", "G1") == {
+        "account_id": "G1",
+        "telegram_id": 1,
+    }
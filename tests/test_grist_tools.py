@@ -1,5 +1,8 @@
+import asyncio
+import json
 from types import SimpleNamespace
 from unittest.mock import AsyncMock, patch
+from urllib.parse import unquote
 
 import pytest
 
@@ -7,14 +10,18 @@ from db.sql_models import User
 from other.grist_tools import (
     GristAPI,
     GristTableConfig,
+    GristWriteBuffer,
     extract_record_ids_from_grist_webhook,
     get_grist_asset_by_code,
     get_secretaries,
+    load_notify_message_records_by_ids,
     load_user_from_grist,
     load_users_from_grist,
+    patch_notify_message_record,
     send_notify_message_record,
     should_send_notify_message_record,
 )
+from other.request_context import finish_trace, record_call, start_trace, track_call
 
 
 @pytest.mark.asyncio
@@ -40,6 +47,73 @@ async def test_grist_api_fetch_and_load_table_data_builds_urls():
     assert "filter=" in called_url
 
 
+@pytest.mark.asyncio
+async def test_grist_api_fetch_data_by_ids_with_limit():
+    session_manager = SimpleNamespace(
+        get_web_request=AsyncMock(
+            return_value=SimpleNamespace(
+                status=200, data={"records": [{"id": 7, "fields": {"TITLE": "x"}}]}
+            )
+        )
+    )
+    api = GristAPI(session_manager=session_manager)
+    table = GristTableConfig("doc", "Table", base_url="https://example.test")
+
+    records = await api.fetch_data(table, ids=[7, 9], limit=2)
+
+    assert records == [{"id": 7, "TITLE": "x"}]
+    call = session_manager.get_web_request.await_args.kwargs
+    assert unquote(call["url"]).endswith('filter={"id": [7, 9]}&limit=2')
+    assert call["headers"]["Accept-Encoding"] == "gzip"
+
+
+@pytest.mark.asyncio
+async def test_grist_api_fetch_data_projection_uses_sql_endpoint():
+    session_manager = SimpleNamespace(
+        get_web_request=AsyncMock(
+            return_value=SimpleNamespace(
+                status=200,
+                data={"records": [{"fields": {"id": 3, "code": "EURMTL"}}]},
+            )
+        )
+    )
+    api = GristAPI(session_manager=session_manager)
+    table = GristTableConfig("doc", "Assets", base_url="https://example.test")
+
+    records = await api.fetch_data(
+        table,
+        sort="-code",
+        filter_dict={"need_dropdown": [True]},
+        columns=["code"],
+        limit=10,
+        offset=20,
+    )
+
+    assert records == [{"id": 3, "code": "EURMTL"}]
+    call = session_manager.get_web_request.await_args.kwargs
+    assert call["method"] == "POST"
+    assert call["url"] == "https://example.test/doc/sql"
+    assert call["json"] == {
+        "sql": 'SELECT id, "code" FROM "Assets" WHERE "need_dropdown" IN (?) '
+        'ORDER BY "code" DESC LIMIT ? OFFSET ?',
+        "args": [True, 10, 20],
+    }
+    with pytest.raises(ValueError):
+        await api.fetch_data(table, columns=['code"; DROP TABLE x; --'])
+
+
+@pytest.mark.asyncio
+async def test_load_notify_message_records_by_ids_requests_only_given_ids():
+    load_table_data = AsyncMock(return_value=[{"id": 5}])
+
+    with patch("other.grist_tools.grist_manager.load_table_data", new=load_table_data):
+        assert await load_notify_message_records_by_ids([]) == []
+        assert await load_notify_message_records_by_ids([5]) == [{"id": 5}]
+
+    load_table_data.assert_awaited_once()
+    assert load_table_data.await_args.kwargs == {"ids": [5]}
+
+
 @pytest.mark.asyncio
 async def test_grist_api_write_methods_and_load_error_path():
     session_manager = SimpleNamespace(
@@ -267,3 +341,150 @@ async def test_send_notify_message_record_skips_already_processed_record():
     assert result == {"status": "skipped", "id": 13}
     send_mock.assert_not_awaited()
     patch_mock.assert_not_awaited()
+
+
+def _buffered_api(**buffer_options):
+    api = GristAPI(session_manager=SimpleNamespace(get_web_request=AsyncMock()))
+    api.post_data = AsyncMock(return_value=True)
+    api.patch_data = AsyncMock(return_value=True)
+    api.write_buffer = GristWriteBuffer(
+        api, flush_interval=0.01, retry_delay=0, **buffer_options
+    )
+    return api
+
+
+@pytest.mark.asyncio
+async def test_write_buffer_coalesces_posts_into_one_request():
+    api = _buffered_api()
+    table = GristTableConfig("doc", "Use_log")
+
+    for idx in range(3):
+        assert await api.queue_post_record(table, {"info": f"call {idx}"}) is True
+    await api.write_buffer.flush_all()
+
+    api.post_data.assert_awaited_once()
+    payload = api.post_data.await_args.args[1]
+    assert [record["fields"]["info"] for record in payload["records"]] == [
+        "call 0",
+        "call 1",
+        "call 2",
+    ]
+
+
+@pytest.mark.asyncio
+async def test_write_buffer_merges_patches_and_reports_result_to_waiters():
+    api = _buffered_api()
+    table = GristTableConfig("doc", "Deals")
+
+    results = await asyncio.gather(
+        api.queue_patch_record(table, 1, {"Checked": False}, wait=True),
+        api.queue_patch_record(table, 1, {"Checked": True}, wait=True),
+        api.queue_patch_record(table, 2, {"Checked": True}, wait=True),
+    )
+
+    assert results == [True, True, True]
+    api.patch_data.assert_awaited_once_with(
+        table,
+        {
+            "records": [
+                {"id": 1, "fields": {"Checked": True}},
+                {"id": 2, "fields": {"Checked": True}},
+            ]
+        },
+    )
+
+
+@pytest.mark.asyncio
+async def test_write_buffer_flushes_when_batch_is_full():
+    api = _buffered_api(max_batch=2)
+    api.write_buffer.flush_interval = 60
+    table = GristTableConfig("doc", "Use_log")
+
+    await api.queue_post_record(table, {"info": "a"})
+    await api.queue_post_record(table, {"info": "b"})
+    await asyncio.sleep(0)
+
+    api.post_data.assert_awaited_once()
+
+
+@pytest.mark.asyncio
+async def test_write_buffer_retries_then_spills_and_replays(tmp_path):
+    spill_path = tmp_path / "spill.jsonl"
+    api = _buffered_api(max_retries=1, spill_path=str(spill_path))
+    api.post_data = AsyncMock(side_effect=Exception("grist down"))
+    table = GristTableConfig("doc", "Use_log", base_url="https://example.test")
+
+    assert await api.queue_post_record(table, {"info": "x"}, wait=True) is False
+    assert api.post_data.await_count == 2
+    assert json.loads(spill_path.read_text())["records"] == [{"fields": {"info": "x"}}]
+
+    api.post_data = AsyncMock(return_value=True)
+    assert await api.write_buffer.replay_spill() == 1
+    await api.write_buffer.flush_all()
+
+    api.post_data.assert_awaited_once_with(
+        table, {"records": [{"fields": {"info": "x"}}]}
+    )
+    assert not spill_path.exists()
+    assert not (tmp_path / "spill.jsonl.replay").exists()
+
+
+@pytest.mark.asyncio
+async def test_write_buffer_flush_does_not_use_the_enqueuing_request_budget(
+    tmp_path,
+):
+    spill_path = tmp_path / "spill.jsonl"
+    api = _buffered_api(spill_path=str(spill_path))
+    calls = []
+
+    async def post_data(table, payload):
+        async with track_call("grist", table.table_name):
+            calls.append(payload)
+
+    api.post_data = post_data
+    table = GristTableConfig("doc", "Use_log")
+
+    token = start_trace("/decode/x", budget=1)
+    try:
+        record_call("horizon", "accounts", 0.01)
+        assert await api.queue_post_record(table, {"info": "x"}, wait=True) is True
+    finally:
+        trace = finish_trace(token)
+
+    assert len(calls) == 1
+    assert trace.call_count == 1
+    assert not spill_path.exists()
+
+
+@pytest.mark.asyncio
+async def test_replay_spill_keeps_records_left_by_interrupted_replay(tmp_path):
+    spill_path = tmp_path / "spill.jsonl"
+    table = {"access_id": "doc", "table_name": "Use_log", "base_url": "https://x"}
+
+    def spill_line(info):
+        return json.dumps(
+            {"method": "POST", "table": table, "records": [{"fields": {"info": info}}]}
+        )
+
+    (tmp_path / "spill.jsonl.replay").write_text(spill_line("old"))
+    spill_path.write_text(spill_line("new") + "\n")
+    api = _buffered_api(spill_path=str(spill_path))
+    api.post_data = AsyncMock(return_value=True)
+
+    assert await api.write_buffer.replay_spill() == 2
+    assert (tmp_path / "spill.jsonl.replay").exists()
+    await api.write_buffer.flush_all()
+
+    sent = api.post_data.await_args.args[1]["records"]
+    assert sent == [{"fields": {"info": "old"}}, {"fields": {"info": "new"}}]
+    assert not spill_path.exists()
+    assert not (tmp_path / "spill.jsonl.replay").exists()
+
+
+@pytest.mark.asyncio
+async def test_patch_notify_message_record_waits_for_grist_write():
+    queue_patch = AsyncMock(return_value=False)
+    with patch("other.grist_tools.grist_manager.queue_patch_record", new=queue_patch):
+        assert await patch_notify_message_record(5, {"send_date": 1}) is False
+
+    assert queue_patch.await_args.kwargs == {"wait": True}
@@ -0,0 +1,125 @@
+import asyncio
+import json
+import os
+from types import SimpleNamespace
+from unittest.mock import patch
+
+import pytest
+
+from other import ipfs_tools
+from other.ipfs_tools import IpfsCidCache, normalize_ipfs_cid
+
+
+@pytest.fixture
+def cache(tmp_path):
+    cache = IpfsCidCache(str(tmp_path), max_bytes=1024 * 1024)
+    with patch.object(ipfs_tools, "ipfs_cache", cache):
+        yield cache
+
+
+class FakeGateways:
+    def __init__(self, delays: dict[str, float], bodies: dict[str, str]):
+        self.delays = delays
+        self.bodies = bodies
+        self.calls = []
+        self.cancelled = []
+
+    async def get_web_request(self, method, url, return_type=None):
+        gateway = url.rsplit("/ipfs/", 1)[0]
+        self.calls.append(gateway)
+        try:
+            await asyncio.sleep(self.delays[gateway])
+        except asyncio.CancelledError:
+            self.cancelled.append(gateway)
+            raise
+        return SimpleNamespace(status=200, data=self.bodies[gateway])
+
+
+def _fake(delays, bodies):
+    fake = FakeGateways(delays, bodies)
+    return fake, patch.object(
+        ipfs_tools.http_session_manager, "get_web_request", fake.get_web_request
+    )
+
+
+PINATA, CLOUDFLARE, IPFS_IO = (
+    gateway.rsplit("/ipfs/", 1)[0] for gateway in ipfs_tools.IPFS_GATEWAYS
+)
+
+
+def test_normalize_ipfs_cid():
+    assert normalize_ipfs_cid("ipfs://bafyabc/meta.json") == "bafyabc"
+    assert normalize_ipfs_cid("'bafyabc'") == "bafyabc"
+    assert normalize_ipfs_cid("not a cid") is None
+
+
+@pytest.mark.asyncio
+async def test_first_valid_gateway_wins_and_others_are_cancelled(cache):
+    fake, patcher = _fake(
+        {PINATA: 5, CLOUDFLARE: 0.01, IPFS_IO: 0},
+        {PINATA: "{}", CLOUDFLARE: '{"name": "MVP"}', IPFS_IO: "not json"},
+    )
+    with patcher:
+        metadata, fetched_from, error = await ipfs_tools.fetch_ipfs_metadata("bafy1")
+
+    assert metadata == {"name": "MVP"}
+    assert fetched_from == f"{CLOUDFLARE}/ipfs/bafy1"
+    assert error is None
+    assert fake.cancelled == [PINATA]
+
+
+@pytest.mark.asyncio
+async def test_cached_cid_does_not_hit_gateways(cache):
+    fake, patcher = _fake(
+        {PINATA: 0, CLOUDFLARE: 0, IPFS_IO: 0},
+        {PINATA: '{"a": 1}', CLOUDFLARE: '{"a": 1}', IPFS_IO: '{"a": 1}'},
+    )
+    with patcher:
+        first = await ipfs_tools.fetch_ipfs_metadata("bafy2")
+        calls = len(fake.calls)
+        second = await ipfs_tools.fetch_ipfs_metadata("bafy2")
+
+    assert first == second
+    assert len(fake.calls) == calls
+    assert os.path.exists(os.path.join(cache.path, "bafy2.json"))
+
+
+@pytest.mark.asyncio
+async def test_all_gateways_failing_returns_error(cache):
+    _, patcher = _fake(
+        {PINATA: 0, CLOUDFLARE: 0, IPFS_IO: 0},
+        {PINATA: "[]", CLOUDFLARE: "[]", IPFS_IO: "[]"},
+    )
+    with patcher:
+        metadata, fetched_from, error = await ipfs_tools.fetch_ipfs_metadata("bafy3")
+
+    assert metadata is None and fetched_from is None
+    assert error.startswith("Non-JSON object")
+    assert not os.path.exists(os.path.join(cache.path, "bafy3.json"))
+
+
+@pytest.mark.asyncio
+async def test_concurrent_requests_share_one_fetch(cache):
+    fake, patcher = _fake(
+        {PINATA: 0.01, CLOUDFLARE: 0.01, IPFS_IO: 0.01},
+        {PINATA: "{}", CLOUDFLARE: "{}", IPFS_IO: "{}"},
+    )
+    with patcher:
+        ipfs_tools.prefetch_ipfs_metadata("bafy4")
+        await ipfs_tools.fetch_ipfs_metadata("bafy4")
+
+    assert len(fake.calls) == len(ipfs_tools.IPFS_GATEWAYS)
+
+
+def test_cache_is_trimmed_to_size_cap(tmp_path):
+    cache = IpfsCidCache(str(tmp_path), max_bytes=300)
+    entry = {"metadata": {"text": "x" * 100}, "fetched_from": "url"}
+    for idx in range(5):
+        cache._write(f"cid{idx}", entry)
+        os.utime(os.path.join(cache.path, f"cid{idx}.json"), (idx, idx))
+
+    files = sorted(os.listdir(tmp_path))
+    total = sum(os.path.getsize(tmp_path / name) for name in files)
+    assert total <= 300
+    assert "cid4.json" in files and "cid0.json" not in files
+    assert json.loads((tmp_path / "cid4.json").read_text()) == entry
@@ -0,0 +1,96 @@
+import asyncio
+
+import pytest
+
+from other.job_runner import JobRunner
+from other.request_context import finish_trace, start_trace, track_call
+
+
+@pytest.mark.asyncio
+async def test_job_runner_limits_concurrency_and_dedupes_keys():
+    runner = JobRunner("test", workers=2, max_queue=10)
+    release = asyncio.Event()
+    active = 0
+    peak = 0
+    done = []
+
+    def make_job(idx):
+        async def job():
+            nonlocal active, peak
+            active += 1
+            peak = max(peak, active)
+            await release.wait()
+            active -= 1
+            done.append(idx)
+
+        return job
+
+    for idx in range(5):
+        assert runner.submit(idx, make_job(idx)) is True
+    assert runner.submit(0, make_job(99)) is True  # уже в очереди
+
+    await asyncio.sleep(0)
+    assert runner.metrics()["running"] == 2
+    assert runner.metrics()["queue_size"] == 3
+
+    release.set()
+    await runner.drain(timeout=1)
+
+    assert peak == 2
+    assert sorted(done) == [0, 1, 2, 3, 4]
+    assert runner.stats.deduplicated == 1
+    assert runner.stats.completed == 5
+
+
+@pytest.mark.asyncio
+async def test_job_runner_rejects_when_full_and_survives_failures():
+    runner = JobRunner("test", workers=1, max_queue=1)
+    started = asyncio.Event()
+    release = asyncio.Event()
+
+    async def blocking():
+        started.set()
+        await release.wait()
+
+    async def failing():
+        raise RuntimeError("boom")
+
+    assert runner.submit("a", blocking)
+    await started.wait()
+    assert runner.submit("b", failing)
+    assert runner.submit("c", failing) is False
+
+    release.set()
+    await runner.drain(timeout=1)
+
+    assert runner.stats.rejected == 1
+    assert runner.stats.failed == 1
+    assert runner.submit("d", failing) is True  # после drain пул поднимается заново
+    await runner.drain(timeout=1)
+
+
+@pytest.mark.asyncio
+async def test_jobs_do_not_spend_the_submitting_request_budget():
+    runner = JobRunner("test", workers=2, max_queue=10)
+    budget = 3
+    calls = []
+
+    def make_job(idx):
+        async def job():
+            for call in range(budget):
+                async with track_call("horizon", f"accounts/{idx}/{call}"):
+                    calls.append((idx, call))
+
+        return job
+
+    token = start_trace("/rely/grist_webhook", budget=budget)
+    try:
+        for idx in range(4):
+            assert runner.submit(idx, make_job(idx)) is True
+    finally:
+        trace = finish_trace(token)
+    await runner.drain(timeout=1)
+
+    assert len(calls) == 4 * budget
+    assert runner.stats.failed == 0
+    assert trace.call_count == 0
@@ -0,0 +1,68 @@
+import asyncio
+import os
+import time
+import traceback
+
+import pytest
+
+from other.loop_watchdog import _PROJECT_ROOT, LoopWatchdog, call_site
+from other.request_context import finish_trace, start_trace
+
+
+def blocking_call(seconds: float):
+    time.sleep(seconds)
+
+
+@pytest.mark.asyncio
+async def test_watchdog_reports_blocking_site_with_route():
+    watchdog = LoopWatchdog(threshold=0.05, interval=0.01)
+    watchdog.start()
+    try:
+        await asyncio.sleep(0.05)
+        token = start_trace("/cup/orderbook")
+        try:
+            blocking_call(0.3)
+        finally:
+            finish_trace(token)
+        await asyncio.sleep(0.05)
+    finally:
+        await watchdog.stop()
+
+    stats = watchdog.stats()
+    assert stats["stalls"] == 1
+    assert stats["max_lag_ms"] >= 200
+    site = stats["sites"][0]
+    assert site["site"].startswith("tests/test_loop_watchdog.py:")
+    assert site["site"].endswith("blocking_call")
+    assert site["routes"] == ["/cup/orderbook"]
+    assert stats["recent"][0]["route"] == "/cup/orderbook"
+    assert watchdog.running is False
+
+
+@pytest.mark.asyncio
+async def test_watchdog_ignores_short_pauses():
+    watchdog = LoopWatchdog(threshold=0.2, interval=0.01)
+    watchdog.start()
+    try:
+        for _ in range(5):
+            blocking_call(0.01)
+            await asyncio.sleep(0.01)
+    finally:
+        await watchdog.stop()
+
+    stats = watchdog.stats()
+    assert stats["stalls"] == 0
+    assert stats["samples"] > 0
+    assert sum(stats["lag_histogram"].values()) == stats["samples"]
+
+
+def test_call_site_prefers_project_frames():
+    stack = traceback.StackSummary.from_list(
+        [
+            (os.path.join(_PROJECT_ROOT, "routers", "cup.py"), 10, "orderbook", None),
+            ("/usr/lib/python3/site-packages/requests/api.py", 5, "get", None),
+        ]
+    )
+
+    assert call_site(stack) == os.path.join("routers", "cup.py") + ":10 orderbook"
+    assert call_site(traceback.StackSummary()) == "unknown"
@@ -1,7 +1,20 @@
-from quart import Quart
+import gzip
+import json
+import zlib
+
+from quart import Quart, flash, request
 import pytest
 
-from other.quart_tools import get_ip
+from other import quart_tools
+from other.request_context import record_call, start_trace
+from other.quart_tools import (
+    NO_STORE_HEADERS,
+    get_ip,
+    http_cache,
+    install_compression,
+    make_etag,
+    stream_json_list,
+)
 
 
 async def _make_request(headers=None):
@@ -32,3 +45,207 @@ async def test_get_ip_falls_back_to_x_real_ip():
 async def test_get_ip_uses_remote_addr_when_no_headers():
     data = await _make_request()
     assert data["ip"] == "<local>"
+
+
+def _make_cached_app(counter, public=True):
+    app = Quart(__name__)
+    app.config["SECRET_KEY"] = "test"
+
+    @app.route("/item/<key>", methods=("GET", "POST"))
+    @http_cache(max_age=60, public=public)
+    async def item(key):
+        counter["calls"] += 1
+        if key == "missing":
+            return "not found", 200, NO_STORE_HEADERS
+        return f"item {key}"
+
+    return app
+
+
+@pytest.mark.asyncio
+async def test_http_cache_sets_etag_and_returns_304():
+    counter = {"calls": 0}
+    client = _make_cached_app(counter).test_client()
+
+    first = await client.get("/item/a")
+    etag = first.headers["ETag"]
+    assert first.status_code == 200
+    assert first.headers["Cache-Control"] == "public, max-age=60"
+    assert "Set-Cookie" not in first.headers
+
+    second = await client.get("/item/a", headers={"If-None-Match": etag})
+    assert second.status_code == 304
+    assert await second.get_data() == b""
+    assert second.headers["ETag"] == etag
+    assert counter["calls"] == 1
+
+
+@pytest.mark.asyncio
+async def test_http_cache_skips_no_store_and_post():
+    counter = {"calls": 0}
+    client = _make_cached_app(counter).test_client()
+
+    await client.get("/item/missing")
+    response = await client.get("/item/missing")
+    assert response.headers["Cache-Control"] == "no-store"
+    assert "ETag" not in response.headers
+
+    await client.post("/item/a")
+    await client.post("/item/a")
+    assert counter["calls"] == 4
+
+
+@pytest.mark.asyncio
+async def test_http_cache_does_not_store_pages_rendered_over_budget():
+    counter = {"calls": 0}
+    app = _make_cached_app(counter)
+    over_budget = {"on": True}
+
+    @app.before_request
+    async def trace():
+        start_trace(request.path, budget=1)
+        if over_budget["on"]:
+            record_call("horizon", "accounts", 0.01)
+
+    client = app.test_client()
+    degraded = await client.get("/item/a")
+    assert degraded.headers["Cache-Control"] == "no-store"
+    assert "ETag" not in degraded.headers
+
+    over_budget["on"] = False
+    full = await client.get("/item/a")
+    assert full.headers["Cache-Control"] == "public, max-age=60"
+    assert counter["calls"] == 2
+
+
+@pytest.mark.asyncio
+async def test_http_cache_private_is_keyed_by_user():
+    counter = {"calls": 0}
+    app = _make_cached_app(counter, public=False)
+    client = app.test_client()
+
+    response = await client.get("/item/a")
+    assert response.headers["Cache-Control"] == "private, max-age=60"
+    async with client.session_transaction() as sess:
+        sess["user_id"] = 42
+    await client.get("/item/a")
+    await client.get("/item/a")
+
+    assert counter["calls"] == 2
+    assert make_etag(b"item a") == response.headers["ETag"]
+
+
+def _make_compressed_app(counter=None):
+    app = Quart(__name__)
+    app.config["SECRET_KEY"] = "test"
+    install_compression(app, min_size=100)
+
+    @app.route("/big")
+    @http_cache(max_age=60)
+    async def big():
+        if counter is not None:
+            counter["calls"] += 1
+        return "x" * 1000
+
+    @app.route("/small")
+    async def small():
+        return "tiny"
+
+    @app.route("/png")
+    async def png():
+        return b"\x89PNG" * 500, 200, {"Content-Type": "image/png"}
+
+    @app.route("/items")
+    async def items():
+        return stream_json_list([{"id": idx, "text": "y" * 50} for idx in range(300)])
+
+    return app
+
+
+@pytest.mark.asyncio
+async def test_compression_gzips_large_text_responses_only():
+    client = _make_compressed_app().test_client()
+
+    response = await client.get("/big", headers={"Accept-Encoding": "gzip"})
+    assert response.headers["Content-Encoding"] == "gzip"
+    assert "Accept-Encoding" in response.headers["Vary"]
+    assert gzip.decompress(await response.get_data()) == b"x" * 1000
+
+    plain = await client.get("/big")
+    assert "Content-Encoding" not in plain.headers
+    assert await plain.get_data() == b"x" * 1000
+
+    small = await client.get("/small", headers={"Accept-Encoding": "gzip"})
+    assert "Content-Encoding" not in small.headers
+    image = await client.get("/png", headers={"Accept-Encoding": "gzip"})
+    assert "Content-Encoding" not in image.headers
+
+
+@pytest.mark.asyncio
+async def test_compression_respects_quality_and_brotli_availability(monkeypatch):
+    monkeypatch.setattr(quart_tools, "brotli", None)
+    client = _make_compressed_app().test_client()
+
+    response = await client.get("/big", headers={"Accept-Encoding": "br, gzip;q=0.5"})
+    assert response.headers["Content-Encoding"] == "gzip"
+
+    response = await client.get("/big", headers={"Accept-Encoding": "gzip;q=0"})
+    assert "Content-Encoding" not in response.headers
+
+
+@pytest.mark.asyncio
+async def test_compressed_etag_still_matches_if_none_match():
+    counter = {"calls": 0}
+    client = _make_compressed_app(counter).test_client()
+
+    first = await client.get("/big", headers={"Accept-Encoding": "gzip"})
+    etag = first.headers["ETag"]
+    assert etag.endswith('-gzip"')
+
+    second = await client.get(
+        "/big", headers={"Accept-Encoding": "gzip", "If-None-Match": etag}
+    )
+    assert second.status_code == 304
+    assert counter["calls"] == 1
+
+
+@pytest.mark.asyncio
+async def test_streamed_json_is_valid_and_compressed_on_the_fly():
+    client = _make_compressed_app().test_client()
+
+    plain = await client.get("/items")
+    assert plain.content_type == "application/json"
+    items = json.loads(await plain.get_data())
+    assert len(items) == 300 and items[-1] == {"id": 299, "text": "y" * 50}
+
+    response = await client.get("/items", headers={"Accept-Encoding": "gzip"})
+    assert response.headers["Content-Encoding"] == "gzip"
+    body = zlib.decompress(await response.get_data(), 31)
+    assert json.loads(body) == items
+
+
+@pytest.mark.asyncio
+async def test_stream_page_consumes_flashes_before_streaming():
+    app = Quart(__name__)
+    app.config["SECRET_KEY"] = "test"
+
+    @app.route("/flash")
+    async def set_flash():
+        await flash("hello")
+        return "ok"
+
+    template = app.jinja_env.from_string(
+        "{% for category, m in get_flashed_messages(with_categories=true) %}"
+        "[{{ category }}:{{ m }}]{% endfor %}{{ body }}"
+    )
+
+    @app.route("/page")
+    async def page():
+        return await quart_tools.stream_page(template, body="z" * 10)
+
+    client = app.test_client()
+    await client.get("/flash")
+    first = await client.get("/page")
+    assert await first.get_data(as_text=True) == "[message:hello]" + "z" * 10
+    second = await client.get("/page")
+    assert await second.get_data(as_text=True) == "z" * 10
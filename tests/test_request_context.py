@@ -0,0 +1,109 @@
+import asyncio
+
+import pytest
+from sqlalchemy import text
+from sqlalchemy.ext.asyncio import create_async_engine
+
+from db.sql_pool import install_call_tracing
+from other.request_context import (
+    CallBudgetExceeded,
+    budget_exceeded,
+    classify_url,
+    finish_trace,
+    get_current_trace,
+    record_call,
+    start_trace,
+    track_call,
+)
+
+
+def test_classify_url():
+    assert classify_url("https://horizon.stellar.org/accounts/G1") == "horizon"
+    assert classify_url("https://soroban-rpc.mainnet.stellar.gateway.fm") == "soroban"
+    assert classify_url("https://montelibero.getgrist.com/api/docs/x") == "grist"
+    assert classify_url("https://ipfs.io/ipfs/cid") == "http"
+
+
+def test_record_call_without_trace_is_noop():
+    assert get_current_trace() is None
+    record_call("horizon", "accounts", 0.1)
+    assert budget_exceeded() is False
+
+
+@pytest.mark.asyncio
+async def test_trace_propagates_into_gathered_tasks():
+    token = start_trace("/decode/x", budget=3)
+    try:
+
+        async def call(idx):
+            async with track_call("horizon", f"accounts/{idx}"):
+                await asyncio.sleep(0)
+
+        await asyncio.gather(call(1), call(2))
+        trace = get_current_trace()
+        assert trace.call_count == 2
+        assert budget_exceeded() is False
+
+        await call(3)
+        assert budget_exceeded() is True
+        assert trace.summary()["by_kind"]["horizon"]["count"] == 3
+
+        with pytest.raises(CallBudgetExceeded):
+            await call(4)
+        assert trace.call_count == 3
+    finally:
+        trace = finish_trace(token)
+
+    assert get_current_trace() is None
+    assert trace.route == "/decode/x"
+
+
+@pytest.mark.asyncio
+async def test_track_call_records_failures():
+    token = start_trace("/x")
+    try:
+        with pytest.raises(RuntimeError):
+            async with track_call("grist", "EURMTL_users"):
+                raise RuntimeError("boom")
+        trace = get_current_trace()
+    finally:
+        finish_trace(token)
+
+    assert trace.calls[0].ok is False
+    assert trace.budget_exceeded is False
+
+
+@pytest.mark.asyncio
+async def test_install_call_tracing_records_db_queries():
+    engine = create_async_engine("sqlite+aiosqlite:///:memory:")
+    install_call_tracing(engine)
+    token = start_trace("/db")
+    try:
+        async with engine.connect() as conn:
+            await conn.execute(text("SELECT 1"))
+        trace = get_current_trace()
+    finally:
+        finish_trace(token)
+        await engine.dispose()
+
+    assert [(call.kind, call.target) for call in trace.calls] == [("db", "SELECT")]
+
+
+@pytest.mark.asyncio
+async def test_db_queries_have_their_own_budget():
+    token = start_trace("/db", budget=2, db_budget=2)
+    try:
+        record_call("db", "SELECT", 0.01)
+        record_call("db", "SELECT", 0.01)
+        record_call("db", "SELECT", 0.01)
+        trace = get_current_trace()
+        assert trace.db_budget_exceeded is True
+        assert budget_exceeded() is False
+
+        async with track_call("horizon", "accounts/G1"):
+            pass
+    finally:
+        finish_trace(token)
+
+    assert trace.outbound_count == 1
+    assert trace.db_count == 3
@@ -0,0 +1,87 @@
+import asyncio
+import time
+
+import pytest
+from quart import Quart, request
+
+from other.request_context import finish_trace, start_trace, track_call
+from other.request_profiler import install_request_profiling
+
+
+def busy_work(seconds: float):
+    deadline = time.perf_counter() + seconds
+    while time.perf_counter() < deadline:
+        pass
+
+
+def make_app(directory, allowed: bool, checks: list):
+    app = Quart(__name__)
+
+    @app.before_request
+    async def begin_trace():
+        request.trace_token = start_trace(request.path)
+
+    @app.teardown_request
+    async def end_trace(exc):
+        finish_trace(request.trace_token)
+
+    async def is_allowed():
+        checks.append(request.path)
+        return allowed
+
+    install_request_profiling(app, is_allowed, str(directory))
+
+    @app.route("/decode/<tx_hash>")
+    async def decode(tx_hash):
+        async with track_call("horizon", "accounts"):
+            await asyncio.sleep(0.02)
+        busy_work(0.05)
+        return f"decoded {tx_hash}"
+
+    return app
+
+
+@pytest.mark.asyncio
+async def test_profile_returns_collapsed_stacks(tmp_path):
+    checks = []
+    client = make_app(tmp_path, True, checks).test_client()
+
+    response = await client.get("/decode/abc?__profile=1")
+    text = await response.get_data(as_text=True)
+
+    assert response.status_code == 200
+    assert response.headers["X-Profile-Status"] == "200"
+    lines = text.strip().splitlines()
+    assert all(line.startswith("/decode/abc;") for line in lines)
+    assert any("busy_work (tests/test_request_profiler.py:" in line for line in lines)
+    awaited = [line for line in lines if ";[await] horizon;accounts " in line]
+    assert int(awaited[0].rsplit(" ", 1)[1]) >= 15_000
+    cpu = sum(int(line.rsplit(" ", 1)[1]) for line in lines if "busy_work" in line)
+    assert cpu >= 20_000
+    saved = list(tmp_path.iterdir())
+    assert len(saved) == 1
+    assert saved[0].name.endswith("-decode_abc.folded")
+    assert saved[0].read_text(encoding="utf-8") == text
+
+
+@pytest.mark.asyncio
+async def test_profile_requires_permission(tmp_path):
+    checks = []
+    client = make_app(tmp_path, False, checks).test_client()
+
+    response = await client.get("/decode/abc?__profile=1")
+
+    assert await response.get_data(as_text=True) == "decoded abc"
+    assert checks == ["/decode/abc"]
+    assert list(tmp_path.iterdir()) == []
+
+
+@pytest.mark.asyncio
+async def test_no_profile_parameter_skips_permission_check(tmp_path):
+    checks = []
+    client = make_app(tmp_path, True, checks).test_client()
+
+    response = await client.get("/decode/abc")
+
+    assert await response.get_data(as_text=True) == "decoded abc"
+    assert checks == []
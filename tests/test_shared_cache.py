@@ -0,0 +1,69 @@
+from unittest.mock import patch
+
+import pytest
+
+from db.sql_models import User
+from other import cache_tools
+from other.cache_tools import AsyncTTLCache
+from other.shared_cache import SqliteCacheBackend, dumps, loads, register_cache_type
+
+
+@pytest.fixture
+def backend(tmp_path):
+    backend = SqliteCacheBackend(str(tmp_path / "shared.sqlite3"))
+    with patch.object(cache_tools, "_shared_backend", backend):
+        yield backend
+
+
+def test_serialization_roundtrip_for_user_and_horizon_dicts():
+    register_cache_type(User)
+    value = {
+        "user": User(telegram_id=1, account_id="GAAA", username="alice"),
+        "account": {"balances": [{"asset_type": "native", "balance": "1.0"}]},
+    }
+
+    assert loads(dumps(value)) == value
+    assert isinstance(loads(dumps(value))["user"], User)
+
+
+def test_unregistered_objects_are_not_serialized():
+    with pytest.raises(TypeError):
+        dumps(object())
+
+
+@pytest.mark.asyncio
+async def test_backend_drops_rows_after_stale_until(backend):
+    await backend.set("ns", "k", '"v"', expires_at=0, stale_until=10**10)
+    assert await backend.get("ns", "k") == ('"v"', 0, 10**10)
+
+    await backend.set("ns", "k", '"v"', expires_at=0, stale_until=1)
+    assert await backend.get("ns", "k") is None
+
+
+@pytest.mark.asyncio
+async def test_second_worker_reuses_loaded_value(backend):
+    # Два экземпляра кеша с одним именем - как одинаковый кеш в двух воркерах
+    first = AsyncTTLCache(60, name="test.shared", shared=True)
+    second = AsyncTTLCache(60, name="test.shared", shared=True)
+    calls = []
+
+    async def load():
+        calls.append(1)
+        return {"balances": []}
+
+    assert await first.get_or_load(("GAAA",), load) == {"balances": []}
+    assert await second.get_or_load(("GAAA",), load) == {"balances": []}
+    assert len(calls) == 1
+    assert second.stats.shared_hits == 1
+
+    await second.invalidate(("GAAA",))
+    first.clear()
+    assert await first.get(("GAAA",)) is None
+
+
+@pytest.mark.asyncio
+async def test_unshared_cache_does_not_touch_backend(backend):
+    cache = AsyncTTLCache(60, name="test.local")
+    await cache.set("k", "v")
+
+    assert await backend.get("test.local", "k") is None
@@ -0,0 +1,62 @@
+import subprocess
+import sys
+
+from other.config_reader import start_path
+from other.lazy_import import lazy_callable
+from other.startup_profile import parse_importtime, top_imports
+
+IMPORTTIME_SAMPLE = """import time: self [us] | cumulative | imported package
+import time:       120 |        120 |     other.cache_tools
+import time:      1745 |    5221510 |   other.grist_tools
+import time:      2681 |    5828699 | start
+"""
+
+
+def test_parse_importtime_reads_depth_and_times():
+    timings = parse_importtime(IMPORTTIME_SAMPLE)
+
+    assert [item.module for item in timings] == [
+        "other.cache_tools",
+        "other.grist_tools",
+        "start",
+    ]
+    assert timings[0].depth == 2
+    assert timings[2].depth == 0
+    assert timings[1].self_us == 1745
+    assert timings[1].cumulative_us == 5221510
+
+
+def test_top_imports_sorted_by_cumulative_time():
+    timings = parse_importtime(IMPORTTIME_SAMPLE)
+
+    assert [item.module for item in top_imports(timings, top=2)] == [
+        "start",
+        "other.grist_tools",
+    ]
+
+
+def test_lazy_callable_imports_module_on_first_call(monkeypatch):
+    monkeypatch.delitem(sys.modules, "colorsys", raising=False)
+    rgb_to_hsv = lazy_callable("colorsys.rgb_to_hsv")
+
+    assert "colorsys" not in sys.modules
+    assert rgb_to_hsv(1.0, 0.0, 0.0) == (0.0, 1.0, 1.0)
+    assert "colorsys" in sys.modules
+    assert rgb_to_hsv.__name__ == "rgb_to_hsv"
+
+
+def test_heavy_optional_modules_are_not_imported_by_routers():
+    code = (
+        "import sys, routers.helpers, routers.decision, routers.index, "
+        "routers.contracts;"
+        "print(sorted(m for m in ('qrcode', 'gspread_asyncio') if m in sys.modules))"
+    )
+    result = subprocess.run(
+        [sys.executable, "-c", code],
+        cwd=start_path,
+        capture_output=True,
+        text=True,
+        check=True,
+    )
+
+    assert result.stdout.strip() == "[]"
@@ -0,0 +1,50 @@
+from unittest.mock import AsyncMock, patch
+
+import pytest
+
+from other.stellar_sequence import SequenceAllocator
+
+ACCOUNT_ID = "GCWCVYBHVDBZP7U4DDJBPEMWKYMUQDR6PKWS6EHYM2OB4YSZGBU3DEAL"
+
+
+@pytest.mark.asyncio
+async def test_reserve_hands_out_consecutive_sequences_with_one_horizon_call():
+    allocator = SequenceAllocator()
+    load_sequence = AsyncMock(return_value=100)
+
+    with patch.object(allocator, "_load_sequence", load_sequence):
+        first = await allocator.reserve(ACCOUNT_ID)
+        batch = await allocator.reserve(ACCOUNT_ID, count=3)
+        current = await allocator.current(ACCOUNT_ID)
+
+    assert first == [101]
+    assert batch == [102, 103, 104]
+    assert current == 100
+    load_sequence.assert_awaited_once_with(ACCOUNT_ID)
+
+
+@pytest.mark.asyncio
+async def test_refresh_keeps_reserved_numbers_and_resync_drops_them():
+    allocator = SequenceAllocator(ttl=0)
+    load_sequence = AsyncMock(side_effect=[100, 101, 101])
+
+    with patch.object(allocator, "_load_sequence", load_sequence):
+        assert await allocator.reserve(ACCOUNT_ID, count=2) == [101, 102]
+        # Horizon видит только первую транзакцию - не выдаем 102 повторно
+        assert await allocator.reserve(ACCOUNT_ID) == [103]
+
+        allocator.resync(ACCOUNT_ID)
+        assert await allocator.reserve(ACCOUNT_ID) == [102]
+
+
+@pytest.mark.asyncio
+async def test_current_with_refresh_bypasses_cache():
+    allocator = SequenceAllocator()
+    load_sequence = AsyncMock(side_effect=[100, 105])
+
+    with patch.object(allocator, "_load_sequence", load_sequence):
+        assert await allocator.current(ACCOUNT_ID) == 100
+        assert await allocator.current(ACCOUNT_ID) == 100
+        assert await allocator.current(ACCOUNT_ID, refresh=True) == 105
+
+    assert load_sequence.await_count == 2
@@ -6,10 +6,11 @@ from stellar_sdk import (
     Account,
     Asset,
     TextMemo,
+    TransactionEnvelope,
 )
 
 # Импортируем тестируемую функцию
-from services.xdr_parser import update_memo_in_xdr, TransactionEnvelope
+from services.xdr_parser import update_memo_in_xdr
 
 # --- Вспомогательная функция для создания XDR ---
 
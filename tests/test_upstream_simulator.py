@@ -0,0 +1,160 @@
+import aiohttp
+import pytest
+import pytest_asyncio
+from aiohttp import web
+from stellar_sdk import Network, ServerAsync, TransactionEnvelope
+from stellar_sdk.client.aiohttp_client import AiohttpClient
+
+from other import config_reader
+from other.grist_tools import GristAPI, GristTableConfig
+from other.upstream_simulator.app import build_app, simulator_key
+from other.upstream_simulator.faults import FaultInjector, parse_fault_args
+from other.upstream_simulator.loadgen import build_transaction, percentile
+from other.upstream_simulator.world import World
+from other.web_tools import HTTPSessionManager
+from tests.fixtures.horizon import get_free_port
+
+
+@pytest_asyncio.fixture
+async def simulator():
+    """Runs the upstream simulator on a free local port."""
+    port = get_free_port()
+    app = build_app(World(user_count=30, multisig_count=2, signers_per_multisig=5))
+    runner = web.AppRunner(app)
+    await runner.setup()
+    site = web.TCPSite(runner, "127.0.0.1", port)
+    await site.start()
+    app.url = f"http://127.0.0.1:{port}"
+    yield app
+    await runner.cleanup()
+
+
+@pytest.mark.asyncio
+async def test_horizon_account_has_fund_signers(simulator):
+    world = simulator[simulator_key].world
+    fund = world.funds[0]
+
+    async with ServerAsync(
+        f"{simulator.url}/horizon", client=AiohttpClient()
+    ) as server:
+        account = await server.accounts().account_id(fund.account_id).call()
+        loaded = await server.load_account(fund.account_id)
+
+    signers = {signer["key"]: signer["weight"] for signer in account["signers"]}
+    assert signers == dict(fund.signers)
+    assert loaded.sequence == fund.sequence
+
+
+@pytest.mark.asyncio
+async def test_soroban_simulate_returns_string(simulator):
+    payload = {
+        "jsonrpc": "2.0",
+        "id": 1,
+        "method": "simulateTransaction",
+        "params": {"transaction": "AAAA", "xdrFormat": "json"},
+    }
+    async with (
+        aiohttp.ClientSession() as session,
+        session.post(f"{simulator.url}/soroban", json=payload) as response,
+    ):
+        data = await response.json()
+
+    assert data["result"]["results"][0]["returnValueJson"] == {"string": "EURMTL"}
+
+
+@pytest.mark.asyncio
+async def test_grist_api_reads_simulated_tables(simulator):
+    world = simulator[simulator_key].world
+    person = world.people[3]
+    users = GristTableConfig("doc", "Users", base_url=f"{simulator.url}/grist/api/docs")
+    manager = HTTPSessionManager()
+    api = GristAPI(manager)
+    try:
+        by_filter = await api.fetch_data(
+            users, filter_dict={"account_id": [person.account_id]}
+        )
+        by_sql = await api.fetch_data(users, columns=["telegram_id"], offset=3)
+    finally:
+        await manager.close()
+
+    assert by_filter == [
+        {
+            "id": 4,
+            "account_id": person.account_id,
+            "telegram_id": person.telegram_id,
+            "username": person.username,
+        }
+    ]
+    assert by_sql[0]["telegram_id"] == person.telegram_id
+    assert len(by_sql) == len(world.people) - 3
+
+
+@pytest.mark.asyncio
+async def test_telegram_stub_records_messages(simulator):
+    base = f"{simulator.url}/telegram/bot123:abc"
+    async with aiohttp.ClientSession() as session:
+        async with session.get(f"{base}/getMe") as response:
+            me = await response.json()
+        async with session.post(
+            f"{base}/sendMessage", data={"chat_id": "-100", "text": "hi"}
+        ) as response:
+            sent = await response.json()
+
+    assert me["result"]["is_bot"] is True
+    assert sent["result"]["text"] == "hi"
+    assert simulator[simulator_key].telegram.sent[0]["chat"]["id"] == -100
+
+
+@pytest.mark.asyncio
+async def test_fault_injection_returns_errors_and_counts(simulator):
+    async with aiohttp.ClientSession() as session:
+        async with session.post(
+            f"{simulator.url}/__sim/faults", json={"horizon": {"error_rate": 1.0}}
+        ) as response:
+            assert response.status == 200
+        async with session.get(f"{simulator.url}/horizon/assets") as response:
+            status = response.status
+        async with session.get(f"{simulator.url}/__sim/stats") as response:
+            stats = await response.json()
+
+    assert status == 503
+    assert stats["upstreams"]["horizon"]["errors"] == 1
+    assert stats["upstreams"]["grist"]["requests"] == 0
+
+
+def test_parse_fault_args_validates_spec():
+    assert parse_fault_args(["horizon:latency_ms=80", "grist:error_rate=0.5"]) == {
+        "horizon": {"latency_ms": 80},
+        "grist": {"error_rate": 0.5},
+    }
+    with pytest.raises(ValueError):
+        parse_fault_args(["ftp:latency_ms=1"])
+    with pytest.raises(KeyError):
+        FaultInjector().update("ftp", latency_ms=1)
+
+
+def test_loadgen_transaction_is_signable_by_fund_signers():
+    world = World(user_count=20, multisig_count=1, signers_per_multisig=4)
+    body, signers = build_transaction(world, 0, 0)
+
+    envelope = TransactionEnvelope.from_xdr(body, Network.PUBLIC_NETWORK_PASSPHRASE)
+    assert envelope.transaction.source.account_id == world.funds[0].account_id
+    assert {kp.public_key for kp in signers} == {
+        key for key, weight in world.funds[0].signers if weight > 0
+    }
+
+
+def test_percentile_interpolates():
+    assert percentile([], 99) == 0.0
+    assert percentile([1.0, 2.0, 3.0, 4.0], 50) == 2.5
+    assert percentile([float(value) for value in range(101)], 99) == 99.0
+
+
+def test_simulator_url(monkeypatch):
+    monkeypatch.setattr(config_reader.config, "upstream_simulator_url", "")
+    assert config_reader.simulator_url("/horizon") is None
+
+    monkeypatch.setattr(
+        config_reader.config, "upstream_simulator_url", "http://127.0.0.1:8900/"
+    )
+    assert config_reader.simulator_url("/horizon") == "http://127.0.0.1:8900/horizon"
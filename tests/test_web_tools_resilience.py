@@ -0,0 +1,196 @@
+import asyncio
+from datetime import UTC, datetime, timedelta
+from email.utils import format_datetime
+
+import pytest
+import pytest_asyncio
+from aiohttp import web
+
+from other.request_context import CallBudgetExceeded, finish_trace, start_trace
+from other.web_tools import CircuitBreaker, HTTPSessionManager, retry_after_seconds
+
+
+@pytest_asyncio.fixture
+async def upstream():
+    """Локальный сервер: отвечает статусами из очереди, потом 200"""
+    state = {"statuses": [], "hits": 0}
+
+    async def handler(request):
+        state["hits"] += 1
+        status = state["statuses"].pop(0) if state["statuses"] else 200
+        return web.json_response(
+            {"status": status}, status=status, headers={"Retry-After": "0"}
+        )
+
+    app = web.Application()
+    app.router.add_route("*", "/", handler)
+    runner = web.AppRunner(app)
+    await runner.setup()
+    site = web.TCPSite(runner, "127.0.0.1", 0)
+    await site.start()
+    port = site._server.sockets[0].getsockname()[1]
+    state["url"] = f"http://127.0.0.1:{port}/"
+    yield state
+    await runner.cleanup()
+
+
+@pytest.mark.asyncio
+async def test_idempotent_request_is_retried_on_503(upstream):
+    manager = HTTPSessionManager()
+    upstream["statuses"] = [503, 502]
+    try:
+        response = await manager.get_web_request("GET", upstream["url"])
+    finally:
+        await manager.close()
+
+    assert response.status == 200
+    assert upstream["hits"] == 3
+    stats = manager.stats()[upstream["url"].split("/")[2]]
+    assert stats["retries"] == 2
+    assert stats["circuit"] == "closed"
+
+
+@pytest.mark.asyncio
+async def test_post_is_not_retried(upstream):
+    manager = HTTPSessionManager()
+    upstream["statuses"] = [503]
+    try:
+        response = await manager.get_web_request("POST", upstream["url"], json={})
+    finally:
+        await manager.close()
+
+    assert response.status == 503
+    assert upstream["hits"] == 1
+
+
+@pytest.mark.asyncio
+async def test_circuit_opens_and_rejects_without_calling_host(upstream):
+    manager = HTTPSessionManager(max_retries=0, failure_threshold=2)
+    upstream["statuses"] = [500, 500]
+    try:
+        await manager.get_web_request("GET", upstream["url"])
+        await manager.get_web_request("GET", upstream["url"])
+        rejected = await manager.get_web_request("GET", upstream["url"])
+    finally:
+        await manager.close()
+
+    assert rejected.status == 503
+    assert "Circuit open" in rejected.data
+    assert upstream["hits"] == 2
+
+
+def test_circuit_half_open_allows_one_trial(monkeypatch):
+    now = [0.0]
+    monkeypatch.setattr("other.web_tools.time.monotonic", lambda: now[0])
+    breaker = CircuitBreaker(failure_threshold=1, reset_timeout=10)
+
+    breaker.record_failure()
+    assert breaker.allow() is False
+
+    now[0] = 11
+    assert breaker.allow() is True
+    assert breaker.allow() is False  # пробный запрос уже идет
+    breaker.record_success()
+    assert breaker.allow() is True
+
+
+@pytest.mark.asyncio
+async def test_cancelled_half_open_probe_does_not_wedge_circuit(upstream):
+    manager = HTTPSessionManager(max_retries=0, failure_threshold=1)
+    upstream["statuses"] = [500]
+    host = upstream["url"].split("/")[2]
+    try:
+        await manager.get_web_request("GET", upstream["url"])
+        breaker = manager._breaker(host)
+        breaker.opened_at -= breaker.reset_timeout
+
+        entered = asyncio.Event()
+        original_send = manager._send
+
+        async def hanging_send(*args, **kwargs):
+            entered.set()
+            await asyncio.sleep(60)
+            return await original_send(*args, **kwargs)
+
+        manager._send = hanging_send
+        probe = asyncio.create_task(manager.get_web_request("GET", upstream["url"]))
+        await entered.wait()
+        probe.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await probe
+        assert manager.stats()[host]["circuit"] == "open"
+
+        manager._send = original_send
+        response = await manager.get_web_request("GET", upstream["url"])
+    finally:
+        await manager.close()
+
+    assert response.status == 200
+    assert manager.stats()[host]["circuit"] == "closed"
+
+
+@pytest.mark.asyncio
+async def test_unexpected_probe_error_reopens_circuit(upstream):
+    manager = HTTPSessionManager(max_retries=0, failure_threshold=1)
+    upstream["statuses"] = [500]
+    host = upstream["url"].split("/")[2]
+
+    async def broken_send(*args, **kwargs):
+        raise ValueError("bad payload")
+
+    try:
+        await manager.get_web_request("GET", upstream["url"])
+        breaker = manager._breaker(host)
+        breaker.opened_at -= breaker.reset_timeout
+        manager._send = broken_send
+        with pytest.raises(ValueError):
+            await manager.get_web_request("GET", upstream["url"])
+    finally:
+        await manager.close()
+
+    assert breaker.state == CircuitBreaker.OPEN
+    assert breaker.allow() is False
+
+
+@pytest.mark.asyncio
+async def test_expired_session_is_rotated_and_closed_later():
+    manager = HTTPSessionManager()
+    manager.session_close_grace = 0
+    first = await manager.get_session()
+    assert await manager.get_session() is first
+
+    manager.session_start_time -= manager.max_session_duration + 1
+    second = await manager.get_session()
+    assert second is not first
+    assert not first.closed  # запросы старой сессии успевают закончиться
+
+    await asyncio.sleep(0.01)
+    assert first.closed
+    await manager.close()
+    assert second.closed
+
+
+def test_retry_after_accepts_seconds_and_http_date():
+    assert retry_after_seconds("3") == 3
+    assert retry_after_seconds(None) is None
+    assert retry_after_seconds("soon") is None
+    later = datetime.now(UTC) + timedelta(seconds=30)
+    assert 25 < retry_after_seconds(format_datetime(later, usegmt=True)) <= 30
+
+
+@pytest.mark.asyncio
+async def test_request_over_call_budget_does_not_reach_host(upstream):
+    manager = HTTPSessionManager()
+    token = start_trace("/decode/x", budget=1)
+    try:
+        await manager.get_web_request("GET", upstream["url"])
+        with pytest.raises(CallBudgetExceeded):
+            await manager.get_web_request("GET", upstream["url"])
+    finally:
+        finish_trace(token)
+        await manager.close()
+
+    assert upstream["hits"] == 1
+    stats = manager.stats()[upstream["url"].split("/")[2]]
+    assert stats["failures"] == 0
+    assert stats["circuit"] == "closed"
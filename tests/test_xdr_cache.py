@@ -0,0 +1,80 @@
+import pytest
+from stellar_sdk import Account, Keypair, Network, TextMemo, TransactionBuilder
+
+from other.xdr_cache import (
+    XdrEnvelopeCache,
+    copy_envelope,
+    parse_envelope,
+    xdr_envelope_cache,
+)
+from services.xdr_parser import update_memo_in_xdr
+
+
+def make_xdr(sequence: int = 1, memo: str = "original", signed: bool = True) -> str:
+    source = Keypair.random()
+    envelope = (
+        TransactionBuilder(
+            Account(source.public_key, sequence),
+            network_passphrase=Network.PUBLIC_NETWORK_PASSPHRASE,
+            base_fee=100,
+        )
+        .add_text_memo(memo)
+        .append_bump_sequence_op(sequence + 10)
+        .set_timeout(300)
+        .build()
+    )
+    if signed:
+        envelope.sign(source)
+    return envelope.to_xdr()
+
+
+def test_parse_envelope_returns_cached_object():
+    xdr = make_xdr()
+    before = xdr_envelope_cache.snapshot()
+
+    first = parse_envelope(xdr)
+    second = parse_envelope(xdr)
+
+    after = xdr_envelope_cache.snapshot()
+    assert first is second
+    assert after["misses"] == before["misses"] + 1
+    assert after["hits"] == before["hits"] + 1
+
+
+def test_copy_envelope_keeps_cached_signatures():
+    xdr = make_xdr()
+    cached = parse_envelope(xdr)
+
+    unsigned = copy_envelope(cached, signatures=[])
+    extra = copy_envelope(cached)
+    extra.sign(Keypair.random())
+
+    assert unsigned.signatures == []
+    assert len(extra.signatures) == 2
+    assert len(cached.signatures) == 1
+    assert unsigned.transaction is cached.transaction
+    assert unsigned.hash_hex() == cached.hash_hex()
+    assert parse_envelope(xdr).to_xdr() == xdr
+
+
+def test_update_memo_does_not_touch_cached_envelope():
+    xdr = make_xdr(memo="original")
+
+    updated = update_memo_in_xdr(xdr, "changed")
+
+    assert parse_envelope(xdr).transaction.memo == TextMemo("original")
+    assert parse_envelope(updated).transaction.memo == TextMemo("changed")
+
+
+def test_cache_is_bounded_and_skips_bad_xdr():
+    cache = XdrEnvelopeCache(maxsize=2)
+    xdrs = [make_xdr(sequence) for sequence in (1, 2, 3)]
+    for xdr in xdrs:
+        cache.get(xdr, Network.PUBLIC_NETWORK_PASSPHRASE)
+
+    with pytest.raises(ValueError):
+        cache.get("not-xdr", Network.PUBLIC_NETWORK_PASSPHRASE)
+
+    assert cache.snapshot() == {"hits": 0, "misses": 3, "evictions": 1, "size": 2}
+    cache.get(xdrs[2], Network.PUBLIC_NETWORK_PASSPHRASE)
+    assert cache.stats.hits == 1